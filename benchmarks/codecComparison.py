@@ -0,0 +1,72 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+Compare the encoded size, and the time taken to encode and decode, of sample telemetry using each of the
+built-in message codecs, with and without deflate compression.  Codecs whose optional dependency is not installed
+are skipped.
+
+    python benchmarks/codecComparison.py [iterations]
+"""
+
+import sys
+import time
+from datetime import datetime
+
+import pytz
+from wiotp.sdk import JsonCodec, CborCodec, MsgPackCodec, CompressedCodec
+from wiotp.sdk.messages import codecAvailable
+
+CODECS = [("json", JsonCodec), ("cbor", CborCodec), ("msgpack", MsgPackCodec)]
+
+SAMPLES = {
+    "environment sensor": {"temperature": 21.5, "humidity": 40.2, "pressure": 1013, "battery": 87, "ok": True},
+    "gps fix": {"lat": 52.370216, "lon": 4.895168, "alt": 2.1, "speed": 13.4, "heading": 271, "sats": 9},
+    "vibration window": {"axis": "x", "rate": 1000, "samples": [round(0.01 * (i % 37) - 0.18, 3) for i in range(200)]},
+    "gateway status": {
+        "uptime": 864213,
+        "firmware": "1.4.2",
+        "children": [{"id": "sensor-%03d" % i, "rssi": -60 - i % 20, "online": i % 7 != 0} for i in range(25)],
+    },
+}
+
+
+class PahoMessage(object):
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def measure(name, codec, data, iterations):
+    encoded = codec.encode(data, None)
+    message = PahoMessage(encoded)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        codec.encode(data, None)
+    encode = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        codec.decode(message)
+    decode = (time.perf_counter() - start) / iterations
+
+    print("  %-16s %6d bytes %9.2f us/encode %9.2f us/decode" % (name, len(encoded), encode * 1e6, decode * 1e6))
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    for sample, data in SAMPLES.items():
+        print(sample)
+        for name, codec in CODECS:
+            if not codecAvailable(codec):
+                print("  %-16s not installed" % (name))
+                continue
+            measure(name, codec, data, iterations)
+            measure(name + "-deflate", CompressedCodec(codec), data, iterations)
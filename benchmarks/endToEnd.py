@@ -0,0 +1,319 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+Measure the throughput and latency of real device, gateway and application clients, connected over loopback to
+the in-process test broker (wiotp.sdk.testing.Broker).  The broker runs in the same process, so absolute numbers
+are lower than against a dedicated broker, but they are comparable between runs on the same machine.
+
+Scenarios:
+
+- publish:   Events published by a device at each QoS level, and the publish-to-confirmation latency under load
+- latency:   Publish-to-confirmation latency of QoS 1 events published one at a time
+- receive:   Events received by an application from many devices publishing at once
+- gateway:   Events received by an application that a gateway publishes on behalf of thousands of devices
+- reconnect: Time for an application with many subscriptions to reconnect and restore them
+
+Results are printed, and can be written as JSON with --output so that runs against different SDK versions can be
+compared with --compare:
+
+    python benchmarks/endToEnd.py [--messages N] [--output results.json] [--compare baseline.json] [scenario ...]
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytz
+from paho.mqtt import __version__ as pahoVersion
+
+import wiotp.sdk
+import wiotp.sdk.application
+import wiotp.sdk.device
+import wiotp.sdk.gateway
+from wiotp.sdk.testing import Broker
+
+SCENARIOS = ["publish", "latency", "receive", "gateway", "reconnect"]
+
+OPTIONS = {"logLevel": logging.ERROR, "mqtt": {"port": 1883, "reconnect": {"minDelay": 0.01, "jitter": 0}}}
+
+DATA = {"temperature": 21.5, "humidity": 40, "ok": True}
+
+# Metrics compared by --compare, by whether a higher or a lower value is an improvement
+HIGHER_IS_BETTER = ("PerSecond",)
+LOWER_IS_BETTER = ("seconds", "Seconds", "p50", "p90", "p99", "max", "mean")
+
+
+def deviceClient(broker, typeId="benchmark", deviceId="device", cls=wiotp.sdk.device.DeviceClient):
+    client = cls(
+        {
+            "identity": {"orgId": "myorg", "typeId": typeId, "deviceId": deviceId},
+            "auth": {"token": "t"},
+            "options": OPTIONS,
+        }
+    )
+    broker.attach(client).connect()
+    return client
+
+
+def applicationClient(broker, appId="benchmark"):
+    client = wiotp.sdk.application.ApplicationClient(
+        {"identity": {"appId": appId}, "auth": {"key": "a-myorg-benchmark", "token": "t"}, "options": OPTIONS}
+    )
+    broker.attach(client).connect()
+    return client
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    last = len(values) - 1
+    return {
+        "p50": values[int(last * 0.50)],
+        "p90": values[int(last * 0.90)],
+        "p99": values[int(last * 0.99)],
+        "max": values[last],
+        "mean": sum(values) / len(values),
+    }
+
+
+class Counter(object):
+    """
+    Counts received events, and records when the expected number have arrived
+    """
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.count = 0
+        self.devices = set()
+        self.done = threading.Event()
+
+    def __call__(self, event):
+        self.count += 1
+        self.devices.add(event.device)
+        if self.count >= self.expected:
+            self.done.set()
+
+
+def benchmarkPublish(broker, args):
+    results = {}
+    for qos in [0, 1, 2]:
+        client = deviceClient(broker)
+        futures = []
+        start = time.perf_counter()
+        for i in range(args.messages):
+            futures.append(client.publishEvent("reading", "json", DATA, qos=qos))
+        confirmed = all(future.wait(60) for future in futures)
+        elapsed = time.perf_counter() - start
+        client.disconnect()
+
+        results["publish.qos%d" % qos] = {
+            "messages": args.messages,
+            "confirmed": confirmed,
+            "seconds": elapsed,
+            "messagesPerSecond": args.messages / elapsed,
+            "latency": percentiles([future.latency for future in futures if future.latency is not None]),
+        }
+    return results
+
+
+def benchmarkLatency(broker, args):
+    client = deviceClient(broker)
+    samples = max(args.messages // 10, 100)
+    latencies = []
+    for i in range(samples):
+        future = client.publishEvent("reading", "json", DATA, qos=1)
+        if future.wait(10):
+            latencies.append(future.latency)
+    client.disconnect()
+    return {"latency.qos1": {"messages": samples, "latency": percentiles(latencies)}}
+
+
+def benchmarkReceive(broker, args):
+    app = applicationClient(broker)
+    perDevice = max(args.messages // args.devices, 1)
+    counter = Counter(perDevice * args.devices)
+    app.deviceEventCallback = counter
+    app.subscribeToDeviceEvents(typeId="benchmark")
+    app.subscriptionsAcknowledged.wait(10)
+
+    devices = [deviceClient(broker, deviceId="device%d" % i) for i in range(args.devices)]
+
+    def publish(device):
+        for i in range(perDevice):
+            device.publishEvent("reading", "json", DATA)
+
+    threads = [threading.Thread(target=publish, args=(device,)) for device in devices]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    counter.done.wait(60)
+    elapsed = time.perf_counter() - start
+
+    for client in devices + [app]:
+        client.disconnect()
+    return {
+        "receive": {
+            "devices": args.devices,
+            "messages": counter.expected,
+            "received": counter.count,
+            "seconds": elapsed,
+            "messagesPerSecond": counter.count / elapsed,
+        }
+    }
+
+
+def benchmarkGateway(broker, args):
+    app = applicationClient(broker)
+    messages = max(args.messages, args.children)
+    counter = Counter(messages)
+    app.deviceEventCallback = counter
+    app.subscribeToDeviceEvents(typeId="child")
+    app.subscriptionsAcknowledged.wait(10)
+
+    gateway = deviceClient(broker, "gateway", "gateway", cls=wiotp.sdk.gateway.GatewayClient)
+    start = time.perf_counter()
+    for i in range(messages):
+        gateway.publishDeviceEvent("child", "child%d" % (i % args.children), "reading", "json", DATA)
+    counter.done.wait(60)
+    elapsed = time.perf_counter() - start
+
+    gateway.disconnect()
+    app.disconnect()
+    return {
+        "gateway": {
+            "childDevices": len(counter.devices),
+            "messages": messages,
+            "received": counter.count,
+            "seconds": elapsed,
+            "messagesPerSecond": counter.count / elapsed,
+        }
+    }
+
+
+def benchmarkReconnect(broker, args):
+    app = applicationClient(broker)
+    batch = app.subscribeMany(
+        [("iot-2/type/benchmark/id/device%d/evt/+/fmt/+" % i, 0) for i in range(args.subscriptions)]
+    )
+    batch.wait(30)
+
+    previous = app.restoredSubscriptions
+    start = time.perf_counter()
+    broker.disconnectClient(app.clientId)
+    while app.restoredSubscriptions is previous and time.perf_counter() - start < 30:
+        time.sleep(0.001)
+    reconnected = time.perf_counter() - start
+    restored = app.restoredSubscriptions is not previous and app.restoredSubscriptions.wait(30)
+    elapsed = time.perf_counter() - start
+
+    app.disconnect()
+    return {
+        "reconnect": {
+            "subscriptions": args.subscriptions,
+            "restored": restored,
+            "reconnectSeconds": reconnected,
+            "seconds": elapsed,
+        }
+    }
+
+
+def flatten(results, prefix=""):
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, prefix + key + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[prefix + key] = value
+    return values
+
+
+def report(results):
+    for name, value in sorted(flatten(results).items()):
+        if isinstance(value, float):
+            print("%-40s %14.6f" % (name, value))
+        else:
+            print("%-40s %14d" % (name, value))
+
+
+def compare(results, parameters, baselineFile):
+    with open(baselineFile) as f:
+        baseline = json.load(f)
+    print("\nCompared with SDK %s (%s):" % (baseline["sdk"], baseline["timestamp"]))
+    if baseline["parameters"] != parameters:
+        print("Warning: the baseline was run with different parameters: %s" % baseline["parameters"])
+    before = flatten(baseline["results"])
+    for name, value in sorted(flatten(results).items()):
+        if not name.endswith(HIGHER_IS_BETTER + LOWER_IS_BETTER) or not before.get(name):
+            continue
+        change = (value - before[name]) / before[name] * 100
+        better = (change < 0) == name.endswith(LOWER_IS_BETTER)
+        print("%-40s %14.6f -> %14.6f %+7.1f%% %s" % (name, before[name], value, change, "" if better else "worse"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end client benchmarks against the in-process test broker")
+    parser.add_argument("scenarios", nargs="*", help="Scenarios to run: %s.  Defaults to all" % ", ".join(SCENARIOS))
+    parser.add_argument("--messages", type=int, default=20000, help="Events published by each scenario")
+    parser.add_argument("--devices", type=int, default=10, help="Devices publishing in the receive scenario")
+    parser.add_argument("--children", type=int, default=5000, help="Child devices in the gateway scenario")
+    parser.add_argument("--subscriptions", type=int, default=1000, help="Subscriptions in the reconnect scenario")
+    parser.add_argument("--output", help="Write the results to this file as JSON")
+    parser.add_argument("--compare", help="Compare the results with a file previously written by --output")
+    args = parser.parse_args()
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error("Unknown scenario: %s" % scenario)
+
+    benchmarks = {
+        "publish": benchmarkPublish,
+        "latency": benchmarkLatency,
+        "receive": benchmarkReceive,
+        "gateway": benchmarkGateway,
+        "reconnect": benchmarkReconnect,
+    }
+
+    results = {}
+    with Broker(record=False) as broker:
+        for scenario in args.scenarios or SCENARIOS:
+            print("Running %s ..." % scenario, file=sys.stderr)
+            results.update(benchmarks[scenario](broker, args))
+
+    parameters = {
+        "messages": args.messages,
+        "devices": args.devices,
+        "children": args.children,
+        "subscriptions": args.subscriptions,
+    }
+
+    report(results)
+    if args.compare:
+        compare(results, parameters, args.compare)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "sdk": wiotp.sdk.__version__,
+                    "python": platform.python_version(),
+                    "paho": pahoVersion,
+                    "platform": platform.platform(),
+                    "timestamp": datetime.now(pytz.utc).isoformat(),
+                    "parameters": parameters,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
@@ -0,0 +1,75 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+Compare the installed JSON backends (see wiotp.sdk.jsonBackend) encoding and decoding representative event
+payloads through JsonCodec.  Backends that are not installed are skipped.
+
+    python benchmarks/jsonBackends.py [iterations]
+"""
+
+import sys
+import time
+
+from wiotp.sdk import jsonBackend, JsonCodec, ConfigurationException
+
+
+class PahoMessage(object):
+    def __init__(self, payload):
+        self.payload = payload
+
+
+PAYLOADS = {
+    "small sensor reading": {"temperature": 21.5, "humidity": 40, "ok": True},
+    "device status": {
+        "d": {
+            "status": "running",
+            "uptime": 864213,
+            "firmware": {"version": "1.4.2", "build": "2024-05-01T12:30:00Z"},
+            "network": {"rssi": -67, "ssid": "plant-floor-3", "ip": "10.4.12.87"},
+            "errors": [],
+        }
+    },
+    "100 sample batch": {
+        "samples": [{"t": 1714566600 + i, "v": [i * 0.5, i * 0.25, -i * 0.125], "q": "good"} for i in range(100)]
+    },
+}
+
+
+def measure(backend, name, data, iterations):
+    encoded = JsonCodec.encode(data)
+    message = PahoMessage(encoded)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        JsonCodec.encode(data)
+    encode = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        JsonCodec.decode(message)
+    decode = (time.perf_counter() - start) / iterations
+
+    print(
+        "%-8s %-22s %6d bytes %9.2f us/encode %9.2f us/decode"
+        % (backend, name, len(encoded), encode * 1e6, decode * 1e6)
+    )
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for backend in jsonBackend.BACKENDS:
+        try:
+            jsonBackend.setBackend(backend)
+        except ConfigurationException:
+            print("%-8s not installed" % (backend))
+            continue
+        for name, data in PAYLOADS.items():
+            measure(backend, name, data, iterations)
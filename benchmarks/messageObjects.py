@@ -0,0 +1,152 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+Compare the lazily decoded, __slots__ based wiotp.sdk.application.Event and Status classes with the eagerly
+decoded classes they replaced (reproduced below).  For each, the script reports the time taken to construct a
+message and read only its id (the common case for a handler that filters messages), the time taken when the
+decoded data is read as well, and the memory retained per message when messages are queued.
+
+    python benchmarks/messageObjects.py [messages]
+"""
+
+import json
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import iso8601
+import pytz
+import wiotp.sdk
+import wiotp.sdk.application
+
+DEVICE_EVENT_RE = re.compile("iot-2/type/(.+)/id/(.+)/evt/(.+)/fmt/(.+)")
+DEVICE_STATUS_RE = re.compile("iot-2/type/(.+)/id/(.+)/mon")
+
+
+class LegacyJsonCodec(object):
+    @staticmethod
+    def decode(message):
+        data = json.loads(message.payload.decode("utf-8"))
+        return wiotp.sdk.Message(data, datetime.now(pytz.timezone("UTC")))
+
+
+class LegacyEvent:
+    def __init__(self, pahoMessage, messageEncoderModules):
+        result = DEVICE_EVENT_RE.match(pahoMessage.topic)
+        self.typeId = result.group(1)
+        self.deviceId = result.group(2)
+        self.device = self.typeId + ":" + self.deviceId
+        self.eventId = result.group(3)
+        self.format = result.group(4)
+        self.payload = pahoMessage.payload
+        message = messageEncoderModules[self.format].decode(pahoMessage)
+        self.timestamp = message.timestamp
+        self.data = message.data
+
+
+class LegacyStatus:
+    def __init__(self, message):
+        result = DEVICE_STATUS_RE.match(message.topic)
+        self.payload = json.loads(message.payload.decode("utf-8"))
+        self.typeId = result.group(1)
+        self.deviceId = result.group(2)
+        self.device = self.typeId + ":" + self.deviceId
+        for key in ("ClientAddr", "Protocol", "ClientID", "User", "Action", "Port", "WriteMsg", "ReadMsg", "Reason"):
+            setattr(self, key, self.payload.get(key))
+        self.time = iso8601.parse_date(self.payload["Time"]) if "Time" in self.payload else None
+        self.connectTime = iso8601.parse_date(self.payload["ConnectTime"]) if "ConnectTime" in self.payload else None
+        self.retained = message.retain
+
+
+class PahoMessage(object):
+    __slots__ = ("topic", "payload", "retain")
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+        self.retain = False
+
+
+EVENT_PAYLOAD = json.dumps({"d": {"temperature": 21.5, "humidity": 40, "pressure": 1013, "status": "ok"}}).encode()
+STATUS_PAYLOAD = json.dumps(
+    {
+        "ClientAddr": "195.212.29.68",
+        "Protocol": "mqtt-tcp",
+        "ClientID": "d:org:sensor:dev00001",
+        "User": "use-token-auth",
+        "Time": "2014-07-07T06:37:56.494-04:00",
+        "Action": "Disconnect",
+        "ConnectTime": "2014-07-07T06:37:56.493-04:00",
+        "Port": 1883,
+        "Reason": "The connection has completed normally.",
+    }
+).encode()
+
+
+def throughput(build, messages, read):
+    start = time.perf_counter()
+    for message in messages:
+        read(build(message))
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def retained(build, messages):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(message) for message in messages]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size / len(messages)
+
+
+def compare(name, legacy, current, messages, readId, readData):
+    for label, build in (("legacy", legacy), ("current", current)):
+        print(
+            "%-7s %-8s %8.2f us/message (id only) %8.2f us/message (with data) %8.0f bytes/message retained"
+            % (
+                name,
+                label,
+                throughput(build, messages, readId),
+                throughput(build, messages, readData),
+                retained(build, messages),
+            )
+        )
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    events = [
+        PahoMessage("iot-2/type/sensor/id/dev%05d/evt/reading/fmt/json" % (i % 1000), EVENT_PAYLOAD)
+        for i in range(count)
+    ]
+    legacyCodecs = {"json": LegacyJsonCodec}
+    codecs = {"json": wiotp.sdk.JsonCodec}
+    compare(
+        "Event",
+        lambda m: LegacyEvent(m, legacyCodecs),
+        lambda m: wiotp.sdk.application.Event(m, codecs),
+        events,
+        lambda e: e.eventId,
+        lambda e: e.data,
+    )
+
+    statuses = [PahoMessage("iot-2/type/sensor/id/dev%05d/mon" % (i % 1000), STATUS_PAYLOAD) for i in range(count)]
+    compare(
+        "Status",
+        LegacyStatus,
+        wiotp.sdk.application.Status,
+        statuses,
+        lambda s: s.deviceId,
+        lambda s: s.time,
+    )
@@ -0,0 +1,63 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+Compare sending a window of vibration samples as a NumPy array using the ndarray codec with converting it to a list
+and sending it as JSON.
+
+    python benchmarks/ndarrayCodec.py [samples] [iterations]
+"""
+
+import sys
+import time
+
+import numpy
+from wiotp.sdk import JsonCodec, NdArrayCodec
+
+
+class PahoMessage(object):
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def measure(name, encode, decode, iterations):
+    payload = encode()
+    message = PahoMessage(payload)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        encode()
+    encodeTime = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        decode(message)
+    decodeTime = (time.perf_counter() - start) / iterations
+
+    print("%-8s %8d bytes %10.2f us/encode %10.2f us/decode" % (name, len(payload), encodeTime * 1e6, decodeTime * 1e6))
+
+
+if __name__ == "__main__":
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    window = numpy.random.default_rng(0).standard_normal((samples, 3)).astype(numpy.float32)
+
+    measure(
+        "json",
+        lambda: JsonCodec.encode(window.tolist()),
+        lambda message: numpy.array(JsonCodec.decode(message).data, dtype=numpy.float32),
+        iterations,
+    )
+    measure(
+        "ndarray",
+        lambda: NdArrayCodec.encode(window),
+        lambda message: NdArrayCodec.decode(message).data,
+        iterations,
+    )
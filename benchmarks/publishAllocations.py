@@ -0,0 +1,83 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+Compare the per-publish cost of DeviceClient.publishEvent() with a prepared publisher created by
+DeviceClient.publisher().
+
+The Paho client's publish() is replaced by a stub that confirms each message immediately, so only the
+work done by the SDK itself is measured.  For each path the script reports the mean time per publish, and
+the mean number of bytes allocated (peak traced memory) during a single publish.
+
+    python benchmarks/publishAllocations.py [iterations]
+"""
+
+import logging
+import sys
+import time
+import tracemalloc
+
+import paho.mqtt.client as paho
+import wiotp.sdk.device
+
+
+class StubPublish(object):
+    def __init__(self, client):
+        self.client = client
+        self.mid = 0
+
+    def __call__(self, topic, payload=None, qos=0, retain=False):
+        self.mid = self.mid % 65535 + 1
+        self.client._onPublish(None, None, self.mid)
+        return (paho.MQTT_ERR_SUCCESS, self.mid)
+
+
+def createClient():
+    client = wiotp.sdk.device.DeviceClient(
+        {
+            "identity": {"orgId": "myorg", "typeId": "mytype", "deviceId": "mydevice"},
+            "auth": {"token": "mytoken"},
+            "options": {"logLevel": logging.ERROR, "mqtt": {"port": 1883}},
+        }
+    )
+    client.client.publish = StubPublish(client)
+    client.connectEvent.set()
+    return client
+
+
+def measure(name, publish, iterations):
+    data = {"temperature": 21.5, "humidity": 40}
+
+    # Warm up any caches before measuring
+    for i in range(1000):
+        publish(data)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        publish(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    peak = 0
+    for i in range(iterations):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        publish(data)
+        peak += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+
+    print("%-28s %8.2f us/publish %8.0f bytes/publish" % (name, elapsed / iterations * 1e6, peak / iterations))
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    client = createClient()
+
+    measure("publishEvent()", lambda data: client.publishEvent("status", "json", data), iterations)
+    measure("publisher(...).publish()", client.publisher("status", "json").publish, iterations)
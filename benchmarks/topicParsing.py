@@ -0,0 +1,68 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+Compare classifying inbound device event topics with the regular expression previously used by
+wiotp.sdk.application.Event against wiotp.sdk.topics.parseTopic(), for a stream of messages from a fixed
+population of devices.  Topics are rebuilt for every message, as they are when Paho decodes a PUBLISH packet.
+
+    python benchmarks/topicParsing.py [messages] [devices]
+"""
+
+import re
+import sys
+import time
+
+from wiotp.sdk.topics import parseTopic
+
+DEVICE_EVENT_RE = re.compile("iot-2/type/(.+)/id/(.+)/evt/(.+)/fmt/(.+)")
+
+
+def regexParse(topic):
+    result = DEVICE_EVENT_RE.match(topic)
+    typeId = result.group(1)
+    deviceId = result.group(2)
+    return (typeId, deviceId, typeId + ":" + deviceId, result.group(3), result.group(4))
+
+
+def splitParse(topic):
+    parsed = parseTopic(topic)
+    return (parsed.typeId, parsed.deviceId, parsed.device, parsed.name, parsed.format)
+
+
+def measure(name, parse, topics):
+    # Warm up any caches before measuring
+    for topic in topics[:10000]:
+        parse(topic)
+
+    start = time.perf_counter()
+    for topic in topics:
+        parse(topic)
+    elapsed = time.perf_counter() - start
+
+    # Hold on to every device string, as an application queueing the messages would, and count the copies
+    devices = [parse(topic)[2] for topic in topics]
+    copies = len(set(map(id, devices)))
+
+    print("%-12s %8.3f us/message %9d device string objects" % (name, elapsed / len(topics) * 1e6, copies))
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    devices = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    # bytes.decode() creates a new string for every message, just as Paho does
+    encoded = [
+        ("iot-2/type/sensor/id/dev%05d/evt/%s/fmt/json" % (i % devices, ("temp", "status")[i % 2])).encode("utf-8")
+        for i in range(messages)
+    ]
+    topics = [topic.decode("utf-8") for topic in encoded]
+
+    measure("regex", regexParse, topics)
+    measure("parseTopic", splitParse, topics)
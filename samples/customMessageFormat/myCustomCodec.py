@@ -40,6 +40,9 @@ class MyCodec(MessageCodec):
         world,10
     """
 
+    # The timestamp is not included in the encoded message
+    requiresTimestamp = False
+
     @staticmethod
     def encode(data=None, timestamp=None):
         return data["hello"] + "," + str(data["x"])
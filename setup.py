@@ -36,6 +36,7 @@ setup(
         'wiotp.sdk.device',
         'wiotp.sdk.gateway',
         'wiotp.sdk.application',
+        'wiotp.sdk.testing',
         'wiotp.sdk.api',
         'wiotp.sdk.api.dsc',
         'wiotp.sdk.api.registry',
@@ -60,7 +61,7 @@ setup(
         "iso8601 >= 0.1.12",
         "pytz >= 2020.1",
         "pyyaml >= 5.3.1",
-        "paho-mqtt >= 1.5.0, < 2.0.0",
+        "paho-mqtt >= 1.6.0, < 2.0.0",
         "requests >= 2.23.0",
         "requests_toolbelt >= 0.9.1",
     ],
@@ -68,7 +69,13 @@ setup(
         'dev': [
             'build',
             'pytest'
-        ]
+        ],
+        'orjson': ['orjson >= 3.6'],
+        'msgspec': ['msgspec >= 0.16'],
+        'ujson': ['ujson >= 5.4'],
+        'cbor': ['cbor2 >= 5.0'],
+        'msgpack': ['msgpack >= 1.0'],
+        'numpy': ['numpy >= 1.17'],
     },
     classifiers=[
         'Development Status :: 4 - Beta',
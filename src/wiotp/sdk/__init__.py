@@ -8,6 +8,8 @@
 #
 # *****************************************************************************
 
+import importlib
+
 __version__ = "0.11.0"
 
 # Expose the public API for the entire SDK
@@ -19,11 +21,29 @@ __version__ = "0.11.0"
 #
 
 from wiotp.sdk.client import AbstractClient
-from wiotp.sdk.messages import Message, MessageCodec, JsonCodec, RawCodec, Utf8Codec
+from wiotp.sdk.messages import Message, MessageCodec, JsonCodec, RawCodec, Utf8Codec, CborCodec, MsgPackCodec
+from wiotp.sdk.messages import NdArrayCodec, BatchCodec, CompressedCodec
+from wiotp.sdk.publish import PublishBatch, PublishFuture, PublishTracker, PublishWindow, Publisher
+from wiotp.sdk.reconnect import ReconnectPolicy, ReconnectStats
+from wiotp.sdk.metrics import ClientMetrics
+from wiotp.sdk.tracing import Tracer, Span, OpenTelemetryTracer
+from wiotp.sdk.subscribe import SubscribeBatch
+from wiotp.sdk.dispatch import KeyedDispatcher
+from wiotp.sdk.inbound import InboundQueue
+from wiotp.sdk.decode import DecodePool
 from wiotp.sdk.exceptions import ConnectionException, ConfigurationException, UnsupportedAuthenticationMethod
 from wiotp.sdk.exceptions import InvalidEventException, MissingMessageDecoderException, MissingMessageEncoderException
 
-import wiotp.sdk.application
-import wiotp.sdk.api
-import wiotp.sdk.device
-import wiotp.sdk.gateway
+# The client packages (and the REST API, which pulls in requests) are only imported when first used, so that
+# a device that only publishes events doesn't pay for loading the application and API code at startup
+_SUBPACKAGES = ["api", "application", "device", "gateway", "testing"]
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        return importlib.import_module("wiotp.sdk." + name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + _SUBPACKAGES)
@@ -12,6 +12,7 @@ import logging
 import json
 from datetime import datetime
 from collections import defaultdict
+from wiotp.sdk import jsonBackend
 from wiotp.sdk.exceptions import ApiException
 import iso8601
 
@@ -61,7 +62,7 @@ class ApiClient:
         resp = requests.patch(
             "https://%s/%s" % (self._config.host, url),
             auth=self._config.credentials,
-            data=json.dumps(data, cls=DateTimeEncoder),
+            data=jsonBackend.dumps(data, default=_jsonDefault),
             headers={"content-type": "application/json"},
             verify=self._config.verify,
         )
@@ -72,7 +73,7 @@ class ApiClient:
         resp = requests.post(
             "https://%s/%s" % (self._config.host, url),
             auth=self._config.credentials,
-            data=json.dumps(data, cls=DateTimeEncoder),
+            data=jsonBackend.dumps(data, default=_jsonDefault),
             headers={"content-type": "application/json"},
             verify=self._config.verify,
         )
@@ -94,7 +95,7 @@ class ApiClient:
         resp = requests.put(
             "https://%s/%s" % (self._config.host, url),
             auth=self._config.credentials,
-            data=json.dumps(data, cls=DateTimeEncoder),
+            data=jsonBackend.dumps(data, default=_jsonDefault),
             headers={"content-type": "application/json"},
             verify=self._config.verify,
         )
@@ -466,6 +467,15 @@ class RestApiDictReadOnly(RestApiDictBase):
         raise Exception("Unable to update this active item, please update and activate the draft version.")
 
 
+def _jsonDefault(o):
+    """
+    Serialize the types found in API request bodies that JSON does not support natively
+    """
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError("Object of type %s is not JSON serializable" % type(o).__name__)
+
+
 class DateTimeEncoder(json.JSONEncoder):
     """
     See: https://stackoverflow.com/a/27058505/3818286
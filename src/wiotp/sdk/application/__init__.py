@@ -8,7 +8,38 @@
 # *****************************************************************************
 
 
-# Expose public API for this package
-from wiotp.sdk.application.client import ApplicationClient
-from wiotp.sdk.application.config import ApplicationClientConfig, parseConfigFile, parseEnvVars
-from wiotp.sdk.application.messages import Command, Event, Status, State, Error, ThingError, DeviceState
+import importlib
+
+# Expose public API for this package.  Each class is imported from its module when it is first used, so that
+# e.g. working with the message classes doesn't load the REST API client or asyncio support
+_EXPORTS = {
+    "ApplicationClient": "wiotp.sdk.application.client",
+    "AsyncApplicationClient": "wiotp.sdk.application.asyncClient",
+    "ApplicationClientConfig": "wiotp.sdk.application.config",
+    "parseConfigFile": "wiotp.sdk.application.config",
+    "parseEnvVars": "wiotp.sdk.application.config",
+    "Command": "wiotp.sdk.application.messages",
+    "Event": "wiotp.sdk.application.messages",
+    "Status": "wiotp.sdk.application.messages",
+    "State": "wiotp.sdk.application.messages",
+    "Error": "wiotp.sdk.application.messages",
+    "ThingError": "wiotp.sdk.application.messages",
+    "DeviceState": "wiotp.sdk.application.messages",
+    "EventBatch": "wiotp.sdk.application.messages",
+    "BatchedEvent": "wiotp.sdk.application.messages",
+    "ShardedApplicationConsumer": "wiotp.sdk.application.sharded",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,85 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+from wiotp.sdk.asyncClient import AsyncClientMixin
+from wiotp.sdk.application.client import ApplicationClient
+
+
+class AsyncApplicationClient(AsyncClientMixin, ApplicationClient):
+    """
+    asyncio-native variant of #wiotp.sdk.application.ApplicationClient, see #wiotp.sdk.asyncClient.AsyncClientMixin
+
+    ```python
+    client = wiotp.sdk.application.AsyncApplicationClient(config)
+    await client.connect()
+    client.subscribeToDeviceEvents(typeId="mytype")
+    async for event in client.deviceEvents():
+        print(event.eventId, event.data)
+    ```
+    """
+
+    def publishCommand(self, typeId, deviceId, commandId, msgFormat, data=None, qos=0, onPublish=None):
+        if not self.isConnected():
+            self.logger.warning("Unable to send command %s because client is is disconnected state", commandId)
+            return self._resolved(False)
+
+        future, resolve = self._trackDelivery(onPublish)
+        if not ApplicationClient.publishCommand(self, typeId, deviceId, commandId, msgFormat, data, qos, resolve):
+            future.set_result(False)
+        return future
+
+    def deviceEvents(self):
+        """
+        Async iterator over device events, replaces any `deviceEventCallback`
+        """
+        return self._iterate("deviceEventCallback")
+
+    def aevents(self, timeout=None, maxBatch=None, maxQueued=0):
+        """
+        Async iterator over device events, or batches of events if `maxBatch` is set, see
+        #wiotp.sdk.application.ApplicationClient.aevents.  Events are received on the event loop thread, which must
+        never wait for space in the queue, so the queue is always unbounded and `maxQueued` is ignored
+        """
+        return ApplicationClient.aevents(self, timeout, maxBatch, 0)
+
+    def deviceCommands(self):
+        """
+        Async iterator over device commands, replaces any `deviceCommandCallback`
+        """
+        return self._iterate("deviceCommandCallback")
+
+    def deviceStatus(self):
+        """
+        Async iterator over device status messages, replaces any `deviceStatusCallback`
+        """
+        return self._iterate("deviceStatusCallback")
+
+    def deviceState(self):
+        """
+        Async iterator over device state messages, replaces any `deviceStateCallback`
+        """
+        return self._iterate("deviceStateCallback")
+
+    def thingState(self):
+        """
+        Async iterator over thing state messages, replaces any `thingStateCallback`
+        """
+        return self._iterate("thingStateCallback")
+
+    def appStatus(self):
+        """
+        Async iterator over application status messages, replaces any `appStatusCallback`
+        """
+        return self._iterate("appStatusCallback")
+
+    def errors(self):
+        """
+        Async iterator over device and thing error messages, replaces any `errorTopicCallback`
+        """
+        return self._iterate("errorTopicCallback")
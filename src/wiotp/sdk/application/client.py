@@ -8,10 +8,14 @@
 # *****************************************************************************
 
 from datetime import datetime
+import functools
+from queue import Empty, Queue
+import logging
 
-from wiotp.sdk import MissingMessageEncoderException, AbstractClient, InvalidEventException
-from wiotp.sdk.application.messages import Status, Command, Event, State, Error, ThingError, DeviceState
+from wiotp.sdk import MissingMessageEncoderException, AbstractClient, InvalidEventException, InboundQueue
+from wiotp.sdk.application.messages import Status, Command, Event, EventBatch, State, Error, ThingError, DeviceState
 from wiotp.sdk.application.config import ApplicationClientConfig
+from wiotp.sdk.messages import _payloadEncoder, _requiresTimestamp
 from wiotp.sdk.api import ApiClient, Registry, Usage, ServiceStatus, DSC, LEC, Mgmt, ServiceBindings, Actions, StateMgr
 
 import paho.mqtt.client as paho
@@ -33,6 +37,14 @@ class ApplicationClient(AbstractClient):
     - `auth-key` The API key to to securely connect your application to Watson IoT Platform.
     - `auth-token` An authentication token to securely connect your application to Watson IoT Platform.
     - `clean-session` A boolean value indicating whether to use MQTT clean session.
+
+    # Attributes
+    decodePool (wiotp.sdk.DecodePool): Decodes large device event payloads in a pool of processes before they are
+        passed to your callbacks.  Defaults to `None`, payloads are decoded when your callback first reads them.
+    decodeEagerly (bool): Decode each device event and command before it is passed to your callback, so that a
+        message with an invalid payload is reported as invalid and never reaches the callback.  Defaults to `False`,
+        payloads are decoded when your callback first reads them and an #InvalidEventException raised from the
+        callback is reported in the same way.
     """
 
     def __init__(self, config, logHandlers=None):
@@ -53,25 +65,61 @@ class ApplicationClient(AbstractClient):
             logLevel=self._config.logLevel,
             sessionExpiry=self._config.sessionExpiry,
             keepAlive=self._config.keepAlive,
+            maxInflight=self._config.maxInflight,
+            maxQueued=self._config.maxQueued,
+            backpressure=self._config.backpressure,
+            backpressureTimeout=self._config.backpressureTimeout,
+            reconnectMinDelay=self._config.reconnectMinDelay,
+            reconnectMaxDelay=self._config.reconnectMaxDelay,
+            reconnectJitter=self._config.reconnectJitter,
+            reconnectMaxAttempts=self._config.reconnectMaxAttempts,
+        )
+
+        # Device events can be buffered in a bounded queue, so that slow event callbacks don't hold up the network
+        # thread (or, depending on the overflow policy, are allowed to)
+        self.inboundQueue = None
+        if self._config.inboundEnabled:
+            self.inboundQueue = InboundQueue(
+                self._config.inboundCapacity, self._config.inboundOverflow, self._config.inboundPath, self.logger
+            )
+            inbound = self.inboundQueue
+            self.metrics.register("inboundQueued", "Device events waiting to be handled", lambda: len(inbound))
+            self.metrics.register(
+                "inboundSpilled", "Device events written to the spill journal", lambda: inbound.spilled, "counter"
+            )
+            self.metrics.register(
+                "inboundDropped",
+                "Device events discarded because the inbound queue was full",
+                lambda: inbound.dropped,
+                "counter",
+            )
+
+        self.decodePool = None
+        self.decodeEagerly = False
+        self.metrics.register(
+            "decodeQueued",
+            "Device events waiting to be decoded by the decode pool, or delivered in order",
+            lambda: self.decodePool.queued if self.decodePool else None,
         )
 
         # Add handlers for events and status
-        self.client.message_callback_add("iot-2/type/+/id/+/evt/+/fmt/+", self._onDeviceEvent)
-        self.client.message_callback_add("iot-2/type/+/id/+/mon", self._onDeviceStatus)
-        self.client.message_callback_add("iot-2/app/+/mon", self._onAppStatus)
-        self.client.message_callback_add("iot-2/type/+/id/+/intf/+/evt/state", self._onDeviceState)
-        self.client.message_callback_add("iot-2/thing/type/+/id/+/intf/+/evt/state", self._onThingState)
-        self.client.message_callback_add("iot-2/type/+/id/+/err/data", self._onErrorTopic)
-        self.client.message_callback_add("iot-2/thing/type/+/id/+/err/data", self._onThingError)
+        self._addMessageCallback("iot-2/type/+/id/+/evt/+/fmt/+", self._onDeviceEvent, self.inboundQueue)
+        self._addMessageCallback("iot-2/type/+/id/+/mon", self._onDeviceStatus)
+        self._addMessageCallback("iot-2/app/+/mon", self._onAppStatus)
+        self._addMessageCallback("iot-2/type/+/id/+/intf/+/evt/state", self._onDeviceState)
+        self._addMessageCallback("iot-2/thing/type/+/id/+/intf/+/evt/state", self._onThingState)
+        self._addMessageCallback("iot-2/type/+/id/+/err/data", self._onErrorTopic)
+        self._addMessageCallback("iot-2/thing/type/+/id/+/err/data", self._onThingError)
 
         # Add handler for commands
-        self.client.message_callback_add("iot-2/type/+/id/+/cmd/+/fmt/+", self._onDeviceCommand)
+        self._addMessageCallback("iot-2/type/+/id/+/cmd/+/fmt/+", self._onDeviceCommand)
 
         # Attach fallback handler
         self.client.on_message = self._onUnsupportedMessage
 
         # Initialize user supplied callbacks
         self.deviceEventCallback = None
+        self.deviceEventBatchCallback = None
         self.deviceCommandCallback = None
         self.deviceStateCallback = None
         self.deviceStatusCallback = None
@@ -116,6 +164,108 @@ class ApplicationClient(AbstractClient):
         topic = "iot-2/type/%s/id/%s/evt/%s/fmt/%s" % (typeId, deviceId, eventId, msgFormat)
         return self._subscribe(topic, qos)
 
+    def events(self, timeout=None, maxBatch=None, maxQueued=1000):
+        """
+        Pull device events from an internal bounded queue, as an alternative to setting `deviceEventCallback`.  The
+        queue replaces any `deviceEventCallback` as soon as this method is called, so no events are missed before
+        iteration starts, and is removed again when the generator is closed.  Only a single consumer is supported,
+        calling `events()` again replaces the previous queue.
+
+        With `maxBatch` set each item is a list of events: the generator waits for the first event, then adds the
+        events that have already arrived, up to `maxBatch`.  Batches therefore grow while the consumer is busy (e.g.
+        with a bulk database insert) without adding any latency when it keeps up.
+
+        ```python
+        for batch in client.events(timeout=30, maxBatch=500):
+            db.insertMany([event.data for event in batch])
+        ```
+
+        # Parameters
+        timeout (float): Maximum time in seconds to wait for the next event, the generator stops if none arrives.
+            Defaults to `None` (wait indefinitely)
+        maxBatch (int): Maximum number of events in each batch, or `None` to yield events one at a time.  Defaults
+            to `None`
+        maxQueued (int): Maximum number of events waiting in the queue.  When the queue is full the thread handling
+            received messages waits for space, applying backpressure to the connection.  Defaults to `1000`
+
+        # Returns
+        generator: Yields each #wiotp.sdk.application.Event, or lists of events if `maxBatch` is set
+        """
+        queue = Queue(maxQueued)
+        self.deviceEventCallback = queue.put
+        return self._pullEvents(queue, timeout, maxBatch)
+
+    def aevents(self, timeout=None, maxBatch=None, maxQueued=1000):
+        """
+        Async iterator equivalent of `events()`, for consuming the events received by a client running on its own
+        network thread from an asyncio event loop.  Must be called from a coroutine running on the event loop.
+
+        ```python
+        async for batch in client.aevents(maxBatch=500):
+            await db.insertMany([event.data for event in batch])
+        ```
+
+        # Returns
+        async_generator: Yields each #wiotp.sdk.application.Event, or lists of events if `maxBatch` is set
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        queue = Queue(maxQueued)
+
+        def onEvent(event):
+            queue.put(event)
+            loop.call_soon_threadsafe(ready.set)
+
+        self.deviceEventCallback = onEvent
+        return self._apullEvents(queue, ready, onEvent, timeout, maxBatch)
+
+    def _pullEvents(self, queue, timeout, maxBatch):
+        try:
+            while True:
+                try:
+                    event = queue.get(timeout=timeout)
+                except Empty:
+                    return
+                yield event if maxBatch is None else self._batch(queue, event, maxBatch)
+        finally:
+            if self.deviceEventCallback == queue.put:
+                self.deviceEventCallback = None
+
+    async def _apullEvents(self, queue, ready, onEvent, timeout, maxBatch):
+        import asyncio
+
+        try:
+            while True:
+                try:
+                    event = queue.get_nowait()
+                except Empty:
+                    # Events arriving after the queue is seen to be empty set the flag again once it is cleared
+                    ready.clear()
+                    if queue.empty():
+                        try:
+                            await asyncio.wait_for(ready.wait(), timeout)
+                        except asyncio.TimeoutError:
+                            return
+                    continue
+                yield event if maxBatch is None else self._batch(queue, event, maxBatch)
+        finally:
+            if self.deviceEventCallback == onEvent:
+                self.deviceEventCallback = None
+
+    def _batch(self, queue, first, maxBatch):
+        """
+        Start a batch with `first` and add the events already waiting in the queue, up to `maxBatch` events
+        """
+        batch = [first]
+        while len(batch) < maxBatch:
+            try:
+                batch.append(queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
     def subscribeToDeviceStatus(self, typeId="+", deviceId="+"):
         """
         Subscribe to device status messages
@@ -227,6 +377,48 @@ class ApplicationClient(AbstractClient):
         topic = "iot-2/type/%s/id/%s/evt/%s/fmt/%s" % (typeId, deviceId, eventId, msgFormat)
         return self._publishEvent(topic, eventId, msgFormat, data, qos, onPublish)
 
+    def publisher(self, typeId, deviceId, eventId, msgFormat, qos=0):
+        """
+        Create a prepared publisher for an event sent on behalf of a device.  The topic and codec are resolved
+        once, making this the cheapest way to send the same event repeatedly.
+
+        # Parameters
+        typeId (string): The type of the device the event is sent on behalf of
+        deviceId (string): The id of the device the event is sent on behalf of
+        eventId (string): Name of the event
+        msgFormat (string): Format of the data for the event
+        qos (int): MQTT quality of service level to use (`0`, `1`, or `2`)
+
+        # Returns
+        Publisher: Call `publish(data, onPublish=None)` on the publisher to send each event
+        """
+        topic = "iot-2/type/%s/id/%s/evt/%s/fmt/%s" % (typeId, deviceId, eventId, msgFormat)
+        return self._publisher(topic, eventId, msgFormat, qos)
+
+    def publishEvents(self, events, qos=0, onPublish=None):
+        """
+        Publish a batch of events on behalf of devices in a single call
+
+        # Parameters
+        events (iterable): Iterable of `(typeId, deviceId, eventId, msgFormat, data)` tuples
+        qos (int): MQTT quality of service level to use for every event in the batch (`0`, `1`, or `2`)
+        onPublish (function): A function that will be called when receipt of every event in the batch is confirmed
+
+        # Returns
+        PublishBatch: A handle tracking delivery of the whole batch, or `False` if the client is disconnected
+        """
+        return self._publishEvents(self._eventTopics(events), qos, onPublish)
+
+    def _eventTopics(self, events):
+        topics = {}
+        for typeId, deviceId, eventId, msgFormat, data in events:
+            key = (typeId, deviceId, eventId, msgFormat)
+            topic = topics.get(key)
+            if topic is None:
+                topic = "iot-2/type/%s/id/%s/evt/%s/fmt/%s" % key
+                topics[key] = topic
+            yield (topic, eventId, msgFormat, data)
+
     def publishCommand(self, typeId, deviceId, commandId, msgFormat, data=None, qos=0, onPublish=None):
         """
         Publish a command to a device
@@ -242,6 +434,9 @@ class ApplicationClient(AbstractClient):
             different implications depending on the qos:
             - qos 0 : the client has asynchronously begun to send the event
             - qos 1 and 2 : the client has confirmation of delivery from WIoTP
+
+        # Returns
+        PublishFuture: A handle tracking delivery of the command, or `False` if the command could not be sent
         """
         if not self.connectEvent.wait(timeout=10):
             return False
@@ -249,31 +444,12 @@ class ApplicationClient(AbstractClient):
             topic = "iot-2/type/%s/id/%s/cmd/%s/fmt/%s" % (typeId, deviceId, commandId, msgFormat)
 
             # Raise an exception if there is no codec for this msgFormat
-            if self.getMessageCodec(msgFormat) is None:
+            codec = self.getMessageCodec(msgFormat)
+            if codec is None:
                 raise MissingMessageEncoderException(msgFormat)
 
-            payload = self.getMessageCodec(msgFormat).encode(data, datetime.now())
-            result = self.client.publish(topic, payload=payload, qos=qos, retain=False)
-            if result[0] == paho.MQTT_ERR_SUCCESS:
-                # Because we are dealing with aync pub/sub model and callbacks it is possible that
-                # the _onPublish() callback for this mid is called before we obtain the lock to place
-                # the mid into the _onPublishCallbacks list.
-                #
-                # _onPublish knows how to handle a scenario where the mid is not present (no nothing)
-                # in this scenario we will need to invoke the callback directly here, because at the time
-                # the callback was invoked the mid was not yet in the list.
-                with self._messagesLock:
-                    if result[1] in self._onPublishCallbacks:
-                        # paho callback beat this thread so call callback inline now
-                        del self._onPublishCallbacks[result[1]]
-                        if onPublish is not None:
-                            onPublish()
-                    else:
-                        # this thread beat paho callback so set up for call later
-                        self._onPublishCallbacks[result[1]] = onPublish
-                return True
-            else:
-                return False
+            payload = _payloadEncoder(codec)(data, datetime.now() if _requiresTimestamp(codec) else None)
+            return self._publish(topic, payload, qos, onPublish)
 
     def _onUnsupportedMessage(self, client, userdata, message):
         """
@@ -291,11 +467,43 @@ class ApplicationClient(AbstractClient):
         """
         try:
             event = Event(pahoMessage, self._messageCodecs)
-            self.logger.debug("Received event '%s' from %s:%s" % (event.eventId, event.typeId, event.deviceId))
-            if self.deviceEventCallback:
-                self.deviceEventCallback(event)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Received event '%s' from %s:%s" % (event.eventId, event.typeId, event.deviceId))
+            if event.batched:
+                event = EventBatch(pahoMessage, self._messageCodecs)
+        except InvalidEventException as e:
+            self._onInvalidMessage(e)
+            return
+        decodePool = self.decodePool
+        if decodePool is not None and (self.deviceEventCallback or self.deviceEventBatchCallback):
+            # The event may be delivered on the pool's thread, so it takes the receive span along for its callbacks
+            decodePool.submit(event, functools.partial(self._deliverDeviceEvent, span=self._receiveSpan()))
+        else:
+            self._deliverDeviceEvent(event)
+
+    def _deliverDeviceEvent(self, event, span=None):
+        """
+        Pass a received device event to the registered callbacks, once its payload is ready to be decoded
+        """
+        previous = self._receiveSpan()
+        if span is not None:
+            self._receiveSpans.span = span
+        try:
+            if self.decodeEagerly and (self.deviceEventCallback or self.deviceEventBatchCallback):
+                event._decode()
+            if event.batched:
+                # Batches of readings are delivered whole if there is a batch callback, otherwise one reading at a time
+                if self.deviceEventBatchCallback:
+                    self._invokeCallback(self.deviceEventBatchCallback, event)
+                elif self.deviceEventCallback:
+                    for reading in event.events:
+                        self._invokeCallback(self.deviceEventCallback, reading)
+            elif self.deviceEventCallback:
+                self._invokeCallback(self.deviceEventCallback, event)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
+        finally:
+            self._receiveSpans.span = previous
 
     def _onThingState(self, client, userdata, pahoMessage):
         """
@@ -306,9 +514,9 @@ class ApplicationClient(AbstractClient):
             state = State(pahoMessage)
             self.logger.debug("Received state from %s:%s" % (state.typeId, state.thingId))
             if self.thingStateCallback:
-                self.thingStateCallback(state)
+                self._invokeCallback(self.thingStateCallback, state)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
 
     def _onDeviceState(self, client, userdata, pahoMessage):
         """
@@ -319,9 +527,9 @@ class ApplicationClient(AbstractClient):
             state = DeviceState(pahoMessage)
             self.logger.debug("Received state from %s:%s" % (state.typeId, state.deviceId))
             if self.deviceStateCallback:
-                self.deviceStateCallback(state)
+                self._invokeCallback(self.deviceStateCallback, state)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
 
     def _onErrorTopic(self, client, userdata, pahoMessage):
         """
@@ -332,9 +540,9 @@ class ApplicationClient(AbstractClient):
             error = Error(pahoMessage)
             self.logger.debug("Received error from device %s:%s" % (error.typeId, error.id))
             if self.errorTopicCallback:
-                self.errorTopicCallback(error)
+                self._invokeCallback(self.errorTopicCallback, error)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
 
     def _onThingError(self, client, userdata, pahoMessage):
         """
@@ -345,9 +553,9 @@ class ApplicationClient(AbstractClient):
             error = ThingError(pahoMessage)
             self.logger.debug("Received error from thing %s:%s" % (error.typeId, error.id))
             if self.errorTopicCallback:
-                self.errorTopicCallback(error)
+                self._invokeCallback(self.errorTopicCallback, error)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
 
     def _onDeviceCommand(self, client, userdata, pahoMessage):
         """
@@ -360,9 +568,11 @@ class ApplicationClient(AbstractClient):
                 "Received command '%s' from %s:%s" % (command.commandId, command.typeId, command.deviceId)
             )
             if self.deviceCommandCallback:
-                self.deviceCommandCallback(command)
+                if self.decodeEagerly:
+                    command._decode()
+                self._invokeCallback(self.deviceCommandCallback, command)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
 
     def _onDeviceStatus(self, client, userdata, pahoMessage):
         """
@@ -371,11 +581,13 @@ class ApplicationClient(AbstractClient):
         """
         try:
             status = Status(pahoMessage)
-            self.logger.debug("Received %s action from %s" % (status.action, status.clientId))
+            # Only decode the status for the log message if it will be logged
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Received %s action from %s" % (status.action, status.clientId))
             if self.deviceStatusCallback:
-                self.deviceStatusCallback(status)
+                self._invokeCallback(self.deviceStatusCallback, status)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
 
     def _onAppStatus(self, client, userdata, pahoMessage):
         """
@@ -384,8 +596,10 @@ class ApplicationClient(AbstractClient):
         """
         try:
             status = Status(pahoMessage)
-            self.logger.debug("Received %s action from %s" % (status.action, status.clientId))
+            # Only decode the status for the log message if it will be logged
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Received %s action from %s" % (status.action, status.clientId))
             if self.appStatusCallback:
-                self.appStatusCallback(status)
+                self._invokeCallback(self.appStatusCallback, status)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
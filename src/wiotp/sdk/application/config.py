@@ -9,7 +9,6 @@
 
 from collections import defaultdict
 import os
-import yaml
 import logging
 import uuid
 
@@ -34,6 +33,68 @@ class ApplicationClientConfig(defaultdict):
                 kwargs["options"]["mqtt"]["cleanSession"], bool
             ):
                 raise ConfigurationException("Optional setting options.cleanSession must be a boolean if provided")
+            # Validate publish window
+            for setting in ["maxInflight", "maxQueued"]:
+                if setting in kwargs["options"]["mqtt"] and kwargs["options"]["mqtt"][setting] is not None:
+                    value = kwargs["options"]["mqtt"][setting]
+                    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                        raise ConfigurationException(
+                            "Optional setting options.mqtt.%s must be a non-negative number if provided" % setting
+                        )
+            if "backpressure" in kwargs["options"]["mqtt"] and kwargs["options"]["mqtt"]["backpressure"] not in [
+                None,
+                "block",
+                "timeout",
+                "reject",
+            ]:
+                raise ConfigurationException(
+                    "Optional setting options.mqtt.backpressure must be one of block, timeout, reject if provided"
+                )
+            backpressureTimeout = kwargs["options"]["mqtt"].get("backpressureTimeout")
+            if backpressureTimeout is not None and (
+                not isinstance(backpressureTimeout, (int, float))
+                or isinstance(backpressureTimeout, bool)
+                or backpressureTimeout <= 0
+            ):
+                raise ConfigurationException(
+                    "Optional setting options.mqtt.backpressureTimeout must be a positive number if provided"
+                )
+            # Validate reconnect policy
+            reconnect = kwargs["options"]["mqtt"].get("reconnect")
+            if reconnect is not None:
+                for setting in ["minDelay", "maxDelay", "jitter", "maxAttempts"]:
+                    if setting in reconnect and reconnect[setting] is not None:
+                        value = reconnect[setting]
+                        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                            raise ConfigurationException(
+                                "Optional setting options.mqtt.reconnect.%s must be a non-negative number if provided"
+                                % setting
+                            )
+                if reconnect.get("jitter") is not None and reconnect["jitter"] > 1:
+                    raise ConfigurationException(
+                        "Optional setting options.mqtt.reconnect.jitter must be between 0 and 1 if provided"
+                    )
+
+        if "options" in kwargs and "inbound" in kwargs["options"] and kwargs["options"]["inbound"] is not None:
+            inbound = kwargs["options"]["inbound"]
+            if "enabled" in inbound and not isinstance(inbound["enabled"], bool):
+                raise ConfigurationException("Optional setting options.inbound.enabled must be a boolean if provided")
+            if "capacity" in inbound and inbound["capacity"] is not None:
+                if (
+                    not isinstance(inbound["capacity"], int)
+                    or isinstance(inbound["capacity"], bool)
+                    or inbound["capacity"] < 1
+                ):
+                    raise ConfigurationException(
+                        "Optional setting options.inbound.capacity must be a positive number if provided"
+                    )
+            if inbound.get("overflow") not in [None, "block", "dropOldest", "dropNewest", "spill"]:
+                raise ConfigurationException(
+                    "Optional setting options.inbound.overflow must be one of block, dropOldest, dropNewest, spill "
+                    "if provided"
+                )
+            if inbound.get("overflow") == "spill" and inbound.get("path") is None:
+                raise ConfigurationException("Setting options.inbound.path is required by the spill overflow policy")
 
         # Set defaults for optional configuration
         if "identity" not in kwargs:
@@ -75,6 +136,37 @@ class ApplicationClientConfig(defaultdict):
         if "caFile" not in kwargs["options"]["mqtt"]:
             kwargs["options"]["mqtt"]["caFile"] = None
 
+        if "maxInflight" not in kwargs["options"]["mqtt"]:
+            kwargs["options"]["mqtt"]["maxInflight"] = None
+
+        if "maxQueued" not in kwargs["options"]["mqtt"] or kwargs["options"]["mqtt"]["maxQueued"] is None:
+            kwargs["options"]["mqtt"]["maxQueued"] = 0
+
+        if "backpressure" not in kwargs["options"]["mqtt"] or kwargs["options"]["mqtt"]["backpressure"] is None:
+            kwargs["options"]["mqtt"]["backpressure"] = "block"
+
+        if (
+            "backpressureTimeout" not in kwargs["options"]["mqtt"]
+            or kwargs["options"]["mqtt"]["backpressureTimeout"] is None
+        ):
+            kwargs["options"]["mqtt"]["backpressureTimeout"] = 10
+
+        if "reconnect" not in kwargs["options"]["mqtt"] or kwargs["options"]["mqtt"]["reconnect"] is None:
+            kwargs["options"]["mqtt"]["reconnect"] = {}
+
+        reconnect = kwargs["options"]["mqtt"]["reconnect"]
+        for setting, default in [("minDelay", 1), ("maxDelay", 120), ("jitter", 0.5), ("maxAttempts", 0)]:
+            if setting not in reconnect or reconnect[setting] is None:
+                reconnect[setting] = default
+
+        if "inbound" not in kwargs["options"] or kwargs["options"]["inbound"] is None:
+            kwargs["options"]["inbound"] = {}
+
+        inbound = kwargs["options"]["inbound"]
+        for setting, default in [("enabled", False), ("capacity", 1000), ("overflow", "block"), ("path", None)]:
+            if setting not in inbound or inbound[setting] is None:
+                inbound[setting] = default
+
         if "http" not in kwargs["options"]:
             kwargs["options"]["http"] = {}
 
@@ -159,6 +251,54 @@ class ApplicationClientConfig(defaultdict):
     def caFile(self):
         return self["options"]["mqtt"]["caFile"]
 
+    @property
+    def maxInflight(self):
+        return self["options"]["mqtt"]["maxInflight"]
+
+    @property
+    def maxQueued(self):
+        return self["options"]["mqtt"]["maxQueued"]
+
+    @property
+    def backpressure(self):
+        return self["options"]["mqtt"]["backpressure"]
+
+    @property
+    def backpressureTimeout(self):
+        return self["options"]["mqtt"]["backpressureTimeout"]
+
+    @property
+    def reconnectMinDelay(self):
+        return self["options"]["mqtt"]["reconnect"]["minDelay"]
+
+    @property
+    def reconnectMaxDelay(self):
+        return self["options"]["mqtt"]["reconnect"]["maxDelay"]
+
+    @property
+    def reconnectJitter(self):
+        return self["options"]["mqtt"]["reconnect"]["jitter"]
+
+    @property
+    def reconnectMaxAttempts(self):
+        return self["options"]["mqtt"]["reconnect"]["maxAttempts"]
+
+    @property
+    def inboundEnabled(self):
+        return self["options"]["inbound"]["enabled"]
+
+    @property
+    def inboundCapacity(self):
+        return self["options"]["inbound"]["capacity"]
+
+    @property
+    def inboundOverflow(self):
+        return self["options"]["inbound"]["overflow"]
+
+    @property
+    def inboundPath(self):
+        return self["options"]["inbound"]["path"]
+
     @property
     def verify(self):
         return self["options"]["http"]["verify"]
@@ -181,6 +321,18 @@ def parseEnvVars():
     - `WIOTP_OPTIONS_MQTT_CLEANSTART` (optional)
     - `WIOTP_OPTIONS_MQTT_SESSIONEXPIRY` (optional)
     - `WIOTP_OPTIONS_MQTT_KEEPALIVE` (optional)
+    - `WIOTP_OPTIONS_MQTT_MAXINFLIGHT` (optional)
+    - `WIOTP_OPTIONS_MQTT_MAXQUEUED` (optional)
+    - `WIOTP_OPTIONS_MQTT_BACKPRESSURE` (optional)
+    - `WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_MINDELAY` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_MAXDELAY` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_JITTER` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_MAXATTEMPTS` (optional)
+    - `WIOTP_OPTIONS_INBOUND_ENABLED` (optional)
+    - `WIOTP_OPTIONS_INBOUND_CAPACITY` (optional)
+    - `WIOTP_OPTIONS_INBOUND_OVERFLOW` (optional)
+    - `WIOTP_OPTIONS_INBOUND_PATH` (optional)
     - `WIOTP_OPTIONS_HTTP_VERIFY` (optional)
     """
 
@@ -205,6 +357,18 @@ def parseEnvVars():
     cleanStart = os.getenv("WIOTP_OPTIONS_MQTT_CLEANSTART", "True")
     sessionExpiry = os.getenv("WIOTP_OPTIONS_MQTT_SESSIONEXPIRY", "3600")
     keepAlive = os.getenv("WIOTP_OPTIONS_MQTT_KEEPALIVE", "60")
+    maxInflight = os.getenv("WIOTP_OPTIONS_MQTT_MAXINFLIGHT", None)
+    maxQueued = os.getenv("WIOTP_OPTIONS_MQTT_MAXQUEUED", "0")
+    backpressure = os.getenv("WIOTP_OPTIONS_MQTT_BACKPRESSURE", "block")
+    backpressureTimeout = os.getenv("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT", "10")
+    reconnectMinDelay = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_MINDELAY", "1")
+    reconnectMaxDelay = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_MAXDELAY", "120")
+    reconnectJitter = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_JITTER", "0.5")
+    reconnectMaxAttempts = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_MAXATTEMPTS", "0")
+    inboundEnabled = os.getenv("WIOTP_OPTIONS_INBOUND_ENABLED", "False")
+    inboundCapacity = os.getenv("WIOTP_OPTIONS_INBOUND_CAPACITY", "1000")
+    inboundOverflow = os.getenv("WIOTP_OPTIONS_INBOUND_OVERFLOW", "block")
+    inboundPath = os.getenv("WIOTP_OPTIONS_INBOUND_PATH", None)
     verifyCert = os.getenv("WIOTP_OPTIONS_HTTP_VERIFY", "True")
 
     if port is not None:
@@ -223,6 +387,42 @@ def parseEnvVars():
     except ValueError as e:
         raise ConfigurationException("WIOTP_OPTIONS_MQTT_KEEPALIVE must be a number")
 
+    if maxInflight is not None:
+        try:
+            maxInflight = int(maxInflight)
+        except ValueError as e:
+            raise ConfigurationException("WIOTP_OPTIONS_MQTT_MAXINFLIGHT must be a number")
+
+    try:
+        maxQueued = int(maxQueued)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_MQTT_MAXQUEUED must be a number")
+
+    try:
+        backpressureTimeout = float(backpressureTimeout)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT must be a number")
+
+    try:
+        reconnectMinDelay = float(reconnectMinDelay)
+        reconnectMaxDelay = float(reconnectMaxDelay)
+        reconnectJitter = float(reconnectJitter)
+    except ValueError as e:
+        raise ConfigurationException(
+            "WIOTP_OPTIONS_MQTT_RECONNECT_MINDELAY, WIOTP_OPTIONS_MQTT_RECONNECT_MAXDELAY and "
+            "WIOTP_OPTIONS_MQTT_RECONNECT_JITTER must be numbers"
+        )
+
+    try:
+        reconnectMaxAttempts = int(reconnectMaxAttempts)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_MQTT_RECONNECT_MAXATTEMPTS must be a number")
+
+    try:
+        inboundCapacity = int(inboundCapacity)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_INBOUND_CAPACITY must be a number")
+
     if logLevel not in ["error", "warning", "info", "debug"]:
         raise ConfigurationException("WIOTP_OPTIONS_LOGLEVEL must be one of error, warning, info, debug")
     else:
@@ -241,8 +441,24 @@ def parseEnvVars():
                 "cleanStart": cleanStart in ["True", "true", "1"],
                 "sessionExpiry": sessionExpiry,
                 "keepAlive": keepAlive,
+                "maxInflight": maxInflight,
+                "maxQueued": maxQueued,
+                "backpressure": backpressure,
+                "backpressureTimeout": backpressureTimeout,
+                "reconnect": {
+                    "minDelay": reconnectMinDelay,
+                    "maxDelay": reconnectMaxDelay,
+                    "jitter": reconnectJitter,
+                    "maxAttempts": reconnectMaxAttempts,
+                },
                 "caFile": caFile,
             },
+            "inbound": {
+                "enabled": inboundEnabled in ["True", "true", "1"],
+                "capacity": inboundCapacity,
+                "overflow": inboundOverflow,
+                "path": inboundPath,
+            },
             "http": {"verify": verifyCert in ["True", "true", "1"]},
         },
         "auth": {"key": authKey, "token": authToken}
@@ -273,11 +489,27 @@ def parseConfigFile(configFilePath):
         cleanStart: false
         sessionExpiry: 3600
         keepAlive: 60
+        maxInflight: 20
+        maxQueued: 1000
+        backpressure: block|timeout|reject
+        backpressureTimeout: 10
+        reconnect:
+          minDelay: 1
+          maxDelay: 120
+          jitter: 0.5
+          maxAttempts: 0
         caFile: /path/to/certificateAuthorityFile.pem
+      inbound:
+        enabled: true
+        capacity: 1000
+        overflow: block|dropOldest|dropNewest|spill
+        path: /var/lib/myapp/inbound.journal
       http:
         verify: true
     """
 
+    import yaml
+
     try:
         with open(configFilePath) as f:
             data = yaml.full_load(f)
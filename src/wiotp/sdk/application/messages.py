@@ -7,170 +7,334 @@
 # http://www.eclipse.org/legal/epl-v10.html
 # *****************************************************************************
 import iso8601
-import json
-import re
+from wiotp.sdk import jsonBackend
 from wiotp.sdk import InvalidEventException, MissingMessageDecoderException
+from wiotp.sdk import topics
 
-# Compile regular expressions for topic parsing
-DEVICE_EVENT_RE = re.compile("iot-2/type/(.+)/id/(.+)/evt/(.+)/fmt/(.+)")
-DEVICE_COMMAND_RE = re.compile("iot-2/type/(.+)/id/(.+)/cmd/(.+)/fmt/(.+)")
-DEVICE_STATUS_RE = re.compile("iot-2/type/(.+)/id/(.+)/mon")
-THING_STATE_RE = re.compile("iot-2/thing/type/(.+)/id/(.+)/intf/(.+)/evt/state")
-DEVICE_STATE_RE = re.compile("iot-2/type/(.+)/id/(.+)/intf/(.+)/evt/state")
-ERROR_TOPIC_RE = re.compile("iot-2/type/(.+)/id/(.+)/err/data")
-THING_ERROR_RE = re.compile("iot-2/thing/type/(.+)/id/(.+)/err/data")
-APP_STATUS_RE = re.compile("iot-2/app/(.+)/mon")
 
+class _PayloadField(object):
+    """
+    Exposes a field of a message's decoded JSON payload as an attribute, `None` if the field is not present
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.payload.get(self.key)
+
+
+class Status(object):
+    """
+    A device connect or disconnect notification.  The payload is only decoded, and the `time` and
+    `connectTime` fields are only parsed, the first time that they are accessed.
+
+    # Attributes
+    typeId (string): The device type
+    deviceId (string): The device id
+    device (string): `typeId:deviceId`
+    payload (dict): The decoded status message
+    retained (bool): Whether this is a retained message
+    """
+
+    __slots__ = ("typeId", "deviceId", "device", "retained", "_raw", "_payload", "_time", "_connectTime")
 
-class Status:
     def __init__(self, message):
-        result = DEVICE_STATUS_RE.match(message.topic)
-        if result:
-            self.payload = json.loads(message.payload.decode("utf-8"))
-            self.typeId = result.group(1)
-            self.deviceId = result.group(2)
-            self.device = self.typeId + ":" + self.deviceId
-
-            """
-            Properties from the "Connect" status are common in "Disconnect" status too
-            {
-            u'ClientAddr': u'195.212.29.68',
-            u'Protocol': u'mqtt-tcp',
-            u'ClientID': u'd:bcaxk:psutil:001',
-            u'User': u'use-token-auth',
-            u'Time': u'2014-07-07T06:37:56.494-04:00',
-            u'Action': u'Connect',
-            u'ConnectTime': u'2014-07-07T06:37:56.493-04:00',
-            u'Port': 1883
-            }
-            """
-
-            self.clientAddr = self.payload["ClientAddr"] if ("ClientAddr" in self.payload) else None
-            self.protocol = self.payload["Protocol"] if ("Protocol" in self.payload) else None
-            self.clientId = self.payload["ClientID"] if ("ClientID" in self.payload) else None
-            self.user = self.payload["User"] if ("User" in self.payload) else None
-            self.time = iso8601.parse_date(self.payload["Time"]) if ("Time" in self.payload) else None
-            self.action = self.payload["Action"] if ("Action" in self.payload) else None
-            self.connectTime = (
-                iso8601.parse_date(self.payload["ConnectTime"]) if ("ConnectTime" in self.payload) else None
-            )
-            self.port = self.payload["Port"] if ("Port" in self.payload) else None
-
-            """
-            Additional "Disconnect" status properties
-            {
-            u'WriteMsg': 0,
-            u'ReadMsg': 872,
-            u'Reason': u'The connection has completed normally.',
-            u'ReadBytes': 136507,
-            u'WriteBytes': 32,
-            }
-            """
-            self.writeMsg = self.payload["WriteMsg"] if ("WriteMsg" in self.payload) else None
-            self.readMsg = self.payload["ReadMsg"] if ("ReadMsg" in self.payload) else None
-            self.reason = self.payload["Reason"] if ("Reason" in self.payload) else None
-            self.readBytes = self.payload["ReadBytes"] if ("ReadBytes" in self.payload) else None
-            self.writeBytes = self.payload["WriteBytes"] if ("WriteBytes" in self.payload) else None
-            self.closeCode = self.payload["CloseCode"] if ("CloseCode" in self.payload) else None
+        topic = topics.parseTopic(message.topic)
+        if topic is not None and topic.kind == topics.DEVICE_STATUS:
+            self.typeId = topic.typeId
+            self.deviceId = topic.deviceId
+            self.device = topic.device
             self.retained = message.retain
-
+            self._raw = message.payload
+            self._payload = None
+            self._time = None
+            self._connectTime = None
         else:
             raise InvalidEventException("Received device status on invalid topic: %s" % (message.topic))
 
+    @property
+    def payload(self):
+        if self._payload is None:
+            self._payload = jsonBackend.loads(self._raw)
+        return self._payload
 
-class Event:
-    def __init__(self, pahoMessage, messageEncoderModules):
-        result = DEVICE_EVENT_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.deviceId = result.group(2)
-            self.device = self.typeId + ":" + self.deviceId
+    # Properties from the "Connect" status are common in "Disconnect" status too
+    # {
+    # u'ClientAddr': u'195.212.29.68',
+    # u'Protocol': u'mqtt-tcp',
+    # u'ClientID': u'd:bcaxk:psutil:001',
+    # u'User': u'use-token-auth',
+    # u'Time': u'2014-07-07T06:37:56.494-04:00',
+    # u'Action': u'Connect',
+    # u'ConnectTime': u'2014-07-07T06:37:56.493-04:00',
+    # u'Port': 1883
+    # }
+    clientAddr = _PayloadField("ClientAddr")
+    protocol = _PayloadField("Protocol")
+    clientId = _PayloadField("ClientID")
+    user = _PayloadField("User")
+    action = _PayloadField("Action")
+    port = _PayloadField("Port")
 
-            self.eventId = result.group(3)
-            self.format = result.group(4)
+    @property
+    def time(self):
+        if self._time is None and "Time" in self.payload:
+            self._time = iso8601.parse_date(self.payload["Time"])
+        return self._time
 
-            self.payload = pahoMessage.payload
+    @property
+    def connectTime(self):
+        if self._connectTime is None and "ConnectTime" in self.payload:
+            self._connectTime = iso8601.parse_date(self.payload["ConnectTime"])
+        return self._connectTime
+
+    # Additional "Disconnect" status properties
+    # {
+    # u'WriteMsg': 0,
+    # u'ReadMsg': 872,
+    # u'Reason': u'The connection has completed normally.',
+    # u'ReadBytes': 136507,
+    # u'WriteBytes': 32,
+    # }
+    writeMsg = _PayloadField("WriteMsg")
+    readMsg = _PayloadField("ReadMsg")
+    reason = _PayloadField("Reason")
+    readBytes = _PayloadField("ReadBytes")
+    writeBytes = _PayloadField("WriteBytes")
+    closeCode = _PayloadField("CloseCode")
+
+
+class _DecodedMessage(object):
+    """
+    Base class for messages whose payload is decoded by a message codec.  The codec is only invoked the first
+    time that `data` or `timestamp` is accessed, so an invalid payload raises #InvalidEventException at that point.
+    The application client reports an #InvalidEventException raised from a callback as an invalid message.
+    """
+
+    __slots__ = ("_pahoMessage", "_codec", "_message")
+
+    def __init__(self, pahoMessage, messageEncoderModules, format):
+        if format not in messageEncoderModules:
+            raise MissingMessageDecoderException(format)
+        self._pahoMessage = pahoMessage
+        self._codec = messageEncoderModules[format]
+        self._message = None
+
+    def _decode(self):
+        if self._message is None:
+            self._message = self._codec.decode(self._pahoMessage)
+        return self._message
+
+    @property
+    def payload(self):
+        """
+        The raw payload of the message
+        """
+        return self._pahoMessage.payload
+
+    @property
+    def data(self):
+        """
+        The payload decoded by the codec registered for the message format
+        """
+        return self._decode().data
+
+    @property
+    def timestamp(self):
+        return self._decode().timestamp
+
+
+class Event(_DecodedMessage):
+    """
+    An event published by a device
+
+    # Attributes
+    typeId (string): The device type
+    deviceId (string): The device id
+    device (string): `typeId:deviceId`
+    eventId (string): The event id
+    format (string): The format of the event
+    payload (bytes): The raw payload of the event
+    data (object): The decoded event, decoded on first access
+    timestamp (datetime): The time the event was received, available once the event is decoded
+    """
+
+    __slots__ = ("typeId", "deviceId", "device", "eventId", "format")
+
+    def __init__(self, pahoMessage, messageEncoderModules):
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.DEVICE_EVENT:
+            self.typeId = topic.typeId
+            self.deviceId = topic.deviceId
+            self.device = topic.device
+
+            self.eventId = topic.name
+            self.format = topic.format
 
-            if self.format in messageEncoderModules:
-                message = messageEncoderModules[self.format].decode(pahoMessage)
-                self.timestamp = message.timestamp
-                self.data = message.data
-            else:
-                raise MissingMessageDecoderException(self.format)
+            _DecodedMessage.__init__(self, pahoMessage, messageEncoderModules, self.format)
         else:
             raise InvalidEventException("Received device event on invalid topic: %s" % (pahoMessage.topic))
 
+    @property
+    def batched(self):
+        """
+        Whether the event carries a batch of readings (e.g. format `batch`), see #EventBatch
+        """
+        return getattr(self._codec, "batch", False)
+
+
+class EventBatch(Event):
+    """
+    An event carrying a batch of readings, published by a device using the `batch` format
+
+    # Attributes
+    data (list): `(timestamp, reading)` tuples for each reading in the batch, decoded on first access
+    events (list<BatchedEvent>): An event for each reading in the batch
+    """
+
+    __slots__ = ("_events",)
 
-class Command:
     def __init__(self, pahoMessage, messageEncoderModules):
-        result = DEVICE_COMMAND_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.deviceId = result.group(2)
-            self.device = self.typeId + ":" + self.deviceId
+        Event.__init__(self, pahoMessage, messageEncoderModules)
+        self._events = None
 
-            self.commandId = result.group(3)
-            self.format = result.group(4)
+    @property
+    def events(self):
+        if self._events is None:
+            self._events = [BatchedEvent(self, data, timestamp) for (timestamp, data) in self.data]
+        return self._events
 
-            self.payload = pahoMessage.payload
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.events)
+
+
+class BatchedEvent(Event):
+    """
+    A single reading from an #EventBatch.  It has the same attributes as the #Event that carried the batch, except
+    that `data` is the reading and `timestamp` is the time that the reading was taken.
+    """
+
+    __slots__ = ("_data", "_timestamp")
+
+    def __init__(self, batch, data, timestamp):
+        self.typeId = batch.typeId
+        self.deviceId = batch.deviceId
+        self.device = batch.device
+        self.eventId = batch.eventId
+        self.format = batch.format
+        self._pahoMessage = batch._pahoMessage
+        self._codec = batch._codec
+        self._message = None
+        self._data = data
+        self._timestamp = timestamp
+
+    @property
+    def batched(self):
+        return False
+
+    @property
+    def data(self):
+        return self._data
 
-            if self.format in messageEncoderModules:
-                message = messageEncoderModules[self.format].decode(pahoMessage)
-                self.timestamp = message.timestamp
-                self.data = message.data
-            else:
-                raise MissingMessageDecoderException(self.format)
+    @property
+    def timestamp(self):
+        return self._timestamp
+
+
+class Command(_DecodedMessage):
+    """
+    A command sent to a device
+
+    # Attributes
+    typeId (string): The device type
+    deviceId (string): The device id
+    device (string): `typeId:deviceId`
+    commandId (string): The command id
+    format (string): The format of the command
+    payload (bytes): The raw payload of the command
+    data (object): The decoded command, decoded on first access
+    timestamp (datetime): The time the command was received, available once the command is decoded
+    """
+
+    __slots__ = ("typeId", "deviceId", "device", "commandId", "format")
+
+    def __init__(self, pahoMessage, messageEncoderModules):
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.DEVICE_COMMAND:
+            self.typeId = topic.typeId
+            self.deviceId = topic.deviceId
+            self.device = topic.device
+
+            self.commandId = topic.name
+            self.format = topic.format
+
+            _DecodedMessage.__init__(self, pahoMessage, messageEncoderModules, self.format)
         else:
             raise InvalidEventException("Received device event on invalid topic: %s" % (pahoMessage.topic))
 
 
-class State:
+class State(object):
+    __slots__ = ("typeId", "thingId", "thing", "logicalInterfaceId", "payload")
+
     def __init__(self, pahoMessage):
-        result = THING_STATE_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.thingId = result.group(2)
-            self.thing = self.typeId + ":" + self.thingId
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.THING_STATE:
+            self.typeId = topic.typeId
+            self.thingId = topic.deviceId
+            self.thing = topic.device
 
-            self.logicalInterfaceId = result.group(3)
+            self.logicalInterfaceId = topic.name
             self.payload = pahoMessage.payload
         else:
             raise InvalidEventException("Received thing state on invalid topic: %s" % (pahoMessage.topic))
 
 
-class DeviceState:
+class DeviceState(object):
+    __slots__ = ("typeId", "deviceId", "device", "logicalInterfaceId", "payload")
+
     def __init__(self, pahoMessage):
-        result = DEVICE_STATE_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.deviceId = result.group(2)
-            self.device = self.typeId + ":" + self.deviceId
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.DEVICE_STATE:
+            self.typeId = topic.typeId
+            self.deviceId = topic.deviceId
+            self.device = topic.device
 
-            self.logicalInterfaceId = result.group(3)
+            self.logicalInterfaceId = topic.name
             self.payload = pahoMessage.payload
         else:
             raise InvalidEventException("Received device state on invalid topic: %s" % (pahoMessage.topic))
 
 
-class Error:
+class Error(object):
+    __slots__ = ("typeId", "id", "source", "payload")
+
     def __init__(self, pahoMessage):
-        result = ERROR_TOPIC_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.id = result.group(2)
-            self.source = self.typeId + ":" + self.id
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.DEVICE_ERROR:
+            self.typeId = topic.typeId
+            self.id = topic.deviceId
+            self.source = topic.device
             self.payload = pahoMessage.payload
         else:
             raise InvalidEventException("Received error message on invalid topic: %s" % (pahoMessage.topic))
 
 
-class ThingError:
+class ThingError(object):
+    __slots__ = ("typeId", "id", "source", "payload")
+
     def __init__(self, pahoMessage):
-        result = ERROR_TOPIC_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.id = result.group(2)
-            self.source = self.typeId + ":" + self.id
+        topic = topics.parseTopic(pahoMessage.topic)
+        # Thing errors have historically been parsed from device error topics, keep accepting both
+        if topic is not None and topic.kind in (topics.THING_ERROR, topics.DEVICE_ERROR):
+            self.typeId = topic.typeId
+            self.id = topic.deviceId
+            self.source = topic.device
             self.payload = pahoMessage.payload
         else:
             raise InvalidEventException("Received error message on invalid topic: %s" % (pahoMessage.topic))
@@ -0,0 +1,319 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import copy
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from queue import Empty
+
+from wiotp.sdk.application.config import ApplicationClientConfig
+from wiotp.sdk.exceptions import ConfigurationException
+from wiotp.sdk.metrics import formatPrometheus, mergeSnapshots
+from wiotp.sdk.reconnect import ReconnectPolicy
+
+
+def _createClient(config):
+    from wiotp.sdk.application.client import ApplicationClient
+
+    return ApplicationClient(config)
+
+
+def _runShard(index, config, setup, clientFactory, stopEvent, reports, interval):
+    """
+    The body of each worker process: connect the shard's client, let `setup` subscribe, and report the client's
+    metrics to the parent every `interval` seconds until asked to stop
+    """
+    client = None
+
+    def report():
+        reports.put((index, client.metrics.snapshot(), client.metrics.gauges()))
+
+    try:
+        client = clientFactory(config)
+        client.connect()
+        setup(client)
+        report()
+        while not stopEvent.wait(interval):
+            report()
+        report()
+    except KeyboardInterrupt:
+        # Ctrl+C is delivered to every process in the group, the parent decides whether the shards are stopping
+        pass
+    finally:
+        if client is not None:
+            client.disconnect()
+
+
+class Shard(object):
+    """
+    One of the worker processes run by a #ShardedApplicationConsumer
+
+    # Attributes
+    index (int): The position of the shard, from `0`
+    instanceId (string): The instance id that the shard's client connects with
+    process (multiprocessing.Process): The current worker process, `None` before the consumer is started
+    restarts (int): Number of times the worker process has been restarted
+    failures (int): Number of times in a row that the worker process has exited before reporting its metrics
+    metrics (dict): The most recent metrics snapshot reported by the shard, `None` until it has connected
+    """
+
+    def __init__(self, index, instanceId):
+        self.index = index
+        self.instanceId = instanceId
+        self.process = None
+        self.restarts = 0
+        self.failures = 0
+        self.metrics = None
+        self._restartAt = None
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class ShardedApplicationConsumer(object):
+    """
+    Scales the consumption of device events across the cores of a node by running several application clients, each
+    in its own worker process.  Every shard connects with the same application id and its own instance id, so that
+    Watson IoT Platform balances the messages for the shared subscriptions between them.
+
+    The consumer supervises the worker processes, restarting any that exit, and collects each shard's metrics so that
+    they can be reported as a whole.
+
+    ```python
+    def setup(client):
+        client.deviceEventCallback = myEventCallback
+        client.subscribeToDeviceEvents()
+
+    consumer = wiotp.sdk.application.ShardedApplicationConsumer(options, setup, processes=4)
+    consumer.run()
+    ```
+
+    # Parameters
+    config (dict): Configuration for the application clients, as for #wiotp.sdk.application.ApplicationClient.  If
+        `options.mqtt.instanceId` is set it is used as the prefix of each shard's instance id, otherwise `shard` is
+    setup (function): Called in each worker process as `setup(client)` once the shard's client has connected, to set
+        its callbacks and make its subscriptions.  Must be defined at module level when processes are started with the
+        `spawn` or `forkserver` methods
+    processes (int): Number of shards.  Defaults to `None`, one for each CPU
+    metricsInterval (float): Seconds between each shard's metrics reports.  Defaults to `5`
+    restartPolicy (wiotp.sdk.ReconnectPolicy): The delay before restarting a shard that has exited, which grows while
+        the shard keeps failing to connect.  Defaults to `ReconnectPolicy(minDelay=1, maxDelay=60)`
+    clientFactory (function): Called in each worker process as `clientFactory(config)` to create the shard's client.
+        Defaults to `None`, creating a #wiotp.sdk.application.ApplicationClient
+    startMethod (string): The multiprocessing start method, `fork`, `spawn` or `forkserver`.  Defaults to `None`, the
+        platform's default method
+    logger (logging.Logger): Logger to use.  Defaults to `None`
+
+    # Attributes
+    config (wiotp.sdk.application.ApplicationClientConfig): The configuration shared by every shard
+    shards (list<Shard>): The shards
+    """
+
+    def __init__(
+        self,
+        config,
+        setup,
+        processes=None,
+        metricsInterval=5,
+        restartPolicy=None,
+        clientFactory=None,
+        startMethod=None,
+        logger=None,
+    ):
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes < 1:
+            raise ConfigurationException("A sharded consumer requires at least one process")
+
+        # Validate the configuration and fill in its defaults once, so that every shard shares the same appId
+        self.config = ApplicationClientConfig(**copy.deepcopy(config))
+        self.setup = setup
+        self.metricsInterval = metricsInterval
+        self.restartPolicy = restartPolicy if restartPolicy is not None else ReconnectPolicy(1, 60)
+        self.clientFactory = clientFactory if clientFactory is not None else _createClient
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+        prefix = self.config.instanceId or "shard"
+        self.shards = [Shard(index, "%s-%d" % (prefix, index)) for index in range(processes)]
+
+        self._context = multiprocessing.get_context(startMethod)
+        self._stopEvent = self._context.Event()
+        self._reports = self._context.Queue()
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def shardConfig(self, shard):
+        """
+        The configuration used by a shard's client, which differs from #config only in its instance id and, if the
+        inbound queue spills to disk, the path of its journal
+
+        # Returns
+        dict: The configuration
+        """
+        config = copy.deepcopy(dict(self.config))
+        config["options"]["mqtt"]["instanceId"] = shard.instanceId
+        inbound = config["options"].get("inbound")
+        if inbound is not None and inbound.get("path") is not None:
+            inbound["path"] = "%s.%s" % (inbound["path"], shard.instanceId)
+        return config
+
+    def start(self):
+        """
+        Start a worker process for each shard, and a thread that supervises them
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._stopped.clear()
+            self._stopEvent.clear()
+            for shard in self.shards:
+                self._startShard(shard)
+            self._thread = threading.Thread(target=self._supervise, name="wiotp-shards", daemon=True)
+            self._thread.start()
+
+    def run(self):
+        """
+        Start the shards and block until #stop() is called, or the process is interrupted (e.g. by Ctrl+C), then stop
+        the shards
+        """
+        self.start()
+        try:
+            while not self._stopped.wait(1):
+                pass
+        except KeyboardInterrupt:
+            self.logger.info("Interrupted, stopping %s shards" % len(self.shards))
+        finally:
+            self.stop()
+
+    def stop(self, timeout=10):
+        """
+        Ask every shard to disconnect and exit, terminating any that have not exited within `timeout` seconds
+
+        # Returns
+        bool: `True` if every shard exited cleanly, `False` if any had to be terminated
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return True
+            self._stopping = True
+            self._stopEvent.set()
+
+        clean = True
+        deadline = time.monotonic() + timeout
+        for shard in self.shards:
+            if shard.process is not None:
+                shard.process.join(max(0, deadline - time.monotonic()))
+                if shard.process.is_alive():
+                    self.logger.warning("Shard %s did not stop within %ss, terminating it" % (shard.index, timeout))
+                    shard.process.terminate()
+                    shard.process.join()
+                    clean = False
+        thread.join()
+        with self._lock:
+            self._thread = None
+        self._stopped.set()
+        return clean
+
+    def metrics(self):
+        """
+        The combined metrics of every shard, from the most recent report of each (see #wiotp.sdk.metrics.mergeSnapshots)
+
+        # Returns
+        dict: A snapshot in the same form as #wiotp.sdk.ClientMetrics.snapshot()
+        """
+        with self._lock:
+            return mergeSnapshots([shard.metrics for shard in self.shards if shard.metrics is not None])
+
+    def shardMetrics(self):
+        """
+        The most recent metrics reported by each shard
+
+        # Returns
+        dict: `{index: snapshot}`, for the shards that have reported their metrics
+        """
+        with self._lock:
+            return {shard.index: shard.metrics for shard in self.shards if shard.metrics is not None}
+
+    def prometheus(self, prefix="wiotp"):
+        """
+        The combined metrics of every shard in the Prometheus text exposition format, see
+        #wiotp.sdk.ClientMetrics.prometheus()
+        """
+        snapshot = self.metrics()
+        with self._lock:
+            gauges = dict(self._gauges)
+        return formatPrometheus(snapshot, gauges, prefix)
+
+    def _startShard(self, shard):
+        shard._restartAt = None
+        shard.process = self._context.Process(
+            target=_runShard,
+            args=(
+                shard.index,
+                self.shardConfig(shard),
+                self.setup,
+                self.clientFactory,
+                self._stopEvent,
+                self._reports,
+                self.metricsInterval,
+            ),
+            name="wiotp-shard-%s" % shard.index,
+            daemon=True,
+        )
+        shard.process.start()
+        self.logger.debug("Started shard %s (%s) in process %s" % (shard.index, shard.instanceId, shard.process.pid))
+
+    def _supervise(self):
+        while True:
+            self._readReports(0.1)
+            with self._lock:
+                if self._stopping:
+                    if not any(shard.alive for shard in self.shards):
+                        break
+                    continue
+                now = time.monotonic()
+                for shard in self.shards:
+                    if shard.alive:
+                        continue
+                    if shard._restartAt is None:
+                        shard.failures += 1
+                        delay = self.restartPolicy.delay(shard.failures)
+                        shard._restartAt = now + delay
+                        self.logger.warning(
+                            "Shard %s exited with code %s, restarting it in %.1fs"
+                            % (shard.index, shard.process.exitcode, delay)
+                        )
+                    elif now >= shard._restartAt:
+                        shard.restarts += 1
+                        self._startShard(shard)
+        # Collect the final reports sent by the shards as they stopped
+        self._readReports(0)
+
+    def _readReports(self, timeout):
+        try:
+            report = self._reports.get(timeout=timeout) if timeout > 0 else self._reports.get_nowait()
+            while True:
+                index, snapshot, gauges = report
+                with self._lock:
+                    shard = self.shards[index]
+                    shard.metrics = snapshot
+                    shard.failures = 0
+                    self._gauges.update(gauges)
+                report = self._reports.get_nowait()
+        except Empty:
+            pass
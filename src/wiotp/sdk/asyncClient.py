@@ -0,0 +1,295 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# *****************************************************************************
+
+import asyncio
+import socket
+
+from wiotp.sdk.exceptions import ConnectionException
+
+
+class AsyncClientMixin(object):
+    """
+    Mixin that replaces the network thread started by `paho.Client.loop_start()` with the asyncio
+    event loop.  The Paho socket is registered with the loop (`add_reader()`/`add_writer()`) and
+    `loop_misc()` is driven from a task, so all client callbacks run on the event loop thread.
+
+    Combined with #wiotp.sdk.device.DeviceClient, #wiotp.sdk.gateway.GatewayClient and
+    #wiotp.sdk.application.ApplicationClient to provide the asyncio-native client variants.
+
+    - `connect()` and `disconnect()` are coroutines
+    - Methods that publish a message return an awaitable that resolves to `True` once delivery is
+      confirmed (PUBACK for qos 1), or `False` if the message could not be sent
+    - Inbound messages can be consumed as async iterators
+    - A full publish window (see `options.mqtt.maxQueued`) rejects the publish rather than blocking
+
+    Async clients are not thread safe, all methods must be called from the event loop thread.
+
+    # Attributes
+    loop (asyncio.AbstractEventLoop): The event loop driving the client, set by `connect()`
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncClientMixin, self).__init__(*args, **kwargs)
+
+        self.loop = None
+        self._miscTask = None
+        self._reconnectTask = None
+        self._connectFuture = None
+        self._disconnectFuture = None
+        self._closing = False
+
+        # Waiting for space in the publish window would block the event loop, so a full window
+        # always rejects the publish
+        self.publishWindow.policy = "reject"
+
+        # The outbound spool is drained by a background thread, which would bypass the event loop
+        if getattr(self, "spool", None) is not None:
+            self.logger.warning("Outbound spool is not supported by asyncio clients, options.spool will be ignored")
+            self.spool = None
+
+        self.client.on_socket_open = self._onSocketOpen
+        self.client.on_socket_close = self._onSocketClose
+        self.client.on_socket_register_write = self._onSocketRegisterWrite
+        self.client.on_socket_unregister_write = self._onSocketUnregisterWrite
+
+    async def connect(self):
+        """
+        Connect the client to IBM Watson IoT Platform, using the running event loop to drive the
+        underlying Paho MQTT client.  If `options.mqtt.reconnect.maxAttempts` is set, failed attempts are
+        retried using the reconnect policy.
+
+        # Raises
+        ConnectionException: If there is a problem establishing the connection.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._closing = False
+        attempt = 0
+        while True:
+            attempt += 1
+            reason = await self._connectAttempt()
+            if reason is None:
+                return
+
+            if self.reconnectPolicy.maxAttempts == 0 or self.reconnectPolicy.exhausted(attempt):
+                self._stopTasks()
+                self._logAndRaiseException(ConnectionException(reason))
+
+            delay = self.reconnectPolicy.delay(attempt)
+            self.logger.warning("%s, retrying in %.1f seconds (attempt %s)" % (reason, delay, attempt))
+            await asyncio.sleep(delay)
+
+    async def _connectAttempt(self):
+        """
+        Make a single attempt to connect, returning `None` on success or the reason the attempt failed
+        """
+        self.connectEvent.clear()
+        self._connectFuture = self.loop.create_future()
+
+        self.logger.debug(
+            "Connecting with clientId %s to host %s on port %s with keepAlive set to %s"
+            % (self.clientId, self.address, self.port, self.keepAlive)
+        )
+        self.logger.debug("User-Agent: %s" % self.userAgent)
+        try:
+            self.client.connect(self.address, port=self.port, keepalive=self.keepAlive)
+        except socket.error as serr:
+            return "Failed to connect to IBM Watson IoT Platform: %s - %s" % (self.address, str(serr))
+
+        if self._miscTask is None or self._miscTask.done():
+            self._miscTask = self.loop.create_task(self._loopMisc())
+
+        try:
+            await asyncio.wait_for(asyncio.shield(self._connectFuture), timeout=60)
+        except asyncio.TimeoutError:
+            return "Operation timed out connecting to IBM Watson IoT Platform: %s" % (self.address)
+        return None
+
+    async def disconnect(self):
+        """
+        Disconnect the client from IBM Watson IoT Platform
+        """
+        self._closing = True
+        if self.isConnected():
+            self._disconnectFuture = self.loop.create_future()
+            self.client.disconnect()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._disconnectFuture), timeout=10)
+            except asyncio.TimeoutError:
+                self.logger.warning("Timed out waiting for disconnect to complete")
+        self._stopTasks()
+        self.logger.info("Closed connection to the IBM Watson IoT Platform")
+
+    def _stopTasks(self):
+        for task in (self._miscTask, self._reconnectTask):
+            if task is not None and not task.done():
+                task.cancel()
+        self._miscTask = None
+        self._reconnectTask = None
+
+    async def _loopMisc(self):
+        """
+        Paho needs `loop_misc()` calling regularly to handle keep alive and retries
+        """
+        while not self._closing:
+            self.client.loop_misc()
+            await asyncio.sleep(1)
+
+    async def _reconnect(self):
+        attempt = 0
+        while not self._closing and not self.isConnected():
+            attempt += 1
+            await asyncio.sleep(self.reconnectPolicy.delay(attempt))
+            try:
+                self.client.reconnect()
+                return
+            except (socket.error, OSError) as e:
+                self.reconnectStats.failedAttempts += 1
+                self.logger.warning("Reconnect attempt failed: %s" % (str(e)))
+                if self.reconnectPolicy.exhausted(attempt):
+                    self.logger.error(
+                        "Giving up on reconnecting to IBM Watson IoT Platform after %s attempts" % (attempt)
+                    )
+                    return
+
+    def _scheduleReconnect(self):
+        # Reconnection is driven by the _reconnect() task rather than Paho's network thread
+        pass
+
+    def _onSocketOpen(self, client, userdata, sock):
+        self.loop.add_reader(sock, self._onSocketReadable)
+
+    def _onSocketClose(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+
+    def _onSocketRegisterWrite(self, client, userdata, sock):
+        self.loop.add_writer(sock, self.client.loop_write)
+
+    def _onSocketUnregisterWrite(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    def _onSocketReadable(self):
+        self.client.loop_read()
+        # TLS sockets may already hold decrypted data in their buffer, which will not trigger
+        # another readiness notification from the event loop
+        sock = self.client.socket()
+        while sock is not None and hasattr(sock, "pending") and sock.pending():
+            self.client.loop_read()
+            sock = self.client.socket()
+
+    def _onConnect(self, mqttc, userdata, flags, rc):
+        try:
+            super(AsyncClientMixin, self)._onConnect(mqttc, userdata, flags, rc)
+        except ConnectionException as e:
+            if self._connectFuture is not None and not self._connectFuture.done():
+                self._connectFuture.set_exception(e)
+        else:
+            if self._connectFuture is not None and not self._connectFuture.done():
+                self._connectFuture.set_result(True)
+
+    def _onDisconnect(self, mqttc, obj, rc):
+        super(AsyncClientMixin, self)._onDisconnect(mqttc, obj, rc)
+        if self._disconnectFuture is not None and not self._disconnectFuture.done():
+            self._disconnectFuture.set_result(True)
+        if rc != 0 and not self._closing and (self._reconnectTask is None or self._reconnectTask.done()):
+            self._reconnectTask = self.loop.create_task(self._reconnect())
+
+    def _trackDelivery(self, onPublish=None):
+        """
+        Create a future and an onPublish callback that resolves it
+        """
+        future = self.loop.create_future()
+
+        def _resolve():
+            if not future.done():
+                future.set_result(True)
+            if onPublish is not None:
+                onPublish()
+
+        return future, _resolve
+
+    def _publishPayload(self, topic, event, payload, qos=0, onPublish=None, span=None):
+        # Never block the event loop waiting for a connection
+        if not self.isConnected():
+            self.logger.warning("Unable to send event %s because client is is disconnected state", event)
+            if span is not None:
+                span.recordError("Client is disconnected")
+                span.end()
+            return self._resolved(False)
+
+        future, resolve = self._trackDelivery(onPublish)
+        if not super(AsyncClientMixin, self)._publishPayload(topic, event, payload, qos, resolve, span):
+            future.set_result(False)
+        return future
+
+    def _publishEvents(self, events, qos=0, onPublish=None):
+        if not self.isConnected():
+            self.logger.warning("Unable to send event batch because client is is disconnected state")
+            return self._resolved(False)
+
+        future = self.loop.create_future()
+        batch = super(AsyncClientMixin, self)._publishEvents(events, qos, onPublish)
+
+        def _resolve():
+            if not future.done():
+                future.set_result(batch)
+
+        if batch.isComplete():
+            _resolve()
+        else:
+            # The batch invokes its onPublish callback once complete
+            batch._onPublish = _chain(_resolve, onPublish)
+        return future
+
+    def _subscribe(self, topic, qos=1):
+        if not self.isConnected():
+            self.logger.warning("Unable to subscribe to %s because client is in disconnected state" % (topic))
+            return 0
+        return super(AsyncClientMixin, self)._subscribe(topic, qos)
+
+    def subscribeMany(self, subscriptions, onSubscribe=None, **kwargs):
+        subscriptions = list(subscriptions)
+        if not self.isConnected():
+            self.logger.warning(
+                "Unable to subscribe to %s topics because client is in disconnected state" % len(subscriptions)
+            )
+            return False
+        return super(AsyncClientMixin, self).subscribeMany(subscriptions, onSubscribe, **kwargs)
+
+    def _resolved(self, result):
+        future = (self.loop or asyncio.get_running_loop()).create_future()
+        future.set_result(result)
+        return future
+
+    def _iterate(self, callbackName):
+        """
+        Expose a user callback attribute (e.g. `deviceEventCallback`) as an async iterator.  The callback is
+        registered immediately so no messages are missed before iteration starts.  Only a single consumer is
+        supported for each callback, starting a second iterator replaces the first.
+        """
+        queue = asyncio.Queue()
+        setattr(self, callbackName, queue.put_nowait)
+        return self._drain(callbackName, queue)
+
+    async def _drain(self, callbackName, queue):
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            if getattr(self, callbackName) == queue.put_nowait:
+                setattr(self, callbackName, None)
+
+
+def _chain(first, second):
+    def _call():
+        first()
+        if second is not None:
+            second()
+
+    return _call
@@ -26,7 +26,14 @@ from datetime import datetime
 
 from wiotp.sdk import __version__ as wiotpVersion
 from wiotp.sdk.exceptions import MissingMessageEncoderException, ConnectionException
-from wiotp.sdk.messages import JsonCodec, RawCodec, Utf8Codec
+from wiotp.sdk.exceptions import InvalidEventException, MissingMessageDecoderException
+from wiotp.sdk.messages import JsonCodec, RawCodec, Utf8Codec, CborCodec, MsgPackCodec, NdArrayCodec
+from wiotp.sdk.messages import BatchCodec, CodecRegistry, codecAvailable, _payloadEncoder, _requiresTimestamp
+from wiotp.sdk.metrics import ClientMetrics
+from wiotp.sdk import tracing
+from wiotp.sdk.publish import PublishBatch, PublishFuture, PublishTracker, PublishWindow, Publisher
+from wiotp.sdk.reconnect import ReconnectPolicy, ReconnectStats
+from wiotp.sdk.subscribe import MAX_SUBSCRIBE_PACKET_SIZE, SubscribeBatch, packSubscriptions
 
 
 class AbstractClient(object):
@@ -47,10 +54,34 @@ class AbstractClient(object):
     sessionExpiry (string): Defaults to 3600 seconds.  Does nothing today (pending MQTT v5)
     transport (string): Defaults to `tcp`
     caFile (string): Defaults to None
+    maxInflight (int): Maximum number of QoS 1 & 2 messages that can be in the process of being transmitted
+        at once.  Defaults to `None`, which will use the Paho default (20)
+    maxQueued (int): Maximum number of messages that can be queued behind the in-flight messages before
+        backpressure is applied to publishers.  Defaults to `0` (unbounded)
+    backpressure (string): What to do when a publish would exceed `maxInflight + maxQueued`: `block`, `timeout` or
+        `reject`.  Defaults to `block`
+    backpressureTimeout (float): Maximum time to wait for space under the `timeout` policy.  Defaults to `10`
+    reconnectMinDelay (float): Delay in seconds before the first attempt to restore a lost connection, doubled after
+        each failed attempt.  Defaults to `1`
+    reconnectMaxDelay (float): Upper bound on the delay between reconnect attempts.  Defaults to `120`
+    reconnectJitter (float): Fraction of each reconnect delay, between `0` and `1`, that is randomised.  Defaults to
+        `0.5`
+    reconnectMaxAttempts (int): Maximum number of consecutive connection attempts before giving up.  Defaults to `0`,
+        automatic reconnection retries indefinitely and `connect()` makes a single attempt
 
     # Attributes
     client (paho.mqtt.client.Client): Built-in Paho MQTT client handling connectivity for the client.
     logger (logging.logger): Client logger.
+    publishWindow (wiotp.sdk.PublishWindow): Tracks the number of messages awaiting confirmation.
+    reconnectPolicy (wiotp.sdk.ReconnectPolicy): Controls the delay between attempts to restore a lost connection.
+    reconnectStats (wiotp.sdk.ReconnectStats): Reconnect counters and time-to-recover metrics.
+    metrics (wiotp.sdk.ClientMetrics): Message counters, publish latency and callback execution time.
+    tracer (wiotp.sdk.tracing.Tracer): Records spans around publishing and receiving messages.  The default tracer
+        does nothing.
+    dispatcher (wiotp.sdk.KeyedDispatcher): Runs message callbacks on a pool of worker threads, partitioned by
+        device.  Defaults to `None`, callbacks run on the Paho network thread.
+    restoredSubscriptions (wiotp.sdk.SubscribeBatch): Tracks the SUBACKs for the subscriptions restored by the most
+        recent connection, `None` if there were none to restore.
     """
 
     def __init__(
@@ -68,6 +99,14 @@ class AbstractClient(object):
         caFile=None,
         logLevel=logging.INFO,
         logHandlers=None,
+        maxInflight=None,
+        maxQueued=0,
+        backpressure="block",
+        backpressureTimeout=10,
+        reconnectMinDelay=1,
+        reconnectMaxDelay=120,
+        reconnectJitter=0.5,
+        reconnectMaxAttempts=0,
     ):
 
         self.organization = organization
@@ -89,11 +128,57 @@ class AbstractClient(object):
         self._subscriptions = {}
         self._subLock = threading.Lock()
         self.subscriptionsAcknowledged = threading.Event()
+        self.restoredSubscriptions = None
 
-        # Create a map to contain mids for onPublish() callback handling.
-        # and a lock to gate access to the dictionary
-        self._onPublishCallbacks = {}
-        self._messagesLock = threading.Lock()
+        # Bounded queues between the network thread and the handling of received messages, with their handlers
+        self._inboundQueues = []
+
+        # Match SUBACKs to the subscribe requests that are waiting on them
+        self._subscribeTracker = PublishTracker()
+
+        # Track mids for onPublish() callback handling
+        self._publishTracker = PublishTracker()
+
+        # Every published message occupies a slot in the publish window until it is confirmed, bounding
+        # how far publishers can get ahead of the service
+        windowCapacity = None
+        if maxQueued:
+            windowCapacity = (maxInflight or 20) + maxQueued
+        self.publishWindow = PublishWindow(windowCapacity, backpressure, backpressureTimeout)
+
+        self.reconnectPolicy = ReconnectPolicy(
+            reconnectMinDelay, reconnectMaxDelay, reconnectJitter, reconnectMaxAttempts
+        )
+        self.reconnectStats = ReconnectStats()
+        self._reconnectAttempts = 0
+
+        self.metrics = ClientMetrics()
+        self.metrics.register("inflight", "Published messages awaiting confirmation", lambda: self.publishWindow.used)
+        self.metrics.register(
+            "disconnects", "Unexpected losses of connection", lambda: self.reconnectStats.disconnects, "counter"
+        )
+        self.metrics.register(
+            "reconnects", "Connections restored after being lost", lambda: self.reconnectStats.reconnects, "counter"
+        )
+        self.metrics.register(
+            "reconnectFailures", "Failed reconnect attempts", lambda: self.reconnectStats.failedAttempts, "counter"
+        )
+
+        self.tracer = tracing.Tracer()
+        # The span of the message being handled by each thread that invokes message callbacks
+        self._receiveSpans = threading.local()
+
+        self.dispatcher = None
+        self.metrics.register(
+            "dispatchQueued",
+            "Received messages waiting for a dispatcher worker",
+            lambda: self.dispatcher.queued if self.dispatcher else None,
+        )
+        self.metrics.register(
+            "dispatchLag",
+            "Seconds the slowest dispatcher partition has fallen behind",
+            lambda: max(self.dispatcher.lag()) if self.dispatcher else None,
+        )
 
         self.clientId = clientId
 
@@ -189,9 +274,13 @@ class AbstractClient(object):
                 )
             self.client.username_pw_set(self.username, self.password)
 
+        if maxInflight is not None:
+            self.client.max_inflight_messages_set(maxInflight)
+
         # Attach MQTT callbacks
         self.client.on_log = self._onLog
         self.client.on_connect = self._onConnect
+        self.client.on_connect_fail = self._onConnectFail
         self.client.on_disconnect = self._onDisconnect
         self.client.on_publish = self._onPublish
         self.client.on_subscribe = self._onSubscribe
@@ -200,11 +289,18 @@ class AbstractClient(object):
         self.subscriptionCallback = None
 
         # Initialize default message encoders and decoders.
-        self._messageCodecs = {}
+        # Compressed variants of each format (e.g. json-deflate) are derived on demand by the registry
+        self._messageCodecs = CodecRegistry()
 
         self.setMessageCodec("json", JsonCodec)
         self.setMessageCodec("raw", RawCodec)
         self.setMessageCodec("utf8", Utf8Codec)
+        self.setMessageCodec("batch", BatchCodec)
+
+        # Binary formats are only available when their optional dependency is installed
+        for messageFormat, codec in (("cbor", CborCodec), ("msgpack", MsgPackCodec), ("ndarray", NdArrayCodec)):
+            if codecAvailable(codec):
+                self.setMessageCodec(messageFormat, codec)
 
     def getMessageCodec(self, messageFormat):
         """
@@ -230,6 +326,90 @@ class AbstractClient(object):
         """
         self._messageCodecs[messageFormat] = codec
 
+    def _addMessageCallback(self, topic, callback, queue=None):
+        """
+        Register a Paho message callback for messages received on `topic`, recording the size of each message and the
+        time taken to handle it in the client metrics, within a `wiotp.receive` span.  If an #wiotp.sdk.InboundQueue
+        is supplied Paho's network thread only adds each message to the queue, and the messages are handled by the
+        queue's consumer thread
+        """
+        metrics = self.metrics
+        receiveSpans = self._receiveSpans
+
+        def _onMessage(client, userdata, pahoMessage):
+            started = time.perf_counter()
+            size = len(pahoMessage.payload)
+            attributes = {
+                tracing.TOPIC: pahoMessage.topic,
+                tracing.QOS: pahoMessage.qos,
+                tracing.SIZE: size,
+                tracing.MID: pahoMessage.mid,
+            }
+            span = self.tracer.startSpan(tracing.RECEIVE, attributes)
+            receiveSpans.span = span
+            try:
+                callback(client, userdata, pahoMessage)
+            except (InvalidEventException, MissingMessageDecoderException) as e:
+                metrics._onDecodeFailure(e)
+                span.recordError(e)
+                raise
+            except Exception as e:
+                span.recordError(e)
+                raise
+            finally:
+                receiveSpans.span = None
+                span.end()
+                metrics._onReceived(pahoMessage.topic, size, time.perf_counter() - started)
+
+        if queue is None:
+            self.client.message_callback_add(topic, _onMessage)
+        else:
+            self.client.message_callback_add(topic, lambda client, userdata, pahoMessage: queue.put(pahoMessage))
+            self._inboundQueues.append((queue, lambda pahoMessage: _onMessage(self.client, None, pahoMessage)))
+
+    def _receiveSpan(self):
+        """
+        The span of the message being handled by the current thread, `None` outside of a message callback
+        """
+        return getattr(self._receiveSpans, "span", None)
+
+    def _invokeCallback(self, callback, message):
+        """
+        Pass a received message to a user callback, within a `wiotp.callback` span.  If a dispatcher is set the
+        callback runs on the dispatcher's worker for the message's partition
+        """
+        dispatcher = self.dispatcher
+        if dispatcher is None:
+            self._runCallback(callback, message, self._receiveSpan())
+        else:
+            dispatcher.dispatch(message, self._runCallback, callback, message, self._receiveSpan())
+
+    def _runCallback(self, callback, message, parent):
+        span = self.tracer.startSpan(tracing.CALLBACK, None, parent)
+        try:
+            callback(message)
+        except (InvalidEventException, MissingMessageDecoderException) as e:
+            # Payloads are decoded when the callback first reads them, so an invalid message surfaces here
+            span.recordError(e)
+            self._onInvalidMessage(e, parent)
+        except Exception as e:
+            span.recordError(e)
+            raise
+        finally:
+            span.end()
+
+    def _onInvalidMessage(self, e, span=None):
+        """
+        Called when a received message cannot be decoded, logs the exception at log level `critical` and records it
+        on `span`, by default the current receive span
+        """
+        self.metrics._onDecodeFailure(e)
+        if span is None:
+            span = self._receiveSpan()
+        if span is not None:
+            span.recordError(e)
+        self.logger.critical(str(e))
+
     def _logAndRaiseException(self, e):
         """
         Logs an exception at log level `critical` before raising it.
@@ -242,7 +422,8 @@ class AbstractClient(object):
 
     def connect(self):
         """
-        Connect the client to IBM Watson IoT Platform using the underlying Paho MQTT client
+        Connect the client to IBM Watson IoT Platform using the underlying Paho MQTT client.  If
+        `options.mqtt.reconnect.maxAttempts` is set, failed attempts are retried using the reconnect policy.
 
         # Raises
         ConnectionException: If there is a problem establishing the connection.
@@ -250,38 +431,46 @@ class AbstractClient(object):
         self.logger.debug(
             f"Connecting ... (address = {self.address}, port = {self.port}, clientId = {self.clientId}, username = {self.username})"
         )
-        try:
-            self.connectEvent.clear()
-            self.logger.debug(
-                "Connecting with clientId %s to host %s on port %s with keepAlive set to %s"
-                % (self.clientId, self.address, self.port, self.keepAlive)
-            )
-            self.logger.debug("User-Agent: %s" % self.userAgent)
-            self.client.connect(self.address, port=self.port, keepalive=self.keepAlive)
-            self.client.loop_start()
-            if not self.connectEvent.wait(timeout=60):
-                self.client.loop_stop()
-                self._logAndRaiseException(
-                    ConnectionException(
-                        "Operation timed out connecting to IBM Watson IoT Platform: %s" % (self.address)
-                    )
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.connectEvent.clear()
+                self.logger.debug(
+                    "Connecting with clientId %s to host %s on port %s with keepAlive set to %s"
+                    % (self.clientId, self.address, self.port, self.keepAlive)
                 )
+                self.logger.debug("User-Agent: %s" % self.userAgent)
+                self.client.connect(self.address, port=self.port, keepalive=self.keepAlive)
+                self.client.loop_start()
+                if self.connectEvent.wait(timeout=60):
+                    return
+                self.client.loop_stop()
+                reason = "Operation timed out connecting to IBM Watson IoT Platform: %s" % (self.address)
+            except socket.error as serr:
+                self.client.loop_stop()
+                reason = "Failed to connect to IBM Watson IoT Platform: %s - %s" % (self.address, str(serr))
 
-        except socket.error as serr:
-            self.client.loop_stop()
-            self._logAndRaiseException(
-                ConnectionException("Failed to connect to IBM Watson IoT Platform: %s - %s" % (self.address, str(serr)))
-            )
+            if self.reconnectPolicy.maxAttempts == 0 or self.reconnectPolicy.exhausted(attempt):
+                self._logAndRaiseException(ConnectionException(reason))
+
+            delay = self.reconnectPolicy.delay(attempt)
+            self.logger.warning("%s, retrying in %.1f seconds (attempt %s)" % (reason, delay, attempt))
+            time.sleep(delay)
 
     def disconnect(self):
         """
-        Disconnect the client from IBM Watson IoT Platform
+        Disconnect the client from IBM Watson IoT Platform, and stop the consumer threads of any inbound queues
         """
         # self.logger.info("Closing connection to the IBM Watson IoT Platform")
         self.client.disconnect()
         # If we don't call loop_stop() it appears we end up with a zombie thread which continues to process
         # network traffic, preventing any subsequent attempt to reconnect using connect()
         self.client.loop_stop()
+        # Nothing more can arrive, stop the consumer threads once they have handled their current message.  Under
+        # the spill policy the messages still in memory are written to the journal, so they survive a restart
+        for queue, handler in self._inboundQueues:
+            queue.stop(10)
         self.logger.info("Closed connection to the IBM Watson IoT Platform")
 
     def isConnected(self):
@@ -317,20 +506,30 @@ class AbstractClient(object):
             6-255: Currently unused.
         """
         if rc == 0:
+            self._reconnectAttempts = 0
+            self.reconnectStats._onConnect()
             self.connectEvent.set()
             self.logger.info("Connected successfully: %s" % (self.clientId))
 
-            # Restoring previous subscriptions
+            # Queued messages (including any left in a spill journal by a previous client) are only handled once
+            # connected, by which time the callbacks they are passed to have been set
+            for queue, handler in self._inboundQueues:
+                queue.start(handler)
+
+            # Restoring previous subscriptions, packed into as few SUBSCRIBE packets as possible
             with self._subLock:
                 if len(self._subscriptions) > 0:
-                    for subscription in self._subscriptions:
-                        # We use the underlying mqttclient subscribe method rather than _subscribe because we are
-                        # claiming a lock on the subscriptions list and do not want anything else to modify it,
-                        # which that method does
-                        (result, mid) = self.client.subscribe(subscription, qos=self._subscriptions[subscription])
-                        if result != paho.MQTT_ERR_SUCCESS:
-                            self._logAndRaiseException(ConnectionException("Unable to subscribe to %s" % subscription))
-                    self.logger.debug("Restored %s previous subscriptions" % len(self._subscriptions))
+                    # We send the packets directly rather than via subscribeMany because we are claiming a lock
+                    # on the subscriptions list and do not want anything else to modify it, which that method does
+                    batch = SubscribeBatch()
+                    packets = self._sendSubscriptions(list(self._subscriptions.items()), batch)
+                    if batch.refused:
+                        self._logAndRaiseException(ConnectionException("Unable to subscribe to %s" % batch.refused[0]))
+                    batch._seal(packets)
+                    self.restoredSubscriptions = batch
+                    self.logger.debug(
+                        "Restored %s previous subscriptions in %s packets" % (len(self._subscriptions), packets)
+                    )
         elif rc == 1:
             self._logAndRaiseException(ConnectionException("Incorrect protocol version"))
         elif rc == 2:
@@ -367,9 +566,37 @@ class AbstractClient(object):
 
         if rc != 0:
             self.logger.error("Unexpected disconnect from IBM Watson IoT Platform: %d" % (rc))
+            self.reconnectStats._onDisconnect()
+            self._reconnectAttempts = 0
+            self._scheduleReconnect()
         else:
             self.logger.info("Disconnected from the IBM Watson IoT Platform")
 
+    def _onConnectFail(self, mqttc, obj):
+        """
+        Called by Paho when an automatic attempt to restore the connection fails
+        """
+        self.reconnectStats.failedAttempts += 1
+        self._scheduleReconnect()
+
+    def _scheduleReconnect(self):
+        """
+        Set the delay before Paho's network thread next attempts to reconnect.  Paho applies its own
+        exponential backoff between the minimum and maximum delay, so both are set to the jittered delay
+        chosen by the reconnect policy for the next attempt.
+        """
+        self._reconnectAttempts += 1
+        if self.reconnectPolicy.exhausted(self._reconnectAttempts):
+            self.logger.error(
+                "Giving up on reconnecting to IBM Watson IoT Platform after %s attempts" % (self._reconnectAttempts - 1)
+            )
+            # Moves the client into the disconnecting state, which stops Paho's network thread
+            self.client.disconnect()
+            return
+        delay = self.reconnectPolicy.delay(self._reconnectAttempts)
+        self.logger.debug("Reconnect attempt %s in %.1f seconds" % (self._reconnectAttempts, delay))
+        self.client.reconnect_delay_set(min_delay=delay, max_delay=delay)
+
     def _onPublish(self, mqttc, obj, mid):
         """
         Called when a message from the client has been successfully sent to IBM Watson IoT Platform.
@@ -381,18 +608,10 @@ class AbstractClient(object):
         obj (object): The private user data as set in Client() or user_data_set()
         mid (int): Gives the message id of the successfully published message.
         """
-        with self._messagesLock:
-            if mid in self._onPublishCallbacks:
-                midOnPublish = self._onPublishCallbacks.get(mid)
-                del self._onPublishCallbacks[mid]
-                if midOnPublish != None:
-                    midOnPublish()
-            else:
-                # record the fact that paho callback has already come through so it can be called inline
-                # with the publish.
-                self._onPublishCallbacks[mid] = None
+        self._publishTracker.confirm(mid)
 
     def _onSubscribe(self, mqttc, userdata, mid, grantedQoS):
+        self._subscribeTracker.confirm(mid, grantedQoS)
         self.subscriptionsAcknowledged.set()
         self.logger.debug("Subscribe callback: mid: %s qos: %s" % (mid, grantedQoS))
         if self.subscriptionCallback:
@@ -411,43 +630,263 @@ class AbstractClient(object):
             else:
                 return 0
 
-    def _publishEvent(self, topic, event, msgFormat, data, qos=0, onPublish=None):
+    def subscribeMany(self, subscriptions, onSubscribe=None, maxPacketSize=MAX_SUBSCRIBE_PACKET_SIZE):
+        """
+        Subscribe to many topics at once.  Rather than sending a SUBSCRIBE packet for each topic, the topics are
+        packed into as few multi-topic SUBSCRIBE packets as will fit within `maxPacketSize`.  The subscriptions are
+        restored in the same way whenever the client reconnects.
+
+        # Parameters
+        subscriptions (iterable): Iterable of `(topic, qos)` tuples
+        onSubscribe (function): A function that will be called with the returned batch once every packet has
+            been acknowledged.  Defaults to `None`
+        maxPacketSize (int): Maximum size in bytes of each SUBSCRIBE packet.  Defaults to `16384`
+
+        # Returns
+        SubscribeBatch: A handle tracking the acknowledgement of every topic, or `False` if the client is disconnected
+        """
+        subscriptions = list(subscriptions)
         if not self.connectEvent.wait(timeout=10):
-            self.logger.warning("Unable to send event %s because client is is disconnected state", event)
+            self.logger.warning(
+                "Unable to subscribe to %s topics because client is in disconnected state" % len(subscriptions)
+            )
             return False
-        else:
-            if self.logger.isEnabledFor(logging.DEBUG):
-                # The data object may not be serializable, e.g. if using a custom binary format
-                try:
-                    dataString = json.dumps(data)
-                except:
-                    dataString = str(data)
-                self.logger.debug("Sending event %s with data %s" % (event, dataString))
 
-            # Raise an exception if there is no codec for this msgFormat
-            if self.getMessageCodec(msgFormat) is None:
-                raise MissingMessageEncoderException(msgFormat)
+        batch = SubscribeBatch(onSubscribe)
+        packets = self._sendSubscriptions(subscriptions, batch, maxPacketSize)
+        refused = set(batch.refused)
+        with self._subLock:
+            for topic, qos in subscriptions:
+                if topic not in refused:
+                    self._subscriptions[topic] = qos
+        batch._seal(packets)
+        return batch
+
+    def _sendSubscriptions(self, subscriptions, batch, maxPacketSize=MAX_SUBSCRIBE_PACKET_SIZE):
+        """
+        Hand `(topic, qos)` pairs to Paho packed into multi-topic SUBSCRIBE packets, registering each packet with
+        the batch so that it is acknowledged when the SUBACK arrives
+
+        # Returns
+        int: The number of packets that Paho accepted
+        """
+        packets = 0
+        self._subscribeTracker.begin()
+        try:
+            for packet in packSubscriptions(subscriptions, maxPacketSize):
+                (result, mid) = self.client.subscribe(packet)
+                if result != paho.MQTT_ERR_SUCCESS:
+                    batch._fail(packet)
+                    continue
+                packets += 1
+                self._subscribeTracker.register(
+                    (mid,), lambda grantedQoS, packet=packet: batch._ack(packet, grantedQoS)
+                )
+        finally:
+            self._subscribeTracker.end()
+        return packets
+
+    def _publish(self, topic, payload, qos=0, onPublish=None, span=None):
+        """
+        Hand a single message to Paho.  The message occupies a slot in the publish window until it is
+        confirmed, at which point the returned future is resolved and the span, if any, is ended.
 
-            payload = self.getMessageCodec(msgFormat).encode(data, datetime.now(pytz.timezone("UTC")))
+        # Returns
+        PublishFuture: Handle tracking delivery of the message, or `False` if the publish window is full or
+            Paho refused the message
+        """
+        if not self.publishWindow.acquire():
+            self.logger.warning("Unable to publish to %s because the publish window is full", topic)
+            if span is not None:
+                span.recordError("Publish window is full")
+                span.end()
+            return False
 
+        future = PublishFuture(onPublish, self.publishWindow, self.metrics, span)
+        self._publishTracker.begin()
+        try:
             result = self.client.publish(topic, payload=payload, qos=qos, retain=False)
-            if result[0] == paho.MQTT_ERR_SUCCESS:
-                # Because we are dealing with aync pub/sub model and callbacks it is possible that
-                # the _onPublish() callback for this mid is called before we obtain the lock to place
-                # the mid into the _onPublishCallbacks list.
-                #
-                # _onPublish knows how to handle a scenario where the mid is not present (no nothing)
-                # in this scenario we will need to invoke the callback directly here, because at the time
-                # the callback was invoked the mid was not yet in the list.
-                with self._messagesLock:
-                    if result[1] in self._onPublishCallbacks:
-                        # Paho callback beat this thread so call callback inline now
-                        del self._onPublishCallbacks[result[1]]
-                        if onPublish is not None:
-                            onPublish()
-                    else:
-                        # This thread beat paho callback so set up for call later
-                        self._onPublishCallbacks[result[1]] = onPublish
-                return True
-            else:
+            if result[0] != paho.MQTT_ERR_SUCCESS:
+                self.publishWindow.release()
+                if span is not None:
+                    span.recordError("Paho refused the message: %s" % paho.error_string(result[0]))
+                    span.end()
                 return False
+            self.metrics._onPublished(topic, len(payload))
+            future.mid = result[1]
+            if span is not None:
+                span.setAttribute(tracing.MID, future.mid)
+                span.addEvent("sent")
+            self._publishTracker.register((future.mid,), future._confirm, future._discard)
+        finally:
+            self._publishTracker.end()
+        return future
+
+    def _windowed(self, onPublish=None, published=None, onDiscard=None):
+        """
+        Wrap an onPublish callback so that the message's slot in the publish window is released when
+        the message is confirmed, and its latency measured from `published` (a `time.monotonic()` value) is recorded.
+
+        # Returns
+        tuple: `(onPublish, onDiscard)` callbacks to register with the publish tracker, both release the slot
+        """
+        window = self.publishWindow
+        metrics = self.metrics
+
+        def _onPublish():
+            window.release()
+            if published is not None:
+                metrics._onConfirmed(time.monotonic() - published)
+            if onPublish is not None:
+                onPublish()
+
+        def _onDiscard():
+            window.release()
+            if onDiscard is not None:
+                onDiscard()
+
+        return (_onPublish, _onDiscard)
+
+    def _publishEvent(self, topic, event, msgFormat, data, qos=0, onPublish=None):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            # The data object may not be serializable, e.g. if using a custom binary format
+            try:
+                dataString = json.dumps(data)
+            except:
+                dataString = str(data)
+            self.logger.debug("Sending event %s with data %s" % (event, dataString))
+
+        span = self.tracer.startSpan(
+            tracing.PUBLISH,
+            {tracing.TOPIC: topic, tracing.QOS: qos, tracing.EVENT: event, tracing.FORMAT: msgFormat},
+        )
+        try:
+            # Raise an exception if there is no codec for this msgFormat
+            codec = self.getMessageCodec(msgFormat)
+            if codec is None:
+                raise MissingMessageEncoderException(msgFormat)
+
+            timestamp = datetime.now(pytz.utc) if _requiresTimestamp(codec) else None
+            payload = _payloadEncoder(codec)(data, timestamp)
+        except Exception as e:
+            span.recordError(e)
+            span.end()
+            raise
+        span.setAttribute(tracing.SIZE, len(payload))
+        span.addEvent("encoded")
+        return self._publishPayload(topic, event, payload, qos, onPublish, span)
+
+    def _publishPayload(self, topic, event, payload, qos=0, onPublish=None, span=None):
+        """
+        Publish an event that has already been encoded, ending `span` once it is confirmed
+        """
+        if not self.connectEvent.wait(timeout=10):
+            self.logger.warning("Unable to send event %s because client is is disconnected state", event)
+            if span is not None:
+                span.recordError("Client is disconnected")
+                span.end()
+            return False
+        return self._publish(topic, payload, qos, onPublish, span)
+
+    def _publisher(self, topic, event, msgFormat, qos=0):
+        """
+        Create a #wiotp.sdk.Publisher bound to a topic and to the codec currently registered for `msgFormat`
+        """
+        codec = self.getMessageCodec(msgFormat)
+        if codec is None:
+            raise MissingMessageEncoderException(msgFormat)
+        return Publisher(self, topic, event, codec, qos, msgFormat)
+
+    def _publishEvents(self, events, qos=0, onPublish=None):
+        """
+        Publish a batch of events.  The connection state is checked once, each message format is
+        resolved to a codec once, all messages share a single timestamp (if any codec needs one), and the mids of every
+        message in the batch are registered for onPublish() handling in a single call.
+
+        If the publish window fills part way through the batch the mids sent so far are registered
+        before waiting for space, so that their confirmations can free up the window.
+
+        The whole batch is recorded as a single span, which ends once every message has been confirmed.  The topic,
+        event and format are only recorded on the span if every message in the batch shares them.
+
+        # Parameters
+        events (iterable): Iterable of `(topic, eventId, msgFormat, data)` tuples
+        qos (int): MQTT quality of service level to use for every message in the batch
+        onPublish (function): A function that will be called once every message in the batch is confirmed
+
+        # Returns
+        PublishBatch: Handle tracking delivery of the batch, or `False` if the client is disconnected
+        """
+        span = self.tracer.startSpan(tracing.PUBLISH, {tracing.QOS: qos})
+        if not self.connectEvent.wait(timeout=10):
+            self.logger.warning("Unable to send event batch because client is is disconnected state")
+            span.recordError("Client is disconnected")
+            span.end()
+            return False
+
+        batch = PublishBatch(onPublish, span)
+        batchOnPublish, batchOnDiscard = self._windowed(batch._ack, time.monotonic(), batch._discard)
+        codecs = {}
+        timestamp = None
+        sent = 0
+        size = 0
+        streams = set()
+        mids = []
+        self._publishTracker.begin()
+        try:
+            for topic, event, msgFormat, data in events:
+                streams.add((topic, event, msgFormat))
+                codec = codecs.get(msgFormat)
+                if codec is None:
+                    # Raise an exception if there is no codec for this msgFormat
+                    codec = self.getMessageCodec(msgFormat)
+                    if codec is None:
+                        raise MissingMessageEncoderException(msgFormat)
+                    codecs[msgFormat] = codec
+
+                if timestamp is None and _requiresTimestamp(codec):
+                    timestamp = datetime.now(pytz.utc)
+                payload = _payloadEncoder(codec)(data, timestamp)
+
+                if not self.publishWindow.tryAcquire():
+                    self._publishTracker.register(mids, batchOnPublish, batchOnDiscard)
+                    mids = []
+                    if not self.publishWindow.acquire():
+                        batch.failed += 1
+                        continue
+
+                try:
+                    result = self.client.publish(topic, payload=payload, qos=qos, retain=False)
+                except Exception:
+                    self.publishWindow.release()
+                    raise
+                if result[0] == paho.MQTT_ERR_SUCCESS:
+                    mids.append(result[1])
+                    sent += 1
+                    size += len(payload)
+                    self.metrics._onPublished(topic, len(payload))
+                else:
+                    self.publishWindow.release()
+                    batch.failed += 1
+
+            self.logger.debug("Sent batch of %s events (%s failed)" % (sent, batch.failed))
+        except Exception as e:
+            span.recordError(e)
+            raise
+        finally:
+            if len(streams) == 1:
+                ((topic, event, msgFormat),) = streams
+                span.setAttribute(tracing.TOPIC, topic)
+                span.setAttribute(tracing.EVENT, event)
+                span.setAttribute(tracing.FORMAT, msgFormat)
+            span.setAttribute(tracing.COUNT, sent + batch.failed)
+            span.setAttribute(tracing.SIZE, size)
+            span.addEvent("sent")
+            if batch.failed:
+                span.recordError("%s messages in the batch were not sent" % batch.failed)
+            # Register the messages sent so far even if an exception stopped the batch part way through, so that their
+            # confirmations release their slots in the publish window.  Sealing ends the span if nothing is awaited
+            batch._seal(sent)
+            self._publishTracker.register(mids, batchOnPublish, batchOnDiscard)
+            self._publishTracker.end()
+        return batch
@@ -0,0 +1,277 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import collections
+import logging
+import os
+import threading
+
+from wiotp.sdk.exceptions import ConfigurationException
+
+
+class _PooledMessage(object):
+    """
+    Stands in for the Paho message when handing a payload to a codec in a pool process
+    """
+
+    __slots__ = ("topic", "payload", "qos", "retain")
+
+    def __init__(self, topic, payload, qos, retain):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+
+
+def _decodeBatch(items):
+    """
+    Run in a pool process: decode each `(codec, topic, payload, qos, retain)` item, returning an `(ok, message)` pair
+    for each.  Payloads that the codec rejects are returned as `(False, None)` so that they are decoded again (and the
+    error raised) when the message is handled
+    """
+    results = []
+    for codec, topic, payload, qos, retain in items:
+        try:
+            results.append((True, codec.decode(_PooledMessage(topic, payload, qos, retain))))
+        except Exception:
+            results.append((False, None))
+    return results
+
+
+class _Entry(object):
+    __slots__ = ("message", "deliver", "ready")
+
+    def __init__(self, message, deliver, ready):
+        self.message = message
+        self.deliver = deliver
+        self.ready = ready
+
+
+class DecodePool(object):
+    """
+    Decodes large payloads in a pool of processes, so that a single connection can use more than one core to decode
+    the events it receives.  Payloads of at least `threshold` bytes are sent to the pool in batches of up to `maxBatch`
+    payloads, and every message, decoded in the pool or not, is delivered in the order it was received.  Payloads
+    below the threshold are left to be decoded when your callback first reads them, as they would be without a pool.
+
+    ```python
+    client.decodePool = wiotp.sdk.DecodePool(processes=4, threshold=16384)
+    ```
+
+    While there are messages waiting for the pool, callbacks are run on the pool's delivery thread rather than on
+    Paho's network thread.  A payload that fails to decode in the pool is decoded again when the callback reads it, so
+    errors are raised in the same place as they would be without a pool.
+
+    # Parameters
+    processes (int): Number of pool processes.  Defaults to `None`, one for each CPU
+    threshold (int): Payloads of at least this many bytes are decoded in the pool.  Defaults to `16384`
+    maxBatch (int): Maximum number of payloads sent to a pool process at once.  Defaults to `64`
+    maxQueued (int): Maximum number of messages waiting to be delivered, the network thread blocks when the limit is
+        reached so that the broker stops sending until the pool catches up.  Defaults to `1000`
+    startMethod (string): The multiprocessing start method, `fork`, `spawn` or `forkserver`.  Defaults to `None`,
+        the platform's default method
+    logger (logging.Logger): Logger to use.  Defaults to `None`
+
+    # Attributes
+    offloaded (int): Number of payloads sent to the pool
+    inline (int): Number of messages delivered straight away, on the thread that submitted them
+    batches (int): Number of batches sent to the pool
+    failed (int): Number of payloads that could not be decoded in the pool
+    """
+
+    def __init__(self, processes=None, threshold=16384, maxBatch=64, maxQueued=1000, startMethod=None, logger=None):
+        if processes is not None and processes < 1:
+            raise ConfigurationException("A decode pool requires at least one process: %s" % processes)
+        if maxBatch < 1:
+            raise ConfigurationException("A decode pool requires a maximum batch size of at least one: %s" % maxBatch)
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        self.threshold = threshold
+        self.maxBatch = maxBatch
+        self.maxQueued = maxQueued
+        self.startMethod = startMethod
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+        self.offloaded = 0
+        self.inline = 0
+        self.batches = 0
+        self.failed = 0
+
+        self._cond = threading.Condition(threading.Lock())
+        # Every message waiting to be delivered, in the order received, and those still to be sent to the pool
+        self._entries = collections.deque()
+        self._unsent = collections.deque()
+        # Limit the batches in flight, so that payloads wait to join the next batch while the processes are busy
+        self._inFlight = 0
+        self._delivering = False
+        self._stopping = False
+        self._executor = None
+        self._threads = []
+
+    @property
+    def queued(self):
+        """
+        The number of messages waiting to be decoded or delivered
+        """
+        with self._cond:
+            return len(self._entries)
+
+    def submit(self, message, deliver):
+        """
+        Call `deliver(message)` once the message's payload has been decoded, or straight away if it is below the size
+        threshold and no earlier message is still waiting.  Messages are delivered in the order they are submitted.
+
+        # Parameters
+        message (object): A message whose payload is decoded by a codec, e.g. #wiotp.sdk.application.Event
+        deliver (function): Called with the message once it is ready
+
+        # Returns
+        bool: `True` if the message was delivered or queued, `False` if the pool has been stopped
+        """
+        offload = len(message.payload) >= self.threshold
+        with self._cond:
+            if self._stopping:
+                self.logger.warning("Unable to decode message in stopped decode pool")
+                return False
+            inline = not offload and not self._entries and not self._delivering
+            if inline:
+                self.inline += 1
+                # Holding the flag keeps the delivery thread from delivering alongside this message
+                self._delivering = True
+            if not inline:
+                if self.maxQueued > 0:
+                    self._cond.wait_for(lambda: len(self._entries) < self.maxQueued or self._stopping)
+                entry = _Entry(message, deliver, not offload)
+                self._entries.append(entry)
+                if offload:
+                    self.offloaded += 1
+                    self._unsent.append(entry)
+                    self._start()
+                self._cond.notify_all()
+                return True
+
+        try:
+            deliver(message)
+        finally:
+            with self._cond:
+                self._delivering = False
+                self._cond.notify_all()
+        return True
+
+    def drain(self, timeout=None):
+        """
+        Block until every queued message has been delivered
+
+        # Parameters
+        timeout (float): Maximum time to wait in seconds, or `None` to wait indefinitely
+
+        # Returns
+        bool: `True` if the pool is empty, `False` if the wait timed out
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._entries and not self._delivering, timeout)
+
+    def stop(self, timeout=None):
+        """
+        Deliver the messages already queued, then shut down the pool processes and the pool's threads
+        """
+        drained = self.drain(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+            executor, self._executor = self._executor, None
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        if executor is not None:
+            executor.shutdown(wait=drained)
+        return drained
+
+    def _start(self):
+        """
+        Create the process pool and start the pool's threads, called with the lock held
+        """
+        if self._executor is not None:
+            return
+        # Only pay for loading multiprocessing when the first large payload arrives
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._executor = ProcessPoolExecutor(self.processes, multiprocessing.get_context(self.startMethod))
+        self._threads = [
+            threading.Thread(target=self._send, name="wiotp-decode-send", daemon=True),
+            threading.Thread(target=self._deliver, name="wiotp-decode-deliver", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _send(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: (self._unsent and self._inFlight < 2 * self.processes) or self._stopping)
+                if self._stopping:
+                    return
+                batch = [self._unsent.popleft() for i in range(min(self.maxBatch, len(self._unsent)))]
+                self._inFlight += 1
+                self.batches += 1
+                executor = self._executor
+            items = []
+            for entry in batch:
+                pahoMessage = entry.message._pahoMessage
+                items.append(
+                    (entry.message._codec, pahoMessage.topic, pahoMessage.payload, pahoMessage.qos, pahoMessage.retain)
+                )
+            try:
+                future = executor.submit(_decodeBatch, items)
+            except Exception as e:
+                self._onDecoded(batch, None, e)
+            else:
+                future.add_done_callback(lambda future, batch=batch: self._onDecoded(batch, future))
+
+    def _onDecoded(self, batch, future, error=None):
+        results = None
+        if error is None:
+            try:
+                results = future.result()
+            except Exception as e:
+                error = e
+        if error is not None:
+            # The payloads are decoded in this process instead, when they are first read
+            self.logger.warning("Unable to decode %s payloads in the decode pool: %s" % (len(batch), error))
+            results = [(False, None)] * len(batch)
+
+        with self._cond:
+            for entry, (ok, result) in zip(batch, results):
+                if ok:
+                    entry.message._message = result
+                else:
+                    self.failed += 1
+                entry.ready = True
+            self._inFlight -= 1
+            self._cond.notify_all()
+
+    def _deliver(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: (self._entries and self._entries[0].ready and not self._delivering) or self._stopping
+                )
+                if self._stopping:
+                    return
+                entry = self._entries.popleft()
+                self._delivering = True
+                self._cond.notify_all()
+            try:
+                entry.deliver(entry.message)
+            except Exception:
+                self.logger.exception("Exception raised delivering decoded message")
+            finally:
+                with self._cond:
+                    self._delivering = False
+                    self._cond.notify_all()
@@ -8,10 +8,32 @@
 # *****************************************************************************
 
 
-# Expose public API for this package
-from wiotp.sdk.device.client import DeviceClient
-from wiotp.sdk.device.command import Command
-from wiotp.sdk.device.config import DeviceClientConfig, parseConfigFile, parseEnvVars
-from wiotp.sdk.device.deviceFirmware import DeviceFirmware
-from wiotp.sdk.device.deviceInfo import DeviceInfo
-from wiotp.sdk.device.managedClient import ManagedDeviceClient
+import importlib
+
+# Expose public API for this package.  Each class is imported from its module when it is first used, so that
+# importing the package doesn't load the asyncio, device management or configuration file support until needed
+_EXPORTS = {
+    "DeviceClient": "wiotp.sdk.device.client",
+    "AsyncDeviceClient": "wiotp.sdk.device.asyncClient",
+    "Command": "wiotp.sdk.device.command",
+    "DeviceClientConfig": "wiotp.sdk.device.config",
+    "parseConfigFile": "wiotp.sdk.device.config",
+    "parseEnvVars": "wiotp.sdk.device.config",
+    "DeviceFirmware": "wiotp.sdk.device.deviceFirmware",
+    "DeviceInfo": "wiotp.sdk.device.deviceInfo",
+    "ManagedDeviceClient": "wiotp.sdk.device.managedClient",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
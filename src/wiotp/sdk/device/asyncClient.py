@@ -0,0 +1,31 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+from wiotp.sdk.asyncClient import AsyncClientMixin
+from wiotp.sdk.device.client import DeviceClient
+
+
+class AsyncDeviceClient(AsyncClientMixin, DeviceClient):
+    """
+    asyncio-native variant of #wiotp.sdk.device.DeviceClient, see #wiotp.sdk.asyncClient.AsyncClientMixin
+
+    ```python
+    client = wiotp.sdk.device.AsyncDeviceClient(config)
+    await client.connect()
+    await client.publishEvent("status", "json", {"cpu": 60}, qos=1)
+    async for command in client.commands():
+        print(command.commandId)
+    ```
+    """
+
+    def commands(self):
+        """
+        Async iterator over commands sent to the device, replaces any `commandCallback`
+        """
+        return self._iterate("commandCallback")
@@ -11,6 +11,7 @@ from datetime import datetime
 import json
 import logging
 import threading
+import time
 import paho.mqtt.client as paho
 import pytz
 from wiotp.sdk import (
@@ -19,9 +20,13 @@ from wiotp.sdk import (
     ConnectionException,
     MissingMessageEncoderException,
     InvalidEventException,
+    PublishBatch,
+    PublishFuture,
 )
 from wiotp.sdk.device.command import Command
 from wiotp.sdk.device.config import DeviceClientConfig
+from wiotp.sdk.messages import _payloadEncoder, _requiresTimestamp
+from wiotp.sdk.spool import OutboundSpool
 
 
 class DeviceClient(AbstractClient):
@@ -33,6 +38,10 @@ class DeviceClient(AbstractClient):
     options (dict): Configuration options for the client
     logHandlers (list<logging.Handler>): Log handlers to configure.  Defaults to `None`,
         which will result in a default log handler being created.
+
+    # Attributes
+    spool (wiotp.sdk.spool.OutboundSpool): Holds events published while the client is unable to
+        deliver them, `None` unless `options.spool.enabled` is set
     """
 
     _COMMAND_TOPIC = "iot-2/cmd/+/fmt/+"
@@ -55,10 +64,18 @@ class DeviceClient(AbstractClient):
             caFile=self._config.caFile,
             logLevel=self._config.logLevel,
             logHandlers=logHandlers,
+            maxInflight=self._config.maxInflight,
+            maxQueued=self._config.maxQueued,
+            backpressure=self._config.backpressure,
+            backpressureTimeout=self._config.backpressureTimeout,
+            reconnectMinDelay=self._config.reconnectMinDelay,
+            reconnectMaxDelay=self._config.reconnectMaxDelay,
+            reconnectJitter=self._config.reconnectJitter,
+            reconnectMaxAttempts=self._config.reconnectMaxAttempts,
         )
 
         # Add handler for commands
-        self.client.message_callback_add("iot-2/cmd/+/fmt/+", self._onCommand)
+        self._addMessageCallback("iot-2/cmd/+/fmt/+", self._onCommand)
 
         # Initialize user supplied callback
         self.commandCallback = None
@@ -66,6 +83,31 @@ class DeviceClient(AbstractClient):
         # Register startup subscription list
         self._subscriptions[self._COMMAND_TOPIC] = 1
 
+        self._initSpool()
+
+    def _initSpool(self):
+        """
+        Create the outbound spool if it has been enabled in the client configuration
+        """
+        self.spool = None
+        self._drainThread = None
+        if self._config.spoolEnabled:
+            self.spool = OutboundSpool(self._config.spoolMemoryLimit, self._config.spoolPath, self.logger)
+            self.metrics.register(
+                "spooled",
+                "Events held in the outbound spool",
+                lambda: len(self.spool) if self.spool is not None else None,
+            )
+
+    def disconnect(self):
+        """
+        Disconnect the client from IBM Watson IoT Platform.  If a spool journal is configured any events
+        still awaiting delivery are written to it, so they will be sent by the next client to use the journal
+        """
+        AbstractClient.disconnect(self)
+        if self.spool is not None:
+            self.spool.persist()
+
     def publishEvent(self, eventId, msgFormat, data, qos=0, onPublish=None):
         """
         Publish an event to Watson IoT Platform.
@@ -84,10 +126,174 @@ class DeviceClient(AbstractClient):
 
         - qos 0: the client has asynchronously begun to send the event
         - qos 1 and 2: the client has confirmation of delivery from the platform
+
+        # Returns
+        PublishFuture: A handle tracking delivery of the event, or `False` if the event could not be sent
         """
         topic = "iot-2/evt/{eventId}/fmt/{msgFormat}".format(eventId=eventId, msgFormat=msgFormat)
         return self._publishEvent(topic, eventId, msgFormat, data, qos, onPublish)
 
+    def publishEvents(self, events, qos=0, onPublish=None):
+        """
+        Publish a batch of events to Watson IoT Platform in a single call.  This is considerably
+        cheaper than repeated calls to #publishEvent() when sending events at a high rate.
+
+        # Parameters
+        events (iterable): Iterable of `(eventId, msgFormat, data)` tuples
+        qos (int): MQTT quality of service level to use for every event in the batch (`0`, `1`, or `2`)
+        onPublish(function): A function that will be called when receipt of every
+           event in the batch is confirmed.
+
+        # Returns
+        PublishBatch: A handle tracking delivery of the whole batch, or `False` if the client is disconnected
+        """
+        return self._publishEvents(self._eventTopics(events), qos, onPublish)
+
+    def publishReadings(self, eventId, readings, qos=0, onPublish=None, msgFormat="batch"):
+        """
+        Publish many readings as a single event, rather than one event per reading, saving the MQTT and
+        JSON overhead of each.  Application clients deliver each reading to `deviceEventCallback` as a
+        separate event, or the whole batch to `deviceEventBatchCallback` if one is set.
+
+        ```python
+        client.publishReadings("vibration", [(sampledAt, {"x": 0.12, "y": -0.03}) for sampledAt in ...])
+        ```
+
+        # Parameters
+        eventId (string): Name of the event
+        readings (iterable): Iterable of `(timestamp, data)` tuples, where `timestamp` is a `datetime` or a
+            number of seconds since the epoch, and `data` is a dictionary
+        qos (int): MQTT quality of service level to use (`0`, `1`, or `2`)
+        onPublish(function): A function that will be called when receipt
+           of the publication is confirmed.
+        msgFormat (string): Format to send the readings in, `batch` or a compressed variant of it such as
+            `batch-deflate`.  Defaults to `batch`
+
+        # Returns
+        PublishFuture: A handle tracking delivery of the event, or `False` if the event could not be sent
+        """
+        return self.publishEvent(eventId, msgFormat, readings, qos, onPublish)
+
+    def publisher(self, eventId, msgFormat, qos=0):
+        """
+        Create a prepared publisher for an event.  The topic and codec are resolved once, when the publisher
+        is created, making this the cheapest way to send the same event repeatedly.
+
+        ```python
+        publishStatus = client.publisher("status", "json", qos=1)
+        for reading in readings:
+            publishStatus(reading)
+        ```
+
+        # Parameters
+        eventId (string): Name of the event
+        msgFormat (string): Format of the data for the event
+        qos (int): MQTT quality of service level to use (`0`, `1`, or `2`)
+
+        # Returns
+        Publisher: Call `publish(data, onPublish=None)` on the publisher to send each event
+        """
+        topic = "iot-2/evt/{eventId}/fmt/{msgFormat}".format(eventId=eventId, msgFormat=msgFormat)
+        return self._publisher(topic, eventId, msgFormat, qos)
+
+    def _eventTopics(self, events):
+        """
+        Resolve the topic for each `(eventId, msgFormat, data)` tuple in a batch, building each
+        distinct topic only once
+        """
+        topics = {}
+        for eventId, msgFormat, data in events:
+            topic = topics.get((eventId, msgFormat))
+            if topic is None:
+                topic = "iot-2/evt/{eventId}/fmt/{msgFormat}".format(eventId=eventId, msgFormat=msgFormat)
+                topics[(eventId, msgFormat)] = topic
+            yield (topic, eventId, msgFormat, data)
+
+    def _spooling(self):
+        """
+        Events must go via the spool while the client is disconnected, and for as long as earlier events are
+        still waiting in the spool so that the order in which they were published is preserved
+        """
+        return self.spool is not None and not (self.connectEvent.is_set() and self.spool.isEmpty())
+
+    def _publishPayload(self, topic, event, payload, qos=0, onPublish=None, span=None):
+        if not self._spooling():
+            return AbstractClient._publishPayload(self, topic, event, payload, qos, onPublish, span)
+
+        if span is not None:
+            span.addEvent("spooled")
+        future = PublishFuture(onPublish, span=span)
+        self.spool.append(topic, payload, qos, future._confirm)
+        self.logger.debug("Spooled event %s (%s awaiting delivery)" % (event, len(self.spool)))
+        return future
+
+    def _publishEvents(self, events, qos=0, onPublish=None):
+        if not self._spooling():
+            return AbstractClient._publishEvents(self, events, qos, onPublish)
+
+        batch = PublishBatch(onPublish)
+        codecs = {}
+        timestamp = None
+        sent = 0
+        for topic, event, msgFormat, data in events:
+            codec = codecs.get(msgFormat)
+            if codec is None:
+                codec = self.getMessageCodec(msgFormat)
+                if codec is None:
+                    raise MissingMessageEncoderException(msgFormat)
+                codecs[msgFormat] = codec
+
+            if timestamp is None and _requiresTimestamp(codec):
+                timestamp = datetime.now(pytz.utc)
+            self.spool.append(topic, _payloadEncoder(codec)(data, timestamp), qos, batch._ack)
+            sent += 1
+
+        self.logger.debug("Spooled batch of %s events (%s awaiting delivery)" % (sent, len(self.spool)))
+        batch._seal(sent)
+        return batch
+
+    def _onConnect(self, mqttc, userdata, flags, rc):
+        AbstractClient._onConnect(self, mqttc, userdata, flags, rc)
+        if rc == 0 and self.spool is not None and (self._drainThread is None or not self._drainThread.is_alive()):
+            self._drainThread = threading.Thread(target=self._drainSpool, name="wiotp-spool-drain")
+            self._drainThread.daemon = True
+            self._drainThread.start()
+
+    def _drainSpool(self):
+        """
+        Deliver spooled events in order while the client remains connected, no faster than
+        `options.spool.drainRate` events per second.
+
+        Events are sent one at a time with at least qos 1 and are only removed from the spool once the
+        platform has confirmed receipt, so an event interrupted by a disconnect is sent again after the
+        client reconnects.
+        """
+        interval = 1.0 / self._config.spoolDrainRate
+        while self.connectEvent.is_set():
+            entry = self.spool.peek(timeout=1)
+            if entry is None:
+                continue
+            (topic, payload, qos, onPublish) = entry
+
+            started = time.time()
+            future = self._publish(topic, payload, max(qos, 1))
+            if not future:
+                self.logger.warning("Unable to deliver spooled event to %s" % (topic))
+                time.sleep(interval)
+                continue
+
+            while not future.wait(timeout=1):
+                if not self.connectEvent.is_set():
+                    return
+
+            self.spool.commit()
+            if onPublish is not None:
+                onPublish()
+
+            delay = interval - (time.time() - started)
+            if delay > 0:
+                time.sleep(delay)
+
     def _onCommand(self, client, userdata, pahoMessage):
         """
         Internal callback for device command messages, parses source device from topic string and
@@ -96,8 +302,8 @@ class DeviceClient(AbstractClient):
         try:
             command = Command(pahoMessage, self._messageCodecs)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
         else:
             self.logger.debug("Received command '%s'" % (command.commandId))
             if self.commandCallback:
-                self.commandCallback(command)
+                self._invokeCallback(self.commandCallback, command)
@@ -7,9 +7,9 @@
 # http://www.eclipse.org/legal/epl-v10.html
 # *****************************************************************************
 
-import re
 from datetime import datetime
 from wiotp.sdk import InvalidEventException, MissingMessageEncoderException, MissingMessageDecoderException
+from wiotp.sdk import topics
 
 
 class Command:
@@ -29,16 +29,14 @@ class Command:
 
     # Raises
     InvalidEventException: If the command was recieved on a topic that does 
-        not match the regular expression `iot-2/cmd/(.+)/fmt/(.+)`
+        not match `iot-2/cmd/<commandId>/fmt/<format>`
     """
 
-    _TOPIC_REGEX = re.compile("iot-2/cmd/(.+)/fmt/(.+)")
-
     def __init__(self, pahoMessage, messageEncoderModules):
-        result = Command._TOPIC_REGEX.match(pahoMessage.topic)
-        if result:
-            self.commandId = result.group(1)
-            self.format = result.group(2)
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.COMMAND:
+            self.commandId = topic.name
+            self.format = topic.format
 
             if self.format in messageEncoderModules:
                 message = messageEncoderModules[self.format].decode(pahoMessage)
@@ -9,7 +9,6 @@
 
 from collections import defaultdict
 import os
-import yaml
 import logging
 
 from wiotp.sdk import ConfigurationException
@@ -42,6 +41,70 @@ class DeviceClientConfig(defaultdict):
                 kwargs["options"]["mqtt"]["cleanStart"], bool
             ):
                 raise ConfigurationException("Optional setting options.mqtt.cleanStart must be a boolean if provided")
+            # Validate publish window
+            for setting in ["maxInflight", "maxQueued"]:
+                if setting in kwargs["options"]["mqtt"] and kwargs["options"]["mqtt"][setting] is not None:
+                    value = kwargs["options"]["mqtt"][setting]
+                    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                        raise ConfigurationException(
+                            "Optional setting options.mqtt.%s must be a non-negative number if provided" % setting
+                        )
+            if "backpressure" in kwargs["options"]["mqtt"] and kwargs["options"]["mqtt"]["backpressure"] not in [
+                None,
+                "block",
+                "timeout",
+                "reject",
+            ]:
+                raise ConfigurationException(
+                    "Optional setting options.mqtt.backpressure must be one of block, timeout, reject if provided"
+                )
+            backpressureTimeout = kwargs["options"]["mqtt"].get("backpressureTimeout")
+            if backpressureTimeout is not None and (
+                not isinstance(backpressureTimeout, (int, float))
+                or isinstance(backpressureTimeout, bool)
+                or backpressureTimeout <= 0
+            ):
+                raise ConfigurationException(
+                    "Optional setting options.mqtt.backpressureTimeout must be a positive number if provided"
+                )
+            # Validate reconnect policy
+            reconnect = kwargs["options"]["mqtt"].get("reconnect")
+            if reconnect is not None:
+                for setting in ["minDelay", "maxDelay", "jitter", "maxAttempts"]:
+                    if setting in reconnect and reconnect[setting] is not None:
+                        value = reconnect[setting]
+                        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                            raise ConfigurationException(
+                                "Optional setting options.mqtt.reconnect.%s must be a non-negative number if provided"
+                                % setting
+                            )
+                if reconnect.get("jitter") is not None and reconnect["jitter"] > 1:
+                    raise ConfigurationException(
+                        "Optional setting options.mqtt.reconnect.jitter must be between 0 and 1 if provided"
+                    )
+
+        if "options" in kwargs and "spool" in kwargs["options"] and kwargs["options"]["spool"] is not None:
+            spool = kwargs["options"]["spool"]
+            if "enabled" in spool and not isinstance(spool["enabled"], bool):
+                raise ConfigurationException("Optional setting options.spool.enabled must be a boolean if provided")
+            if "memoryLimit" in spool and spool["memoryLimit"] is not None:
+                if (
+                    not isinstance(spool["memoryLimit"], int)
+                    or isinstance(spool["memoryLimit"], bool)
+                    or spool["memoryLimit"] < 1
+                ):
+                    raise ConfigurationException(
+                        "Optional setting options.spool.memoryLimit must be a positive number if provided"
+                    )
+            if "drainRate" in spool and spool["drainRate"] is not None:
+                if (
+                    not isinstance(spool["drainRate"], (int, float))
+                    or isinstance(spool["drainRate"], bool)
+                    or spool["drainRate"] <= 0
+                ):
+                    raise ConfigurationException(
+                        "Optional setting options.spool.drainRate must be a positive number if provided"
+                    )
 
         # Set defaults for optional configuration
         if "options" not in kwargs:
@@ -74,6 +137,44 @@ class DeviceClientConfig(defaultdict):
         if "caFile" not in kwargs["options"]["mqtt"]:
             kwargs["options"]["mqtt"]["caFile"] = None
 
+        if "maxInflight" not in kwargs["options"]["mqtt"]:
+            kwargs["options"]["mqtt"]["maxInflight"] = None
+
+        if "maxQueued" not in kwargs["options"]["mqtt"] or kwargs["options"]["mqtt"]["maxQueued"] is None:
+            kwargs["options"]["mqtt"]["maxQueued"] = 0
+
+        if "backpressure" not in kwargs["options"]["mqtt"] or kwargs["options"]["mqtt"]["backpressure"] is None:
+            kwargs["options"]["mqtt"]["backpressure"] = "block"
+
+        if (
+            "backpressureTimeout" not in kwargs["options"]["mqtt"]
+            or kwargs["options"]["mqtt"]["backpressureTimeout"] is None
+        ):
+            kwargs["options"]["mqtt"]["backpressureTimeout"] = 10
+
+        if "reconnect" not in kwargs["options"]["mqtt"] or kwargs["options"]["mqtt"]["reconnect"] is None:
+            kwargs["options"]["mqtt"]["reconnect"] = {}
+
+        reconnect = kwargs["options"]["mqtt"]["reconnect"]
+        for setting, default in [("minDelay", 1), ("maxDelay", 120), ("jitter", 0.5), ("maxAttempts", 0)]:
+            if setting not in reconnect or reconnect[setting] is None:
+                reconnect[setting] = default
+
+        if "spool" not in kwargs["options"] or kwargs["options"]["spool"] is None:
+            kwargs["options"]["spool"] = {}
+
+        if "enabled" not in kwargs["options"]["spool"]:
+            kwargs["options"]["spool"]["enabled"] = False
+
+        if "memoryLimit" not in kwargs["options"]["spool"] or kwargs["options"]["spool"]["memoryLimit"] is None:
+            kwargs["options"]["spool"]["memoryLimit"] = 1000
+
+        if "path" not in kwargs["options"]["spool"]:
+            kwargs["options"]["spool"]["path"] = None
+
+        if "drainRate" not in kwargs["options"]["spool"] or kwargs["options"]["spool"]["drainRate"] is None:
+            kwargs["options"]["spool"]["drainRate"] = 50
+
         dict.__init__(self, **kwargs)
 
     @property
@@ -132,6 +233,54 @@ class DeviceClientConfig(defaultdict):
     def caFile(self):
         return self["options"]["mqtt"]["caFile"]
 
+    @property
+    def maxInflight(self):
+        return self["options"]["mqtt"]["maxInflight"]
+
+    @property
+    def maxQueued(self):
+        return self["options"]["mqtt"]["maxQueued"]
+
+    @property
+    def backpressure(self):
+        return self["options"]["mqtt"]["backpressure"]
+
+    @property
+    def backpressureTimeout(self):
+        return self["options"]["mqtt"]["backpressureTimeout"]
+
+    @property
+    def reconnectMinDelay(self):
+        return self["options"]["mqtt"]["reconnect"]["minDelay"]
+
+    @property
+    def reconnectMaxDelay(self):
+        return self["options"]["mqtt"]["reconnect"]["maxDelay"]
+
+    @property
+    def reconnectJitter(self):
+        return self["options"]["mqtt"]["reconnect"]["jitter"]
+
+    @property
+    def reconnectMaxAttempts(self):
+        return self["options"]["mqtt"]["reconnect"]["maxAttempts"]
+
+    @property
+    def spoolEnabled(self):
+        return self["options"]["spool"]["enabled"]
+
+    @property
+    def spoolMemoryLimit(self):
+        return self["options"]["spool"]["memoryLimit"]
+
+    @property
+    def spoolPath(self):
+        return self["options"]["spool"]["path"]
+
+    @property
+    def spoolDrainRate(self):
+        return self["options"]["spool"]["drainRate"]
+
 
 def parseEnvVars():
     """
@@ -150,6 +299,18 @@ def parseEnvVars():
     - `WIOTP_OPTIONS_MQTT_CLEANSTART` (optional)
     - `WIOTP_OPTIONS_MQTT_SESSIONEXPIRY` (optional)
     - `WIOTP_OPTIONS_MQTT_KEEPALIVE` (optional)
+    - `WIOTP_OPTIONS_MQTT_MAXINFLIGHT` (optional)
+    - `WIOTP_OPTIONS_MQTT_MAXQUEUED` (optional)
+    - `WIOTP_OPTIONS_MQTT_BACKPRESSURE` (optional)
+    - `WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_MINDELAY` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_MAXDELAY` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_JITTER` (optional)
+    - `WIOTP_OPTIONS_MQTT_RECONNECT_MAXATTEMPTS` (optional)
+    - `WIOTP_OPTIONS_SPOOL_ENABLED` (optional)
+    - `WIOTP_OPTIONS_SPOOL_MEMORYLIMIT` (optional)
+    - `WIOTP_OPTIONS_SPOOL_PATH` (optional)
+    - `WIOTP_OPTIONS_SPOOL_DRAINRATE` (optional)
     """
 
     # Identify
@@ -167,7 +328,19 @@ def parseEnvVars():
     cleanStart = os.getenv("WIOTP_OPTIONS_MQTT_CLEANSTART", "False")
     sessionExpiry = os.getenv("WIOTP_OPTIONS_MQTT_SESSIONEXPIRY", "3600")
     keepAlive = os.getenv("WIOTP_OPTIONS_MQTT_KEEPALIVE", "60")
+    maxInflight = os.getenv("WIOTP_OPTIONS_MQTT_MAXINFLIGHT", None)
+    maxQueued = os.getenv("WIOTP_OPTIONS_MQTT_MAXQUEUED", "0")
+    backpressure = os.getenv("WIOTP_OPTIONS_MQTT_BACKPRESSURE", "block")
+    backpressureTimeout = os.getenv("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT", "10")
+    reconnectMinDelay = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_MINDELAY", "1")
+    reconnectMaxDelay = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_MAXDELAY", "120")
+    reconnectJitter = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_JITTER", "0.5")
+    reconnectMaxAttempts = os.getenv("WIOTP_OPTIONS_MQTT_RECONNECT_MAXATTEMPTS", "0")
     caFile = os.getenv("WIOTP_OPTIONS_MQTT_CAFILE", None)
+    spoolEnabled = os.getenv("WIOTP_OPTIONS_SPOOL_ENABLED", "False")
+    spoolMemoryLimit = os.getenv("WIOTP_OPTIONS_SPOOL_MEMORYLIMIT", "1000")
+    spoolPath = os.getenv("WIOTP_OPTIONS_SPOOL_PATH", None)
+    spoolDrainRate = os.getenv("WIOTP_OPTIONS_SPOOL_DRAINRATE", "50")
 
     if orgId is None:
         raise ConfigurationException("Missing WIOTP_IDENTITY_ORGID environment variable")
@@ -193,6 +366,47 @@ def parseEnvVars():
     except ValueError as e:
         raise ConfigurationException("WIOTP_OPTIONS_MQTT_KEEPALIVE must be a number")
 
+    if maxInflight is not None:
+        try:
+            maxInflight = int(maxInflight)
+        except ValueError as e:
+            raise ConfigurationException("WIOTP_OPTIONS_MQTT_MAXINFLIGHT must be a number")
+
+    try:
+        maxQueued = int(maxQueued)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_MQTT_MAXQUEUED must be a number")
+
+    try:
+        backpressureTimeout = float(backpressureTimeout)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT must be a number")
+
+    try:
+        spoolMemoryLimit = int(spoolMemoryLimit)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_SPOOL_MEMORYLIMIT must be a number")
+
+    try:
+        spoolDrainRate = float(spoolDrainRate)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_SPOOL_DRAINRATE must be a number")
+
+    try:
+        reconnectMinDelay = float(reconnectMinDelay)
+        reconnectMaxDelay = float(reconnectMaxDelay)
+        reconnectJitter = float(reconnectJitter)
+    except ValueError as e:
+        raise ConfigurationException(
+            "WIOTP_OPTIONS_MQTT_RECONNECT_MINDELAY, WIOTP_OPTIONS_MQTT_RECONNECT_MAXDELAY and "
+            "WIOTP_OPTIONS_MQTT_RECONNECT_JITTER must be numbers"
+        )
+
+    try:
+        reconnectMaxAttempts = int(reconnectMaxAttempts)
+    except ValueError as e:
+        raise ConfigurationException("WIOTP_OPTIONS_MQTT_RECONNECT_MAXATTEMPTS must be a number")
+
     if logLevel not in ["error", "warning", "info", "debug"]:
         raise ConfigurationException("WIOTP_OPTIONS_LOGLEVEL must be one of error, warning, info, debug")
     else:
@@ -211,6 +425,22 @@ def parseEnvVars():
                 "cleanStart": cleanStart in ["True", "true", "1"],
                 "sessionExpiry": sessionExpiry,
                 "keepAlive": keepAlive,
+                "maxInflight": maxInflight,
+                "maxQueued": maxQueued,
+                "backpressure": backpressure,
+                "backpressureTimeout": backpressureTimeout,
+                "reconnect": {
+                    "minDelay": reconnectMinDelay,
+                    "maxDelay": reconnectMaxDelay,
+                    "jitter": reconnectJitter,
+                    "maxAttempts": reconnectMaxAttempts,
+                },
+            },
+            "spool": {
+                "enabled": spoolEnabled in ["True", "true", "1"],
+                "memoryLimit": spoolMemoryLimit,
+                "path": spoolPath,
+                "drainRate": spoolDrainRate,
             },
         },
         "auth": {"token": authToken}
@@ -241,10 +471,26 @@ def parseConfigFile(configFilePath):
         cleanStart: true
         sessionExpiry: 3600
         keepAlive: 60
+        maxInflight: 20
+        maxQueued: 1000
+        backpressure: block|timeout|reject
+        backpressureTimeout: 10
+        reconnect:
+          minDelay: 1
+          maxDelay: 120
+          jitter: 0.5
+          maxAttempts: 0
         caFile: /path/to/certificateAuthorityFile.pem
+      spool:
+        enabled: true
+        memoryLimit: 1000
+        path: /var/lib/mydevice/outbound.journal
+        drainRate: 50
 
     """
 
+    import yaml
+
     try:
         with open(configFilePath) as f:
             data = yaml.full_load(f)
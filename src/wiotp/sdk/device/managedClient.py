@@ -13,6 +13,7 @@ import logging
 import threading
 import pytz
 import uuid
+import paho.mqtt.client as paho
 
 from wiotp.sdk import ConnectionException, ConfigurationException
 from wiotp.sdk.device.client import DeviceClient
@@ -83,7 +84,7 @@ class ManagedDeviceClient(DeviceClient):
 
         # Add handler for supported device management commands
         for message, callback in messages_callbacks:
-            self.client.message_callback_add(message, callback)
+            self._addMessageCallback(message, callback)
 
         # Initialize user supplied callback
         self.client.on_subscribe = self._onSubscribe
@@ -155,18 +156,72 @@ class ManagedDeviceClient(DeviceClient):
                 message = {"d": {"field": field, "value": value}, "reqId": reqId}
 
                 resolvedEvent = threading.Event()
-                self.client.publish(ManagedDeviceClient.NOTIFY_TOPIC, payload=json.dumps(message), qos=1, retain=False)
                 with self._deviceMgmtRequestsPendingLock:
                     self._deviceMgmtRequestsPending[reqId] = {
                         "topic": ManagedDeviceClient.NOTIFY_TOPIC,
                         "message": message,
                         "event": resolvedEvent,
                     }
+                self._publishDeviceMgmtRequest(ManagedDeviceClient.NOTIFY_TOPIC, message)
 
                 return resolvedEvent
             else:
                 return threading.Event().set()
 
+    def _onConnect(self, mqttc, userdata, flags, rc):
+        restored = self.reconnectStats.disconnected
+        super(ManagedDeviceClient, self)._onConnect(mqttc, userdata, flags, rc)
+        if rc == 0 and restored:
+            self._replayDeviceMgmtRequests()
+
+    def _publishDeviceMgmtRequest(self, topic, message):
+        """
+        Publish a device management request that has been added to the pending requests.  The request is marked
+        as delivered once the service acknowledges it, until then Paho itself re-sends it after a reconnect.
+        """
+        reqId = message["reqId"]
+
+        def onDelivered():
+            with self._deviceMgmtRequestsPendingLock:
+                request = self._deviceMgmtRequestsPending.get(reqId)
+                if request is not None:
+                    request["delivered"] = True
+
+        self._publishTracker.begin()
+        try:
+            (result, mid) = self.client.publish(topic, payload=json.dumps(message), qos=1, retain=False)
+            if result in (paho.MQTT_ERR_SUCCESS, paho.MQTT_ERR_NO_CONN):
+                # Paho keeps the message until it is acknowledged, even if the client is disconnected
+                self._publishTracker.register((mid,), onDelivered)
+            else:
+                # Paho discarded the message, leave it to be replayed after the next reconnect
+                onDelivered()
+        finally:
+            self._publishTracker.end()
+
+    def _replayDeviceMgmtRequests(self):
+        """
+        Re-send device management requests that had been delivered but not received a response when the connection
+        was lost, reusing their original reqId so that the response resolves the event returned to the caller.
+        Requests that were never acknowledged are re-sent by Paho, and manage requests are dropped because
+        `manage()` sends a new one as soon as the subscriptions have been restored.
+        """
+        replay = []
+        with self._deviceMgmtRequestsPendingLock:
+            for reqId, request in list(self._deviceMgmtRequestsPending.items()):
+                if not request.get("delivered"):
+                    continue
+                if request["topic"] == ManagedDeviceClient.MANAGE_TOPIC:
+                    del self._deviceMgmtRequestsPending[reqId]
+                    continue
+                request["delivered"] = False
+                replay.append(request)
+
+        for request in replay:
+            self._publishDeviceMgmtRequest(request["topic"], request["message"])
+        if len(replay) > 0:
+            self.logger.info("Replayed %s pending device management requests" % len(replay))
+
     def _onSubscribe(self, mqttc, userdata, mid, granted_qos):
         super(ManagedDeviceClient, self)._onSubscribe(mqttc, userdata, mid, granted_qos)
         # Once IoTF acknowledges the subscriptions we are able to process commands and responses from device management server
@@ -205,13 +260,13 @@ class ManagedDeviceClient(DeviceClient):
                 message["d"]["supports"][bundleId] = supportDeviceMgmtExtActions
 
         resolvedEvent = threading.Event()
-        self.client.publish(ManagedDeviceClient.MANAGE_TOPIC, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": ManagedDeviceClient.MANAGE_TOPIC,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self._publishDeviceMgmtRequest(ManagedDeviceClient.MANAGE_TOPIC, message)
 
         # Register the future call back to Watson IoT Platform 2 minutes before the device lifetime expiry
         if lifetime != 0:
@@ -238,13 +293,13 @@ class ManagedDeviceClient(DeviceClient):
         message = {"reqId": reqId}
 
         resolvedEvent = threading.Event()
-        self.client.publish(ManagedDeviceClient.UNMANAGE_TOPIC, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": ManagedDeviceClient.UNMANAGE_TOPIC,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self._publishDeviceMgmtRequest(ManagedDeviceClient.UNMANAGE_TOPIC, message)
 
         return resolvedEvent
 
@@ -275,13 +330,13 @@ class ManagedDeviceClient(DeviceClient):
         message = {"d": self._location, "reqId": reqId}
 
         resolvedEvent = threading.Event()
-        self.client.publish(ManagedDeviceClient.UPDATE_LOCATION_TOPIC, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": ManagedDeviceClient.UPDATE_LOCATION_TOPIC,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self._publishDeviceMgmtRequest(ManagedDeviceClient.UPDATE_LOCATION_TOPIC, message)
 
         return resolvedEvent
 
@@ -299,13 +354,13 @@ class ManagedDeviceClient(DeviceClient):
         message = {"d": {"errorCode": errorCode}, "reqId": reqId}
 
         resolvedEvent = threading.Event()
-        self.client.publish(ManagedDeviceClient.ADD_ERROR_CODE_TOPIC, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": ManagedDeviceClient.ADD_ERROR_CODE_TOPIC,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self._publishDeviceMgmtRequest(ManagedDeviceClient.ADD_ERROR_CODE_TOPIC, message)
 
         return resolvedEvent
 
@@ -320,15 +375,13 @@ class ManagedDeviceClient(DeviceClient):
         message = {"reqId": reqId}
 
         resolvedEvent = threading.Event()
-        self.client.publish(
-            ManagedDeviceClient.CLEAR_ERROR_CODES_TOPIC, payload=json.dumps(message), qos=1, retain=False
-        )
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": ManagedDeviceClient.CLEAR_ERROR_CODES_TOPIC,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self._publishDeviceMgmtRequest(ManagedDeviceClient.CLEAR_ERROR_CODES_TOPIC, message)
 
         return resolvedEvent
 
@@ -342,13 +395,13 @@ class ManagedDeviceClient(DeviceClient):
         message = {"d": {"message": msg, "timestamp": timestamp, "data": data, "severity": sensitivity}, "reqId": reqId}
 
         resolvedEvent = threading.Event()
-        self.client.publish(ManagedDeviceClient.ADD_LOG_TOPIC, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": ManagedDeviceClient.ADD_LOG_TOPIC,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self._publishDeviceMgmtRequest(ManagedDeviceClient.ADD_LOG_TOPIC, message)
 
         return resolvedEvent
 
@@ -362,13 +415,13 @@ class ManagedDeviceClient(DeviceClient):
         message = {"reqId": reqId}
 
         resolvedEvent = threading.Event()
-        self.client.publish(ManagedDeviceClient.CLEAR_LOG_TOPIC, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": ManagedDeviceClient.CLEAR_LOG_TOPIC,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self._publishDeviceMgmtRequest(ManagedDeviceClient.CLEAR_LOG_TOPIC, message)
 
         return resolvedEvent
 
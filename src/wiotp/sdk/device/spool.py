@@ -0,0 +1,14 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+# OutboundSpool was originally added here, it moved to wiotp.sdk.spool when the application client's inbound queue
+# started using it as well.  This module is kept so that existing imports continue to work.
+from wiotp.sdk.spool import OutboundSpool
+
+__all__ = ["OutboundSpool"]
@@ -0,0 +1,225 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import collections
+import logging
+import threading
+import time
+
+from wiotp.sdk.exceptions import ConfigurationException
+
+
+def deviceKey(message):
+    """
+    The default partition key, the device (`typeId:deviceId`) or thing that a received message relates to.  Messages
+    that don't relate to a device, e.g. commands received by a device client, all share the key `None`
+    """
+    for attribute in ("device", "thing"):
+        key = getattr(message, attribute, None)
+        if key is not None:
+            return key
+    deviceId = getattr(message, "deviceId", None)
+    if deviceId is not None:
+        return "%s:%s" % (getattr(message, "typeId", None), deviceId)
+    return None
+
+
+class _Partition(object):
+    __slots__ = ("index", "queue", "cond", "thread", "processed", "failed")
+
+    def __init__(self, index):
+        self.index = index
+        # Each entry is (enqueued, function, args), the entry being run stays at the head of the queue until it returns
+        self.queue = collections.deque()
+        self.cond = threading.Condition(threading.Lock())
+        self.thread = None
+        self.processed = 0
+        self.failed = 0
+
+
+class KeyedDispatcher(object):
+    """
+    Runs message callbacks on a pool of worker threads rather than on Paho's network thread, so that a slow callback
+    does not delay acknowledgements and keepalives for the whole connection.  Messages are partitioned by key (by
+    default the device they relate to) and each partition is handled by a single worker, so the messages from each
+    device are handled in the order they were received while different devices are handled in parallel.
+
+    ```python
+    client.dispatcher = wiotp.sdk.KeyedDispatcher(workers=8, maxQueued=1000)
+    ```
+
+    When a dispatcher is set the client's callback execution time metric only covers decoding each message and
+    handing it over.  Exceptions raised by callbacks are logged and counted in `failed`.
+
+    # Parameters
+    workers (int): Number of worker threads (and partitions).  Defaults to `4`
+    maxQueued (int): Maximum number of messages waiting in each partition, the network thread blocks when a partition
+        is full so that the broker stops sending until the workers catch up.  Defaults to `0` (unbounded)
+    partitionKey (function): Returns the partition key of a received message.  Defaults to
+        #wiotp.sdk.dispatch.deviceKey
+    name (string): Prefix for the names of the worker threads.  Defaults to `wiotp-dispatch`
+
+    # Attributes
+    workers (int): Number of worker threads (and partitions)
+    maxQueued (int): Maximum number of messages waiting in each partition, `0` if unbounded
+    partitionKey (function): Returns the partition key of a received message
+    logger (logging.Logger): Logger used to report exceptions raised by callbacks
+    """
+
+    def __init__(self, workers=4, maxQueued=0, partitionKey=deviceKey, name="wiotp-dispatch"):
+        if workers < 1:
+            raise ConfigurationException("A dispatcher requires at least one worker: %s" % workers)
+        self.workers = workers
+        self.maxQueued = maxQueued
+        self.partitionKey = partitionKey
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._partitions = [_Partition(i) for i in range(workers)]
+        self._startLock = threading.Lock()
+        self._stopping = False
+
+    @property
+    def queued(self):
+        """
+        The number of messages waiting in (or being handled by) all partitions
+        """
+        return sum(len(partition.queue) for partition in self._partitions)
+
+    @property
+    def processed(self):
+        """
+        The number of messages that have been handled
+        """
+        return sum(partition.processed for partition in self._partitions)
+
+    @property
+    def failed(self):
+        """
+        The number of messages whose callback raised an exception
+        """
+        return sum(partition.failed for partition in self._partitions)
+
+    def depths(self):
+        """
+        The number of messages waiting in (or being handled by) each partition
+
+        # Returns
+        list<int>: The queue depth of each partition
+        """
+        return [len(partition.queue) for partition in self._partitions]
+
+    def lag(self):
+        """
+        How far each partition has fallen behind: the age of the oldest message it has not finished handling
+
+        # Returns
+        list<float>: Seconds of lag for each partition, `0` if the partition is idle
+        """
+        now = time.monotonic()
+        lags = []
+        for partition in self._partitions:
+            try:
+                lags.append(now - partition.queue[0][0])
+            except IndexError:
+                lags.append(0.0)
+        return lags
+
+    def dispatch(self, message, function, *args):
+        """
+        Run `function(*args)` on the worker for the message's partition
+        """
+        return self.submit(self.partitionKey(message), function, *args)
+
+    def submit(self, key, function, *args):
+        """
+        Run `function(*args)` on the worker for partition `key`, after every function previously submitted with a
+        key in the same partition.  Blocks if the partition is full.
+
+        # Parameters
+        key (object): Hashable partition key, e.g. `typeId:deviceId`
+        function (function): The function to run
+
+        # Returns
+        bool: `True` if the function was queued, `False` if the dispatcher has been stopped
+        """
+        if self._stopping:
+            self.logger.warning("Discarding message submitted to a stopped dispatcher")
+            return False
+        partition = self._partitions[hash(key) % self.workers]
+        if partition.thread is None:
+            self._start(partition)
+        with partition.cond:
+            if self.maxQueued:
+                partition.cond.wait_for(lambda: len(partition.queue) < self.maxQueued or self._stopping)
+            partition.queue.append((time.monotonic(), function, args))
+            if len(partition.queue) == 1:
+                partition.cond.notify_all()
+        return True
+
+    def drain(self, timeout=None):
+        """
+        Block until every queued message has been handled
+
+        # Parameters
+        timeout (float): Maximum time to wait in seconds, or `None` to wait indefinitely
+
+        # Returns
+        bool: `True` if every partition is empty, `False` if the wait timed out
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for partition in self._partitions:
+            with partition.cond:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                if not partition.cond.wait_for(lambda: not partition.queue, remaining):
+                    return False
+        return True
+
+    def stop(self, timeout=None):
+        """
+        Stop accepting messages and shut down the workers once they have handled the messages already queued
+
+        # Parameters
+        timeout (float): Maximum time to wait for each worker in seconds, or `None` to wait indefinitely
+        """
+        self._stopping = True
+        for partition in self._partitions:
+            with partition.cond:
+                partition.cond.notify_all()
+        for partition in self._partitions:
+            if partition.thread is not None and partition.thread is not threading.current_thread():
+                partition.thread.join(timeout)
+
+    def _start(self, partition):
+        with self._startLock:
+            if partition.thread is None:
+                thread = threading.Thread(
+                    target=self._run, args=(partition,), name="%s-%d" % (self.name, partition.index), daemon=True
+                )
+                thread.start()
+                partition.thread = thread
+
+    def _run(self, partition):
+        queue = partition.queue
+        cond = partition.cond
+        while True:
+            with cond:
+                while not queue:
+                    if self._stopping:
+                        return
+                    cond.wait()
+                enqueued, function, args = queue[0]
+            try:
+                function(*args)
+            except Exception:
+                partition.failed += 1
+                self.logger.exception("Exception raised by message callback in %s" % threading.current_thread().name)
+            with cond:
+                queue.popleft()
+                partition.processed += 1
+                cond.notify_all()
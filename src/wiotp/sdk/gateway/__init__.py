@@ -8,11 +8,33 @@
 # *****************************************************************************
 
 
-# Expose public API for this package
-from wiotp.sdk.gateway.client import GatewayClient
-from wiotp.sdk.device.config import parseConfigFile, parseEnvVars
-from wiotp.sdk.gateway.config import GatewayClientConfig
-from wiotp.sdk.device.deviceFirmware import DeviceFirmware
-from wiotp.sdk.device.deviceInfo import DeviceInfo
-from wiotp.sdk.gateway.managedClient import ManagedGatewayClient
-from wiotp.sdk.gateway.messages import Command, Notification
+import importlib
+
+# Expose public API for this package.  Each class is imported from its module when it is first used, so that
+# importing the package doesn't load the asyncio, device management or configuration file support until needed
+_EXPORTS = {
+    "GatewayClient": "wiotp.sdk.gateway.client",
+    "AsyncGatewayClient": "wiotp.sdk.gateway.asyncClient",
+    "parseConfigFile": "wiotp.sdk.device.config",
+    "parseEnvVars": "wiotp.sdk.device.config",
+    "GatewayClientConfig": "wiotp.sdk.gateway.config",
+    "DeviceFirmware": "wiotp.sdk.device.deviceFirmware",
+    "DeviceInfo": "wiotp.sdk.device.deviceInfo",
+    "ManagedGatewayClient": "wiotp.sdk.gateway.managedClient",
+    "Command": "wiotp.sdk.gateway.messages",
+    "Notification": "wiotp.sdk.gateway.messages",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
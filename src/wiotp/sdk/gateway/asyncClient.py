@@ -0,0 +1,35 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+from wiotp.sdk.asyncClient import AsyncClientMixin
+from wiotp.sdk.gateway.client import GatewayClient
+
+
+class AsyncGatewayClient(AsyncClientMixin, GatewayClient):
+    """
+    asyncio-native variant of #wiotp.sdk.gateway.GatewayClient, see #wiotp.sdk.asyncClient.AsyncClientMixin
+    """
+
+    def commands(self):
+        """
+        Async iterator over commands sent to the gateway itself, replaces any `commandCallback`
+        """
+        return self._iterate("commandCallback")
+
+    def deviceCommands(self):
+        """
+        Async iterator over commands sent to devices connected via the gateway, replaces any `deviceCommandCallback`
+        """
+        return self._iterate("deviceCommandCallback")
+
+    def notifications(self):
+        """
+        Async iterator over gateway notifications, replaces any `notificationCallback`
+        """
+        return self._iterate("notificationCallback")
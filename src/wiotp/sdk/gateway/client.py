@@ -13,9 +13,8 @@ from wiotp.sdk import (
     InvalidEventException
 )
 from wiotp.sdk.device import DeviceClient
-from wiotp.sdk.device.command import Command
 from wiotp.sdk.gateway.config import GatewayClientConfig
-from wiotp.sdk.gateway.messages import Notification
+from wiotp.sdk.gateway.messages import Command, Notification
 
 
 class GatewayClient(DeviceClient):
@@ -40,6 +39,14 @@ class GatewayClient(DeviceClient):
             caFile=self._config.caFile,
             logLevel=self._config.logLevel,
             logHandlers=logHandlers,
+            maxInflight=self._config.maxInflight,
+            maxQueued=self._config.maxQueued,
+            backpressure=self._config.backpressure,
+            backpressureTimeout=self._config.backpressureTimeout,
+            reconnectMinDelay=self._config.reconnectMinDelay,
+            reconnectMaxDelay=self._config.reconnectMaxDelay,
+            reconnectJitter=self._config.reconnectJitter,
+            reconnectMaxAttempts=self._config.reconnectMaxAttempts,
         )
 
         self.COMMAND_TOPIC = "iot-2/type/" + self._config.typeId + "/id/" + self._config.deviceId + "/cmd/+/fmt/+"
@@ -48,9 +55,9 @@ class GatewayClient(DeviceClient):
         deviceCommandTopic = "iot-2/type/+/id/+/cmd/+/fmt/+"
         messageNotificationTopic = "iot-2/type/" + self._config.typeId + "/id/" + self._config.deviceId + "/notify"
 
-        self.client.message_callback_add(gatewayCommandTopic, self._onCommand)
-        self.client.message_callback_add(deviceCommandTopic, self._onDeviceCommand)
-        self.client.message_callback_add(messageNotificationTopic, self._onMessageNotification)
+        self._addMessageCallback(gatewayCommandTopic, self._onCommand)
+        self._addMessageCallback(deviceCommandTopic, self._onDeviceCommand)
+        self._addMessageCallback(messageNotificationTopic, self._onMessageNotification)
 
         # Initialize user supplied callback
         self.commandCallback = None
@@ -59,6 +66,8 @@ class GatewayClient(DeviceClient):
         self.client.on_connect = self._onConnect
         self.client.on_disconnect = self._onDisconnect
 
+        self._initSpool()
+
     def publishDeviceEvent(self, typeId, deviceId, eventId, msgFormat, data, qos=0, onPublish=None):
         topic = "iot-2/type/" + typeId + "/id/" + deviceId + "/evt/" + eventId + "/fmt/" + msgFormat
         return self._publishEvent(topic, eventId, msgFormat, data, qos, onPublish)
@@ -76,6 +85,59 @@ class GatewayClient(DeviceClient):
         )
         return self._publishEvent(topic, eventId, msgFormat, data, qos, onPublish)
 
+    def publishDeviceEvents(self, events, qos=0, onPublish=None):
+        """
+        Publish a batch of events on behalf of devices connected via this gateway in a single call.
+
+        # Parameters
+        events (iterable): Iterable of `(typeId, deviceId, eventId, msgFormat, data)` tuples
+        qos (int): MQTT quality of service level to use for every event in the batch (`0`, `1`, or `2`)
+        onPublish(function): A function that will be called when receipt of every
+           event in the batch is confirmed.
+
+        # Returns
+        PublishBatch: A handle tracking delivery of the whole batch, or `False` if the client is disconnected
+        """
+        return self._publishEvents(self._deviceEventTopics(events), qos, onPublish)
+
+    def publishEvents(self, events, qos=0, onPublish=None):
+        typeId = self._config.typeId
+        deviceId = self._config.deviceId
+        return self.publishDeviceEvents(
+            ((typeId, deviceId, eventId, msgFormat, data) for eventId, msgFormat, data in events), qos, onPublish
+        )
+
+    def devicePublisher(self, typeId, deviceId, eventId, msgFormat, qos=0):
+        """
+        Create a prepared publisher for an event sent on behalf of a device connected via this gateway.  The
+        topic and codec are resolved once, making this the cheapest way to send the same event repeatedly.
+
+        # Parameters
+        typeId (string): The type of the device the event is sent on behalf of
+        deviceId (string): The id of the device the event is sent on behalf of
+        eventId (string): Name of the event
+        msgFormat (string): Format of the data for the event
+        qos (int): MQTT quality of service level to use (`0`, `1`, or `2`)
+
+        # Returns
+        Publisher: Call `publish(data, onPublish=None)` on the publisher to send each event
+        """
+        topic = "iot-2/type/" + typeId + "/id/" + deviceId + "/evt/" + eventId + "/fmt/" + msgFormat
+        return self._publisher(topic, eventId, msgFormat, qos)
+
+    def publisher(self, eventId, msgFormat, qos=0):
+        return self.devicePublisher(self._config.typeId, self._config.deviceId, eventId, msgFormat, qos)
+
+    def _deviceEventTopics(self, events):
+        topics = {}
+        for typeId, deviceId, eventId, msgFormat, data in events:
+            key = (typeId, deviceId, eventId, msgFormat)
+            topic = topics.get(key)
+            if topic is None:
+                topic = "iot-2/type/" + typeId + "/id/" + deviceId + "/evt/" + eventId + "/fmt/" + msgFormat
+                topics[key] = topic
+            yield (topic, eventId, msgFormat, data)
+
     def subscribeToDeviceCommands(self, typeId, deviceId, commandId="+", msgFormat="json", qos=1):
         topic = "iot-2/type/" + typeId + "/id/" + deviceId + "/cmd/" + commandId + "/fmt/" + msgFormat
         return self._subscribe(topic, qos=1)
@@ -101,11 +163,11 @@ class GatewayClient(DeviceClient):
         try:
             command = Command(pahoMessage, self._messageCodecs)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
         else:
             self.logger.debug("Received device command '%s'" % (command.commandId))
             if self.commandCallback:
-                self.commandCallback(command)
+                self._invokeCallback(self.commandCallback, command)
 
     def _onDeviceCommand(self, client, userdata, pahoMessage):
         """
@@ -115,11 +177,11 @@ class GatewayClient(DeviceClient):
         try:
             command = Command(pahoMessage, self._messageCodecs)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
         else:
             self.logger.debug("Received gateway command '%s'" % (command.commandId))
             if self.deviceCommandCallback:
-                self.deviceCommandCallback(command)
+                self._invokeCallback(self.deviceCommandCallback, command)
 
     def _onMessageNotification(self, client, userdata, pahoMessage):
         """
@@ -129,8 +191,8 @@ class GatewayClient(DeviceClient):
         try:
             note = Notification(pahoMessage, self._messageCodecs)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
         else:
             self.logger.debug("Received Notification")
             if self.notificationCallback:
-                self.notificationCallback(note)
+                self._invokeCallback(self.notificationCallback, note)
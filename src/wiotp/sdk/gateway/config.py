@@ -9,7 +9,6 @@
 
 from collections import defaultdict
 import os
-import yaml
 
 from wiotp.sdk import ConfigurationException
 from wiotp.sdk.device.config import DeviceClientConfig
@@ -66,9 +66,9 @@ class ManagedGatewayClient(ManagedDeviceClient):
         deviceCommandTopic = "iot-2/type/+/id/+/cmd/+/fmt/+"
         messageNotificationTopic = "iot-2/type/" + self._config.typeId + "/id/" + self._config.deviceId + "/notify"
 
-        self.client.message_callback_add(gatewayCommandTopic, self._onCommand)
-        self.client.message_callback_add(deviceCommandTopic, self._onDeviceCommand)
-        self.client.message_callback_add(messageNotificationTopic, self._onMessageNotification)
+        self._addMessageCallback(gatewayCommandTopic, self._onCommand)
+        self._addMessageCallback(deviceCommandTopic, self._onDeviceCommand)
+        self._addMessageCallback(messageNotificationTopic, self._onMessageNotification)
 
         # Initialize user supplied callback
         self.deviceCommandCallback = None
@@ -80,7 +80,7 @@ class ManagedGatewayClient(ManagedDeviceClient):
         self.readyForDeviceMgmt = threading.Event()
 
         # Add handler for supported device management commands
-        self.client.message_callback_add("iotdm-1/#", self.__onDeviceMgmtResponse)
+        self._addMessageCallback("iotdm-1/#", self.__onDeviceMgmtResponse)
 
         # List of DM requests that have not received a response yet
         self._deviceMgmtRequestsPendingLock = threading.Lock()
@@ -147,11 +147,11 @@ class ManagedGatewayClient(ManagedDeviceClient):
         try:
             command = Command(pahoMessage, self._messageCodecs)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
         else:
             self.logger.debug("Received gateway command '%s'" % (command.command))
             if self.deviceCommandCallback:
-                self.deviceCommandCallback(command)
+                self._invokeCallback(self.deviceCommandCallback, command)
 
     def _onMessageNotification(self, client, userdata, pahoMessage):
         """
@@ -161,11 +161,11 @@ class ManagedGatewayClient(ManagedDeviceClient):
         try:
             note = Notification(pahoMessage, self._messageCodecs)
         except InvalidEventException as e:
-            self.logger.critical(str(e))
+            self._onInvalidMessage(e)
         else:
             self.logger.debug("Received Notification")
             if self.notificationCallback:
-                self.notificationCallback(note)
+                self._invokeCallback(self.notificationCallback, note)
 
     def setProperty(self, name, value):
         if name not in [
@@ -198,13 +198,13 @@ class ManagedGatewayClient(ManagedDeviceClient):
                 notify_topic = ManagedGatewayClient.NOTIFY_TOPIC_TEMPLATE % (self._config.typeId, self._config.deviceId)
                 resolvedEvent = threading.Event()
 
-                self.client.publish(notify_topic, payload=json.dumps(message), qos=1, retain=False)
                 with self._deviceMgmtRequestsPendingLock:
                     self._deviceMgmtRequestsPending[reqId] = {
                         "topic": notify_topic,
                         "message": message,
                         "event": resolvedEvent,
                     }
+                self.client.publish(notify_topic, payload=json.dumps(message), qos=1, retain=False)
 
                 return resolvedEvent
             else:
@@ -235,9 +235,9 @@ class ManagedGatewayClient(ManagedDeviceClient):
         manage_topic = ManagedGatewayClient.MANAGE_TOPIC_TEMPLATE % (self._config.typeId, self._config.deviceId)
         resolvedEvent = threading.Event()
 
-        self.client.publish(manage_topic, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {"topic": manage_topic, "message": message, "event": resolvedEvent}
+        self.client.publish(manage_topic, payload=json.dumps(message), qos=1, retain=False)
 
         # Register the future call back to Watson IoT Platform 2 minutes before the device lifetime expiry
         if lifetime != 0:
@@ -258,13 +258,13 @@ class ManagedGatewayClient(ManagedDeviceClient):
         unmanage_topic = ManagedGatewayClient.UNMANAGE_TOPIC_TEMPLATE % (self._config.typeId, self._config.deviceId)
         resolvedEvent = threading.Event()
 
-        self.client.publish(unmanage_topic, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": unmanage_topic,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self.client.publish(unmanage_topic, payload=json.dumps(message), qos=1, retain=False)
 
         return resolvedEvent
 
@@ -298,13 +298,13 @@ class ManagedGatewayClient(ManagedDeviceClient):
         )
         resolvedEvent = threading.Event()
 
-        self.client.publish(update_location_topic, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": update_location_topic,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self.client.publish(update_location_topic, payload=json.dumps(message), qos=1, retain=False)
 
         return resolvedEvent
 
@@ -327,13 +327,13 @@ class ManagedGatewayClient(ManagedDeviceClient):
         )
         resolvedEvent = threading.Event()
 
-        self.client.publish(add_error_code_topic, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": add_error_code_topic,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self.client.publish(add_error_code_topic, payload=json.dumps(message), qos=1, retain=False)
 
         return resolvedEvent
 
@@ -353,13 +353,13 @@ class ManagedGatewayClient(ManagedDeviceClient):
         )
         resolvedEvent = threading.Event()
 
-        self.client.publish(clear_error_codes_topic, payload=json.dumps(message), qos=1, retain=False)
         with self._deviceMgmtRequestsPendingLock:
             self._deviceMgmtRequestsPending[reqId] = {
                 "topic": clear_error_codes_topic,
                 "message": message,
                 "event": resolvedEvent,
             }
+        self.client.publish(clear_error_codes_topic, payload=json.dumps(message), qos=1, retain=False)
 
         return resolvedEvent
 
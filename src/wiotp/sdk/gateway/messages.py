@@ -7,20 +7,18 @@
 # http://www.eclipse.org/legal/epl-v10.html
 # *****************************************************************************
 
-import re
 from wiotp.sdk import MissingMessageDecoderException, InvalidEventException
-
-COMMAND_RE = re.compile("iot-2/type/(.+)/id/(.+)/cmd/(.+)/fmt/(.+)")
+from wiotp.sdk import topics
 
 
 class Command:
     def __init__(self, pahoMessage, messageEncoderModules):
-        result = COMMAND_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.deviceId = result.group(2)
-            self.commandId = result.group(3)
-            self.format = result.group(4)
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.DEVICE_COMMAND:
+            self.typeId = topic.typeId
+            self.deviceId = topic.deviceId
+            self.commandId = topic.name
+            self.format = topic.format
 
             if self.format in messageEncoderModules:
                 message = messageEncoderModules[self.format].decode(pahoMessage)
@@ -32,15 +30,12 @@ class Command:
             raise InvalidEventException("Received command on invalid topic: %s" % (pahoMessage.topic))
 
 
-NOTIFY_RE = re.compile("iot-2/type/(.+)/id/(.+)/notify")
-
-
 class Notification:
     def __init__(self, pahoMessage, messageEncoderModules):
-        result = NOTIFY_RE.match(pahoMessage.topic)
-        if result:
-            self.typeId = result.group(1)
-            self.deviceId = result.group(2)
+        topic = topics.parseTopic(pahoMessage.topic)
+        if topic is not None and topic.kind == topics.DEVICE_NOTIFY:
+            self.typeId = topic.typeId
+            self.deviceId = topic.deviceId
             self.format = "json"
 
             if self.format in messageEncoderModules:
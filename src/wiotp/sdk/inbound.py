@@ -0,0 +1,223 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import collections
+import logging
+import threading
+
+import paho.mqtt.client as paho
+
+from wiotp.sdk.spool import OutboundSpool
+from wiotp.sdk.exceptions import ConfigurationException
+
+# Spilled messages are journalled with their retain flag folded into the qos byte
+_RETAINED = 0x80
+
+
+class InboundQueue(object):
+    """
+    Bounded buffer between Paho's network thread and the handling of received messages.  Paho's network thread only
+    adds each message to the queue, and a consumer thread decodes the messages and passes them to your callbacks in
+    the order they were received.  When the queue is full the overflow policy decides what happens next:
+
+    - `block`: The network thread waits for space, so the client stops reading from the socket and the broker stops
+      sending until the callbacks catch up
+    - `dropOldest`: The oldest message in the queue is discarded to make room
+    - `dropNewest`: The message that has just been received is discarded
+    - `spill`: The message is written to a journal file on disk (see #wiotp.sdk.spool.OutboundSpool), and read
+      back once the messages ahead of it have been handled.  Messages left in the journal are handled by the next
+      client to use it
+
+    # Parameters
+    capacity (int): Maximum number of messages held in memory.  Defaults to `1000`
+    overflow (string): What to do when the queue is full, one of `block`, `dropOldest`, `dropNewest` or `spill`.
+        Defaults to `block`
+    path (string): Path of the journal file, required by the `spill` policy.  Defaults to `None`
+    logger (logging.Logger): Logger to use.  Defaults to `None`
+
+    # Attributes
+    received (int): Number of messages added to the queue
+    blocked (int): Number of times the network thread had to wait for space in the queue
+    droppedOldest (int): Number of queued messages discarded to make room for a newer message
+    droppedNewest (int): Number of received messages discarded because the queue was full
+    spilled (int): Number of messages written to the journal
+    """
+
+    POLICIES = ["block", "dropOldest", "dropNewest", "spill"]
+
+    def __init__(self, capacity=1000, overflow="block", path=None, logger=None):
+        if overflow not in InboundQueue.POLICIES:
+            raise ConfigurationException(
+                "Unsupported inbound overflow policy: %s.  Supported values are %s"
+                % (overflow, ", ".join(InboundQueue.POLICIES))
+            )
+        if overflow == "spill" and path is None:
+            raise ConfigurationException("The spill overflow policy requires a journal path")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.path = path
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+        self.received = 0
+        self.blocked = 0
+        self.droppedOldest = 0
+        self.droppedNewest = 0
+        self.spilled = 0
+
+        self._cond = threading.Condition(threading.Lock())
+        self._ring = collections.deque()
+        self._spool = OutboundSpool(capacity, path, self.logger) if overflow == "spill" else None
+        self._overflowing = False
+        self._handling = False
+        self._stopping = False
+        self._thread = None
+
+    def __len__(self):
+        if self._spool is not None:
+            return len(self._spool)
+        return len(self._ring)
+
+    @property
+    def dropped(self):
+        """
+        The number of messages discarded under the `dropOldest` or `dropNewest` policies
+        """
+        return self.droppedOldest + self.droppedNewest
+
+    @property
+    def journalled(self):
+        """
+        The number of messages currently held in the journal
+        """
+        return self._spool.journalled if self._spool is not None else 0
+
+    def put(self, pahoMessage):
+        """
+        Add a received message to the tail of the queue, applying the overflow policy if the queue is full
+
+        # Returns
+        bool: `True` if the message was queued (or spilled), `False` if it was discarded
+        """
+        with self._cond:
+            self.received += 1
+            if self._spool is not None:
+                journalled = self._spool.journalled
+                qos = pahoMessage.qos | (_RETAINED if pahoMessage.retain else 0)
+                self._spool.append(pahoMessage.topic, pahoMessage.payload, qos)
+                if self._spool.journalled > journalled:
+                    self.spilled += 1
+                    self._onOverflow("spilled to %s" % self.path)
+            elif len(self._ring) < self.capacity:
+                self._ring.append(pahoMessage)
+            elif self.overflow == "block":
+                self.blocked += 1
+                self._onOverflow("waiting for space")
+                self._cond.wait_for(lambda: len(self._ring) < self.capacity or self._stopping)
+                self._ring.append(pahoMessage)
+            elif self.overflow == "dropOldest":
+                self._ring.popleft()
+                self._ring.append(pahoMessage)
+                self.droppedOldest += 1
+                self._onOverflow("discarded oldest message")
+            else:
+                self.droppedNewest += 1
+                self._onOverflow("discarded newest message")
+                return False
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Remove and return the message at the head of the queue, waiting up to `timeout` seconds for one to arrive
+
+        # Returns
+        paho.mqtt.client.MQTTMessage: The message, or `None` if the queue is empty
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self) > 0 or self._stopping, timeout) or len(self) == 0:
+                return None
+            return self._pop()
+
+    def start(self, handler, name="wiotp-inbound"):
+        """
+        Start a consumer thread that passes each message to `handler(pahoMessage)`
+        """
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, args=(handler,), name=name, daemon=True)
+        self._thread.start()
+
+    def drain(self, timeout=None):
+        """
+        Block until every queued message has been handled
+
+        # Parameters
+        timeout (float): Maximum time to wait in seconds, or `None` to wait indefinitely
+
+        # Returns
+        bool: `True` if the queue is empty, `False` if the wait timed out
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self) == 0 and not self._handling, timeout)
+
+    def stop(self, timeout=None):
+        """
+        Stop the consumer thread once it has finished handling the current message.  Messages still in memory are
+        written to the journal under the `spill` policy, so they survive a restart
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        if self._spool is not None:
+            self._spool.persist()
+
+    def _run(self, handler):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self) > 0 or self._stopping)
+                if self._stopping:
+                    return
+                message = self._pop()
+                self._handling = True
+            try:
+                handler(message)
+            except Exception:
+                self.logger.exception("Exception raised handling message on topic %s" % message.topic)
+            finally:
+                with self._cond:
+                    self._handling = False
+                    self._cond.notify_all()
+
+    def _pop(self):
+        """
+        Remove the message at the head of the queue, called with the lock held when the queue is not empty
+        """
+        if self._spool is not None:
+            topic, payload, qos, _ = self._spool.peek(0)
+            self._spool.commit()
+            message = paho.MQTTMessage(topic=topic.encode("utf-8"))
+            message.payload = payload
+            message.qos = qos & ~_RETAINED
+            message.retain = bool(qos & _RETAINED)
+        else:
+            message = self._ring.popleft()
+        if len(self) < self.capacity:
+            self._overflowing = False
+        self._cond.notify_all()
+        return message
+
+    def _onOverflow(self, action):
+        # Only warn when the queue first fills up, not for every message while it stays full
+        if not self._overflowing:
+            self._overflowing = True
+            self.logger.warning("Inbound queue is full (%s messages), %s" % (self.capacity, action))
@@ -0,0 +1,169 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+"""
+The JSON implementation used by `wiotp.sdk.JsonCodec` and the REST API client.
+
+By default the fastest installed library is used, in order of preference `orjson`, `msgspec`, `ujson`, falling
+back to the standard library `json` module.  A specific backend can be chosen by setting the `WIOTP_JSON_BACKEND`
+environment variable, or by calling `setBackend()`:
+
+```python
+import wiotp.sdk.jsonBackend
+
+wiotp.sdk.jsonBackend.setBackend("orjson")
+```
+
+Every backend produces UTF-8 encoded `bytes` and decodes directly from `bytes`, and all decode errors are raised
+as `ValueError`.
+"""
+
+import json
+import logging
+import os
+
+from wiotp.sdk.exceptions import ConfigurationException
+
+BACKENDS = ["orjson", "msgspec", "ujson", "json"]
+
+logger = logging.getLogger(__name__)
+
+
+def _jsonBackend():
+    def dumps(obj, default=None):
+        return json.dumps(obj, default=default).encode("utf-8")
+
+    return (dumps, json.loads)
+
+
+def _orjsonBackend():
+    import orjson
+
+    # The standard library accepts non-string keys (e.g. integers), keep that behaviour
+    options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, default=None):
+        return orjson.dumps(obj, default=default, option=options)
+
+    return (dumps, orjson.loads)
+
+
+def _msgspecBackend():
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj, default=None):
+        if default is None:
+            return encoder.encode(obj)
+        return msgspec.json.encode(obj, enc_hook=default)
+
+    def loads(data):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e))
+
+    return (dumps, loads)
+
+
+def _ujsonBackend():
+    import ujson
+
+    def dumps(obj, default=None):
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, default=default).encode("utf-8")
+
+    def loads(data):
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        return ujson.loads(data)
+
+    return (dumps, loads)
+
+
+_FACTORIES = {"orjson": _orjsonBackend, "msgspec": _msgspecBackend, "ujson": _ujsonBackend, "json": _jsonBackend}
+
+_name = None
+_dumps = None
+_loads = None
+
+
+def setBackend(name="auto"):
+    """
+    Select the JSON library used by the SDK
+
+    # Parameters
+    name (string): One of `orjson`, `msgspec`, `ujson`, `json` or `auto`.  `auto` selects the first of these
+        that is installed.  Defaults to `auto`
+
+    # Raises
+    ConfigurationException: If the backend is not recognised or is not installed
+    """
+    global _name, _dumps, _loads
+
+    if name == "auto":
+        for candidate in BACKENDS:
+            try:
+                (_dumps, _loads) = _FACTORIES[candidate]()
+            except ImportError:
+                continue
+            _name = candidate
+            return
+    elif name not in _FACTORIES:
+        raise ConfigurationException("JSON backend must be one of auto, %s" % ", ".join(BACKENDS))
+
+    try:
+        (_dumps, _loads) = _FACTORIES[name]()
+    except ImportError:
+        raise ConfigurationException("JSON backend %s is not installed" % (name))
+    _name = name
+
+
+def getBackend():
+    """
+    # Returns
+    string: The name of the JSON library currently in use
+    """
+    return _name
+
+
+def dumps(obj, default=None):
+    """
+    Serialize `obj` to JSON
+
+    # Parameters
+    obj (object): The object to serialize
+    default (function): Called for objects that cannot otherwise be serialized, should return a serializable
+        version of the object or raise `TypeError`.  Defaults to `None`
+
+    # Returns
+    bytes: The UTF-8 encoded JSON document
+    """
+    return _dumps(obj, default)
+
+
+def loads(data):
+    """
+    Deserialize a JSON document
+
+    # Parameters
+    data (bytes): The JSON document, as UTF-8 encoded `bytes` or `bytearray`, or a `str`
+
+    # Returns
+    object: The decoded document
+    """
+    return _loads(data)
+
+
+try:
+    setBackend(os.getenv("WIOTP_JSON_BACKEND", "auto"))
+except ConfigurationException as e:
+    logger.warning("%s, using the fastest available backend instead" % (e.reason))
+    setBackend("auto")
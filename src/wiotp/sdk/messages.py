@@ -7,13 +7,32 @@
 # http://www.eclipse.org/legal/epl-v10.html
 # *****************************************************************************
 
-import json
+import bz2
+import gzip
+import importlib.util
+import lzma
+import struct
+import zlib
 import pytz
-from datetime import datetime
+from datetime import datetime, timedelta
+from wiotp.sdk import jsonBackend
 from wiotp.sdk.exceptions import InvalidEventException
 
 
 class MessageCodec(object):
+    """
+    Base class for message codecs.
+
+    # Attributes
+    requiresTimestamp (bool): Whether `encode()` makes use of the `timestamp` argument.  Clients skip computing
+        a timestamp for codecs that set this to `False`, in which case `encode()` is passed `None`.  Codecs
+        that do not define this attribute are always passed a timestamp.  The setting only applies to the class
+        that defines it alongside `encode()`, so a subclass that overrides `encode()` is passed a timestamp unless
+        it sets `requiresTimestamp = False` itself.
+    """
+
+    requiresTimestamp = True
+
     @staticmethod
     def encode(data=None, timestamp=None):
         raise NotImplementedError()
@@ -29,15 +48,19 @@ class JsonCodec(MessageCodec):
     defined as "json".  This default can be changed by reconfiguring your client:
 
       deviceCli.setMessageCodec("json", myCustomEncoderModule)
+
+    Encoding and decoding is performed by the JSON library selected in #wiotp.sdk.jsonBackend
     """
 
+    requiresTimestamp = False
+
     @staticmethod
     def encode(data=None, timestamp=None):
         """
-        Convert Python dictionary object into a UTF-8 encoded JSON string.  Timestamp information is
+        Convert Python dictionary object into a JSON string.  Timestamp information is
         not passed into the encoded message.
         """
-        return json.dumps(data)
+        return jsonBackend.dumps(data).decode("utf-8")
 
     @staticmethod
     def decode(message):
@@ -48,7 +71,7 @@ class JsonCodec(MessageCodec):
         * The timestamp of the message is the time that the message is RECEIVED
         """
         try:
-            data = json.loads(message.payload.decode("utf-8"))
+            data = jsonBackend.loads(message.payload)
         except ValueError as e:
             raise InvalidEventException('Unable to parse JSON.  payload="%s" error=%s' % (message.payload, str(e)))
 
@@ -58,6 +81,36 @@ class JsonCodec(MessageCodec):
         return Message(data, timestamp)
 
 
+def _requiresTimestamp(codec):
+    """
+    Whether a timestamp has to be computed for `codec.encode()`.  A class's `requiresTimestamp = False` is not
+    inherited by subclasses that override `encode()`, which may well use the timestamp.
+    """
+    attributes = getattr(codec, "__dict__", {})
+    if not isinstance(codec, type) and "requiresTimestamp" in attributes:
+        # Set on a codec instance (or module) itself
+        return attributes["requiresTimestamp"]
+    for cls in (codec if isinstance(codec, type) else type(codec)).__mro__:
+        if "encode" in vars(cls):
+            return vars(cls).get("requiresTimestamp", True)
+    return True
+
+
+def _encodeJson(data=None, timestamp=None):
+    return jsonBackend.dumps(data)
+
+
+def _payloadEncoder(codec):
+    """
+    The function used to encode payloads for publishing with `codec`.  For #JsonCodec (and subclasses that do not
+    override `encode()`) this skips decoding the JSON bytes produced by the backend into the `str` that
+    `JsonCodec.encode()` returns, only for Paho to encode them back into bytes.
+    """
+    if codec.encode is JsonCodec.encode:
+        return _encodeJson
+    return codec.encode
+
+
 class RawCodec(MessageCodec):
     """
     Support sending and receiving bytearray, useful for transmitting raw data files.  This is the default encoder used by clients for all messages sent with format
@@ -66,6 +119,8 @@ class RawCodec(MessageCodec):
       deviceCli.setMessageCodec("raw", myCustomEncoderModule)
     """
 
+    requiresTimestamp = False
+
     @staticmethod
     def encode(data=None, timestamp=None):
         # str is just an immutable bytearray at the end of the day!
@@ -93,6 +148,8 @@ class Utf8Codec(MessageCodec):
       deviceCli.setMessageCodec("utf8", myCustomEncoderModule)
     """
 
+    requiresTimestamp = False
+
     @staticmethod
     def encode(data=None, timestamp=None):
         if not isinstance(data, str):
@@ -113,6 +170,406 @@ class Utf8Codec(MessageCodec):
         return Message(data, timestamp)
 
 
+class CborCodec(MessageCodec):
+    """
+    Support sending and receiving messages encoded as [CBOR](https://cbor.io), a compact binary alternative
+    to JSON.  This is the default encoder used by clients for all messages sent with format defined as "cbor"
+    when the optional `cbor2` package is installed (`pip install wiotp-sdk[cbor]`).
+
+    Supports the same Python types as #JsonCodec, plus `datetime`.  Datetimes without a timezone are treated as UTC.
+    """
+
+    requiresTimestamp = False
+    module = "cbor2"
+
+    @staticmethod
+    def encode(data=None, timestamp=None):
+        import cbor2
+
+        return cbor2.dumps(data, timezone=pytz.utc)
+
+    @staticmethod
+    def decode(message):
+        import cbor2
+
+        try:
+            data = cbor2.loads(message.payload)
+        except Exception as e:
+            raise InvalidEventException('Unable to parse CBOR.  payload="%s" error=%s' % (message.payload, str(e)))
+
+        timestamp = datetime.now(pytz.timezone("UTC"))
+
+        return Message(data, timestamp)
+
+
+def _msgpackDefault(obj):
+    import msgpack
+
+    if isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            obj = pytz.utc.localize(obj)
+        return msgpack.Timestamp.from_datetime(obj)
+    raise TypeError("Object of type %s is not MessagePack serializable" % type(obj).__name__)
+
+
+class MsgPackCodec(MessageCodec):
+    """
+    Support sending and receiving messages encoded as [MessagePack](https://msgpack.org), a compact binary
+    alternative to JSON.  This is the default encoder used by clients for all messages sent with format defined
+    as "msgpack" when the optional `msgpack` package is installed (`pip install wiotp-sdk[msgpack]`).
+
+    Supports the same Python types as #JsonCodec, plus `datetime`, which is sent using the MessagePack timestamp
+    extension type.  Datetimes without a timezone are treated as UTC.
+    """
+
+    requiresTimestamp = False
+    module = "msgpack"
+
+    @staticmethod
+    def encode(data=None, timestamp=None):
+        import msgpack
+
+        return msgpack.packb(data, default=_msgpackDefault)
+
+    @staticmethod
+    def decode(message):
+        import msgpack
+
+        try:
+            data = msgpack.unpackb(message.payload, timestamp=3, strict_map_key=False)
+        except Exception as e:
+            raise InvalidEventException(
+                'Unable to parse MessagePack.  payload="%s" error=%s' % (message.payload, str(e))
+            )
+
+        timestamp = datetime.now(pytz.timezone("UTC"))
+
+        return Message(data, timestamp)
+
+
+# Fixed part of the ndarray header: dtype length, number of dimensions and header padding
+_NDARRAY_HEADER = struct.Struct("<BBB")
+# Kinds of dtype that can be sent: bool, integers, floats, complex, bytes, str, timedelta64 and datetime64
+_NDARRAY_KINDS = "biufcSUmM"
+
+
+class NdArrayCodec(MessageCodec):
+    """
+    Support sending and receiving [NumPy](https://numpy.org) arrays, e.g. batches of samples from a vibration sensor,
+    without converting them to lists.  This is the default encoder used by clients for all messages sent with format
+    defined as "ndarray" when the optional `numpy` package is installed (`pip install wiotp-sdk[numpy]`).
+
+    The array is sent in C order after a short header describing its dtype and shape, padded so that the data
+    starts on an 8 byte boundary.  Decoding does not copy the data: the decoded message data is a read-only array
+    that is a view on the message payload.  Arrays of objects, and structured arrays, are not supported.
+    """
+
+    requiresTimestamp = False
+    module = "numpy"
+
+    @staticmethod
+    def encode(data=None, timestamp=None):
+        import numpy
+
+        array = numpy.asarray(data)
+        if not array.flags.c_contiguous:
+            array = numpy.ascontiguousarray(array)
+        if array.dtype.kind not in _NDARRAY_KINDS or array.dtype.fields is not None:
+            raise InvalidEventException("Unable to encode array of dtype %s" % (array.dtype))
+
+        dtype = array.dtype.str.encode("ascii")
+        shape = struct.pack("<%dQ" % array.ndim, *array.shape)
+        size = _NDARRAY_HEADER.size + len(dtype) + len(shape)
+        padding = -size % 8
+        header = _NDARRAY_HEADER.pack(len(dtype), array.ndim, padding) + dtype + shape + b"\x00" * padding
+        # Viewed as raw bytes because not every dtype (e.g. datetime64) can be exported through the buffer protocol
+        return b"".join((header, array.reshape(-1).view(numpy.uint8)))
+
+    @staticmethod
+    def decode(message):
+        import numpy
+
+        payload = message.payload
+        try:
+            (dtypeLength, ndim, padding) = _NDARRAY_HEADER.unpack_from(payload, 0)
+            offset = _NDARRAY_HEADER.size
+            dtype = numpy.dtype(bytes(payload[offset : offset + dtypeLength]).decode("ascii"))
+            offset += dtypeLength
+            shape = struct.unpack_from("<%dQ" % ndim, payload, offset)
+            offset += 8 * ndim + padding
+
+            count = 1
+            for dimension in shape:
+                count *= dimension
+            expected = count * dtype.itemsize
+            if len(payload) - offset != expected:
+                raise ValueError("expected %d bytes of data, received %d" % (expected, len(payload) - offset))
+
+            data = numpy.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(shape)
+        except Exception as e:
+            raise InvalidEventException("Unable to decode array.  error=%s" % (str(e)))
+
+        # Payloads received as a bytearray would otherwise produce a writeable view
+        data.flags.writeable = False
+        timestamp = datetime.now(pytz.timezone("UTC"))
+
+        return Message(data, timestamp)
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def _epochMillis(timestamp):
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = pytz.utc.localize(timestamp)
+        return (timestamp - _EPOCH) // _MILLISECOND
+    return int(round(timestamp * 1000))
+
+
+class BatchCodec(MessageCodec):
+    """
+    Support sending many readings in a single message.  This is the default encoder used by clients for all
+    messages sent with format defined as "batch", which is what #wiotp.sdk.device.DeviceClient.publishReadings()
+    uses.  Combine it with compression (format "batch-deflate") to shrink large batches further.
+
+    The data to encode is a sequence of `(timestamp, reading)` pairs, where each reading is a dictionary and each
+    timestamp is either a `datetime` (treated as UTC if it has no timezone) or a number of seconds since the
+    epoch.  The decoded message data is a list of `(timestamp, reading)` pairs, with each timestamp a UTC
+    `datetime`.  Timestamps are sent to millisecond precision.
+
+    The envelope is a JSON document that sends each reading's timestamp as the number of milliseconds since the
+    previous reading, and its values as a list, against a dictionary of the distinct sets of keys in the batch:
+
+    ```json
+    {"t": 1714564800000, "k": ["temp", "hum"], "s": [[0, 1]], "r": [[0, 0, 21.5, 40], [1000, 0, 21.6, 41]]}
+    ```
+
+    # Attributes
+    batch (bool): Identifies codecs whose messages hold a batch of readings, which the application client
+        delivers one reading at a time
+    """
+
+    requiresTimestamp = False
+    batch = True
+
+    @staticmethod
+    def encode(data=None, timestamp=None):
+        keys = {}
+        schemas = {}
+        rows = []
+        first = None
+        previous = None
+        for readingTime, reading in data:
+            if not isinstance(reading, dict):
+                raise InvalidEventException("Unable to encode batch, reading is not a dictionary: %s" % (reading,))
+            millis = _epochMillis(readingTime)
+            if first is None:
+                first = previous = millis
+
+            schema = tuple(reading)
+            schemaIndex = schemas.get(schema)
+            if schemaIndex is None:
+                schemaIndex = schemas[schema] = len(schemas)
+                for key in schema:
+                    keys.setdefault(key, len(keys))
+
+            rows.append([millis - previous, schemaIndex] + list(reading.values()))
+            previous = millis
+
+        envelope = {
+            "t": first if first is not None else 0,
+            "k": list(keys),
+            "s": [[keys[key] for key in schema] for schema in schemas],
+            "r": rows,
+        }
+        return jsonBackend.dumps(envelope)
+
+    @staticmethod
+    def decode(message):
+        try:
+            envelope = jsonBackend.loads(message.payload)
+            keys = envelope["k"]
+            schemas = [[keys[index] for index in schema] for schema in envelope["s"]]
+            millis = envelope["t"]
+            readings = []
+            for row in envelope["r"]:
+                millis += row[0]
+                schema = schemas[row[1]]
+                if len(row) - 2 != len(schema):
+                    raise ValueError("reading has %d values, expected %d" % (len(row) - 2, len(schema)))
+                readings.append((_EPOCH + timedelta(milliseconds=millis), dict(zip(schema, row[2:]))))
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise InvalidEventException('Unable to decode batch.  payload="%s" error=%s' % (message.payload, str(e)))
+
+        timestamp = datetime.now(pytz.timezone("UTC"))
+
+        return Message(readings, timestamp)
+
+
+def codecAvailable(codec):
+    """
+    Whether the optional package that a codec depends on (named by its `module` attribute) is installed
+
+    # Parameters
+    codec (class): The codec
+
+    # Returns
+    bool: `True` if the codec has no optional dependency, or the dependency is installed
+    """
+    module = getattr(codec, "module", None)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+# Compression algorithms available to CompressedCodec, keyed by the suffix used in derived format names
+COMPRESSIONS = {
+    "deflate": (zlib.compress, zlib.decompress),
+    "gzip": (gzip.compress, gzip.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def registerCompression(name, compress, decompress):
+    """
+    Make an additional compression algorithm available to #CompressedCodec, e.g. to use zstandard:
+
+    ```python
+    import zstandard
+    wiotp.sdk.messages.registerCompression(
+        "zstd", zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+    )
+    ```
+
+    # Parameters
+    name (string): Name of the algorithm, used as the suffix of derived format names (e.g. `json-zstd`)
+    compress (function): Takes `bytes` and returns the compressed `bytes`
+    decompress (function): Takes compressed `bytes` and returns the original `bytes`
+    """
+    COMPRESSIONS[name] = (compress, decompress)
+
+
+class _DecompressedMessage(object):
+    """
+    Stands in for the Paho message when handing a decompressed payload to the wrapped codec
+    """
+
+    __slots__ = ("topic", "payload", "qos", "retain")
+
+    def __init__(self, message, payload):
+        self.topic = getattr(message, "topic", None)
+        self.payload = payload
+        self.qos = getattr(message, "qos", 0)
+        self.retain = getattr(message, "retain", False)
+
+
+class CompressedCodec(object):
+    """
+    Compresses the messages produced by another codec.  Clients automatically derive a compressed codec for any
+    registered format when a message is published or received with the format name `<format>-<compression>`, e.g.
+    `json-deflate`, using the default threshold.  Register an instance to use a different threshold:
+
+    ```python
+    client.setMessageCodec("json-deflate", CompressedCodec(JsonCodec, "deflate", threshold=1024))
+    ```
+
+    The first byte of each message records whether the remainder is compressed, so that payloads smaller than
+    the threshold (which rarely get any smaller) can be sent as they are.
+
+    # Parameters
+    codec (class): The codec that encodes and decodes the uncompressed message
+    compression (string): One of the algorithms in `COMPRESSIONS`, `deflate`, `gzip`, `bz2` or `lzma` unless
+        others have been added with #registerCompression.  Defaults to `deflate`
+    threshold (int): Payloads smaller than this many bytes are not compressed.  Defaults to `256`
+    """
+
+    _RAW = b"\x00"
+    _COMPRESSED = b"\x01"
+
+    def __init__(self, codec, compression="deflate", threshold=256):
+        if compression not in COMPRESSIONS:
+            raise ValueError("Unsupported compression %s, must be one of %s" % (compression, ", ".join(COMPRESSIONS)))
+        self.codec = codec
+        self.compression = compression
+        self.threshold = threshold
+        self.requiresTimestamp = _requiresTimestamp(codec)
+        self.batch = getattr(codec, "batch", False)
+        (self._compress, self._decompress) = COMPRESSIONS[compression]
+        self._encode = _payloadEncoder(codec)
+
+    def encode(self, data=None, timestamp=None):
+        payload = self._encode(data, timestamp)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if len(payload) < self.threshold:
+            return self._RAW + payload
+        compressed = self._compress(payload)
+        # Incompressible data is sent as it is rather than growing it
+        if len(compressed) >= len(payload):
+            return self._RAW + payload
+        return self._COMPRESSED + compressed
+
+    def decode(self, message):
+        payload = message.payload
+        header = payload[0:1]
+        if header == self._RAW:
+            payload = payload[1:]
+        elif header == self._COMPRESSED:
+            try:
+                payload = self._decompress(bytes(payload[1:]))
+            except Exception as e:
+                raise InvalidEventException("Unable to decompress %s payload: %s" % (self.compression, str(e)))
+            # Hand the wrapped codec the same type of payload that it would have received from Paho
+            if isinstance(message.payload, bytearray):
+                payload = bytearray(payload)
+        else:
+            raise InvalidEventException("Unable to decode %s compressed payload, invalid header" % (self.compression))
+        return self.codec.decode(_DecompressedMessage(message, payload))
+
+
+class CodecRegistry(dict):
+    """
+    The message codecs registered with a client, keyed by message format.  A format named
+    `<format>-<compression>` (e.g. `json-deflate`) that has not been registered explicitly resolves to a
+    #CompressedCodec wrapping the codec registered for `<format>`, which lets messages published in a compressed
+    format be decoded without any configuration.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._derived = set()
+
+    def __setitem__(self, messageFormat, codec):
+        # Formats derived from the codec being replaced must be derived again from the new one
+        for derived in [f for f in self._derived if f.rpartition("-")[0] == messageFormat]:
+            self._derived.discard(derived)
+            dict.pop(self, derived, None)
+        self._derived.discard(messageFormat)
+        dict.__setitem__(self, messageFormat, codec)
+
+    def __missing__(self, messageFormat):
+        codec = self._derive(messageFormat)
+        if codec is None:
+            raise KeyError(messageFormat)
+        return codec
+
+    def __contains__(self, messageFormat):
+        return dict.__contains__(self, messageFormat) or self._derive(messageFormat) is not None
+
+    def get(self, messageFormat, default=None):
+        return self[messageFormat] if messageFormat in self else default
+
+    def _derive(self, messageFormat):
+        (base, separator, compression) = messageFormat.rpartition("-")
+        if not separator or compression not in COMPRESSIONS or not dict.__contains__(self, base):
+            return None
+        codec = CompressedCodec(dict.__getitem__(self, base), compression)
+        dict.__setitem__(self, messageFormat, codec)
+        self._derived.add(messageFormat)
+        return codec
+
+
 class Message:
     """
     Represents an abstract message recieved over Mqtt.  All implementations of
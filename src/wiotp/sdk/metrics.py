@@ -0,0 +1,360 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+from bisect import bisect_left
+
+from wiotp.sdk import topics
+
+# Upper bounds, in seconds, of the publish-to-confirmation latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upper bounds, in seconds, of the message callback execution time histogram buckets
+CALLBACK_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.1, 1.0)
+
+# Label used for messages on topics that are not recognised by #wiotp.sdk.topics.parseTopic
+OTHER = "other"
+
+# Keys of every snapshot, any other keys are the values of registered metrics
+_SNAPSHOT_KEYS = ("published", "received", "publishLatency", "callbackTime", "decodeFailures")
+
+
+class Histogram(object):
+    """
+    Counts observations into fixed buckets, in the same way as a Prometheus histogram.  Not thread safe on its
+    own, #ClientMetrics serialises updates.
+
+    # Parameters
+    buckets (tuple<float>): The upper bound of each bucket, in ascending order
+
+    # Attributes
+    buckets (tuple<float>): The upper bound of each bucket
+    count (int): The number of observations
+    sum (float): The sum of every observation
+    """
+
+    __slots__ = ("buckets", "count", "sum", "_counts")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.count = 0
+        self.sum = 0.0
+        # The final count is for observations above the largest bucket
+        self._counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value):
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        The number of observations less than or equal to each bucket's upper bound
+
+        # Returns
+        list<tuple>: `(upperBound, count)` for each bucket, ending with `(float("inf"), count)`
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self):
+        return {"count": self.count, "sum": self.sum, "buckets": self.cumulative()}
+
+
+def _label(topic):
+    """
+    The `(kind, name)` that a message is counted against, e.g. `("deviceEvent", "status")`
+    """
+    parsed = topics.parseTopic(topic)
+    if parsed is None:
+        return (OTHER, "")
+    return (parsed.kind, parsed.name or "")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class ClientMetrics(object):
+    """
+    Counters, gauges and histograms describing the messaging activity of a client, available as
+    `client.metrics`.  Recording is cheap enough to leave enabled in production: each message costs a cached
+    topic lookup, a few dictionary updates and an uncontended lock.
+
+    Messages are counted per `(kind, name)`, where `kind` is the kind of topic (e.g. `event` for events published by a
+    device, `deviceEvent` for events published or received on behalf of a device, `deviceCommand` or `command`) and
+    `name` is the event or command id.  Messages on other topics, such as device management requests, are counted
+    against kind `other`.
+
+    ```python
+    print(client.metrics.snapshot()["published"])
+    with open("/var/lib/node_exporter/wiotp.prom", "w") as f:
+        f.write(client.metrics.prometheus())
+    ```
+
+    # Parameters
+    latencyBuckets (tuple<float>): Upper bounds of the publish latency histogram buckets, in seconds
+    callbackBuckets (tuple<float>): Upper bounds of the callback execution time histogram buckets, in seconds
+
+    # Attributes
+    enabled (bool): Whether activity is being recorded.  Defaults to `True`
+    publishLatency (Histogram): Seconds from handing each message to Paho to it being confirmed.  For qos 0
+        messages this is the time taken to write the message to the network
+    """
+
+    def __init__(self, latencyBuckets=LATENCY_BUCKETS, callbackBuckets=CALLBACK_BUCKETS):
+        self.enabled = True
+        self.publishLatency = Histogram(latencyBuckets)
+        self._callbackBuckets = callbackBuckets
+        self._published = {}
+        self._received = {}
+        self._callbackTime = {}
+        self._decodeFailures = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, description, function, type="gauge"):
+        """
+        Report an additional value, read each time a snapshot is taken, e.g. the size of a queue
+
+        # Parameters
+        name (string): Name of the metric, in camelCase
+        description (string): Description of the metric, used as its Prometheus help text
+        function (function): Returns the current value, or `None` if there is currently no value
+        type (string): The Prometheus metric type, `gauge` or `counter`.  Defaults to `gauge`
+        """
+        self._gauges[name] = (description, function, type)
+
+    def gauges(self):
+        """
+        The metrics added with #ClientMetrics.register()
+
+        # Returns
+        dict: `{name: (description, type)}`
+        """
+        return {name: (description, metricType) for name, (description, function, metricType) in self._gauges.items()}
+
+    def _onPublished(self, topic, size):
+        if not self.enabled:
+            return
+        label = _label(topic)
+        with self._lock:
+            counts = self._published.get(label)
+            if counts is None:
+                counts = self._published[label] = [0, 0]
+            counts[0] += 1
+            counts[1] += size
+
+    def _onConfirmed(self, latency):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.publishLatency.observe(latency)
+
+    def _onReceived(self, topic, size, callbackTime):
+        if not self.enabled:
+            return
+        label = _label(topic)
+        with self._lock:
+            counts = self._received.get(label)
+            if counts is None:
+                counts = self._received[label] = [0, 0]
+            counts[0] += 1
+            counts[1] += size
+            histogram = self._callbackTime.get(label[0])
+            if histogram is None:
+                histogram = self._callbackTime[label[0]] = Histogram(self._callbackBuckets)
+            histogram.observe(callbackTime)
+
+    def _onDecodeFailure(self, exception):
+        if not self.enabled:
+            return
+        reason = type(exception).__name__
+        with self._lock:
+            self._decodeFailures[reason] = self._decodeFailures.get(reason, 0) + 1
+
+    def reset(self):
+        """
+        Reset every counter and histogram to zero.  Registered gauges are unaffected
+        """
+        with self._lock:
+            self.publishLatency = Histogram(self.publishLatency.buckets)
+            self._published = {}
+            self._received = {}
+            self._callbackTime = {}
+            self._decodeFailures = {}
+
+    def snapshot(self):
+        """
+        A consistent copy of every metric
+
+        # Returns
+        dict: With keys:
+
+        - `published`, `received`: `{kind: {name: {"messages": int, "bytes": int}}}`
+        - `publishLatency`: `{"count": int, "sum": float, "buckets": [(upperBound, cumulativeCount), ...]}`
+        - `callbackTime`: `{kind: histogram}`, in the same form as `publishLatency`
+        - `decodeFailures`: `{exceptionName: int}`
+        - one key for each registered gauge, e.g. `inflight` and `reconnects`
+        """
+        with self._lock:
+            result = {
+                "published": self._counters(self._published),
+                "received": self._counters(self._received),
+                "publishLatency": self.publishLatency.snapshot(),
+                "callbackTime": {kind: h.snapshot() for kind, h in self._callbackTime.items()},
+                "decodeFailures": dict(self._decodeFailures),
+            }
+        for name, (description, function, metricType) in self._gauges.items():
+            result[name] = function()
+        return result
+
+    @staticmethod
+    def _counters(counters):
+        result = {}
+        for (kind, name), (messages, size) in counters.items():
+            result.setdefault(kind, {})[name] = {"messages": messages, "bytes": size}
+        return result
+
+    def prometheus(self, prefix="wiotp"):
+        """
+        Every metric in the Prometheus text exposition format
+        (https://prometheus.io/docs/instrumenting/exposition_formats/)
+
+        # Parameters
+        prefix (string): Prepended to the name of every metric.  Defaults to `wiotp`
+
+        # Returns
+        string: The metrics, e.g. to serve from a `/metrics` endpoint or write to a node exporter textfile
+        """
+        return formatPrometheus(self.snapshot(), self.gauges(), prefix)
+
+
+def formatPrometheus(snapshot, gauges, prefix="wiotp"):
+    """
+    Format a snapshot in the Prometheus text exposition format, see #ClientMetrics.prometheus()
+
+    # Parameters
+    snapshot (dict): A snapshot, as returned by #ClientMetrics.snapshot() or #mergeSnapshots()
+    gauges (dict): The description and type of each registered metric, as returned by #ClientMetrics.gauges()
+    prefix (string): Prepended to the name of every metric.  Defaults to `wiotp`
+
+    # Returns
+    string: The metrics
+    """
+    lines = []
+
+    def family(name, metricType, description):
+        lines.append("# HELP %s_%s %s" % (prefix, name, description))
+        lines.append("# TYPE %s_%s %s" % (prefix, name, metricType))
+
+    def sample(name, labels, value):
+        if labels:
+            labelText = ",".join('%s="%s"' % (key, _escape(v)) for key, v in labels)
+            lines.append("%s_%s{%s} %s" % (prefix, name, labelText, _number(value)))
+        else:
+            lines.append("%s_%s %s" % (prefix, name, _number(value)))
+
+    def histogram(name, labels, data):
+        for bound, count in data["buckets"]:
+            sample(name + "_bucket", labels + [("le", _number(float(bound)))], count)
+        sample(name + "_sum", labels, data["sum"])
+        sample(name + "_count", labels, data["count"])
+
+    for direction in ["published", "received"]:
+        for unit, field in [("messages", "messages"), ("bytes", "bytes")]:
+            family("%s_%s_total" % (direction, unit), "counter", "Payload %s %s" % (field, direction))
+            for kind, names in sorted(snapshot[direction].items()):
+                for name, counts in sorted(names.items()):
+                    sample("%s_%s_total" % (direction, unit), [("kind", kind), ("name", name)], counts[field])
+
+    family("publish_latency_seconds", "histogram", "Time from publishing a message to it being confirmed")
+    histogram("publish_latency_seconds", [], snapshot["publishLatency"])
+
+    family("callback_seconds", "histogram", "Time taken to handle each received message")
+    for kind, data in sorted(snapshot["callbackTime"].items()):
+        histogram("callback_seconds", [("kind", kind)], data)
+
+    family("decode_failures_total", "counter", "Received messages that could not be decoded")
+    for reason, count in sorted(snapshot["decodeFailures"].items()):
+        sample("decode_failures_total", [("exception", reason)], count)
+
+    for name, (description, metricType) in gauges.items():
+        value = snapshot.get(name)
+        if value is None:
+            continue
+        metricName = "".join("_" + c.lower() if c.isupper() else c for c in name)
+        if metricType == "counter":
+            metricName += "_total"
+        family(metricName, metricType, description)
+        sample(metricName, [], value)
+
+    return "\n".join(lines) + "\n"
+
+
+def mergeSnapshots(snapshots):
+    """
+    Combine the snapshots of several clients into one, e.g. to report on the shards of a
+    #wiotp.sdk.application.ShardedApplicationConsumer as a whole.  Counters and histograms are added together, and so
+    are the values of registered metrics, skipping any that are `None`.
+
+    # Parameters
+    snapshots (iterable<dict>): Snapshots, as returned by #ClientMetrics.snapshot()
+
+    # Returns
+    dict: A snapshot in the same form as #ClientMetrics.snapshot()
+    """
+    result = {"published": {}, "received": {}, "publishLatency": None, "callbackTime": {}, "decodeFailures": {}}
+    for snapshot in snapshots:
+        for direction in ["published", "received"]:
+            for kind, names in snapshot[direction].items():
+                merged = result[direction].setdefault(kind, {})
+                for name, counts in names.items():
+                    total = merged.setdefault(name, {"messages": 0, "bytes": 0})
+                    total["messages"] += counts["messages"]
+                    total["bytes"] += counts["bytes"]
+        result["publishLatency"] = _mergeHistograms(result["publishLatency"], snapshot["publishLatency"])
+        for kind, data in snapshot["callbackTime"].items():
+            result["callbackTime"][kind] = _mergeHistograms(result["callbackTime"].get(kind), data)
+        for reason, count in snapshot["decodeFailures"].items():
+            result["decodeFailures"][reason] = result["decodeFailures"].get(reason, 0) + count
+        for name, value in snapshot.items():
+            if name in _SNAPSHOT_KEYS:
+                continue
+            if value is None:
+                result.setdefault(name, None)
+            else:
+                result[name] = (result.get(name) or 0) + value
+    if result["publishLatency"] is None:
+        result["publishLatency"] = Histogram(LATENCY_BUCKETS).snapshot()
+    return result
+
+
+def _mergeHistograms(total, data):
+    if total is None:
+        return {"count": data["count"], "sum": data["sum"], "buckets": list(data["buckets"])}
+    if [bound for bound, count in total["buckets"]] != [bound for bound, count in data["buckets"]]:
+        raise ValueError("Unable to merge histograms with different buckets")
+    return {
+        "count": total["count"] + data["count"],
+        "sum": total["sum"] + data["sum"],
+        "buckets": [(bound, count + other) for (bound, count), (_, other) in zip(total["buckets"], data["buckets"])],
+    }
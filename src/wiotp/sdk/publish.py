@@ -0,0 +1,445 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+from wiotp.sdk import tracing
+from wiotp.sdk.messages import _payloadEncoder, _requiresTimestamp
+
+
+class PublishBatch(object):
+    """
+    Aggregate handle returned when publishing a batch of events in a single call (e.g.
+    `DeviceClient.publishEvents()`), tracking delivery of every message in the batch.
+
+    # Parameters
+    onPublish (function): A function that will be called once every message in the batch
+        has been confirmed.  Defaults to `None`
+    span (wiotp.sdk.tracing.Span): Span to end once every message in the batch has been confirmed.  Defaults to
+        `None`
+
+    # Attributes
+    sent (int): The number of messages that were handed over to the underlying Paho client
+    failed (int): The number of messages that the underlying Paho client refused to queue
+    discarded (int): The number of sent messages that stopped being tracked before they were confirmed
+    """
+
+    def __init__(self, onPublish=None, span=None):
+        self.sent = 0
+        self.failed = 0
+        self.discarded = 0
+        self._acked = 0
+        self._sealed = False
+        self._onPublish = onPublish
+        self._span = span
+        self._lock = threading.Lock()
+        self._complete = threading.Event()
+
+    @property
+    def size(self):
+        """
+        The total number of messages in the batch
+        """
+        return self.sent + self.failed
+
+    @property
+    def acked(self):
+        """
+        The number of messages in the batch that have been confirmed
+        """
+        return self._acked
+
+    @property
+    def pending(self):
+        """
+        The number of messages in the batch still awaiting confirmation
+        """
+        return self.sent - self._acked - self.discarded
+
+    def isComplete(self):
+        return self._complete.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Block until every message in the batch has been confirmed
+
+        # Parameters
+        timeout (float): Maximum time to wait in seconds, or `None` to wait indefinitely
+
+        # Returns
+        bool: `True` if the whole batch has been confirmed, `False` if the wait timed out or messages in the batch
+            were discarded
+        """
+        return self._complete.wait(timeout) and self.discarded == 0
+
+    def _seal(self, sent):
+        """
+        Called by the client once every message in the batch has been handed to Paho, from this
+        point on the batch can complete.
+        """
+        with self._lock:
+            self.sent = sent
+            self._sealed = True
+            done = self._acked + self.discarded >= self.sent
+        if done:
+            self._finish()
+
+    def _ack(self):
+        """
+        Called by the client each time a message in the batch is confirmed
+        """
+        with self._lock:
+            self._acked += 1
+            done = self._sealed and self._acked + self.discarded >= self.sent
+        if done:
+            self._finish()
+
+    def _discard(self):
+        """
+        Called by the client when a message in the batch is no longer tracked and will never be confirmed
+        """
+        with self._lock:
+            self.discarded += 1
+            done = self._sealed and self._acked + self.discarded >= self.sent
+        if done:
+            self._finish()
+
+    def _finish(self):
+        self._complete.set()
+        if self._span is not None:
+            if self.discarded:
+                self._span.recordError(
+                    "%s messages in the batch were discarded before being confirmed" % self.discarded
+                )
+            self._span.end()
+        if self._onPublish is not None and not self.discarded:
+            self._onPublish()
+
+
+class PublishFuture(object):
+    """
+    Lightweight handle returned when publishing a single message, tracking its delivery.  A future is
+    always truthy, so code that treats the result of `publishEvent()` as a boolean continues to work.
+
+    # Parameters
+    onPublish (function): A function that will be called when the message is confirmed.  Defaults to `None`
+    window (PublishWindow): The publish window to release a slot in when the message is confirmed.  Defaults
+        to `None`
+    metrics (wiotp.sdk.metrics.ClientMetrics): Metrics to record the message's latency in.  Defaults to `None`
+    span (wiotp.sdk.tracing.Span): Span to end when the message is confirmed.  Defaults to `None`
+
+    # Attributes
+    mid (int): The MQTT message id assigned by Paho, `None` until the message has been handed to Paho
+    latency (float): Seconds between the message being published and confirmed, `None` until confirmed
+    """
+
+    __slots__ = ("mid", "latency", "_enqueued", "_onPublish", "_window", "_metrics", "_span", "_event")
+
+    # Shared by all futures, only needed on the (rare) path where a caller actually waits
+    _waitLock = threading.Lock()
+
+    def __init__(self, onPublish=None, window=None, metrics=None, span=None):
+        self.mid = None
+        self.latency = None
+        self._enqueued = time.monotonic()
+        self._onPublish = onPublish
+        self._window = window
+        self._metrics = metrics
+        self._span = span
+        self._event = None
+
+    def __bool__(self):
+        return True
+
+    def done(self):
+        return self.latency is not None
+
+    def wait(self, timeout=None):
+        """
+        Block until the message has been confirmed
+
+        # Parameters
+        timeout (float): Maximum time to wait in seconds, or `None` to wait indefinitely
+
+        # Returns
+        bool: `True` if the message has been confirmed, `False` if the wait timed out or the message was discarded
+        """
+        if self.latency is not None:
+            return True
+        with PublishFuture._waitLock:
+            if self._event is None:
+                self._event = threading.Event()
+        if self.latency is not None:
+            return True
+        return self._event.wait(timeout) and self.latency is not None
+
+    def _confirm(self):
+        self.latency = time.monotonic() - self._enqueued
+        if self._window is not None:
+            self._window.release()
+        if self._metrics is not None:
+            self._metrics._onConfirmed(self.latency)
+        if self._span is not None:
+            self._span.end()
+        if self._event is not None:
+            self._event.set()
+        if self._onPublish is not None:
+            self._onPublish()
+
+    def _discard(self):
+        """
+        Called when the message is no longer tracked and will never be confirmed, the window slot is released and
+        anyone waiting on the future is woken up, but `onPublish` is not called
+        """
+        if self._window is not None:
+            self._window.release()
+        if self._span is not None:
+            self._span.recordError("Message was discarded before being confirmed")
+            self._span.end()
+        with PublishFuture._waitLock:
+            if self._event is None:
+                self._event = threading.Event()
+        self._event.set()
+
+
+class PublishTracker(object):
+    """
+    Tracks published messages awaiting confirmation from Paho, keyed by MQTT message id.
+
+    Paho may confirm a message before the publisher has had chance to register it (the network thread can
+    win the race with the thread calling `publish()`).  Such early confirmations are only remembered while
+    a publish is actually in progress, so confirmations for messages that are never registered (e.g. those
+    sent by the device management protocol) cannot accumulate, or be mistaken for a later message that
+    reuses the same id.  Callbacks are always invoked after the tracker's lock has been released, with any
+    arguments that were passed to `confirm()`.  The same mechanism is used to match SUBACKs to subscribe requests.
+
+    # Parameters
+    maxPending (int): Maximum number of messages tracked at once, the oldest registration is discarded if
+        this is exceeded.  Defaults to `65535`, the size of the MQTT message id space
+
+    A registration is also discarded when a new message reuses its mid.  Either way, the registration's `onDiscard`
+    callback is invoked so that anything held for the message (e.g. its publish window slot) can be released.
+    """
+
+    def __init__(self, maxPending=65535):
+        self.maxPending = maxPending
+        self._pending = {}
+        self._early = {}
+        self._publishing = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def begin(self):
+        """
+        Called before handing one or more messages to Paho
+        """
+        with self._lock:
+            self._publishing += 1
+
+    def end(self):
+        """
+        Called once the messages handed to Paho since the matching `begin()` have been registered
+        """
+        with self._lock:
+            self._publishing -= 1
+            if self._publishing == 0:
+                self._early.clear()
+
+    def register(self, mids, onPublish, onDiscard=None):
+        """
+        Register a callback to be invoked when each of the supplied mids is confirmed.  If a message has
+        already been confirmed the callback is invoked immediately.  `onDiscard`, if supplied, is invoked
+        instead for each message whose registration is discarded before it is confirmed.
+        """
+        confirmed = []
+        discarded = []
+        with self._lock:
+            for mid in mids:
+                if mid in self._early:
+                    confirmed.append(self._early.pop(mid))
+                else:
+                    discarded.append(self._pending.pop(mid, None))
+                    self._pending[mid] = (onPublish, onDiscard)
+            while len(self._pending) > self.maxPending:
+                discarded.append(self._pending.pop(next(iter(self._pending))))
+        for args in confirmed:
+            onPublish(*args)
+        for entry in discarded:
+            if entry is not None and entry[1] is not None:
+                entry[1]()
+
+    def confirm(self, mid, *args):
+        """
+        Called when Paho confirms a message, `args` are passed on to the registered callback
+        """
+        with self._lock:
+            entry = self._pending.pop(mid, None)
+            if entry is None:
+                if self._publishing > 0 and len(self._early) < self.maxPending:
+                    self._early[mid] = args
+                return
+        entry[0](*args)
+
+
+class PublishWindow(object):
+    """
+    Bounds the number of published messages that are awaiting confirmation from the service, applying
+    backpressure to publishers when the window is full.
+
+    # Parameters
+    capacity (int): Maximum number of unconfirmed messages, or `None` for an unbounded window
+    policy (string): What to do when the window is full: `block` waits indefinitely for space, `timeout` waits
+        for up to `timeout` seconds, and `reject` fails the publish immediately.  Defaults to `block`
+    timeout (float): Maximum time to wait for space in the window under the `timeout` policy.  Defaults to `10`
+
+    # Attributes
+    capacity (int): Maximum number of unconfirmed messages, or `None` for an unbounded window
+    policy (string): The backpressure policy, one of `block`, `timeout` or `reject`
+    """
+
+    POLICIES = ["block", "timeout", "reject"]
+
+    def __init__(self, capacity=None, policy="block", timeout=10):
+        self.capacity = capacity
+        self.policy = policy
+        self.timeout = timeout
+        self._used = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def used(self):
+        """
+        The number of messages currently occupying the window
+        """
+        return self._used
+
+    @property
+    def available(self):
+        """
+        The number of messages that can be published before the window is full, or `None` if the window is unbounded
+        """
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self._used, 0)
+
+    def isFull(self):
+        return self.capacity is not None and self._used >= self.capacity
+
+    def tryAcquire(self):
+        """
+        Claim a slot in the window if one is immediately available
+
+        # Returns
+        bool: `True` if a slot was claimed
+        """
+        with self._cond:
+            if self.capacity is None or self._used < self.capacity:
+                self._used += 1
+                return True
+            return False
+
+    def acquire(self):
+        """
+        Claim a slot in the window, applying the configured backpressure policy if the window is full
+
+        # Returns
+        bool: `True` if a slot was claimed, `False` if the publish should be rejected
+        """
+        with self._cond:
+            if self.capacity is None or self._used < self.capacity:
+                self._used += 1
+                return True
+            if self.policy == "reject":
+                return False
+            timeout = self.timeout if self.policy == "timeout" else None
+            if not self._cond.wait_for(lambda: self._used < self.capacity, timeout):
+                return False
+            self._used += 1
+            return True
+
+    def release(self):
+        """
+        Free a slot in the window, called when a message is confirmed (or could not be sent)
+        """
+        with self._cond:
+            if self._used > 0:
+                self._used -= 1
+            self._cond.notify()
+
+
+class Publisher(object):
+    """
+    Prepared publisher for a single stream of events, created by a client's `publisher()` method.  The topic
+    is built and the codec is resolved once, when the publisher is created, rather than on every publish,
+    and a timestamp is only computed if the codec makes use of one.
+
+    Note: the publisher is bound to the codec registered for its message format at the time it was created,
+    later calls to `setMessageCodec()` do not affect existing publishers.
+
+    # Parameters
+    client (wiotp.sdk.AbstractClient): The client to publish with
+    topic (string): The MQTT topic to publish to
+    eventId (string): Name of the event
+    codec (wiotp.sdk.MessageCodec): The codec used to encode each event
+    qos (int): MQTT quality of service level to use (`0`, `1`, or `2`)
+    msgFormat (string): Name of the message format, recorded on the span of each publish.  Defaults to `None`
+
+    # Attributes
+    topic (string): The MQTT topic events are published to
+    qos (int): MQTT quality of service level used for every event
+    """
+
+    __slots__ = ("topic", "eventId", "qos", "msgFormat", "_client", "_encode", "_timestamped")
+
+    def __init__(self, client, topic, eventId, codec, qos=0, msgFormat=None):
+        self.topic = topic
+        self.eventId = eventId
+        self.qos = qos
+        self.msgFormat = msgFormat
+        self._client = client
+        self._encode = _payloadEncoder(codec)
+        self._timestamped = _requiresTimestamp(codec)
+
+    def publish(self, data, onPublish=None):
+        """
+        Publish an event
+
+        # Parameters
+        data (object): Data for this event
+        onPublish (function): A function that will be called when receipt of the publication is confirmed
+
+        # Returns
+        PublishFuture: A handle tracking delivery of the event, or `False` if the event could not be sent
+        """
+        span = self._client.tracer.startSpan(
+            tracing.PUBLISH,
+            {
+                tracing.TOPIC: self.topic,
+                tracing.QOS: self.qos,
+                tracing.EVENT: self.eventId,
+                tracing.FORMAT: self.msgFormat,
+            },
+        )
+        try:
+            payload = self._encode(data, datetime.now(pytz.utc) if self._timestamped else None)
+        except Exception as e:
+            span.recordError(e)
+            span.end()
+            raise
+        span.setAttribute(tracing.SIZE, len(payload))
+        span.addEvent("encoded")
+        return self._client._publishPayload(self.topic, self.eventId, payload, self.qos, onPublish, span)
+
+    __call__ = publish
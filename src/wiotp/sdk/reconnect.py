@@ -0,0 +1,92 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import random
+import time
+
+
+class ReconnectPolicy(object):
+    """
+    Exponential backoff with jitter, used to space out attempts to (re)establish the connection to
+    Watson IoT Platform.  The delay before attempt `n` is drawn at random from
+    `[base * (1 - jitter), base]` where `base = min(minDelay * 2^(n-1), maxDelay)`, so that a fleet of clients
+    that lose their connection at the same instant do not all retry at the same instant.
+
+    # Parameters
+    minDelay (float): Delay in seconds before the first attempt, doubled after each failed attempt.  Defaults to `1`
+    maxDelay (float): Upper bound on the delay in seconds.  Defaults to `120`
+    jitter (float): Fraction of each delay, between `0` and `1`, that is randomised.  Defaults to `0.5`
+    maxAttempts (int): Maximum number of consecutive attempts before giving up.  `0` means that automatic
+        reconnection retries indefinitely, and that `connect()` makes a single attempt.  Defaults to `0`
+    """
+
+    def __init__(self, minDelay=1, maxDelay=120, jitter=0.5, maxAttempts=0):
+        self.minDelay = minDelay
+        self.maxDelay = maxDelay
+        self.jitter = jitter
+        self.maxAttempts = maxAttempts
+
+    def delay(self, attempt):
+        """
+        The time to wait, in seconds, before making attempt number `attempt` (starting from 1)
+        """
+        base = min(self.minDelay * (2 ** min(attempt - 1, 32)), self.maxDelay)
+        return base * (1 - self.jitter * random.random())
+
+    def exhausted(self, attempts):
+        """
+        Whether `attempts` consecutive failed attempts means the client should give up
+        """
+        return self.maxAttempts > 0 and attempts >= self.maxAttempts
+
+
+class ReconnectStats(object):
+    """
+    Counters describing how often a client has lost its connection and how long it took to recover
+
+    # Attributes
+    disconnects (int): Number of times the connection has been lost unexpectedly
+    reconnects (int): Number of times the connection has been restored after being lost
+    failedAttempts (int): Number of reconnect attempts that failed
+    lastRecoveryTime (float): Seconds from the most recent loss of connection to its restoration
+    maxRecoveryTime (float): The longest time, in seconds, taken to restore the connection
+    totalRecoveryTime (float): Total time, in seconds, spent without a connection after losing it
+    """
+
+    def __init__(self):
+        self.disconnects = 0
+        self.reconnects = 0
+        self.failedAttempts = 0
+        self.lastRecoveryTime = None
+        self.maxRecoveryTime = None
+        self.totalRecoveryTime = 0.0
+        self._disconnectedAt = None
+
+    @property
+    def disconnected(self):
+        """
+        Whether the client is currently trying to restore a lost connection
+        """
+        return self._disconnectedAt is not None
+
+    def _onDisconnect(self):
+        self.disconnects += 1
+        if self._disconnectedAt is None:
+            self._disconnectedAt = time.monotonic()
+
+    def _onConnect(self):
+        if self._disconnectedAt is None:
+            return
+        recovery = time.monotonic() - self._disconnectedAt
+        self._disconnectedAt = None
+        self.reconnects += 1
+        self.lastRecoveryTime = recovery
+        self.totalRecoveryTime += recovery
+        if self.maxRecoveryTime is None or recovery > self.maxRecoveryTime:
+            self.maxRecoveryTime = recovery
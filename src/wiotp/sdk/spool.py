@@ -0,0 +1,273 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import collections
+import logging
+import os
+import struct
+import threading
+
+# Journal record header: qos (1 byte), topic length (2 bytes), payload length (4 bytes)
+_RECORD_HEADER = struct.Struct("!BHI")
+
+
+class OutboundSpool(object):
+    """
+    First-in first-out store for messages published while a device or gateway is unable to deliver
+    them directly to Watson IoT Platform.
+
+    Messages are held in a bounded in-memory ring.  When the ring is full, and a journal path has been
+    configured, further messages overflow to an append-only journal file on disk.  Once any message has
+    overflowed to the journal all subsequent messages are also written to the journal until it has been
+    drained, so that the original publish order is always preserved.
+
+    The journal survives process restarts: the position of the next message to deliver is recorded in a
+    `.offset` file alongside the journal, and any messages left in the memory ring are written to the
+    journal when the spool is persisted.  Without a journal, the oldest message is discarded when the
+    ring is full, other than a message returned by #peek() that is still being delivered.
+
+    # Parameters
+    memoryLimit (int): Maximum number of messages held in memory.  Defaults to `1000`
+    path (string): Path of the journal file, or `None` to disable the disk tier.  Defaults to `None`
+    logger (logging.Logger): Logger to use.  Defaults to `None`
+
+    # Attributes
+    dropped (int): Number of messages discarded because the spool was full
+    """
+
+    def __init__(self, memoryLimit=1000, path=None, logger=None):
+        self.memoryLimit = memoryLimit
+        self.path = path
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.dropped = 0
+
+        self._ring = collections.deque()
+        self._cond = threading.Condition(threading.Lock())
+
+        # onPublish callbacks are held in memory only, keyed by each message's position in the spool.  Messages in
+        # the ring carry their position, as discarding messages can leave gaps, and `_headSeq` is the position of
+        # the first journalled message once the ring is empty
+        self._callbacks = {}
+        self._headSeq = 0
+        self._nextSeq = 0
+        # The position of the message returned by peek(), which must not be discarded until it is committed
+        self._peekedSeq = None
+
+        self._journal = None
+        self._journalCount = 0
+        self._readOffset = 0
+        self._headRecord = None
+        if self.path is not None:
+            self._openJournal()
+
+    def __len__(self):
+        return len(self._ring) + self._journalCount
+
+    def isEmpty(self):
+        return len(self) == 0
+
+    @property
+    def journalled(self):
+        """
+        The number of messages currently held in the on-disk journal
+        """
+        return self._journalCount
+
+    def append(self, topic, payload, qos, onPublish=None):
+        """
+        Add a message to the tail of the spool
+
+        # Parameters
+        topic (string): The MQTT topic to publish the message to
+        payload (bytes): The encoded message payload
+        qos (int): The MQTT quality of service level requested by the publisher
+        onPublish (function): Optional callback, invoked once the message has been delivered
+        """
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+
+        with self._cond:
+            if self._journalCount == 0 and len(self._ring) < self.memoryLimit:
+                self._ring.append((topic, payload, qos, self._nextSeq))
+            elif self._journal is not None:
+                self._writeRecord(self._journal, topic, payload, qos)
+                self._journal.flush()
+                self._journalCount += 1
+            else:
+                # No disk tier, make room by discarding the oldest message that is not being delivered
+                if self._ring and self._ring[0][3] == self._peekedSeq:
+                    index = 1
+                else:
+                    index = 0
+                if index < len(self._ring):
+                    discarded = self._ring[index]
+                    del self._ring[index]
+                    self._callbacks.pop(discarded[3], None)
+                    self._ring.append((topic, payload, qos, self._nextSeq))
+                else:
+                    # The only message in the ring is being delivered, so there is no room for this one
+                    onPublish = None
+                self.dropped += 1
+                self.logger.warning("Outbound spool is full, discarded oldest message (%s dropped)" % self.dropped)
+
+            if onPublish is not None:
+                self._callbacks[self._nextSeq] = onPublish
+            self._nextSeq += 1
+            self._cond.notify_all()
+
+    def peek(self, timeout=None):
+        """
+        Return the message at the head of the spool without removing it, waiting up to `timeout` seconds
+        for a message to become available
+
+        # Returns
+        tuple: `(topic, payload, qos, onPublish)`, or `None` if the spool is empty
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self) > 0, timeout):
+                return None
+            if len(self._ring) > 0:
+                topic, payload, qos, seq = self._ring[0]
+            else:
+                if self._headRecord is None:
+                    self._headRecord = self._readRecord(self._readOffset)
+                topic, payload, qos, _ = self._headRecord
+                seq = self._headSeq
+            self._peekedSeq = seq
+            return (topic, payload, qos, self._callbacks.get(seq))
+
+    def commit(self):
+        """
+        Remove the message at the head of the spool, called once it has been delivered
+        """
+        with self._cond:
+            self._peekedSeq = None
+            if len(self._ring) > 0:
+                seq = self._ring.popleft()[3]
+                self._callbacks.pop(seq, None)
+                self._headSeq = seq + 1
+                return
+            elif self._journalCount > 0:
+                if self._headRecord is None:
+                    self._headRecord = self._readRecord(self._readOffset)
+                self._readOffset = self._headRecord[3]
+                self._headRecord = None
+                self._journalCount -= 1
+                if self._journalCount == 0:
+                    # Fully drained, reclaim the disk space
+                    self._journal.seek(0)
+                    self._journal.truncate()
+                    self._readOffset = 0
+                self._writeOffset()
+            else:
+                return
+            self._callbacks.pop(self._headSeq, None)
+            self._headSeq += 1
+
+    def persist(self):
+        """
+        Move any messages held in memory into the journal so that they survive a restart.  The journal is
+        rewritten with the memory ring ahead of the messages already journalled, preserving their order.
+        """
+        with self._cond:
+            if self._journal is None or len(self._ring) == 0:
+                return
+
+            tmpPath = self.path + ".tmp"
+            with open(tmpPath, "wb") as tmp:
+                for topic, payload, qos, seq in self._ring:
+                    self._writeRecord(tmp, topic, payload, qos)
+                self._journal.flush()
+                self._journal.seek(self._readOffset)
+                remaining = self._journal.read()
+                tmp.write(remaining)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+
+            # Reset the offset before swapping the journal in: a crash in between can only cause messages
+            # to be delivered twice, never lost
+            self._readOffset = 0
+            self._writeOffset()
+            self._journal.close()
+            os.replace(tmpPath, self.path)
+            self._journalCount += len(self._ring)
+            self._headSeq = self._ring[0][3]
+            self._ring.clear()
+            self._headRecord = None
+            self._journal = open(self.path, "r+b")
+            self._journal.seek(0, os.SEEK_END)
+
+    def close(self):
+        """
+        Persist the spool and close the journal
+        """
+        self.persist()
+        with self._cond:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _openJournal(self):
+        if os.path.exists(self.path):
+            self._journal = open(self.path, "r+b")
+        else:
+            self._journal = open(self.path, "w+b")
+
+        try:
+            with open(self.path + ".offset", "r") as f:
+                self._readOffset = int(f.read().strip() or 0)
+        except (OSError, IOError, ValueError):
+            self._readOffset = 0
+
+        # Count the messages still to be delivered, discarding any partially written record left behind
+        # by a crash
+        validEnd = self._readOffset
+        while True:
+            record = self._readRecord(validEnd)
+            if record is None:
+                break
+            validEnd = record[3]
+            self._journalCount += 1
+        self._journal.seek(validEnd)
+        self._journal.truncate()
+        self._journal.seek(0, os.SEEK_END)
+
+        self._nextSeq = self._journalCount
+        if self._journalCount > 0:
+            self.logger.info("Recovered %s undelivered messages from %s" % (self._journalCount, self.path))
+
+    def _writeRecord(self, f, topic, payload, qos):
+        topicBytes = topic.encode("utf-8")
+        f.write(_RECORD_HEADER.pack(qos, len(topicBytes), len(payload)))
+        f.write(topicBytes)
+        f.write(payload)
+
+    def _readRecord(self, offset):
+        """
+        Read the journal record starting at `offset`.  Returns `(topic, payload, qos, nextOffset)`, or
+        `None` if there is no complete record.  The file position is left at the end of the journal.
+        """
+        self._journal.flush()
+        self._journal.seek(offset)
+        header = self._journal.read(_RECORD_HEADER.size)
+        record = None
+        if len(header) == _RECORD_HEADER.size:
+            qos, topicLength, payloadLength = _RECORD_HEADER.unpack(header)
+            topicBytes = self._journal.read(topicLength)
+            payload = self._journal.read(payloadLength)
+            if len(topicBytes) == topicLength and len(payload) == payloadLength:
+                record = (topicBytes.decode("utf-8"), payload, qos, self._journal.tell())
+        self._journal.seek(0, os.SEEK_END)
+        return record
+
+    def _writeOffset(self):
+        tmpPath = self.path + ".offset.tmp"
+        with open(tmpPath, "w") as f:
+            f.write(str(self._readOffset))
+        os.replace(tmpPath, self.path + ".offset")
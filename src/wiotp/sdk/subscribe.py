@@ -0,0 +1,133 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+
+# Default upper bound on the size of a single SUBSCRIBE packet built by `packSubscriptions()`
+MAX_SUBSCRIBE_PACKET_SIZE = 16384
+
+# Fixed header (at most 5 bytes) plus the 2 byte packet identifier
+_SUBSCRIBE_OVERHEAD = 7
+
+# SUBACK return code indicating that the broker refused a subscription
+_SUBACK_FAILURE = 0x80
+
+
+def packSubscriptions(subscriptions, maxPacketSize=MAX_SUBSCRIBE_PACKET_SIZE):
+    """
+    Group `(topic, qos)` pairs into lists that each fit in a single SUBSCRIBE packet of at most
+    `maxPacketSize` bytes.  A topic that is too long to share a packet is placed in a packet on its own.
+
+    # Parameters
+    subscriptions (iterable): Iterable of `(topic, qos)` tuples
+    maxPacketSize (int): Maximum size in bytes of each packet.  Defaults to `16384`
+
+    # Returns
+    generator: Yields a list of `(topic, qos)` tuples for each packet
+    """
+    packet = []
+    size = _SUBSCRIBE_OVERHEAD
+    for topic, qos in subscriptions:
+        # Each entry is a 2 byte length prefix, the UTF-8 topic, and 1 byte of options
+        entrySize = len(topic.encode("utf-8")) + 3
+        if packet and size + entrySize > maxPacketSize:
+            yield packet
+            packet = []
+            size = _SUBSCRIBE_OVERHEAD
+        packet.append((topic, qos))
+        size += entrySize
+    if packet:
+        yield packet
+
+
+class SubscribeBatch(object):
+    """
+    Aggregate handle returned by `subscribeMany()`, tracking the SUBACKs for every SUBSCRIBE packet
+    that was sent on behalf of the call.
+
+    # Parameters
+    onSubscribe (function): A function that will be called with the batch once every packet has been
+        acknowledged.  Defaults to `None`
+
+    # Attributes
+    packets (int): The number of SUBSCRIBE packets handed to the underlying Paho client
+    granted (dict): Maps each topic the broker accepted to the QoS it granted
+    refused (list): Topics the broker refused, or that Paho was unable to send
+    """
+
+    def __init__(self, onSubscribe=None):
+        self.packets = 0
+        self.granted = {}
+        self.refused = []
+        self._acked = 0
+        self._sealed = False
+        self._onSubscribe = onSubscribe
+        self._lock = threading.Lock()
+        self._complete = threading.Event()
+
+    @property
+    def pending(self):
+        """
+        The number of SUBSCRIBE packets still awaiting acknowledgement
+        """
+        return self.packets - self._acked
+
+    def isComplete(self):
+        return self._complete.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Block until every SUBSCRIBE packet in the batch has been acknowledged
+
+        # Parameters
+        timeout (float): Maximum time to wait in seconds, or `None` to wait indefinitely
+
+        # Returns
+        bool: `True` if the whole batch has been acknowledged, `False` if the wait timed out
+        """
+        return self._complete.wait(timeout)
+
+    def _seal(self, packets):
+        """
+        Called by the client once every packet in the batch has been handed to Paho, from this
+        point on the batch can complete.
+        """
+        with self._lock:
+            self.packets = packets
+            self._sealed = True
+            done = self._acked >= self.packets
+        if done:
+            self._finish()
+
+    def _ack(self, topics, grantedQoS):
+        """
+        Called by the client when the SUBACK for the packet subscribing to `topics` is received
+        """
+        with self._lock:
+            for (topic, qos), granted in zip(topics, grantedQoS):
+                if granted == _SUBACK_FAILURE:
+                    self.refused.append(topic)
+                else:
+                    self.granted[topic] = granted
+            self._acked += 1
+            done = self._sealed and self._acked >= self.packets
+        if done:
+            self._finish()
+
+    def _fail(self, topics):
+        """
+        Called by the client when Paho refuses to send the packet subscribing to `topics`
+        """
+        with self._lock:
+            self.refused.extend(topic for topic, qos in topics)
+
+    def _finish(self):
+        self._complete.set()
+        if self._onSubscribe is not None:
+            self._onSubscribe(self)
@@ -0,0 +1,10 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+from wiotp.sdk.testing.broker import Broker, BrokerMessage, DeviceRecord, DeviceManagementRequest, topicMatches
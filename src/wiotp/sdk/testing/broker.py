@@ -0,0 +1,897 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import json
+import logging
+import socket
+import struct
+import threading
+import uuid
+from datetime import datetime
+
+import pytz
+
+from wiotp.sdk.exceptions import ConfigurationException
+
+# MQTT control packet types
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+# CONNACK return codes
+CONNACK_ACCEPTED = 0
+CONNACK_REFUSED_PROTOCOL = 1
+CONNACK_REFUSED_IDENTIFIER = 2
+CONNACK_REFUSED_NOT_AUTHORIZED = 5
+
+# Highest QoS level granted to a subscription, QoS 2 subscriptions are downgraded
+MAX_QOS = 1
+
+# Device management requests that a device can publish to `iotdevice-1/...`
+DM_REQUESTS = [
+    "mgmt/manage",
+    "mgmt/unmanage",
+    "device/update/location",
+    "add/diag/errorCodes",
+    "clear/diag/errorCodes",
+    "add/diag/log",
+    "clear/diag/log",
+    "notify",
+]
+
+# Topic namespaces that are relative to the device for device clients, e.g. `iot-2/evt/...`
+_DEVICE_NAMESPACES = ("iot-2", "iotdm-1", "iotdevice-1")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def topicMatches(topicFilter, topic):
+    """
+    Whether a topic matches an MQTT topic filter, which may contain `+` and `#` wildcards
+
+    # Parameters
+    topicFilter (string): The topic filter, e.g. `iot-2/type/+/id/+/evt/#`
+    topic (string): The topic name
+
+    # Returns
+    bool: `True` if the topic matches the filter
+    """
+    return _levelsMatch(topicFilter.split("/"), topic.split("/"))
+
+
+def _levelsMatch(filterLevels, topicLevels):
+    for i, level in enumerate(filterLevels):
+        if level == "#":
+            return True
+        if i >= len(topicLevels):
+            return False
+        if level != "+" and level != topicLevels[i]:
+            return False
+    return len(filterLevels) == len(topicLevels)
+
+
+def _encodeLength(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _string(value):
+    data = value.encode("utf-8")
+    return struct.pack("!H", len(data)) + data
+
+
+def _packet(packetType, body=b"", flags=0):
+    return bytes([packetType << 4 | flags]) + _encodeLength(len(body)) + body
+
+
+def _readString(body, offset):
+    (length,) = struct.unpack_from("!H", body, offset)
+    offset += 2
+    if offset + length > len(body):
+        raise ProtocolError("String overruns packet")
+    return body[offset : offset + length].decode("utf-8"), offset + length
+
+
+def _readBytes(body, offset):
+    (length,) = struct.unpack_from("!H", body, offset)
+    offset += 2
+    return body[offset : offset + length], offset + length
+
+
+def _now():
+    return datetime.now(pytz.utc).isoformat(timespec="milliseconds")
+
+
+class BrokerMessage(object):
+    """
+    A message published to the broker, by a client or by the broker itself
+
+    # Attributes
+    clientId (string): The client that published the message, `None` for messages published by the broker
+    topic (string): The topic the message was published to.  Topics published by devices are expanded to include the
+        device, e.g. a device publishing to `iot-2/evt/status/fmt/json` is recorded as
+        `iot-2/type/<typeId>/id/<deviceId>/evt/status/fmt/json`
+    payload (bytes): The payload
+    qos (int): The QoS level the message was published with
+    retain (bool): Whether the message was published as a retained message
+    """
+
+    __slots__ = ("clientId", "topic", "payload", "qos", "retain")
+
+    def __init__(self, clientId, topic, payload, qos=0, retain=False):
+        self.clientId = clientId
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+
+    def json(self):
+        """
+        The payload decoded as JSON
+        """
+        return json.loads(self.payload.decode("utf-8"))
+
+    def __repr__(self):
+        return "BrokerMessage(%s, %r, qos=%s)" % (self.topic, self.payload, self.qos)
+
+
+class DeviceRecord(object):
+    """
+    What the broker knows about a device from the device management requests that it has published
+
+    # Attributes
+    typeId (string): The device type
+    deviceId (string): The device id
+    managed (bool): Whether the device has sent a manage request, and not since sent an unmanage request
+    lifetime (int): The lifetime from the most recent manage request
+    supports (dict): The actions that the device supports, from the most recent manage request
+    deviceInfo (dict): The device information from the most recent manage request
+    metadata (dict): The metadata from the most recent manage request
+    location (dict): The most recently reported location, `None` if the device has not reported one
+    errorCodes (list<int>): Error codes added since they were last cleared
+    logs (list<dict>): Log entries added since they were last cleared
+    fields (dict): The most recent value of each field reported in a notify request, e.g. `mgmt.firmware`
+    """
+
+    def __init__(self, typeId, deviceId):
+        self.typeId = typeId
+        self.deviceId = deviceId
+        self.managed = False
+        self.lifetime = None
+        self.supports = {}
+        self.deviceInfo = {}
+        self.metadata = {}
+        self.location = None
+        self.errorCodes = []
+        self.logs = []
+        self.fields = {}
+
+    def _update(self, request, data):
+        if request == "mgmt/manage":
+            self.managed = True
+            self.lifetime = data.get("lifetime")
+            self.supports = data.get("supports", {})
+            self.deviceInfo = data.get("deviceInfo", {})
+            self.metadata = data.get("metadata", {})
+        elif request == "mgmt/unmanage":
+            self.managed = False
+        elif request == "device/update/location":
+            self.location = data
+        elif request == "add/diag/errorCodes":
+            self.errorCodes.append(data.get("errorCode"))
+        elif request == "clear/diag/errorCodes":
+            self.errorCodes = []
+        elif request == "add/diag/log":
+            self.logs.append(data)
+        elif request == "clear/diag/log":
+            self.logs = []
+        elif request == "notify":
+            if "fields" in data:
+                for field in data["fields"]:
+                    self.fields[field["field"]] = field["value"]
+            else:
+                self.fields[data.get("field")] = data.get("value")
+
+
+class DeviceManagementRequest(object):
+    """
+    A device management request sent to a device by #Broker.initiateDeviceManagement(), resolved when the device
+    publishes its response
+
+    # Attributes
+    reqId (string): The request id
+    response (dict): The response from the device, `None` until it has responded
+    """
+
+    def __init__(self, reqId):
+        self.reqId = reqId
+        self.response = None
+        self._responded = threading.Event()
+
+    @property
+    def rc(self):
+        """
+        The response code returned by the device, `None` until it has responded
+        """
+        return None if self.response is None else self.response.get("rc")
+
+    def wait(self, timeout=None):
+        """
+        Block until the device has responded
+
+        # Returns
+        bool: `True` if the device has responded, `False` if the wait timed out
+        """
+        return self._responded.wait(timeout)
+
+    def _resolve(self, response):
+        self.response = response
+        self._responded.set()
+
+
+class _Session(object):
+    """
+    A connection from a single MQTT client, served by its own thread
+    """
+
+    def __init__(self, broker, sock, address):
+        self.broker = broker
+        self.sock = sock
+        self.address = address
+        self.clientId = None
+        self.username = None
+        self.kind = None
+        self.typeId = None
+        self.deviceId = None
+        self.appId = None
+        self.shareGroup = None
+        self.subscriptions = {}
+        self.will = None
+        self.connectTime = None
+        self.readMsg = 0
+        self.writeMsg = 0
+        self.readBytes = 0
+        self.writeBytes = 0
+        self._nextMid = 0
+        self._writeLock = threading.Lock()
+        self._closed = False
+        self._reason = "The connection was closed by the client."
+
+    # -------------------------------------------------------------------------
+    # Topic mapping
+    # -------------------------------------------------------------------------
+    def canonical(self, topic):
+        """
+        Expand a topic, or topic filter, that is relative to the device (e.g. `iot-2/evt/status/fmt/json` or
+        `iotdm-1/#`) to include the device.  Gateways may use relative device management topics to refer to
+        themselves, every other topic is already absolute.
+        """
+        if self.kind not in ("device", "gateway"):
+            return topic
+        levels = topic.split("/", 2)
+        if levels[0] not in _DEVICE_NAMESPACES:
+            return topic
+        if self.kind == "gateway" and (levels[0] == "iot-2" or (len(levels) > 1 and levels[1] == "type")):
+            return topic
+        return "%s/type/%s/id/%s/%s" % (levels[0], self.typeId, self.deviceId, topic[len(levels[0]) + 1 :])
+
+    def relative(self, topic):
+        """
+        The topic that a message published to `topic` is delivered to this client on
+        """
+        if self.kind != "device":
+            return topic
+        levels = topic.split("/", 5)
+        if len(levels) == 6 and levels[1:5] == ["type", self.typeId, "id", self.deviceId]:
+            return levels[0] + "/" + levels[5]
+        return topic
+
+    # -------------------------------------------------------------------------
+    # Network
+    # -------------------------------------------------------------------------
+    def send(self, data):
+        try:
+            with self._writeLock:
+                self.sock.sendall(data)
+        except OSError:
+            self.close("The connection was lost.")
+            return
+        self.writeBytes += len(data)
+
+    def deliver(self, message, qos, retain=False):
+        topic = _string(self.relative(message.topic))
+        flags = qos << 1 | (1 if retain else 0)
+        if qos > 0:
+            with self._writeLock:
+                self._nextMid = self._nextMid % 65535 + 1
+                mid = self._nextMid
+            body = topic + struct.pack("!H", mid) + message.payload
+        else:
+            body = topic + message.payload
+        self.writeMsg += 1
+        self.send(_packet(PUBLISH, body, flags))
+
+    def close(self, reason=None):
+        if self._closed:
+            return
+        self._closed = True
+        if reason is not None:
+            self._reason = reason
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _readPacket(self, stream):
+        header = stream.read(1)
+        if not header:
+            return None
+        multiplier = 1
+        length = 0
+        while True:
+            byte = stream.read(1)
+            if not byte:
+                return None
+            length += (byte[0] & 0x7F) * multiplier
+            if not byte[0] & 0x80:
+                break
+            multiplier *= 128
+            if multiplier > 128 ** 3:
+                raise ProtocolError("Malformed remaining length")
+        body = stream.read(length)
+        if len(body) < length:
+            return None
+        self.readBytes += 1 + length
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    def run(self):
+        stream = self.sock.makefile("rb")
+        try:
+            packet = self._readPacket(stream)
+            if packet is None or packet[0] != CONNECT:
+                raise ProtocolError("Expected CONNECT")
+            if not self._onConnect(packet[2]):
+                return
+            while not self._closed:
+                packet = self._readPacket(stream)
+                if packet is None:
+                    break
+                packetType, flags, body = packet
+                if packetType == PUBLISH:
+                    self._onPublish(flags, body)
+                elif packetType == PUBREL:
+                    self.send(_packet(PUBCOMP, body[:2]))
+                elif packetType == SUBSCRIBE:
+                    self._onSubscribe(body)
+                elif packetType == UNSUBSCRIBE:
+                    self._onUnsubscribe(body)
+                elif packetType == PINGREQ:
+                    self.send(_packet(PINGRESP))
+                elif packetType == DISCONNECT:
+                    self._reason = "The connection has completed normally."
+                    self.will = None
+                    break
+                elif packetType not in (PUBACK, PUBREC, PUBCOMP):
+                    raise ProtocolError("Unexpected packet type %s" % packetType)
+        except (OSError, ValueError, struct.error, ProtocolError) as e:
+            if not self._closed:
+                self.broker.logger.warning("Closing connection from %s: %s" % (self.clientId or self.address[0], e))
+                self._reason = "The connection was closed because of a protocol error."
+        finally:
+            stream.close()
+            self.close()
+            self.broker._onSessionClosed(self)
+
+    # -------------------------------------------------------------------------
+    # Packet handlers
+    # -------------------------------------------------------------------------
+    def _onConnect(self, body):
+        protocol, offset = _readString(body, 0)
+        level, flags, keepAlive = struct.unpack_from("!BBH", body, offset)
+        offset += 4
+        if protocol not in ("MQTT", "MQIsdp") or level not in (3, 4):
+            self.send(_packet(CONNACK, bytes([0, CONNACK_REFUSED_PROTOCOL])))
+            return False
+
+        self.clientId, offset = _readString(body, offset)
+        if flags & 0x04:
+            willTopic, offset = _readString(body, offset)
+            willPayload, offset = _readBytes(body, offset)
+            self.will = (willTopic, willPayload, (flags >> 3) & 0x03, bool(flags & 0x20))
+        password = None
+        if flags & 0x80:
+            self.username, offset = _readString(body, offset)
+        if flags & 0x40:
+            password, offset = _readBytes(body, offset)
+            password = password.decode("utf-8")
+
+        if not self._identify():
+            self.send(_packet(CONNACK, bytes([0, CONNACK_REFUSED_IDENTIFIER])))
+            return False
+        if not self.broker._authenticate(self.clientId, self.username, password):
+            self.send(_packet(CONNACK, bytes([0, CONNACK_REFUSED_NOT_AUTHORIZED])))
+            return False
+
+        self.connectTime = _now()
+        self.broker._onSessionConnected(self)
+        self.send(_packet(CONNACK, bytes([0, CONNACK_ACCEPTED])))
+        self.broker._publishStatus(self, "Connect")
+        return True
+
+    def _identify(self):
+        """
+        Work out what kind of client this is from its client id, e.g. `d:orgId:typeId:deviceId`
+        """
+        parts = self.clientId.split(":")
+        if len(parts) == 4 and parts[0] in ("d", "g") and all(parts[1:]):
+            self.kind = "device" if parts[0] == "d" else "gateway"
+            self.typeId = parts[2]
+            self.deviceId = parts[3]
+            return True
+        if (len(parts) == 3 and parts[0] in ("a", "A") or len(parts) == 4 and parts[0] == "A") and all(parts[1:]):
+            self.kind = "application"
+            self.appId = parts[2]
+            if parts[0] == "A":
+                self.shareGroup = parts[1] + ":" + parts[2]
+            return True
+        return False
+
+    def _onPublish(self, flags, body):
+        qos = (flags >> 1) & 0x03
+        topic, offset = _readString(body, 0)
+        if qos > 0:
+            mid = body[offset : offset + 2]
+            offset += 2
+        self.readMsg += 1
+        self.broker._onMessage(
+            BrokerMessage(self.clientId, self.canonical(topic), bytes(body[offset:]), qos, bool(flags & 0x01))
+        )
+        if qos == 1:
+            self.send(_packet(PUBACK, mid))
+        elif qos == 2:
+            self.send(_packet(PUBREC, mid))
+
+    def _onSubscribe(self, body):
+        mid = body[:2]
+        offset = 2
+        granted = []
+        filters = []
+        while offset < len(body):
+            topicFilter, offset = _readString(body, offset)
+            qos = min(body[offset] & 0x03, MAX_QOS)
+            offset += 1
+            topicFilter = self.canonical(topicFilter)
+            self.subscriptions[topicFilter] = (topicFilter.split("/"), qos)
+            filters.append(topicFilter)
+            granted.append(qos)
+        self.send(_packet(SUBACK, mid + bytes(granted)))
+        self.broker._deliverRetained(self, filters)
+
+    def _onUnsubscribe(self, body):
+        mid = body[:2]
+        offset = 2
+        while offset < len(body):
+            topicFilter, offset = _readString(body, offset)
+            self.subscriptions.pop(self.canonical(topicFilter), None)
+        self.send(_packet(UNSUBACK, mid))
+
+
+class Broker(object):
+    """
+    A lightweight MQTT 3.1.1 broker that stands in for IBM Watson IoT Platform, so that device, gateway and
+    application clients can be tested, and benchmarked, end to end on one machine.  The broker listens on the
+    loopback interface without TLS and runs each connection in its own thread.
+
+    It behaves like the platform in the ways that matter to the SDK:
+
+    - Client ids identify devices (`d:`), gateways (`g:`) and applications (`a:` or `A:`), any other client id is
+      refused
+    - Applications that connect with an `A:` client id share their subscriptions with the other instances of the same
+      application, each message is delivered to one instance in turn
+    - Topics used by devices are relative to the device, so an event published by a device to
+      `iot-2/evt/status/fmt/json` is delivered to applications subscribed to `iot-2/type/+/id/+/evt/+/fmt/+`, and a
+      command published to `iot-2/type/<typeId>/id/<deviceId>/cmd/reboot/fmt/json` is delivered to the device on
+      `iot-2/cmd/reboot/fmt/json`
+    - Device and gateway connects and disconnects are published to `iot-2/type/<typeId>/id/<deviceId>/mon`, and
+      application connects and disconnects to `iot-2/app/<appId>/mon`
+    - Device management requests published to `iotdevice-1/...` are answered on `iotdm-1/.../response`, and the
+      state they describe is recorded in #DeviceRecord, see #Broker.device()
+
+    QoS 0 and 1 are supported, as are wildcard subscriptions and retained messages.  QoS 2 publications are
+    accepted, but subscriptions are granted at most QoS 1.  Sessions are not persisted and keep alive is not
+    enforced.
+
+    ```python
+    with Broker() as broker:
+        client = broker.attach(wiotp.sdk.device.DeviceClient(config))
+        client.connect()
+        client.publishEvent("status", "json", {"ok": True}, qos=1)
+        messages = broker.waitForMessages("iot-2/type/+/id/+/evt/status/fmt/json")
+    ```
+
+    # Parameters
+    host (string): Address to listen on.  Defaults to `127.0.0.1`
+    port (int): Port to listen on.  Defaults to `0`, which picks a free port
+    record (bool): Whether to record every message published to the broker, see #Broker.messages().  Disable this
+        when benchmarking.  Defaults to `True`
+    authenticate (function): Called as `authenticate(clientId, username, password)` for each connection, which is
+        refused unless it returns `True`.  Defaults to `None`, which accepts every connection
+
+    # Attributes
+    host (string): The address the broker is listening on
+    port (int): The port the broker is listening on, set once the broker has started
+    dmResponseCodes (dict): Response code to return for each kind of device management request, e.g.
+        `{"mgmt/manage": 403}`.  Requests that are not listed succeed with response code `200`
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, record=True, authenticate=None):
+        self.host = host
+        self.port = port
+        self.record = record
+        self.authenticate = authenticate
+        self.dmResponseCodes = {}
+        self.logger = logging.getLogger(self.__module__ + "." + self.__class__.__name__)
+
+        self._sessions = {}
+        self._retained = {}
+        self._devices = {}
+        self._dmPending = {}
+        self._shareTurns = {}
+        self._messages = []
+        self._lock = threading.Lock()
+        self._messagesChanged = threading.Condition(threading.Lock())
+        self._listener = None
+        self._thread = None
+
+    def start(self):
+        """
+        Start listening for connections
+
+        # Returns
+        Broker: The broker
+        """
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.host, self.port))
+        self._listener.listen(128)
+        self.port = self._listener.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, name="wiotp-testing-broker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop listening and close every connection
+        """
+        if self._listener is None:
+            return
+        listener = self._listener
+        self._listener = None
+        try:
+            listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        listener.close()
+        self._thread.join()
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.close("The connection was closed by the server.")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    def attach(self, client):
+        """
+        Point a client at the broker instead of IBM Watson IoT Platform.  The client must be configured to connect
+        without TLS, by setting `options.mqtt.port` to `1883`, and must not have connected yet.
+
+        # Parameters
+        client (wiotp.sdk.AbstractClient): The device, gateway or application client
+
+        # Returns
+        wiotp.sdk.AbstractClient: The client
+
+        # Raises
+        ConfigurationException: If the client is configured to use TLS
+        """
+        if client.tlsVersion is not None:
+            raise ConfigurationException("Clients attached to the test broker must set options.mqtt.port to 1883")
+        client.address = self.host
+        client.port = self.port
+        return client
+
+    @property
+    def clients(self):
+        """
+        The client ids of the connected clients
+        """
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def disconnectClient(self, clientId):
+        """
+        Drop a client's connection without sending it a DISCONNECT, e.g. to test reconnection
+
+        # Returns
+        bool: `True` if the client was connected
+        """
+        with self._lock:
+            session = self._sessions.get(clientId)
+        if session is None:
+            return False
+        session.close("The connection was closed by the server.")
+        return True
+
+    # -------------------------------------------------------------------------
+    # Messages
+    # -------------------------------------------------------------------------
+    def publish(self, topic, payload, qos=0, retain=False):
+        """
+        Publish a message as the platform, e.g. a command to a device or a notification to a gateway
+
+        # Parameters
+        topic (string): The absolute topic, e.g. `iot-2/type/<typeId>/id/<deviceId>/cmd/reboot/fmt/json`
+        payload (bytes|string|dict): The payload, strings are encoded as UTF-8 and dictionaries as JSON
+        qos (int): The QoS level to deliver the message with.  Defaults to `0`
+        retain (bool): Whether to retain the message.  Defaults to `False`
+        """
+        if isinstance(payload, dict):
+            payload = json.dumps(payload)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self._onMessage(BrokerMessage(None, topic, payload, qos, retain))
+
+    def messages(self, topicFilter="#"):
+        """
+        The recorded messages, in the order they were published
+
+        # Parameters
+        topicFilter (string): Only return messages whose topic matches this filter.  Defaults to `#`
+
+        # Returns
+        list<BrokerMessage>: The matching messages
+        """
+        levels = topicFilter.split("/")
+        with self._messagesChanged:
+            return [message for message in self._messages if _levelsMatch(levels, message.topic.split("/"))]
+
+    def waitForMessages(self, topicFilter="#", count=1, timeout=10):
+        """
+        Block until at least `count` messages matching `topicFilter` have been recorded
+
+        # Returns
+        list<BrokerMessage>: The matching messages, fewer than `count` if the wait timed out
+        """
+        levels = topicFilter.split("/")
+
+        def matching():
+            return [message for message in self._messages if _levelsMatch(levels, message.topic.split("/"))]
+
+        with self._messagesChanged:
+            self._messagesChanged.wait_for(lambda: len(matching()) >= count, timeout)
+            return matching()
+
+    def clearMessages(self):
+        with self._messagesChanged:
+            self._messages = []
+
+    def _onMessage(self, message):
+        if self.record:
+            with self._messagesChanged:
+                self._messages.append(message)
+                self._messagesChanged.notify_all()
+
+        if message.retain:
+            with self._lock:
+                if message.payload:
+                    self._retained[message.topic] = message
+                else:
+                    self._retained.pop(message.topic, None)
+
+        if message.topic.startswith("iotdevice-1/"):
+            self._onDeviceManagement(message)
+        self._route(message)
+
+    def _route(self, message):
+        topicLevels = message.topic.split("/")
+        with self._lock:
+            sessions = list(self._sessions.values())
+        shared = {}
+        for session in sessions:
+            qos = None
+            for levels, grantedQos in list(session.subscriptions.values()):
+                if _levelsMatch(levels, topicLevels):
+                    qos = grantedQos if qos is None else max(qos, grantedQos)
+            if qos is None:
+                continue
+            if session.shareGroup is None:
+                session.deliver(message, min(qos, message.qos))
+            else:
+                shared.setdefault(session.shareGroup, []).append((session, qos))
+        for group, members in shared.items():
+            with self._lock:
+                turn = self._shareTurns.get(group, 0)
+                self._shareTurns[group] = turn + 1
+            session, qos = members[turn % len(members)]
+            session.deliver(message, min(qos, message.qos))
+
+    def _deliverRetained(self, session, filters):
+        with self._lock:
+            retained = list(self._retained.values())
+        for message in retained:
+            topicLevels = message.topic.split("/")
+            for topicFilter in filters:
+                levels, qos = session.subscriptions[topicFilter]
+                if _levelsMatch(levels, topicLevels):
+                    session.deliver(message, min(qos, message.qos), retain=True)
+                    break
+
+    # -------------------------------------------------------------------------
+    # Connections
+    # -------------------------------------------------------------------------
+    def _accept(self):
+        while True:
+            listener = self._listener
+            if listener is None:
+                return
+            try:
+                sock, address = listener.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            session = _Session(self, sock, address)
+            threading.Thread(target=session.run, name="wiotp-testing-broker-session", daemon=True).start()
+
+    def _authenticate(self, clientId, username, password):
+        if self.authenticate is None:
+            return True
+        return bool(self.authenticate(clientId, username, password))
+
+    def _onSessionConnected(self, session):
+        with self._lock:
+            existing = self._sessions.get(session.clientId)
+            self._sessions[session.clientId] = session
+        if existing is not None:
+            existing.close("The connection was taken over by a new connection with the same client id.")
+
+    def _onSessionClosed(self, session):
+        if session.connectTime is None:
+            return
+        with self._lock:
+            if self._sessions.get(session.clientId) is session:
+                del self._sessions[session.clientId]
+        if session.will is not None:
+            topic, payload, qos, retain = session.will
+            self._onMessage(BrokerMessage(session.clientId, session.canonical(topic), payload, qos, retain))
+        self._publishStatus(session, "Disconnect")
+
+    def _publishStatus(self, session, action):
+        if session.kind == "application":
+            topic = "iot-2/app/%s/mon" % session.appId
+        else:
+            topic = "iot-2/type/%s/id/%s/mon" % (session.typeId, session.deviceId)
+        status = {
+            "Action": action,
+            "Time": _now(),
+            "ClientAddr": session.address[0],
+            "ClientID": session.clientId,
+            "Port": self.port,
+            "Protocol": "mqtt4-tcp",
+            "User": session.username,
+            "ConnectTime": session.connectTime,
+        }
+        if action == "Disconnect":
+            status.update(
+                {
+                    "Reason": session._reason,
+                    "ReadBytes": session.readBytes,
+                    "ReadMsg": session.readMsg,
+                    "WriteBytes": session.writeBytes,
+                    "WriteMsg": session.writeMsg,
+                }
+            )
+        self._onMessage(BrokerMessage(None, topic, json.dumps(status).encode("utf-8")))
+
+    # -------------------------------------------------------------------------
+    # Device management
+    # -------------------------------------------------------------------------
+    def device(self, typeId, deviceId):
+        """
+        What the broker knows about a device from its device management requests
+
+        # Returns
+        DeviceRecord: The device's record, created if the device has not published any requests
+        """
+        key = typeId + ":" + deviceId
+        with self._lock:
+            record = self._devices.get(key)
+            if record is None:
+                record = self._devices[key] = DeviceRecord(typeId, deviceId)
+            return record
+
+    def initiateDeviceManagement(self, typeId, deviceId, action, data=None):
+        """
+        Send a device management request to a device, as the platform does when a device action, firmware action
+        or device update is initiated
+
+        ```python
+        request = broker.initiateDeviceManagement("myType", "myDevice", "mgmt/initiate/device/reboot")
+        assert request.wait(5) and request.rc == 202
+        ```
+
+        # Parameters
+        typeId (string): The device type
+        deviceId (string): The device id
+        action (string): The request, relative to `iotdm-1/`, e.g. `mgmt/initiate/device/reboot`, `device/update`,
+            `observe` or `mgmt/custom/<bundleId>/<actionId>`
+        data (dict): The `d` field of the request, if any
+
+        # Returns
+        DeviceManagementRequest: Resolved when the device responds
+        """
+        request = DeviceManagementRequest(str(uuid.uuid4()))
+        message = {"reqId": request.reqId}
+        if data is not None:
+            message["d"] = data
+        with self._lock:
+            self._dmPending[request.reqId] = request
+        self.publish("iotdm-1/type/%s/id/%s/%s" % (typeId, deviceId, action), message, qos=1)
+        return request
+
+    def _onDeviceManagement(self, message):
+        levels = message.topic.split("/", 5)
+        if len(levels) < 6 or levels[1] != "type" or levels[3] != "id":
+            return
+        typeId, deviceId, request = levels[2], levels[4], levels[5]
+        try:
+            data = json.loads(message.payload.decode("utf-8"))
+        except ValueError:
+            self.logger.warning("Ignoring device management request that is not JSON on %s" % message.topic)
+            return
+
+        reqId = data.get("reqId")
+        if request == "response":
+            with self._lock:
+                pending = self._dmPending.pop(reqId, None)
+            if pending is not None:
+                pending._resolve(data)
+            return
+
+        rc = self.dmResponseCodes.get(request, 200 if request in DM_REQUESTS else 404)
+        if rc == 200:
+            record = self.device(typeId, deviceId)
+            with self._lock:
+                record._update(request, data.get("d", {}))
+        if reqId is not None:
+            self.publish("iotdm-1/type/%s/id/%s/response" % (typeId, deviceId), {"rc": rc, "reqId": reqId}, qos=1)
@@ -0,0 +1,136 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import sys
+from functools import lru_cache
+
+# Number of distinct topics, and of distinct devices, remembered by the parser
+CACHE_SIZE = 65536
+
+# Kinds of topic recognised by parseTopic()
+DEVICE_EVENT = "deviceEvent"
+DEVICE_COMMAND = "deviceCommand"
+DEVICE_STATUS = "deviceStatus"
+DEVICE_STATE = "deviceState"
+DEVICE_ERROR = "deviceError"
+DEVICE_NOTIFY = "deviceNotify"
+THING_STATE = "thingState"
+THING_ERROR = "thingError"
+APP_STATUS = "appStatus"
+# Commands received by a device, which carry no type or device id (`iot-2/cmd/<commandId>/fmt/<format>`)
+COMMAND = "command"
+# Events published by a device, which carry no type or device id (`iot-2/evt/<eventId>/fmt/<format>`)
+EVENT = "event"
+
+
+class ParsedTopic(object):
+    """
+    The components of a Watson IoT Platform topic.  Instances are cached and shared between every message received
+    on the same topic, so must not be modified.
+
+    # Attributes
+    kind (string): What the topic carries, one of the kind constants defined in this module
+    typeId (string): The device or thing type, `None` for topics that are not specific to a device
+    deviceId (string): The device or thing id, `None` for topics that are not specific to a device
+    device (string): `typeId:deviceId`, shared by every topic of the same device
+    name (string): The eventId, commandId or logicalInterfaceId, or the appId of an application status topic
+    format (string): The message format, for event and command topics
+    """
+
+    __slots__ = ("kind", "typeId", "deviceId", "device", "name", "format")
+
+    def __init__(self, kind, typeId=None, deviceId=None, device=None, name=None, format=None):
+        self.kind = kind
+        self.typeId = typeId
+        self.deviceId = deviceId
+        self.device = device
+        self.name = name
+        self.format = format
+
+    def __repr__(self):
+        return "ParsedTopic(%s, device=%s, name=%s, format=%s)" % (self.kind, self.device, self.name, self.format)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _device(typeId, deviceId):
+    return sys.intern(typeId + ":" + deviceId)
+
+
+def _topic(kind, typeId, deviceId, name=None, format=None):
+    typeId = sys.intern(typeId)
+    deviceId = sys.intern(deviceId)
+    if name is not None:
+        name = sys.intern(name)
+    if format is not None:
+        format = sys.intern(format)
+    return ParsedTopic(kind, typeId, deviceId, _device(typeId, deviceId), name, format)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parseTopic(topic):
+    """
+    Classify a topic that a message was received on by splitting it into its levels, rather than matching it
+    against a regular expression for each kind of topic.  Results are cached, so every message received on the
+    same topic shares a single #ParsedTopic, and every topic for the same device shares the same strings.
+
+    # Parameters
+    topic (string): The MQTT topic
+
+    # Returns
+    ParsedTopic: The components of the topic, or `None` if it is not a recognised Watson IoT Platform topic
+    """
+    levels = topic.split("/")
+    count = len(levels)
+    if levels[0] != "iot-2" or count < 4 or "" in levels:
+        return None
+
+    if levels[1] == "cmd":
+        if count == 5 and levels[3] == "fmt":
+            return ParsedTopic(COMMAND, name=sys.intern(levels[2]), format=sys.intern(levels[4]))
+        return None
+
+    if levels[1] == "evt":
+        if count == 5 and levels[3] == "fmt":
+            return ParsedTopic(EVENT, name=sys.intern(levels[2]), format=sys.intern(levels[4]))
+        return None
+
+    if levels[1] == "app":
+        if count == 4 and levels[3] == "mon":
+            return ParsedTopic(APP_STATUS, name=sys.intern(levels[2]))
+        return None
+
+    if levels[1] == "thing":
+        if count < 8 or levels[2] != "type" or levels[4] != "id":
+            return None
+        typeId, thingId = levels[3], levels[5]
+        if count == 8 and levels[6] == "err" and levels[7] == "data":
+            return _topic(THING_ERROR, typeId, thingId)
+        if count == 10 and levels[6] == "intf" and levels[8] == "evt" and levels[9] == "state":
+            return _topic(THING_STATE, typeId, thingId, levels[7])
+        return None
+
+    if count < 6 or levels[1] != "type" or levels[3] != "id":
+        return None
+    typeId, deviceId = levels[2], levels[4]
+    if count == 9:
+        if levels[7] == "fmt":
+            if levels[5] == "evt":
+                return _topic(DEVICE_EVENT, typeId, deviceId, levels[6], levels[8])
+            if levels[5] == "cmd":
+                return _topic(DEVICE_COMMAND, typeId, deviceId, levels[6], levels[8])
+        elif levels[5] == "intf" and levels[7] == "evt" and levels[8] == "state":
+            return _topic(DEVICE_STATE, typeId, deviceId, levels[6])
+    elif count == 6:
+        if levels[5] == "mon":
+            return _topic(DEVICE_STATUS, typeId, deviceId)
+        if levels[5] == "notify":
+            return _topic(DEVICE_NOTIFY, typeId, deviceId)
+    elif count == 7 and levels[5] == "err" and levels[6] == "data":
+        return _topic(DEVICE_ERROR, typeId, deviceId)
+    return None
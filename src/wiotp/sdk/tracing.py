@@ -0,0 +1,147 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+# Span names
+PUBLISH = "wiotp.publish"
+RECEIVE = "wiotp.receive"
+CALLBACK = "wiotp.callback"
+
+# Span attributes
+TOPIC = "mqtt.topic"
+MID = "mqtt.mid"
+QOS = "mqtt.qos"
+SIZE = "mqtt.size"
+EVENT = "wiotp.event"
+FORMAT = "wiotp.format"
+COUNT = "wiotp.batch.count"
+
+
+class Span(object):
+    """
+    A timed operation, e.g. the delivery of a published message.  This base class does nothing and is what the
+    default #Tracer returns, tracers that record spans return their own subclass.
+    """
+
+    __slots__ = ()
+
+    def setAttribute(self, key, value):
+        pass
+
+    def addEvent(self, name):
+        """
+        Record that a step of the operation has completed, e.g. `encoded` or `sent`
+        """
+        pass
+
+    def recordError(self, error):
+        """
+        Record that the operation failed
+
+        # Parameters
+        error (Exception|string): The exception, or a description of the failure
+        """
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = Span()
+
+
+class Tracer(object):
+    """
+    Creates the spans that a client records around publishing and receiving messages, set as `client.tracer`.
+    This base class does nothing, so tracing costs next to nothing unless a tracer is set.  Subclass it to send
+    spans to a tracing system, or use #OpenTelemetryTracer.
+
+    The client records these spans:
+
+    - `wiotp.publish`: From an event being published until it is confirmed, with events `encoded` and `sent`
+      (or `spooled`) and attributes `mqtt.topic`, `mqtt.qos`, `mqtt.size`, `mqtt.mid`, `wiotp.event` and
+      `wiotp.format`
+    - `wiotp.receive`: From a message being received until it has been decoded and handled by your callback,
+      with attributes `mqtt.topic`, `mqtt.qos`, `mqtt.size` and `mqtt.mid`
+    - `wiotp.callback`: A child of `wiotp.receive` covering your device event or command callback
+
+    Publish spans end on the thread that receives the confirmation, which is not the thread that started them.
+    """
+
+    def startSpan(self, name, attributes=None, parent=None):
+        """
+        Start a span
+
+        # Parameters
+        name (string): Name of the span, one of `wiotp.publish`, `wiotp.receive` or `wiotp.callback`
+        attributes (dict): Initial attributes of the span.  Values may be `None` if they are not known
+        parent (Span): The span that this span is part of, `None` for a new trace
+
+        # Returns
+        Span: The new span
+        """
+        return NOOP_SPAN
+
+
+class _OpenTelemetrySpan(Span):
+    __slots__ = ("span",)
+
+    def __init__(self, span):
+        self.span = span
+
+    def setAttribute(self, key, value):
+        if value is not None:
+            self.span.set_attribute(key, value)
+
+    def addEvent(self, name):
+        self.span.add_event(name)
+
+    def recordError(self, error):
+        from opentelemetry.trace import Status, StatusCode
+
+        if isinstance(error, BaseException):
+            self.span.record_exception(error)
+        self.span.set_status(Status(StatusCode.ERROR, str(error)))
+
+    def end(self):
+        self.span.end()
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Records spans with [OpenTelemetry](https://opentelemetry.io).  OpenTelemetry is not a dependency of the SDK,
+    it is only imported once a span is recorded.
+
+    ```python
+    from opentelemetry import trace
+    client.tracer = wiotp.sdk.tracing.OpenTelemetryTracer(trace.get_tracer("my.service"))
+    ```
+
+    # Parameters
+    tracer (opentelemetry.trace.Tracer): The tracer to create spans with
+    """
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def startSpan(self, name, attributes=None, parent=None):
+        from opentelemetry import trace
+
+        if name == PUBLISH:
+            kind = trace.SpanKind.PRODUCER
+        elif name == RECEIVE:
+            kind = trace.SpanKind.CONSUMER
+        else:
+            kind = trace.SpanKind.INTERNAL
+
+        context = None
+        if isinstance(parent, _OpenTelemetrySpan):
+            context = trace.set_span_in_context(parent.span)
+        if attributes:
+            attributes = {key: value for key, value in attributes.items() if value is not None}
+        return _OpenTelemetrySpan(self.tracer.start_span(name, context=context, kind=kind, attributes=attributes))
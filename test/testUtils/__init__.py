@@ -8,6 +8,7 @@
 # *****************************************************************************
 
 import wiotp.sdk.application
+import paho.mqtt.client as paho
 import pytest
 import os
 
@@ -17,6 +18,54 @@ oneJobOnlyTest = pytest.mark.skipif(
 )
 
 
+class FakePublisher(object):
+    """
+    Stands in for paho.Client.publish(), recording each message and optionally acknowledging it
+    before the call returns (emulating the Paho network thread winning the race with the publisher)
+    """
+
+    def __init__(self, client, ackInline=False):
+        self.client = client
+        self.ackInline = ackInline
+        self.messages = []
+        self.mid = 0
+
+    def __call__(self, topic, payload=None, qos=0, retain=False):
+        self.mid += 1
+        self.messages.append((self.mid, topic, payload, qos))
+        if self.ackInline:
+            self.client._onPublish(None, None, self.mid)
+        return (paho.MQTT_ERR_SUCCESS, self.mid)
+
+    def ackAll(self):
+        for message in self.messages:
+            self.client._onPublish(None, None, message[0])
+
+
+def createClient(cls, ackInline=False, options=None, connected=True):
+    """
+    Create a device or gateway client that publishes to a #FakePublisher rather than a broker.  The `mqtt` settings
+    in `options` are added to the default `{"port": 1883}`, any other options are used as they are.
+    """
+    config = {"mqtt": {"port": 1883}}
+    for key, value in (options or {}).items():
+        if key == "mqtt":
+            config["mqtt"].update(value)
+        else:
+            config[key] = value
+    client = cls(
+        {
+            "identity": {"orgId": "myorg", "typeId": "mytype", "deviceId": "mydevice"},
+            "auth": {"token": "mytoken"},
+            "options": config,
+        }
+    )
+    client.client.publish = FakePublisher(client, ackInline)
+    if connected:
+        client.connectEvent.set()
+    return client
+
+
 class AbstractTest(object):
 
     WIOTP_API_KEY = os.getenv("WIOTP_API_KEY")
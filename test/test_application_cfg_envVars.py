@@ -37,3 +37,47 @@ class TestApplication(testUtils.AbstractTest):
             os.environ["WIOTP_OPTIONS_LOGLEVEL"] = "notALogLevel"
             wiotp.sdk.application.parseEnvVars()
         assert e.value.reason == "WIOTP_OPTIONS_LOGLEVEL must be one of error, warning, info, debug"
+
+    def testInboundCapacityEnvVarNotInteger(self, manageEnvVars, monkeypatch):
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            monkeypatch.setenv("WIOTP_OPTIONS_INBOUND_CAPACITY", "notANumber")
+            wiotp.sdk.application.parseEnvVars()
+        assert e.value.reason == "WIOTP_OPTIONS_INBOUND_CAPACITY must be a number"
+
+    def testInboundEnvVars(self, manageEnvVars, monkeypatch):
+        monkeypatch.setenv("WIOTP_AUTH_KEY", "a-myOrg-myKey")
+        monkeypatch.setenv("WIOTP_OPTIONS_INBOUND_ENABLED", "true")
+        monkeypatch.setenv("WIOTP_OPTIONS_INBOUND_OVERFLOW", "dropNewest")
+        config = wiotp.sdk.application.parseEnvVars()
+        assert config.inboundEnabled == True
+        assert config.inboundCapacity == 1000
+        assert config.inboundOverflow == "dropNewest"
+        assert config.inboundPath is None
+
+    def testBackpressureTimeoutEnvVarNotNumber(self, manageEnvVars, monkeypatch):
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            monkeypatch.setenv("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT", "notANumber")
+            wiotp.sdk.application.parseEnvVars()
+        assert e.value.reason == "WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT must be a number"
+
+    def testBackpressureTimeoutEnvVar(self, manageEnvVars, monkeypatch):
+        monkeypatch.setenv("WIOTP_AUTH_KEY", "a-myOrg-myKey")
+        monkeypatch.setenv("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT", "2.5")
+        assert wiotp.sdk.application.parseEnvVars().backpressureTimeout == 2.5
+        assert (
+            wiotp.sdk.application.ApplicationClientConfig(
+                identity={"appId": "myApp"},
+                auth={"key": "a-myOrg-myKey", "token": "myToken"},
+                options={"mqtt": {"backpressureTimeout": 0.5}},
+            ).backpressureTimeout
+            == 0.5
+        )
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            wiotp.sdk.application.ApplicationClientConfig(
+                identity={"appId": "myApp"},
+                auth={"key": "a-myOrg-myKey", "token": "myToken"},
+                options={"mqtt": {"backpressureTimeout": -1}},
+            )
+        assert (
+            e.value.reason == "Optional setting options.mqtt.backpressureTimeout must be a positive number if provided"
+        )
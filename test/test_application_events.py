@@ -0,0 +1,156 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import asyncio
+import threading
+
+import testUtils
+import wiotp.sdk.application
+import paho.mqtt.client as paho
+
+
+def createApplication(cls=wiotp.sdk.application.ApplicationClient):
+    client = cls(
+        {
+            "identity": {"appId": "myapp"},
+            "auth": {"key": "a-myorg-key", "token": "t"},
+            "options": {"mqtt": {"port": 1883}},
+        }
+    )
+    client.connectEvent.set()
+    return client
+
+
+def receive(client, i, deviceId="d"):
+    pahoMessage = paho.MQTTMessage(mid=1, topic=("iot-2/type/t/id/%s/evt/reading/fmt/json" % deviceId).encode("utf-8"))
+    pahoMessage.payload = b'{"i": %d}' % i
+    client.client._handle_on_message(pahoMessage)
+
+
+def receiveRaw(client, topic, payload):
+    pahoMessage = paho.MQTTMessage(mid=1, topic=topic.encode("utf-8"))
+    pahoMessage.payload = payload
+    client.client._handle_on_message(pahoMessage)
+
+
+def values(items):
+    return [event.data["i"] for event in items]
+
+
+class TestApplicationEvents(testUtils.AbstractTest):
+    def testEvents(self):
+        client = createApplication()
+        events = client.events(timeout=0.05)
+        assert client.deviceEventCallback is not None
+        for i in range(3):
+            receive(client, i)
+
+        assert values(events) == [0, 1, 2]
+        assert client.deviceEventCallback is None
+
+    def testBatches(self):
+        client = createApplication()
+        events = client.events(timeout=0.05, maxBatch=2)
+        for i in range(5):
+            receive(client, i)
+
+        batches = list(events)
+        assert [values(batch) for batch in batches] == [[0, 1], [2, 3], [4]]
+
+    def testBackpressure(self):
+        client = createApplication()
+        events = client.events(timeout=5, maxQueued=2)
+        producer = threading.Thread(target=lambda: [receive(client, i) for i in range(5)])
+        producer.start()
+        producer.join(0.1)
+        assert producer.is_alive()
+
+        received = [next(events).data["i"] for i in range(5)]
+        producer.join(5)
+        assert received == [0, 1, 2, 3, 4]
+        events.close()
+        assert client.deviceEventCallback is None
+
+    def testReplacedCallbackIsNotCleared(self):
+        client = createApplication()
+        events = client.events(timeout=0.01)
+        callback = lambda event: None
+        client.deviceEventCallback = callback
+        assert list(events) == []
+        assert client.deviceEventCallback is callback
+
+    def testAsyncEventsFromNetworkThread(self):
+        client = createApplication()
+
+        async def consume():
+            events = client.aevents(timeout=1, maxBatch=10)
+            producer = threading.Thread(target=lambda: [receive(client, i, "d%d" % (i % 3)) for i in range(30)])
+            producer.start()
+            received = []
+            async for batch in events:
+                assert 1 <= len(batch) <= 10
+                received.extend(values(batch))
+                if len(received) == 30:
+                    break
+            await events.aclose()
+            producer.join()
+            return received
+
+        assert asyncio.run(consume()) == list(range(30))
+        assert client.deviceEventCallback is None
+
+    def testAsyncEventsTimeout(self):
+        client = createApplication()
+
+        async def consume():
+            return [event async for event in client.aevents(timeout=0.05)]
+
+        assert asyncio.run(consume()) == []
+
+    def testAsyncClient(self):
+        client = createApplication(wiotp.sdk.application.AsyncApplicationClient)
+
+        async def consume():
+            events = client.aevents(timeout=0.05, maxBatch=100, maxQueued=1)
+            for i in range(5):
+                receive(client, i)
+            return [values(batch) async for batch in events]
+
+        assert asyncio.run(consume()) == [[0, 1, 2, 3, 4]]
+
+    def testInvalidPayloadRaisedFromCallbackIsReported(self):
+        client = createApplication()
+        eventIds = []
+        data = []
+        client.deviceEventCallback = lambda event: data.append(event.data["i"])
+        receiveRaw(client, "iot-2/type/t/id/d/evt/reading/fmt/json", b"not json")
+        receive(client, 1)
+        assert data == [1]
+        assert client.metrics.snapshot()["decodeFailures"] == {"InvalidEventException": 1}
+
+        # A callback that never reads the data never decodes it
+        client.deviceEventCallback = lambda event: eventIds.append((event.eventId, event._message))
+        receiveRaw(client, "iot-2/type/t/id/d/evt/reading/fmt/json", b"not json")
+        assert eventIds == [("reading", None)]
+        assert client.metrics.snapshot()["decodeFailures"] == {"InvalidEventException": 1}
+
+    def testDecodeEagerly(self):
+        client = createApplication()
+        client.decodeEagerly = True
+        events = []
+        commands = []
+        client.deviceEventCallback = events.append
+        client.deviceCommandCallback = commands.append
+        receiveRaw(client, "iot-2/type/t/id/d/evt/reading/fmt/json", b"not json")
+        receiveRaw(client, "iot-2/type/t/id/d/cmd/reboot/fmt/json", b"not json")
+        receive(client, 1)
+
+        assert values(events) == [1]
+        assert commands == []
+        assert client.metrics.snapshot()["decodeFailures"] == {"InvalidEventException": 2}
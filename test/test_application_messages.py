@@ -171,3 +171,55 @@ class TestApplicationMsgCom(testUtils.AbstractTest):
             messageEncoderModules = {"json": wiotp.sdk.JsonCodec()}
             command = wiotp.sdk.application.Command(pahoMessage, messageEncoderModules)
         assert e.value.reason == "Received device event on invalid topic: iot-2/type/1/id/2/evt/3/fmt/json"
+
+
+class CountingCodec(wiotp.sdk.JsonCodec):
+    decoded = 0
+
+    @staticmethod
+    def decode(message):
+        CountingCodec.decoded += 1
+        return wiotp.sdk.JsonCodec.decode(message)
+
+
+class FakeConnectStatus:
+    topic = "iot-2/type/typeid/id/deviceid/mon"
+    payload = b'{"Action": "Connect", "ClientID": "d:org:typeid:deviceid", "Time": "2014-07-07T06:37:56.494-04:00"}'
+    retain = True
+
+
+class TestApplicationMsgLazy(testUtils.AbstractTest):
+    def testEventDecodedOnAccess(self):
+        CountingCodec.decoded = 0
+        event = wiotp.sdk.application.Event(FakePahoMessageEvent(), {"json": CountingCodec})
+        assert event.eventId == "3"
+        assert event.payload == b'{"a":4}'
+        assert CountingCodec.decoded == 0
+
+        assert event.data == {"a": 4}
+        assert event.timestamp is not None
+        assert CountingCodec.decoded == 1
+
+    def testInvalidPayloadRaisesOnAccess(self):
+        pahoMessage = FakePahoMessageEvent()
+        pahoMessage.payload = b"{sss,eee}"
+        event = wiotp.sdk.application.Event(pahoMessage, {"json": wiotp.sdk.JsonCodec})
+        with pytest.raises(wiotp.sdk.InvalidEventException):
+            event.data
+
+    def testSlots(self):
+        event = wiotp.sdk.application.Event(FakePahoMessageEvent(), {"json": wiotp.sdk.JsonCodec})
+        command = wiotp.sdk.application.Command(FakePahoMessageCommand(), {"json": wiotp.sdk.JsonCodec})
+        for message in (event, command, wiotp.sdk.application.Status(FakeMessageStatus())):
+            assert not hasattr(message, "__dict__")
+
+    def testStatusFields(self):
+        status = wiotp.sdk.application.Status(FakeConnectStatus())
+        assert status.device == "typeid:deviceid"
+        assert status.retained
+        assert status.action == "Connect"
+        assert status.clientId == "d:org:typeid:deviceid"
+        assert status.time.year == 2014
+        assert status.time is status.time
+        assert status.connectTime is None
+        assert status.reason is None
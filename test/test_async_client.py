@@ -0,0 +1,83 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import asyncio
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+import wiotp.sdk.gateway
+
+
+def createClient(cls, ackInline=False):
+    client = testUtils.createClient(cls, ackInline)
+    client.loop = asyncio.get_running_loop()
+    return client
+
+
+class TestAsyncClient(testUtils.AbstractTest):
+    def testPublishEventResolvesOnAck(self):
+        async def run():
+            client = createClient(wiotp.sdk.device.AsyncDeviceClient)
+            future = client.publishEvent("status", "json", {"a": 1}, qos=1)
+            assert not future.done()
+            client.client.publish.ackAll()
+            assert await asyncio.wait_for(future, timeout=1) == True
+
+        asyncio.run(run())
+
+    def testPublishEventAckedInline(self):
+        async def run():
+            client = createClient(wiotp.sdk.gateway.AsyncGatewayClient, ackInline=True)
+            calls = []
+            result = await client.publishDeviceEvent("t", "d", "status", "json", {}, onPublish=lambda: calls.append(1))
+            assert result == True
+            assert calls == [1]
+
+        asyncio.run(run())
+
+    def testPublishEventDisconnected(self):
+        async def run():
+            client = createClient(wiotp.sdk.device.AsyncDeviceClient)
+            client.connectEvent.clear()
+            assert await client.publishEvent("status", "json", {}) == False
+            assert client.client.publish.messages == []
+
+        asyncio.run(run())
+
+    def testPublishEventsResolvesToBatch(self):
+        async def run():
+            client = createClient(wiotp.sdk.device.AsyncDeviceClient)
+            future = client.publishEvents([("status", "json", i) for i in range(3)], qos=1)
+            client.client.publish.ackAll()
+            batch = await asyncio.wait_for(future, timeout=1)
+            assert batch.acked == 3
+
+        asyncio.run(run())
+
+    def testCommandIterator(self):
+        class FakeCommand:
+            topic = "iot-2/cmd/reboot/fmt/json"
+            payload = b'{"delay": 5}'
+
+        async def run():
+            client = createClient(wiotp.sdk.device.AsyncDeviceClient)
+            commands = client.commands()
+            client._onCommand(None, None, FakeCommand())
+            client._onCommand(None, None, FakeCommand())
+            received = []
+            async for command in commands:
+                received.append(command)
+                if len(received) == 2:
+                    break
+            await commands.aclose()
+            assert [c.commandId for c in received] == ["reboot", "reboot"]
+            assert received[0].data == {"delay": 5}
+            assert client.commandCallback is None
+
+        asyncio.run(run())
@@ -0,0 +1,169 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+import paho.mqtt.client as paho
+
+from wiotp.sdk import InvalidEventException, BatchCodec, JsonCodec
+from wiotp.sdk.messages import CodecRegistry
+
+START = datetime(2024, 5, 1, 12, 0, 0, tzinfo=pytz.utc)
+
+
+class DummyPahoMessage(object):
+    def __init__(self, payload, topic="iot-2/type/mytype/id/mydevice/evt/vibration/fmt/batch"):
+        self.payload = payload
+        self.topic = topic
+        self.qos = 0
+        self.retain = False
+
+
+def readings(count):
+    return [(START + timedelta(milliseconds=10 * i), {"x": i, "y": -i, "ok": i % 2 == 0}) for i in range(count)]
+
+
+def createApplication():
+    return wiotp.sdk.application.ApplicationClient(
+        {"identity": {"appId": "batchtest"}, "auth": {"key": "a-myorg-abcdefgh", "token": "mytoken"}}
+    )
+
+
+class TestCodecBatch(testUtils.AbstractTest):
+    def testRoundTrip(self):
+        data = readings(100)
+        message = BatchCodec.decode(DummyPahoMessage(BatchCodec.encode(data)))
+        assert message.data == data
+
+    def testEnvelope(self):
+        envelope = json.loads(BatchCodec.encode(readings(3)))
+        assert envelope == {
+            "t": 1714564800000,
+            "k": ["x", "y", "ok"],
+            "s": [[0, 1, 2]],
+            "r": [[0, 0, 0, 0, True], [10, 0, 1, -1, False], [10, 0, 2, -2, True]],
+        }
+
+    def testSmallerThanEvents(self):
+        data = readings(100)
+        events = sum(len(JsonCodec.encode(dict(reading, time=t.isoformat()))) for (t, reading) in data)
+        assert len(BatchCodec.encode(data)) < events / 2
+
+    def testMixedKeys(self):
+        data = [(START, {"a": 1}), (START, {"a": 2, "b": None}), (START - timedelta(seconds=1), {"b": "x"})]
+        envelope = json.loads(BatchCodec.encode(data))
+        assert envelope["k"] == ["a", "b"]
+        assert envelope["s"] == [[0], [0, 1], [1]]
+        assert BatchCodec.decode(DummyPahoMessage(BatchCodec.encode(data))).data == data
+
+    def testTimestamps(self):
+        naive = datetime(2024, 5, 1, 12, 0, 0, 123000)
+        epoch = 1714564800.5
+        data = BatchCodec.decode(DummyPahoMessage(BatchCodec.encode([(naive, {}), (epoch, {})]))).data
+        assert data[0][0] == pytz.utc.localize(naive)
+        assert data[1][0] == datetime(2024, 5, 1, 12, 0, 0, 500000, tzinfo=pytz.utc)
+
+    def testEmpty(self):
+        assert BatchCodec.decode(DummyPahoMessage(BatchCodec.encode([]))).data == []
+
+    def testInvalid(self):
+        with pytest.raises(InvalidEventException):
+            BatchCodec.encode([(START, [1, 2])])
+        for payload in [
+            b"not json",
+            b"{}",
+            b'{"t": 0, "k": [], "s": [[0]], "r": []}',
+            b'{"t": 0, "k": ["a"], "s": [[0]], "r": [[0, 0]]}',
+        ]:
+            with pytest.raises(InvalidEventException):
+                BatchCodec.decode(DummyPahoMessage(payload))
+
+    def testDevicePublishReadings(self):
+        client = wiotp.sdk.device.DeviceClient(
+            {
+                "identity": {"orgId": "myorg", "typeId": "mytype", "deviceId": "mydevice"},
+                "auth": {"token": "mytoken"},
+                "options": {"mqtt": {"port": 1883}},
+            }
+        )
+        published = []
+        client.client.publish = lambda topic, payload=None, qos=0, retain=False: (
+            published.append((topic, payload, qos)) or (paho.MQTT_ERR_SUCCESS, len(published))
+        )
+        client.connectEvent.set()
+
+        assert client.publishReadings("vibration", readings(5), qos=1)
+        assert client.publishReadings("vibration", readings(5), msgFormat="batch-deflate")
+        assert published[0][0] == "iot-2/evt/vibration/fmt/batch"
+        assert published[0][2] == 1
+        assert BatchCodec.decode(DummyPahoMessage(published[0][1])).data == readings(5)
+        assert published[1][0] == "iot-2/evt/vibration/fmt/batch-deflate"
+
+    def testApplicationEventPerReading(self):
+        client = createApplication()
+        received = []
+        client.deviceEventCallback = received.append
+
+        client._onDeviceEvent(None, None, DummyPahoMessage(BatchCodec.encode(readings(3))))
+        assert [(event.timestamp, event.data) for event in received] == readings(3)
+        for event in received:
+            assert isinstance(event, wiotp.sdk.application.BatchedEvent)
+            assert event.device == "mytype:mydevice"
+            assert event.eventId == "vibration"
+            assert event.format == "batch"
+            assert not event.batched
+
+        received.clear()
+        client._onDeviceEvent(None, None, DummyPahoMessage(b'{"x": 1}', "iot-2/type/t/id/d/evt/e/fmt/json"))
+        assert len(received) == 1
+        assert received[0].data == {"x": 1}
+
+    def testApplicationBatchCallback(self):
+        client = createApplication()
+        batches = []
+        events = []
+        client.deviceEventCallback = events.append
+        client.deviceEventBatchCallback = batches.append
+
+        client._onDeviceEvent(None, None, DummyPahoMessage(BatchCodec.encode(readings(4))))
+        assert events == []
+        assert len(batches) == 1
+        batch = batches[0]
+        assert isinstance(batch, wiotp.sdk.application.EventBatch)
+        assert batch.batched
+        assert len(batch) == 4
+        assert batch.data == readings(4)
+        assert [event.data for event in batch] == [reading for (t, reading) in readings(4)]
+
+    def testApplicationCompressedBatch(self):
+        client = createApplication()
+        received = []
+        client.deviceEventCallback = received.append
+        payload = client.getMessageCodec("batch-deflate").encode(readings(50))
+        client._onDeviceEvent(None, None, DummyPahoMessage(payload, "iot-2/type/t/id/d/evt/e/fmt/batch-deflate"))
+        assert len(received) == 50
+
+    def testApplicationInvalidBatch(self):
+        client = createApplication()
+        received = []
+        client.deviceEventCallback = received.append
+        client._onDeviceEvent(None, None, DummyPahoMessage(b"not json"))
+        assert received == []
+
+    def testEventBatchFromRegistry(self):
+        batch = wiotp.sdk.application.EventBatch(
+            DummyPahoMessage(BatchCodec.encode(readings(2))), CodecRegistry(batch=BatchCodec)
+        )
+        assert batch.events[1].timestamp == readings(2)[1][0]
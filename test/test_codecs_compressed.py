@@ -0,0 +1,145 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import zlib
+
+import pytest
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+
+from wiotp.sdk import InvalidEventException, CompressedCodec, JsonCodec, RawCodec, Utf8Codec
+from wiotp.sdk.messages import CodecRegistry, registerCompression, COMPRESSIONS
+
+
+class DummyPahoMessage(object):
+    def __init__(self, payload, topic="iot-2/type/mytype/id/mydevice/evt/reading/fmt/json-deflate"):
+        self.payload = payload
+        self.topic = topic
+        self.qos = 0
+        self.retain = False
+
+
+def readings(count):
+    return {"readings": [{"temperature": 21.5, "humidity": 40, "seq": i} for i in range(count)]}
+
+
+class TestCodecCompressed(testUtils.AbstractTest):
+    def testRoundTripCompressed(self):
+        codec = CompressedCodec(JsonCodec)
+        data = readings(50)
+        payload = codec.encode(data)
+        assert payload[0:1] == b"\x01"
+        assert len(payload) < len(JsonCodec.encode(data)) / 4
+        assert codec.decode(DummyPahoMessage(payload)).data == data
+
+    def testBelowThreshold(self):
+        codec = CompressedCodec(JsonCodec, threshold=1024)
+        data = readings(1)
+        payload = codec.encode(data)
+        assert payload == b"\x00" + JsonCodec.encode(data).encode("utf-8")
+        assert codec.decode(DummyPahoMessage(payload)).data == data
+
+    def testIncompressible(self):
+        codec = CompressedCodec(RawCodec, threshold=0)
+        data = bytearray(zlib.compress(bytes(range(256)) * 4))
+        payload = codec.encode(data)
+        assert payload[0:1] == b"\x00"
+        assert codec.decode(DummyPahoMessage(bytearray(payload))).data == data
+
+    def testRawPayloadType(self):
+        codec = CompressedCodec(RawCodec, threshold=0)
+        data = bytearray(b"abc" * 200)
+        message = codec.decode(DummyPahoMessage(bytearray(codec.encode(data))))
+        assert isinstance(message.data, bytearray)
+        assert message.data == data
+
+    def testAlgorithms(self):
+        for compression in ["deflate", "gzip", "bz2", "lzma"]:
+            codec = CompressedCodec(Utf8Codec, compression, threshold=0)
+            data = "hello world " * 100
+            assert codec.decode(DummyPahoMessage(codec.encode(data))).data == data
+
+    def testUnsupportedAlgorithm(self):
+        with pytest.raises(ValueError):
+            CompressedCodec(JsonCodec, "snappy")
+
+    def testRegisterCompression(self):
+        registerCompression("deflate9", lambda data: zlib.compress(data, 9), zlib.decompress)
+        try:
+            registry = CodecRegistry(json=JsonCodec)
+            codec = registry["json-deflate9"]
+            payload = codec.encode(readings(50))
+            assert payload[0:1] == b"\x01"
+            assert codec.decode(DummyPahoMessage(payload)).data == readings(50)
+        finally:
+            del COMPRESSIONS["deflate9"]
+
+    def testInvalid(self):
+        codec = CompressedCodec(JsonCodec)
+        with pytest.raises(InvalidEventException):
+            codec.decode(DummyPahoMessage(b"\x01not deflated"))
+        with pytest.raises(InvalidEventException):
+            codec.decode(DummyPahoMessage(b"\x07{}"))
+        with pytest.raises(InvalidEventException):
+            codec.decode(DummyPahoMessage(b""))
+
+    def testRegistry(self):
+        registry = CodecRegistry(json=JsonCodec)
+        assert "json-deflate" in registry
+        assert "json-snappy" not in registry
+        assert "utf8-deflate" not in registry
+        assert "json" in registry
+        codec = registry["json-gzip"]
+        assert isinstance(codec, CompressedCodec)
+        assert codec.codec is JsonCodec
+        assert codec.compression == "gzip"
+        assert registry["json-gzip"] is codec
+        with pytest.raises(KeyError):
+            registry["xml-gzip"]
+
+    def testRegistryRederivesReplacedCodec(self):
+        registry = CodecRegistry()
+        registry["json"] = JsonCodec
+        assert registry["json-deflate"].codec is JsonCodec
+        registry["json"] = Utf8Codec
+        assert registry["json-deflate"].codec is Utf8Codec
+
+    def testClientDerivesFormat(self):
+        client = wiotp.sdk.device.DeviceClient(
+            {
+                "identity": {"orgId": "myorg", "typeId": "mytype", "deviceId": "mydevice"},
+                "auth": {"token": "mytoken"},
+                "options": {"mqtt": {"port": 1883}},
+            }
+        )
+        codec = client.getMessageCodec("json-deflate")
+        assert isinstance(codec, CompressedCodec)
+        assert codec.codec is JsonCodec
+        assert client.getMessageCodec("nosuchformat-deflate") is None
+
+        custom = CompressedCodec(JsonCodec, threshold=0)
+        client.setMessageCodec("json-deflate", custom)
+        assert client.getMessageCodec("json-deflate") is custom
+
+    def testApplicationEvent(self):
+        data = readings(20)
+        payload = CompressedCodec(JsonCodec).encode(data)
+        event = wiotp.sdk.application.Event(DummyPahoMessage(payload), CodecRegistry(json=JsonCodec))
+        assert event.format == "json-deflate"
+        assert event.payload == payload
+        assert event.data == data
+
+    def testApplicationCommand(self):
+        message = DummyPahoMessage(
+            CompressedCodec(JsonCodec, threshold=0).encode({"reboot": True}),
+            "iot-2/type/mytype/id/mydevice/cmd/reboot/fmt/json-lzma",
+        )
+        command = wiotp.sdk.application.Command(message, CodecRegistry(json=JsonCodec))
+        assert command.data == {"reboot": True}
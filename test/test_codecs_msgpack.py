@@ -0,0 +1,57 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+from datetime import datetime
+
+import pytest
+import pytz
+import testUtils
+import wiotp.sdk.device
+
+from wiotp.sdk import InvalidEventException, MsgPackCodec
+
+msgpack = pytest.importorskip("msgpack")
+
+
+class DummyPahoMessage(object):
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class TestCodecMsgPack(testUtils.AbstractTest):
+    def testRoundTrip(self):
+        data = {"temp": 21.5, "count": 3, "ok": True, "tags": ["a", "b"], "none": None, "nested": {"name": "café"}}
+        message = MsgPackCodec.decode(DummyPahoMessage(MsgPackCodec.encode(data, None)))
+        assert message.data == data
+        assert message.timestamp is not None
+
+    def testDatetime(self):
+        aware = datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=pytz.utc)
+        naive = datetime(2024, 5, 1, 12, 30, 15)
+        message = MsgPackCodec.decode(DummyPahoMessage(MsgPackCodec.encode({"aware": aware, "naive": naive})))
+        assert message.data["aware"] == aware
+        assert message.data["naive"] == pytz.utc.localize(naive)
+
+    def testSmallerThanJson(self):
+        data = {"temperature": 21.5, "humidity": 40, "readings": list(range(50))}
+        assert len(MsgPackCodec.encode(data)) < len(wiotp.sdk.JsonCodec.encode(data))
+
+    def testInvalid(self):
+        with pytest.raises(InvalidEventException):
+            MsgPackCodec.decode(DummyPahoMessage(b"\\xc1"))
+
+    def testRegisteredByDefault(self):
+        client = wiotp.sdk.device.DeviceClient(
+            {
+                "identity": {"orgId": "myorg", "typeId": "mytype", "deviceId": "mydevice"},
+                "auth": {"token": "mytoken"},
+                "options": {"mqtt": {"port": 1883}},
+            }
+        )
+        assert client.getMessageCodec("msgpack") is MsgPackCodec
@@ -0,0 +1,113 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import pytest
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+
+from wiotp.sdk import InvalidEventException, NdArrayCodec, CompressedCodec
+from wiotp.sdk.messages import CodecRegistry
+
+np = pytest.importorskip("numpy")
+
+
+class DummyPahoMessage(object):
+    def __init__(self, payload, topic="iot-2/type/mytype/id/mydevice/evt/vibration/fmt/ndarray"):
+        self.payload = payload
+        self.topic = topic
+        self.qos = 0
+        self.retain = False
+
+
+class TestCodecNdArray(testUtils.AbstractTest):
+    def testRoundTrip(self):
+        for array in [
+            np.arange(4096, dtype=np.float32),
+            np.arange(24, dtype=">i8").reshape(2, 3, 4),
+            np.array([True, False, True]),
+            np.array([1 + 2j, 3 - 4j]),
+            np.array(["a", "bc"]),
+            np.array(["2024-05-01T12:00", "2024-05-02T12:00"], dtype="datetime64[ms]"),
+            np.float64(21.5),
+            np.zeros((0, 3), dtype=np.int16),
+        ]:
+            data = NdArrayCodec.decode(DummyPahoMessage(NdArrayCodec.encode(array))).data
+            assert data.dtype == array.dtype
+            assert data.shape == array.shape
+            assert np.array_equal(data, array)
+
+    def testSize(self):
+        array = np.random.default_rng(1).standard_normal(4096).astype(np.float32)
+        payload = NdArrayCodec.encode(array)
+        assert len(payload) - array.nbytes < 32
+        assert len(payload) < len(wiotp.sdk.JsonCodec.encode(array.tolist())) / 4
+
+    def testDataIsAligned(self):
+        payload = NdArrayCodec.encode(np.arange(10, dtype=np.float64).reshape(2, 5))
+        data = NdArrayCodec.decode(DummyPahoMessage(payload)).data
+        assert data.flags.aligned
+        assert (len(payload) - data.nbytes) % 8 == 0
+
+    def testNonContiguous(self):
+        array = np.arange(20).reshape(4, 5)[:, ::2]
+        data = NdArrayCodec.decode(DummyPahoMessage(NdArrayCodec.encode(array))).data
+        assert np.array_equal(data, array)
+
+    def testList(self):
+        data = NdArrayCodec.decode(DummyPahoMessage(NdArrayCodec.encode([[1.5, 2.5], [3.5, 4.5]]))).data
+        assert data.shape == (2, 2)
+        assert data[1, 0] == 3.5
+
+    def testReadOnlyView(self):
+        payload = NdArrayCodec.encode(np.arange(100, dtype=np.int32))
+        for received in [payload, bytearray(payload)]:
+            data = NdArrayCodec.decode(DummyPahoMessage(received)).data
+            assert not data.flags.writeable
+            assert not data.flags.owndata
+            assert np.shares_memory(data, np.frombuffer(received, dtype=np.uint8))
+            with pytest.raises(ValueError):
+                data[0] = 1
+
+    def testUnsupported(self):
+        with pytest.raises(InvalidEventException):
+            NdArrayCodec.encode(np.array([{}, None], dtype=object))
+        with pytest.raises(InvalidEventException):
+            NdArrayCodec.encode(np.zeros(3, dtype=[("x", "<f4"), ("y", "<f4")]))
+
+    def testInvalid(self):
+        payload = NdArrayCodec.encode(np.arange(10, dtype=np.int32))
+        for invalid in [b"", b"\x03", payload[:-1], payload + b"\x00", b"\x03\x01\x00zzz" + b"\x00" * 8]:
+            with pytest.raises(InvalidEventException):
+                NdArrayCodec.decode(DummyPahoMessage(invalid))
+
+    def testRegisteredByDefault(self):
+        client = wiotp.sdk.device.DeviceClient(
+            {
+                "identity": {"orgId": "myorg", "typeId": "mytype", "deviceId": "mydevice"},
+                "auth": {"token": "mytoken"},
+                "options": {"mqtt": {"port": 1883}},
+            }
+        )
+        assert client.getMessageCodec("ndarray") is NdArrayCodec
+
+    def testApplicationEvent(self):
+        array = np.linspace(-1, 1, 1000).reshape(500, 2)
+        payload = NdArrayCodec.encode(array)
+        event = wiotp.sdk.application.Event(DummyPahoMessage(payload), CodecRegistry(ndarray=NdArrayCodec))
+        assert np.array_equal(event.data, array)
+        assert not event.data.flags.writeable
+
+    def testCompressed(self):
+        array = np.zeros(4096, dtype=np.float32)
+        payload = CompressedCodec(NdArrayCodec).encode(array)
+        assert len(payload) < 1024
+        message = DummyPahoMessage(payload, "iot-2/type/mytype/id/mydevice/evt/vibration/fmt/ndarray-deflate")
+        event = wiotp.sdk.application.Event(message, CodecRegistry(ndarray=NdArrayCodec))
+        assert np.array_equal(event.data, array)
@@ -0,0 +1,158 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+
+import pytest
+import testUtils
+import wiotp.sdk.application
+import paho.mqtt.client as paho
+
+from wiotp.sdk import ConfigurationException, DecodePool, InvalidEventException
+from wiotp.sdk.application import Event
+from wiotp.sdk.decode import _decodeBatch
+from wiotp.sdk.messages import JsonCodec
+
+CODECS = {"json": JsonCodec}
+
+
+def pahoMessage(payload, deviceId="d"):
+    message = paho.MQTTMessage(mid=1, topic=("iot-2/type/t/id/%s/evt/reading/fmt/json" % deviceId).encode("utf-8"))
+    message.payload = payload
+    return message
+
+
+def payload(i, size=0):
+    return b'{"i": %d, "pad": "%s"}' % (i, b"x" * size)
+
+
+def createPool(**kwargs):
+    kwargs.setdefault("processes", 2)
+    kwargs.setdefault("threshold", 100)
+    return DecodePool(startMethod="fork", **kwargs)
+
+
+class TestDecodePool(testUtils.AbstractTest):
+    def testOrderIsPreserved(self):
+        pool = createPool(maxBatch=8)
+        delivered = []
+        decodedInPool = []
+
+        def deliver(event):
+            # Large payloads have already been decoded by the time they are delivered
+            decodedInPool.append(event._message is not None)
+            delivered.append(event.data["i"])
+
+        sizes = [500 if i % 3 else 0 for i in range(200)]
+        for i, size in enumerate(sizes):
+            assert pool.submit(Event(pahoMessage(payload(i, size)), CODECS), deliver)
+        assert pool.drain(30)
+
+        assert delivered == list(range(200))
+        assert all(decoded for decoded, size in zip(decodedInPool, sizes) if size)
+        assert pool.offloaded == sum(1 for size in sizes if size)
+        # Small payloads queued behind a large one are delivered by the pool, not inline
+        assert 1 <= pool.inline < 200 - pool.offloaded
+        assert 0 < pool.batches <= pool.offloaded
+        assert pool.failed == 0
+        assert pool.queued == 0
+        pool.stop(10)
+
+    def testSmallPayloadsAreDeliveredInline(self):
+        pool = createPool()
+        threads = []
+        event = Event(pahoMessage(payload(1)), CODECS)
+        assert pool.submit(event, lambda event: threads.append(threading.current_thread()))
+        assert threads == [threading.current_thread()]
+        assert event._message is None
+        assert pool.inline == 1
+        assert pool.batches == 0
+        pool.stop()
+
+    def testInvalidPayloadIsDecodedAgain(self):
+        pool = createPool()
+        delivered = []
+        pool.submit(Event(pahoMessage(b"{" + b"x" * 200), CODECS), delivered.append)
+        assert pool.drain(30)
+        assert pool.failed == 1
+        with pytest.raises(InvalidEventException):
+            delivered[0].data
+        pool.stop(10)
+        assert pool.submit(Event(pahoMessage(payload(1)), CODECS), delivered.append) is False
+
+    def testNullPayloadIsNotAFailure(self):
+        pool = createPool()
+        delivered = []
+        pool.submit(Event(pahoMessage(b"null" + b" " * 200), CODECS), delivered.append)
+        assert pool.drain(30)
+        assert pool.failed == 0
+        assert delivered[0]._message is not None
+        assert delivered[0].data is None
+        pool.stop(10)
+
+    def testDecodeBatchResults(self):
+        # A codec may legitimately decode a payload to None, only the flag marks a failure
+        class NoneCodec(object):
+            @staticmethod
+            def decode(message):
+                return None
+
+        items = [(NoneCodec, "t", b"x", 0, False), (JsonCodec, "t", b"{", 0, False)]
+        assert _decodeBatch(items) == [(True, None), (False, None)]
+
+    def testInlineCountsOnlyMessagesDeliveredInline(self):
+        pool = createPool()
+        release = threading.Event()
+        delivered = []
+
+        def deliver(event):
+            release.wait(30)
+            delivered.append(event.data["i"])
+
+        # The large payload holds up the small one behind it, which is delivered by the pool's thread
+        pool.submit(Event(pahoMessage(payload(1, 200)), CODECS), deliver)
+        pool.submit(Event(pahoMessage(payload(2)), CODECS), deliver)
+        assert pool.inline == 0
+        release.set()
+        assert pool.drain(30)
+        assert delivered == [1, 2]
+        assert pool.inline == 0
+        pool.submit(Event(pahoMessage(payload(3)), CODECS), deliver)
+        assert pool.inline == 1
+        pool.stop(10)
+
+    def testInvalidSettings(self):
+        with pytest.raises(ConfigurationException):
+            DecodePool(processes=0)
+        with pytest.raises(ConfigurationException):
+            DecodePool(maxBatch=0)
+
+    def testApplicationClient(self):
+        client = wiotp.sdk.application.ApplicationClient(
+            {
+                "identity": {"appId": "myapp"},
+                "auth": {"key": "a-myorg-key", "token": "t"},
+                "options": {"mqtt": {"port": 1883}},
+            }
+        )
+        client.connectEvent.set()
+        assert client.metrics.snapshot()["decodeQueued"] is None
+
+        client.decodePool = createPool()
+        events = []
+        client.deviceEventCallback = lambda event: events.append((event.device, event.data["i"]))
+        for i in range(50):
+            client.client._handle_on_message(pahoMessage(payload(i, 200 if i % 2 else 0), "d%d" % (i % 3)))
+
+        assert client.decodePool.drain(30)
+        assert [i for device, i in events] == list(range(50))
+        assert events[1] == ("t:d1", 1)
+        assert client.metrics.snapshot()["decodeQueued"] == 0
+        assert client.decodePool.offloaded == 25
+        client.decodePool.stop(10)
@@ -75,6 +75,65 @@ class TestDeviceCfg(testUtils.AbstractTest):
             )
         assert e.value.reason == "Optional setting options.mqtt.cleanStart must be a boolean if provided"
 
+    def testMaxQueuedNotInteger(self):
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            wiotp.sdk.device.DeviceClient(
+                {
+                    "identity": {"orgId": "myOrg", "typeId": "myType", "deviceId": "myDevice"},
+                    "auth": {"token": "myToken"},
+                    "options": {"mqtt": {"maxQueued": "notAnInteger"}},
+                }
+            )
+        assert e.value.reason == "Optional setting options.mqtt.maxQueued must be a non-negative number if provided"
+
+    def testInvalidBackpressure(self):
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            wiotp.sdk.device.DeviceClient(
+                {
+                    "identity": {"orgId": "myOrg", "typeId": "myType", "deviceId": "myDevice"},
+                    "auth": {"token": "myToken"},
+                    "options": {"mqtt": {"backpressure": "drop"}},
+                }
+            )
+        assert (
+            e.value.reason
+            == "Optional setting options.mqtt.backpressure must be one of block, timeout, reject if provided"
+        )
+
+    def testInvalidBackpressureTimeout(self):
+        for value in [0, -1, "notANumber", True]:
+            with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+                wiotp.sdk.device.DeviceClient(
+                    {
+                        "identity": {"orgId": "myOrg", "typeId": "myType", "deviceId": "myDevice"},
+                        "auth": {"token": "myToken"},
+                        "options": {"mqtt": {"backpressureTimeout": value}},
+                    }
+                )
+            assert (
+                e.value.reason
+                == "Optional setting options.mqtt.backpressureTimeout must be a positive number if provided"
+            )
+
+    def testPublishWindow(self):
+        client = wiotp.sdk.device.DeviceClient(
+            {
+                "identity": {"orgId": "myOrg", "typeId": "myType", "deviceId": "myDevice"},
+                "auth": {"token": "myToken"},
+                "options": {"mqtt": {"maxInflight": 5, "maxQueued": 10, "backpressure": "reject"}},
+            }
+        )
+        assert client.publishWindow.capacity == 15
+        assert client.publishWindow.policy == "reject"
+        assert client.publishWindow.used == 0
+
+    def testPublishWindowDefault(self):
+        client = wiotp.sdk.device.DeviceClient(
+            {"identity": {"orgId": "myOrg", "typeId": "myType", "deviceId": "myDevice"}, "auth": {"token": "myToken"}}
+        )
+        assert client.publishWindow.capacity is None
+        assert client.publishWindow.available is None
+
     def testMissingConfigFile(self):
         deviceFile = "notAFile.yaml"
         with pytest.raises(wiotp.sdk.ConfigurationException) as e:
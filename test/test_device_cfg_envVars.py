@@ -63,3 +63,19 @@ class TestDeviceCfg(testUtils.AbstractTest):
             os.environ["WIOTP_OPTIONS_LOGLEVEL"] = "notALogLevel"
             wiotp.sdk.device.parseEnvVars()
         assert e.value.reason == "WIOTP_OPTIONS_LOGLEVEL must be one of error, warning, info, debug"
+
+    def testBackpressureTimeoutEnvVarNotNumber(self, manageEnvVars, monkeypatch):
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            monkeypatch.setenv("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT", "notANumber")
+            wiotp.sdk.device.parseEnvVars()
+        assert e.value.reason == "WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT must be a number"
+
+    def testBackpressureTimeoutEnvVar(self, manageEnvVars, monkeypatch):
+        monkeypatch.setenv("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT", "2.5")
+        assert wiotp.sdk.device.parseEnvVars().backpressureTimeout == 2.5
+        monkeypatch.setenv("WIOTP_OPTIONS_MQTT_BACKPRESSURETIMEOUT", "0")
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            wiotp.sdk.device.parseEnvVars()
+        assert (
+            e.value.reason == "Optional setting options.mqtt.backpressureTimeout must be a positive number if provided"
+        )
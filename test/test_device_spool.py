@@ -0,0 +1,175 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import json
+import os
+import pytest
+import testUtils
+import wiotp.sdk.device
+import wiotp.sdk.gateway
+from wiotp.sdk.spool import OutboundSpool
+
+
+def createClient(cls, spool, ackInline=True):
+    client = testUtils.createClient(cls, ackInline, {"spool": spool}, connected=False)
+    client.client.subscribe = lambda topic, qos=0: (0, 1)
+    return client
+
+
+def drain(spool):
+    entries = []
+    while not spool.isEmpty():
+        entries.append(spool.peek(timeout=0)[0:3])
+        spool.commit()
+    return entries
+
+
+class TestOutboundSpool(testUtils.AbstractTest):
+    def testDeviceModuleAlias(self):
+        import wiotp.sdk.device.spool
+
+        assert wiotp.sdk.device.spool.OutboundSpool is OutboundSpool
+
+    def testMemoryOnly(self):
+        spool = OutboundSpool(memoryLimit=3)
+        for i in range(5):
+            spool.append("t", b"%d" % i, 0)
+        assert len(spool) == 3
+        assert spool.dropped == 2
+        assert [e[1] for e in drain(spool)] == [b"2", b"3", b"4"]
+        assert spool.peek(timeout=0) is None
+
+    def testMemoryOnlyKeepsMessageBeingDelivered(self):
+        spool = OutboundSpool(memoryLimit=2)
+        delivered = []
+        for i in range(2):
+            spool.append("t", b"%d" % i, 1, lambda i=i: delivered.append(i))
+        topic, payload, qos, onPublish = spool.peek(timeout=0)
+        assert payload == b"0"
+
+        # The spool fills up while the head is waiting to be acknowledged, the next message is discarded instead
+        spool.append("t", b"2", 1, lambda: delivered.append(2))
+        assert spool.dropped == 1
+        spool.commit()
+        onPublish()
+
+        entry = spool.peek(timeout=0)
+        assert entry[1] == b"2"
+        spool.commit()
+        entry[3]()
+        assert delivered == [0, 2]
+        assert spool.isEmpty()
+
+    def testMemoryOnlyLimitOfOne(self):
+        spool = OutboundSpool(memoryLimit=1)
+        spool.append("t", b"0", 1)
+        assert spool.peek(timeout=0)[1] == b"0"
+        spool.append("t", b"1", 1)
+        assert spool.dropped == 1
+        spool.commit()
+        assert spool.isEmpty()
+
+    def testOverflowToJournalPreservesOrder(self, tmp_path):
+        spool = OutboundSpool(memoryLimit=2, path=str(tmp_path / "journal"))
+        for i in range(4):
+            spool.append("t/%d" % i, b"%d" % i, 1)
+        assert spool.journalled == 2
+
+        # Once the journal is in use new messages must queue behind it, even if the ring has space
+        spool.peek(timeout=0)
+        spool.commit()
+        spool.append("t/4", b"4", 0)
+        assert spool.journalled == 3
+
+        assert drain(spool) == [("t/%d" % i, b"%d" % i, 1 if i < 4 else 0) for i in range(1, 5)]
+        assert os.path.getsize(str(tmp_path / "journal")) == 0
+
+    def testJournalSurvivesRestart(self, tmp_path):
+        path = str(tmp_path / "journal")
+        spool = OutboundSpool(memoryLimit=2, path=path)
+        for i in range(5):
+            spool.append("t", b"%d" % i, 1)
+        spool.peek(timeout=0)
+        spool.commit()
+        spool.close()
+
+        spool = OutboundSpool(memoryLimit=2, path=path)
+        assert len(spool) == 4
+        assert [e[1] for e in drain(spool)] == [b"1", b"2", b"3", b"4"]
+
+    def testTruncatedRecordDiscarded(self, tmp_path):
+        path = str(tmp_path / "journal")
+        spool = OutboundSpool(memoryLimit=1, path=path)
+        for i in range(3):
+            spool.append("t", b"payload%d" % i, 1)
+        spool.close()
+
+        # Simulate a crash part way through writing the final record
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 3)
+
+        spool = OutboundSpool(memoryLimit=1, path=path)
+        assert len(spool) == 2
+        spool.append("t", b"payload3", 1)
+        assert [e[1] for e in drain(spool)] == [b"payload0", b"payload1", b"payload3"]
+
+
+class TestDeviceSpool(testUtils.AbstractTest):
+    def testSpoolDisabledByDefault(self):
+        client = createClient(wiotp.sdk.device.DeviceClient, None)
+        assert client.spool is None
+
+    def testInvalidSpoolConfig(self):
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            createClient(wiotp.sdk.device.DeviceClient, {"enabled": True, "drainRate": 0})
+        assert "options.spool.drainRate" in e.value.reason
+
+    def testPublishWhileDisconnected(self):
+        client = createClient(wiotp.sdk.device.DeviceClient, {"enabled": True, "drainRate": 1000})
+        calls = []
+
+        for i in range(3):
+            assert client.publishEvent("status", "json", {"n": i}, onPublish=lambda i=i: calls.append(i))
+        batch = client.publishEvents([("status", "json", {"n": 3})])
+        assert len(client.spool) == 4
+        assert client.client.publish.messages == []
+
+        client._onConnect(None, None, None, 0)
+        assert batch.wait(timeout=5)
+
+        messages = client.client.publish.messages
+        assert [json.loads(m[2]) for m in messages] == [{"n": i} for i in range(4)]
+        assert all(m[3] == 1 for m in messages)
+        assert calls == [0, 1, 2]
+        assert client.spool.isEmpty()
+        assert client.publishWindow.used == 0
+
+    def testOrderingBehindSpool(self):
+        client = createClient(wiotp.sdk.device.DeviceClient, {"enabled": True}, ackInline=False)
+        client.publishEvent("status", "json", {"n": 0})
+        client.connectEvent.set()
+
+        # Connected, but an earlier event is still waiting so this one must queue behind it
+        client.publishEvent("status", "json", {"n": 1})
+        assert len(client.spool) == 2
+        assert client.client.publish.messages == []
+
+    def testGatewaySpool(self, tmp_path):
+        spool = {"enabled": True, "memoryLimit": 1, "path": str(tmp_path / "journal")}
+        client = createClient(wiotp.sdk.gateway.GatewayClient, spool)
+        client.publishDeviceEvent("childType", "child", "reading", "json", {"v": 1})
+        client.publishDeviceEvent("childType", "child", "reading", "json", {"v": 2})
+        assert client.spool.journalled == 1
+        client.spool.close()
+
+        # Closing the spool moves the event held in memory into the journal ahead of the one already there
+        client = createClient(wiotp.sdk.gateway.GatewayClient, spool)
+        entries = drain(client.spool)
+        assert [e[0] for e in entries] == ["iot-2/type/childType/id/child/evt/reading/fmt/json"] * 2
+        assert [json.loads(e[1]) for e in entries] == [{"v": 1}, {"v": 2}]
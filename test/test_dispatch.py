@@ -0,0 +1,175 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+import time
+
+import pytest
+import testUtils
+import wiotp.sdk
+import wiotp.sdk.application
+import paho.mqtt.client as paho
+
+from wiotp.sdk import ConfigurationException, KeyedDispatcher
+from wiotp.sdk.dispatch import deviceKey
+
+
+def createApplication():
+    client = wiotp.sdk.application.ApplicationClient(
+        {
+            "identity": {"appId": "myapp"},
+            "auth": {"key": "a-myorg-key", "token": "t"},
+            "options": {"mqtt": {"port": 1883}},
+        }
+    )
+    client.connectEvent.set()
+    return client
+
+
+def receive(client, topic, payload):
+    message = paho.MQTTMessage(mid=1, topic=topic.encode("utf-8"))
+    message.payload = payload
+    client.client._handle_on_message(message)
+
+
+class TestKeyedDispatcher(testUtils.AbstractTest):
+    def testOrderedPerKey(self):
+        dispatcher = KeyedDispatcher(workers=4)
+        handled = {}
+
+        def handle(key, i):
+            handled.setdefault(key, []).append(i)
+
+        for i in range(500):
+            for key in ["a:1", "a:2", "b:1"]:
+                dispatcher.submit(key, handle, key, i)
+        assert dispatcher.drain(10)
+        assert handled == {key: list(range(500)) for key in ["a:1", "a:2", "b:1"]}
+        assert dispatcher.processed == 1500
+        assert dispatcher.queued == 0
+        dispatcher.stop()
+
+    def testPartitionsRunInParallel(self):
+        dispatcher = KeyedDispatcher(workers=2)
+        # Integers hash to themselves, so these keys are always handled by different workers
+        slow = 0
+        fast = 1
+        release = threading.Event()
+        done = threading.Event()
+
+        dispatcher.submit(slow, release.wait, 10)
+        dispatcher.submit(slow, lambda: None)
+        dispatcher.submit(fast, done.set)
+        assert done.wait(5)
+
+        time.sleep(0.05)
+        depths = dispatcher.depths()
+        assert depths[hash(slow) % 2] == 2
+        assert depths[hash(fast) % 2] == 0
+        lag = dispatcher.lag()
+        assert lag[hash(slow) % 2] >= 0.05
+        assert lag[hash(fast) % 2] == 0
+
+        release.set()
+        assert dispatcher.drain(5)
+        assert dispatcher.lag() == [0.0, 0.0]
+        dispatcher.stop()
+
+    def testMaxQueuedBlocksSubmit(self):
+        dispatcher = KeyedDispatcher(workers=1, maxQueued=2)
+        release = threading.Event()
+        dispatcher.submit(None, release.wait, 10)
+        dispatcher.submit(None, lambda: None)
+
+        submitted = threading.Event()
+        thread = threading.Thread(target=lambda: submitted.set() if dispatcher.submit(None, lambda: None) else None)
+        thread.start()
+        assert not submitted.wait(0.1)
+        release.set()
+        assert submitted.wait(5)
+        thread.join()
+        assert dispatcher.drain(5)
+        assert dispatcher.processed == 3
+        dispatcher.stop()
+
+    def testExceptionsAreCounted(self):
+        dispatcher = KeyedDispatcher(workers=1)
+        handled = []
+
+        def fail():
+            raise ValueError("boom")
+
+        dispatcher.submit("a", fail)
+        dispatcher.submit("a", handled.append, 1)
+        assert dispatcher.drain(5)
+        assert handled == [1]
+        assert dispatcher.failed == 1
+        assert dispatcher.processed == 2
+        dispatcher.stop()
+
+    def testStop(self):
+        dispatcher = KeyedDispatcher(workers=2)
+        handled = []
+        for i in range(100):
+            dispatcher.submit(i, handled.append, i)
+        dispatcher.stop(5)
+        assert sorted(handled) == list(range(100))
+        assert dispatcher.submit("a", handled.append, 1) is False
+
+    def testInvalidWorkers(self):
+        with pytest.raises(ConfigurationException):
+            KeyedDispatcher(workers=0)
+
+    def testDeviceKey(self):
+        class Message(object):
+            pass
+
+        message = Message()
+        assert deviceKey(message) is None
+        message.typeId, message.deviceId = "t", "d"
+        assert deviceKey(message) == "t:d"
+        message.device = "t:other"
+        assert deviceKey(message) == "t:other"
+
+    def testApplicationCallbacksRunOnWorkers(self):
+        client = createApplication()
+        client.dispatcher = KeyedDispatcher(workers=4)
+        events = []
+        statuses = []
+        threads = set()
+
+        def onEvent(event):
+            threads.add(threading.current_thread().name)
+            events.append((event.device, event.data["i"]))
+
+        client.deviceEventCallback = onEvent
+        client.deviceStatusCallback = statuses.append
+        for i in range(50):
+            for deviceId in ["d1", "d2", "d3"]:
+                receive(client, "iot-2/type/t/id/%s/evt/reading/fmt/json" % deviceId, b'{"i": %d}' % i)
+        receive(client, "iot-2/type/t/id/d1/mon", b'{"Action": "Connect"}')
+
+        assert client.dispatcher.drain(10)
+        assert threading.current_thread().name not in threads
+        for deviceId in ["d1", "d2", "d3"]:
+            assert [i for device, i in events if device == "t:" + deviceId] == list(range(50))
+        assert len(statuses) == 1
+
+        snapshot = client.metrics.snapshot()
+        assert snapshot["dispatchQueued"] == 0
+        assert snapshot["dispatchLag"] == 0
+        client.dispatcher.stop()
+
+    def testInlineWithoutDispatcher(self):
+        client = createApplication()
+        threads = []
+        client.deviceEventCallback = lambda event: threads.append(threading.current_thread())
+        receive(client, "iot-2/type/t/id/d1/evt/reading/fmt/json", b"{}")
+        assert threads == [threading.current_thread()]
+        assert client.metrics.snapshot()["dispatchQueued"] is None
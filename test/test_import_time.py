@@ -0,0 +1,76 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import os
+import subprocess
+import sys
+
+import testUtils
+import wiotp.sdk
+
+# Budget (in milliseconds) for `import wiotp.sdk.device` as reported by `python -X importtime`, generous enough to
+# pass on a slow CI runner but far below the cost of loading the application and REST API packages as well
+IMPORT_BUDGET_MS = int(os.getenv("WIOTP_IMPORT_BUDGET_MS", "400"))
+
+HEAVY_MODULES = ["requests", "yaml", "iso8601", "asyncio", "wiotp.sdk.api", "wiotp.sdk.application"]
+
+
+def runPython(code, *options):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(sys.path)
+    return subprocess.run(
+        [sys.executable] + list(options) + ["-c", code], env=env, capture_output=True, text=True, check=True
+    )
+
+
+class TestImportTime(testUtils.AbstractTest):
+    def testDeviceImportSkipsHeavyModules(self):
+        code = "import sys, wiotp.sdk.device; wiotp.sdk.device.DeviceClient; print(' '.join(sorted(sys.modules)))"
+        loaded = runPython(code).stdout.split()
+        for module in HEAVY_MODULES:
+            assert module not in loaded
+
+    def testImportBudget(self):
+        result = runPython("import wiotp.sdk.device", "-X", "importtime")
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                fields = line[len("import time:") :].split("|")
+                if fields[1].strip().isdigit():
+                    cumulative[fields[2].strip()] = int(fields[1])
+        assert cumulative["wiotp.sdk.device"] / 1000.0 < IMPORT_BUDGET_MS
+
+    def testCoreImportSkipsClientPackages(self):
+        code = "import sys, wiotp.sdk; print(' '.join(sorted(sys.modules)))"
+        loaded = runPython(code).stdout.split()
+        for module in ["wiotp.sdk.device", "wiotp.sdk.gateway", "wiotp.sdk.application"]:
+            assert module not in loaded
+
+    def testSubpackagesLoadOnFirstUse(self):
+        code = (
+            "import sys, wiotp.sdk; assert 'wiotp.sdk.application' not in sys.modules; "
+            "print(wiotp.sdk.application.ApplicationClient.__module__, wiotp.sdk.gateway.Notification.__module__)"
+        )
+        assert runPython(code).stdout.split() == ["wiotp.sdk.application.client", "wiotp.sdk.gateway.messages"]
+
+    def testPublicNames(self):
+        for name in ["api", "application", "device", "gateway", "testing"]:
+            assert name in dir(wiotp.sdk)
+        for package in [wiotp.sdk.device, wiotp.sdk.gateway, wiotp.sdk.application]:
+            for name in package.__all__:
+                assert name in dir(package)
+                assert getattr(package, name) is not None
+        from wiotp.sdk.device import ManagedDeviceClient, parseConfigFile
+
+        assert ManagedDeviceClient.__module__ == "wiotp.sdk.device.managedClient"
+        assert callable(parseConfigFile)
+
+    def testUnknownAttribute(self):
+        for module in [wiotp.sdk, wiotp.sdk.device, wiotp.sdk.gateway, wiotp.sdk.application]:
+            assert not hasattr(module, "DoesNotExist")
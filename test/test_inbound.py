@@ -0,0 +1,193 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+
+import pytest
+import testUtils
+import wiotp.sdk
+import wiotp.sdk.application
+import paho.mqtt.client as paho
+
+from wiotp.sdk import ConfigurationException, InboundQueue
+
+
+def message(i, topic="iot-2/type/t/id/d/evt/e/fmt/json", retain=False):
+    pahoMessage = paho.MQTTMessage(topic=topic.encode("utf-8"))
+    pahoMessage.payload = b'{"i": %d}' % i
+    pahoMessage.qos = 1
+    pahoMessage.retain = retain
+    return pahoMessage
+
+
+def drain(queue):
+    payloads = []
+    while True:
+        pahoMessage = queue.get(0)
+        if pahoMessage is None:
+            return payloads
+        payloads.append(pahoMessage.payload)
+
+
+def createApplication(inbound):
+    client = wiotp.sdk.application.ApplicationClient(
+        {
+            "identity": {"appId": "myapp"},
+            "auth": {"key": "a-myorg-key", "token": "t"},
+            "options": {"mqtt": {"port": 1883}, "inbound": inbound},
+        }
+    )
+    client.connectEvent.set()
+    return client
+
+
+def receive(client, topic, payload):
+    pahoMessage = paho.MQTTMessage(mid=1, topic=topic.encode("utf-8"))
+    pahoMessage.payload = payload
+    client.client._handle_on_message(pahoMessage)
+
+
+class TestInboundQueue(testUtils.AbstractTest):
+    def testDropOldest(self):
+        queue = InboundQueue(3, "dropOldest")
+        for i in range(5):
+            assert queue.put(message(i))
+        assert queue.droppedOldest == 2
+        assert queue.dropped == 2
+        assert drain(queue) == [b'{"i": 2}', b'{"i": 3}', b'{"i": 4}']
+
+    def testDropNewest(self):
+        queue = InboundQueue(3, "dropNewest")
+        results = [queue.put(message(i)) for i in range(5)]
+        assert results == [True, True, True, False, False]
+        assert queue.droppedNewest == 2
+        assert queue.received == 5
+        assert drain(queue) == [b'{"i": 0}', b'{"i": 1}', b'{"i": 2}']
+
+    def testBlock(self):
+        queue = InboundQueue(2, "block")
+        queue.put(message(0))
+        queue.put(message(1))
+        putDone = threading.Event()
+        thread = threading.Thread(target=lambda: queue.put(message(2)) and putDone.set())
+        thread.start()
+        assert not putDone.wait(0.1)
+        assert queue.get(0).payload == b'{"i": 0}'
+        assert putDone.wait(5)
+        thread.join()
+        assert queue.blocked == 1
+        assert queue.dropped == 0
+        assert drain(queue) == [b'{"i": 1}', b'{"i": 2}']
+
+    def testSpill(self, tmpdir):
+        path = str(tmpdir.join("inbound.journal"))
+        queue = InboundQueue(2, "spill", path)
+        for i in range(5):
+            queue.put(message(i, retain=(i == 4)))
+        assert queue.spilled == 3
+        assert queue.journalled == 3
+        assert len(queue) == 5
+
+        first = queue.get(0)
+        assert first.payload == b'{"i": 0}'
+        queue.stop()
+
+        # Messages still queued survive a restart, in order
+        restarted = InboundQueue(2, "spill", path)
+        assert len(restarted) == 4
+        messages = [restarted.get(0) for i in range(4)]
+        assert [m.payload for m in messages] == [b'{"i": %d}' % i for i in range(1, 5)]
+        assert [m.retain for m in messages] == [False, False, False, True]
+        assert messages[0].qos == 1
+        assert messages[0].topic == "iot-2/type/t/id/d/evt/e/fmt/json"
+
+    def testConsumer(self):
+        queue = InboundQueue(10)
+        handled = []
+
+        def handle(pahoMessage):
+            if pahoMessage.payload == b'{"i": 1}':
+                raise ValueError("boom")
+            handled.append(pahoMessage.payload)
+
+        queue.start(handle)
+        for i in range(3):
+            queue.put(message(i))
+        assert queue.drain(5)
+        assert handled == [b'{"i": 0}', b'{"i": 2}']
+        queue.stop(5)
+
+    def testInvalidPolicy(self):
+        with pytest.raises(ConfigurationException):
+            InboundQueue(10, "dropEverything")
+        with pytest.raises(ConfigurationException):
+            InboundQueue(10, "spill")
+
+    def testConfiguration(self):
+        with pytest.raises(ConfigurationException) as e:
+            createApplication({"enabled": True, "capacity": 0})
+        assert e.value.reason == "Optional setting options.inbound.capacity must be a positive number if provided"
+        with pytest.raises(ConfigurationException) as e:
+            createApplication({"enabled": True, "overflow": "spill"})
+        assert e.value.reason == "Setting options.inbound.path is required by the spill overflow policy"
+
+        client = createApplication(None)
+        assert client.inboundQueue is None
+        assert "inboundQueued" not in client.metrics.snapshot()
+
+    def testApplicationEventsAreQueued(self):
+        client = createApplication({"enabled": True, "capacity": 2, "overflow": "dropOldest"})
+        events = []
+        client.deviceEventCallback = lambda event: events.append(event.data["i"])
+        statuses = []
+        client.deviceStatusCallback = statuses.append
+
+        for i in range(5):
+            receive(client, "iot-2/type/t/id/d/evt/reading/fmt/json", b'{"i": %d}' % i)
+        receive(client, "iot-2/type/t/id/d/mon", b'{"Action": "Connect"}')
+
+        # Nothing is handled until the client has connected, but status messages are not queued
+        assert events == []
+        assert len(statuses) == 1
+        assert client.metrics.snapshot()["inboundDropped"] == 3
+
+        client._onConnect(client.client, None, {}, 0)
+        assert client.inboundQueue.drain(5)
+        assert events == [3, 4]
+        snapshot = client.metrics.snapshot()
+        assert snapshot["inboundQueued"] == 0
+        assert snapshot["inboundSpilled"] == 0
+        client.inboundQueue.stop(5)
+
+    def testDisconnectStopsQueue(self):
+        client = createApplication({"enabled": True, "capacity": 10})
+        events = []
+        client.deviceEventCallback = lambda event: events.append(event.data["i"])
+        client._onConnect(client.client, None, {}, 0)
+        receive(client, "iot-2/type/t/id/d/evt/reading/fmt/json", b'{"i": 1}')
+        assert client.inboundQueue.drain(5)
+        thread = client.inboundQueue._thread
+        assert thread.is_alive()
+
+        client.disconnect()
+        assert not thread.is_alive()
+        assert events == [1]
+
+    def testDisconnectPersistsSpilledQueue(self, tmpdir):
+        path = str(tmpdir.join("inbound.journal"))
+        client = createApplication({"enabled": True, "capacity": 2, "overflow": "spill", "path": path})
+        client.deviceEventCallback = lambda event: None
+        for i in range(5):
+            receive(client, "iot-2/type/t/id/d/evt/reading/fmt/json", b'{"i": %d}' % i)
+        assert client.inboundQueue.journalled == 3
+
+        # The messages still in memory are journalled too, so every message survives a restart
+        client.disconnect()
+        restarted = InboundQueue(2, "spill", path)
+        assert [restarted.get(0).payload for i in range(5)] == [b'{"i": %d}' % i for i in range(5)]
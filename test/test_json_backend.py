@@ -0,0 +1,82 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import json
+from datetime import datetime
+
+import pytest
+import pytz
+import testUtils
+import wiotp.sdk
+from wiotp.sdk import jsonBackend, InvalidEventException, JsonCodec
+from wiotp.sdk.api.common import _jsonDefault
+from wiotp.sdk.messages import _payloadEncoder
+
+
+class DummyPahoMessage(object):
+    def __init__(self, payload):
+        self.payload = payload
+
+
+@pytest.fixture(params=jsonBackend.BACKENDS)
+def backend(request):
+    pytest.importorskip(request.param)
+    previous = jsonBackend.getBackend()
+    jsonBackend.setBackend(request.param)
+    yield request.param
+    jsonBackend.setBackend(previous)
+
+
+class TestJsonBackend(testUtils.AbstractTest):
+    def testRoundTrip(self, backend):
+        data = {"temp": 21.5, "count": 3, "ok": True, "tags": ["a", "b"], "none": None, "name": "café / bar"}
+        # encode() keeps returning a str, the clients publish the backend's bytes as they are
+        assert json.loads(JsonCodec.encode(data)) == data
+        encoded = _payloadEncoder(JsonCodec)(data, None)
+        assert isinstance(encoded, bytes)
+        assert encoded.decode("utf-8") == JsonCodec.encode(data)
+        assert JsonCodec.decode(DummyPahoMessage(encoded)).data == data
+        assert JsonCodec.decode(DummyPahoMessage(bytearray(encoded))).data == data
+
+    def testEncodeReturnsStr(self, backend):
+        assert isinstance(JsonCodec.encode({"a": 1}), str)
+        assert isinstance(JsonCodec().encode({"a": 1}), str)
+
+    def testOverriddenEncodeIsUsed(self):
+        class PrettyJsonCodec(JsonCodec):
+            @staticmethod
+            def encode(data=None, timestamp=None):
+                return json.dumps(data, indent=2)
+
+        class SubclassedJsonCodec(JsonCodec):
+            pass
+
+        assert _payloadEncoder(PrettyJsonCodec)({"a": 1}, None) == json.dumps({"a": 1}, indent=2)
+        assert isinstance(_payloadEncoder(SubclassedJsonCodec)({"a": 1}, None), bytes)
+
+    def testNonStringKeys(self, backend):
+        assert json.loads(jsonBackend.dumps({1: "one"})) == {"1": "one"}
+
+    def testInvalidJson(self, backend):
+        with pytest.raises(ValueError):
+            jsonBackend.loads(b"{sss,eee}")
+        with pytest.raises(InvalidEventException):
+            JsonCodec.decode(DummyPahoMessage(b"{sss,eee}"))
+
+    def testDefault(self, backend):
+        timestamp = datetime(2024, 5, 1, 12, 30, tzinfo=pytz.utc)
+        decoded = json.loads(jsonBackend.dumps({"when": timestamp}, default=_jsonDefault))
+        assert datetime.fromisoformat(decoded["when"].replace("Z", "+00:00")) == timestamp
+        with pytest.raises(TypeError):
+            jsonBackend.dumps({"x": object()}, default=_jsonDefault)
+
+    def testUnknownBackend(self):
+        with pytest.raises(wiotp.sdk.ConfigurationException):
+            jsonBackend.setBackend("simdjson")
+        assert jsonBackend.getBackend() in jsonBackend.BACKENDS
@@ -0,0 +1,157 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import pytest
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+import paho.mqtt.client as paho
+
+from wiotp.sdk import ClientMetrics, JsonCodec, MissingMessageDecoderException
+from wiotp.sdk.metrics import Histogram
+
+
+def createDevice(spool=False):
+    options = {"spool": {"enabled": True}} if spool else None
+    return testUtils.createClient(wiotp.sdk.device.DeviceClient, options=options)
+
+
+def receive(client, topic, payload):
+    message = paho.MQTTMessage(topic=topic.encode("utf-8"))
+    message.payload = payload
+    client.client._handle_on_message(message)
+
+
+class TestMetrics(testUtils.AbstractTest):
+    def testHistogram(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value)
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(2.65)
+        assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+
+    def testPublished(self):
+        client = createDevice()
+        client.publishEvent("status", "json", {"a": 1})
+        client.publishEvent("status", "json", {"a": 2})
+        client.publishEvents([("alert", "utf8", "hot"), ("status", "json", {"a": 3})])
+        client.publisher("reading", "raw")(b"12345")
+
+        published = client.metrics.snapshot()["published"]["event"]
+        assert published["status"]["messages"] == 3
+        assert published["status"]["bytes"] == 3 * len(JsonCodec.encode({"a": 1}))
+        assert published["alert"] == {"messages": 1, "bytes": 3}
+        assert published["reading"] == {"messages": 1, "bytes": 5}
+
+    def testPublishLatency(self):
+        client = createDevice()
+        client.publishEvent("status", "json", {"a": 1}, qos=1)
+        client.publishEvents([("status", "json", {"a": i}) for i in range(3)], qos=1)
+        snapshot = client.metrics.snapshot()
+        assert snapshot["inflight"] == 4
+        assert snapshot["publishLatency"]["count"] == 0
+
+        client.client.publish.ackAll()
+        snapshot = client.metrics.snapshot()
+        assert snapshot["inflight"] == 0
+        assert snapshot["publishLatency"]["count"] == 4
+        assert snapshot["publishLatency"]["buckets"][-1] == (float("inf"), 4)
+
+    def testReceived(self):
+        client = wiotp.sdk.application.ApplicationClient(
+            {"identity": {"appId": "metricstest"}, "auth": {"key": "a-myorg-abcdefgh", "token": "mytoken"}}
+        )
+        events = []
+        client.deviceEventCallback = events.append
+        receive(client, "iot-2/type/t/id/d1/evt/status/fmt/json", b'{"a": 1}')
+        receive(client, "iot-2/type/t/id/d2/evt/status/fmt/json", b'{"a": 2}')
+        receive(client, "iot-2/type/t/id/d1/mon", b'{"Action": "Connect"}')
+        assert len(events) == 2
+
+        snapshot = client.metrics.snapshot()
+        assert snapshot["received"]["deviceEvent"]["status"] == {"messages": 2, "bytes": 16}
+        assert snapshot["received"]["deviceStatus"][""]["messages"] == 1
+        assert snapshot["callbackTime"]["deviceEvent"]["count"] == 2
+        assert snapshot["callbackTime"]["deviceStatus"]["count"] == 1
+
+        with pytest.raises(MissingMessageDecoderException):
+            receive(client, "iot-2/type/t/id/d1/evt/status/fmt/xml", b"<a/>")
+        snapshot = client.metrics.snapshot()
+        assert snapshot["decodeFailures"] == {"MissingMessageDecoderException": 1}
+        assert snapshot["received"]["deviceEvent"]["status"]["messages"] == 3
+
+    def testInvalidCommand(self):
+        client = createDevice()
+        commands = []
+        client.commandCallback = commands.append
+        receive(client, "iot-2/cmd/reboot/fmt/json", b"not json")
+        receive(client, "iot-2/cmd/reboot/fmt/json", b'{"delay": 5}')
+        assert len(commands) == 1
+        snapshot = client.metrics.snapshot()
+        assert snapshot["decodeFailures"] == {"InvalidEventException": 1}
+        assert snapshot["received"]["command"]["reboot"]["messages"] == 2
+
+    def testReconnectsAndSpool(self):
+        client = createDevice(spool=True)
+        client.reconnectStats._onDisconnect()
+        client.reconnectStats._onConnect()
+        snapshot = client.metrics.snapshot()
+        assert snapshot["disconnects"] == 1
+        assert snapshot["reconnects"] == 1
+        assert snapshot["reconnectFailures"] == 0
+        assert snapshot["spooled"] == 0
+        assert "spooled" not in createDevice().metrics.snapshot()
+
+    def testDisabledAndReset(self):
+        client = createDevice()
+        client.metrics.enabled = False
+        client.publishEvent("status", "json", {"a": 1})
+        assert client.metrics.snapshot()["published"] == {}
+
+        client.metrics.enabled = True
+        client.publishEvent("status", "json", {"a": 1})
+        assert client.metrics.snapshot()["published"]["event"]["status"]["messages"] == 1
+        client.metrics.reset()
+        assert client.metrics.snapshot()["published"] == {}
+
+    def testPrometheus(self):
+        client = createDevice()
+        client.publishEvent("status", "json", {"a": 1})
+        client.publishEvent('we"ird', "json", {"a": 1})
+        client.client.publish.ackAll()
+        client.metrics.register("queueDepth", "Items queued", lambda: 7)
+        client.metrics.register("nothing", "Never has a value", lambda: None)
+
+        text = client.metrics.prometheus()
+        lines = text.splitlines()
+        assert text.endswith("\n")
+        assert "# TYPE wiotp_published_messages_total counter" in lines
+        assert 'wiotp_published_messages_total{kind="event",name="status"} 1' in lines
+        size = len(JsonCodec.encode({"a": 1}))
+        assert 'wiotp_published_bytes_total{kind="event",name="status"} %d' % size in lines
+        assert 'wiotp_published_messages_total{kind="event",name="we\\"ird"} 1' in lines
+        assert "# TYPE wiotp_publish_latency_seconds histogram" in lines
+        assert 'wiotp_publish_latency_seconds_bucket{le="+Inf"} 2' in lines
+        assert "wiotp_publish_latency_seconds_count 2" in lines
+        assert "wiotp_inflight 0" in lines
+        assert "# TYPE wiotp_reconnects_total counter" in lines
+        assert "wiotp_reconnect_failures_total 0" in lines
+        assert "wiotp_queue_depth 7" in lines
+        assert "wiotp_nothing" not in text
+
+        assert "myapp_inflight 0" in client.metrics.prometheus(prefix="myapp").splitlines()
+
+    def testStandalone(self):
+        metrics = ClientMetrics(latencyBuckets=(1.0,))
+        metrics._onConfirmed(0.5)
+        metrics._onPublished("iotdm-1/response", 10)
+        snapshot = metrics.snapshot()
+        assert snapshot["publishLatency"]["buckets"] == [(1.0, 1), (float("inf"), 1)]
+        assert snapshot["published"] == {"other": {"": {"messages": 1, "bytes": 10}}}
@@ -0,0 +1,119 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import json
+import pytest
+import testUtils
+import wiotp.sdk.device
+import wiotp.sdk.gateway
+import paho.mqtt.client as paho
+
+from testUtils import FakePublisher, createClient
+
+
+class TestPublishBatch(testUtils.AbstractTest):
+    def testDevicePublishEvents(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        calls = []
+
+        events = [("status", "json", {"n": i}) for i in range(5)]
+        batch = client.publishEvents(events, qos=1, onPublish=lambda: calls.append(True))
+
+        assert isinstance(batch, wiotp.sdk.PublishBatch)
+        assert batch.size == 5
+        assert batch.sent == 5
+        assert batch.failed == 0
+        assert batch.pending == 5
+        assert not batch.isComplete()
+
+        messages = client.client.publish.messages
+        assert [m[1] for m in messages] == ["iot-2/evt/status/fmt/json"] * 5
+        assert [json.loads(m[2]) for m in messages] == [{"n": i} for i in range(5)]
+        assert all(m[3] == 1 for m in messages)
+
+        client.client.publish.ackAll()
+        assert batch.wait(timeout=1)
+        assert batch.acked == 5
+        assert calls == [True]
+        assert len(client._publishTracker) == 0
+
+    def testPublishEventsAckedInline(self):
+        client = createClient(wiotp.sdk.device.DeviceClient, ackInline=True)
+        batch = client.publishEvents([("a", "json", 1), ("b", "utf8", "two")])
+        assert batch.isComplete()
+        assert batch.acked == 2
+        assert len(client._publishTracker) == 0
+
+    def testPublishEventsEmpty(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        batch = client.publishEvents([])
+        assert batch.size == 0
+        assert batch.isComplete()
+
+    def testPublishEventsMissingCodec(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        with pytest.raises(wiotp.sdk.MissingMessageEncoderException):
+            client.publishEvents([("a", "unknown", 1)])
+
+    def testPublishEventsDisconnected(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        client.connectEvent.clear()
+        client.connectEvent.wait = lambda timeout=None: False
+        assert client.publishEvents([("a", "json", 1)]) == False
+
+    def testGatewayPublishDeviceEvents(self):
+        client = createClient(wiotp.sdk.gateway.GatewayClient)
+        batch = client.publishDeviceEvents(
+            [("childType", "child%s" % i, "reading", "json", {"v": i}) for i in range(3)], qos=1
+        )
+        assert batch.sent == 3
+        topics = [m[1] for m in client.client.publish.messages]
+        assert topics == ["iot-2/type/childType/id/child%s/evt/reading/fmt/json" % i for i in range(3)]
+
+    def testGatewayPublishEvents(self):
+        client = createClient(wiotp.sdk.gateway.GatewayClient)
+        client.publishEvents([("reading", "json", {"v": 1})])
+        assert client.client.publish.messages[0][1] == "iot-2/type/mytype/id/mydevice/evt/reading/fmt/json"
+
+    def testPublishEventsEncodeFailureReleasesWindow(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        encoded = []
+
+        class FailingCodec(wiotp.sdk.JsonCodec):
+            @staticmethod
+            def encode(data=None, timestamp=None):
+                if len(encoded) == 2:
+                    raise ValueError("boom")
+                encoded.append(data)
+                return wiotp.sdk.JsonCodec.encode(data, timestamp)
+
+        client.setMessageCodec("failing", FailingCodec)
+        with pytest.raises(ValueError):
+            client.publishEvents([("reading", "failing", {"n": i}) for i in range(5)], qos=1)
+        assert len(client.client.publish.messages) == 2
+        assert client.publishWindow.used == 2
+
+        client.client.publish.ackAll()
+        assert client.publishWindow.used == 0
+        assert len(client._publishTracker) == 0
+
+    def testPublishEventsPahoFailureReleasesWindow(self):
+        client = createClient(wiotp.sdk.device.DeviceClient, ackInline=True)
+        publish = client.client.publish
+
+        def failOnThird(topic, payload=None, qos=0, retain=False):
+            if publish.mid == 2:
+                raise RuntimeError("boom")
+            return publish(topic, payload, qos, retain)
+
+        client.client.publish = failOnThird
+        with pytest.raises(RuntimeError):
+            client.publishEvents([("reading", "json", {"n": i}) for i in range(5)], qos=1)
+        assert client.publishWindow.used == 0
+        assert len(client._publishTracker) == 0
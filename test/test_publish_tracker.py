@@ -0,0 +1,150 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+import testUtils
+import wiotp.sdk.device
+
+from wiotp.sdk import PublishFuture, PublishTracker
+from testUtils import createClient
+
+
+class TestPublishTracker(testUtils.AbstractTest):
+    def testConfirmAfterRegister(self):
+        tracker = PublishTracker()
+        calls = []
+        tracker.begin()
+        tracker.register([1, 2], lambda: calls.append(True))
+        tracker.end()
+        assert len(tracker) == 2
+        tracker.confirm(1)
+        tracker.confirm(2)
+        assert calls == [True, True]
+        assert len(tracker) == 0
+
+    def testConfirmBeforeRegister(self):
+        tracker = PublishTracker()
+        calls = []
+        tracker.begin()
+        tracker.confirm(7)
+        tracker.register([7], lambda: calls.append(True))
+        tracker.end()
+        assert calls == [True]
+        assert len(tracker) == 0
+
+    def testUnregisteredConfirmationsNotRetained(self):
+        tracker = PublishTracker()
+        calls = []
+
+        # Confirmations for messages published outside of the tracker must not linger, otherwise a
+        # later message that reuses the mid would be reported as confirmed before it was sent
+        for mid in range(1, 1000):
+            tracker.confirm(mid)
+        tracker.begin()
+        tracker.register([5], lambda: calls.append(True))
+        tracker.end()
+        assert calls == []
+        assert len(tracker) == 1
+        assert len(tracker._early) == 0
+
+    def testBounded(self):
+        tracker = PublishTracker(maxPending=10)
+        tracker.begin()
+        tracker.register(range(1, 21), lambda: None)
+        tracker.end()
+        assert len(tracker) == 10
+        assert sorted(tracker._pending) == list(range(11, 21))
+
+    def testDiscarded(self):
+        tracker = PublishTracker(maxPending=2)
+        discarded = []
+        tracker.begin()
+        tracker.register([1, 2], lambda: None, lambda: discarded.append(1))
+        tracker.register([3], lambda: None, lambda: discarded.append(3))
+        # A message that reuses a mid replaces the registration that is still waiting for it
+        tracker.register([2], lambda: None)
+        tracker.end()
+        assert discarded == [1, 1]
+        assert sorted(tracker._pending) == [2, 3]
+
+    def testEvictionReleasesWindow(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        client._publishTracker.maxPending = 2
+        calls = []
+        futures = [
+            client.publishEvent("status", "json", {"n": i}, qos=1, onPublish=lambda: calls.append(True))
+            for i in range(3)
+        ]
+        batch = client.publishEvents([("status", "json", {"n": i}) for i in range(2)], qos=1)
+        assert len(client._publishTracker) == 2
+        assert client.publishWindow.used == 2
+
+        # Evicted messages are never confirmed, waiting on them must not block and onPublish is not called
+        assert all(not future.wait(timeout=5) for future in futures)
+        assert not any(future.done() for future in futures)
+        client.client.publish.ackAll()
+        assert batch.isComplete() and batch.acked == 2
+        assert client.publishWindow.used == 0
+        assert calls == []
+
+        # A batch with evicted messages completes once the rest are confirmed, but is not reported as confirmed
+        batch = client.publishEvents(
+            [("status", "json", {"n": i}) for i in range(3)], qos=1, onPublish=lambda: calls.append(True)
+        )
+        client.client.publish.ackAll()
+        assert batch.isComplete() and batch.discarded == 1 and batch.pending == 0
+        assert not batch.wait(timeout=5)
+        assert client.publishWindow.used == 0
+        assert calls == []
+
+    def testCallbackRunsOutsideLock(self):
+        tracker = PublishTracker()
+        held = []
+        tracker.begin()
+        tracker.register([1], lambda: held.append(tracker._lock.locked()))
+        tracker.end()
+        tracker.confirm(1)
+        assert held == [False]
+
+
+class TestPublishFuture(testUtils.AbstractTest):
+    def testFuture(self):
+        calls = []
+        future = PublishFuture(lambda: calls.append(True))
+        assert future
+        assert not future.done()
+        assert not future.wait(timeout=0.01)
+        assert future.latency is None
+
+        threading.Timer(0.05, future._confirm).start()
+        assert future.wait(timeout=5)
+        assert future.done()
+        assert future.latency > 0
+        assert calls == [True]
+
+    def testPublishEventReturnsFuture(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        future = client.publishEvent("status", "json", {"n": 1}, qos=1)
+        assert isinstance(future, PublishFuture)
+        assert future.mid == client.client.publish.messages[0][0]
+        assert not future.done()
+
+        client.client.publish.ackAll()
+        assert future.done()
+        assert future.latency >= 0
+        assert len(client._publishTracker) == 0
+        assert client.publishWindow.used == 0
+
+    def testPublishEventAckedInline(self):
+        client = createClient(wiotp.sdk.device.DeviceClient, ackInline=True)
+        calls = []
+        future = client.publishEvent("status", "json", {"n": 1}, onPublish=lambda: calls.append(True))
+        assert future.done()
+        assert calls == [True]
+        assert len(client._publishTracker) == 0
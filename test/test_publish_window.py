@@ -0,0 +1,100 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+import time
+import testUtils
+import wiotp.sdk.device
+
+from wiotp.sdk import PublishWindow
+
+
+def createClient(backpressure, maxQueued=2, backpressureTimeout=10):
+    mqtt = {
+        "maxInflight": 1,
+        "maxQueued": maxQueued,
+        "backpressure": backpressure,
+        "backpressureTimeout": backpressureTimeout,
+    }
+    return testUtils.createClient(wiotp.sdk.device.DeviceClient, options={"mqtt": mqtt})
+
+
+class TestPublishWindow(testUtils.AbstractTest):
+    def testUnbounded(self):
+        window = PublishWindow()
+        for i in range(1000):
+            assert window.acquire()
+        assert window.used == 1000
+        assert window.available is None
+
+    def testReject(self):
+        window = PublishWindow(2, "reject")
+        assert window.acquire()
+        assert window.acquire()
+        assert window.isFull()
+        assert not window.acquire()
+        window.release()
+        assert window.available == 1
+        assert window.acquire()
+
+    def testTimeout(self):
+        window = PublishWindow(1, "timeout", timeout=0.05)
+        assert window.acquire()
+        start = time.time()
+        assert not window.acquire()
+        assert time.time() - start >= 0.05
+
+    def testBlock(self):
+        window = PublishWindow(1, "block")
+        assert window.acquire()
+        threading.Timer(0.05, window.release).start()
+        assert window.acquire()
+        assert window.used == 1
+
+    def testClientRejectsWhenFull(self):
+        client = createClient("reject")
+        assert client.publishEvent("e", "json", 1, qos=1)
+        assert client.publishEvent("e", "json", 2, qos=1)
+        assert client.publishEvent("e", "json", 3, qos=1)
+        assert client.publishWindow.used == 3
+        assert client.publishEvent("e", "json", 4, qos=1) == False
+        assert len(client.client.publish.messages) == 3
+
+        client.client.publish.ackAll()
+        assert client.publishWindow.used == 0
+        assert client.publishEvent("e", "json", 4, qos=1)
+
+    def testClientBlocksUntilAcked(self):
+        client = createClient("block", maxQueued=1)
+        client.publishEvent("e", "json", 1, qos=1)
+        client.publishEvent("e", "json", 2, qos=1)
+        threading.Timer(0.05, client.client.publish.ackAll).start()
+        assert client.publishEvent("e", "json", 3, qos=1)
+        assert client.publishWindow.used == 1
+
+    def testBatchLargerThanWindow(self):
+        client = createClient("timeout", maxQueued=1, backpressureTimeout=0.05)
+
+        # Acknowledge everything published so far whenever the batch has to wait for space
+        acquire = client.publishWindow.acquire
+
+        def ackThenAcquire():
+            client.client.publish.ackAll()
+            client.client.publish.messages = []
+            return acquire()
+
+        client.publishWindow.acquire = ackThenAcquire
+
+        batch = client.publishEvents([("e", "json", i) for i in range(10)], qos=1)
+        assert batch.sent == 10
+        assert batch.failed == 0
+        assert batch.acked == 8
+        client.client.publish.ackAll()
+        assert batch.isComplete()
+        assert client.publishWindow.used == 0
@@ -0,0 +1,123 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import json
+import pytest
+import testUtils
+import wiotp.sdk
+import wiotp.sdk.device
+import wiotp.sdk.gateway
+from testUtils import createClient
+from wiotp.sdk.messages import _requiresTimestamp
+
+
+class TimestampCodec(wiotp.sdk.MessageCodec):
+    @staticmethod
+    def encode(data=None, timestamp=None):
+        return json.dumps({"data": data, "ts": timestamp.isoformat() if timestamp else None})
+
+
+class TimestampedJsonCodec(wiotp.sdk.JsonCodec):
+    """
+    Overrides encode() and uses the timestamp, without opting out of it like JsonCodec does
+    """
+
+    @staticmethod
+    def encode(data=None, timestamp=None):
+        return json.dumps({"data": data, "ts": timestamp.isoformat()})
+
+
+class UntimestampedJsonCodec(TimestampedJsonCodec):
+    requiresTimestamp = False
+
+    @staticmethod
+    def encode(data=None, timestamp=None):
+        return json.dumps({"data": data})
+
+
+class TestPublisher(testUtils.AbstractTest):
+    def testDevicePublisher(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        publisher = client.publisher("status", "json", qos=1)
+        assert publisher.topic == "iot-2/evt/status/fmt/json"
+
+        future = publisher.publish({"n": 1})
+        publisher({"n": 2})
+        messages = client.client.publish.messages
+        assert [(m[1], json.loads(m[2]), m[3]) for m in messages] == [
+            ("iot-2/evt/status/fmt/json", {"n": 1}, 1),
+            ("iot-2/evt/status/fmt/json", {"n": 2}, 1),
+        ]
+
+        client.client.publish.ackAll()
+        assert future.done()
+        assert client.publishWindow.used == 0
+
+    def testGatewayPublishers(self):
+        client = createClient(wiotp.sdk.gateway.GatewayClient)
+        assert client.publisher("reading", "json").topic == "iot-2/type/mytype/id/mydevice/evt/reading/fmt/json"
+        publisher = client.devicePublisher("childType", "child", "reading", "json")
+        publisher({"v": 1})
+        assert client.client.publish.messages[0][1] == "iot-2/type/childType/id/child/evt/reading/fmt/json"
+
+    def testMissingCodec(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        with pytest.raises(wiotp.sdk.MissingMessageEncoderException):
+            client.publisher("status", "unknown")
+
+    def testTimestampOnlyWhenRequired(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        assert wiotp.sdk.JsonCodec.requiresTimestamp == False
+
+        client.setMessageCodec("ts", TimestampCodec)
+        client.publisher("status", "ts")("x")
+        client.publishEvent("status", "ts", "y")
+        payloads = [json.loads(m[2]) for m in client.client.publish.messages]
+        assert all(p["ts"] is not None for p in payloads)
+
+    def testSubclassOverridingEncodeGetsTimestamp(self):
+        assert _requiresTimestamp(TimestampedJsonCodec)
+        assert _requiresTimestamp(TimestampedJsonCodec())
+        assert not _requiresTimestamp(UntimestampedJsonCodec)
+        # Opting out without overriding encode() does not stop the inherited encode() from getting a timestamp
+        assert _requiresTimestamp(type("OptOutCodec", (TimestampedJsonCodec,), {"requiresTimestamp": False}))
+        assert not _requiresTimestamp(wiotp.sdk.JsonCodec)
+        # A subclass that keeps JsonCodec's encode() keeps its opt out
+        assert not _requiresTimestamp(type("PlainJsonCodec", (wiotp.sdk.JsonCodec,), {}))
+        assert _requiresTimestamp(wiotp.sdk.CompressedCodec(TimestampedJsonCodec))
+
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        client.setMessageCodec("ts", TimestampedJsonCodec)
+        client.publisher("status", "ts")("a")
+        client.publishEvent("status", "ts", "b")
+        client.publishEvents([("status", "ts", "c")])
+        client.publishEvent("status", "ts-deflate", "d")
+        payloads = [m[2] for m in client.client.publish.messages]
+        assert [json.loads(p)["data"] for p in payloads[:3]] == ["a", "b", "c"]
+        assert all(json.loads(p)["ts"] for p in payloads[:3])
+
+        client = createClient(wiotp.sdk.device.DeviceClient, options={"spool": {"enabled": True}}, connected=False)
+        client.setMessageCodec("ts", TimestampedJsonCodec)
+        assert client.publishEvents([("status", "ts", "e")])
+        assert json.loads(client.spool.peek(timeout=0)[1])["ts"]
+
+        app = wiotp.sdk.application.ApplicationClient(
+            {"identity": {"appId": "myapp"}, "auth": {"key": "a-myorg-key", "token": "t"}}
+        )
+        app.client.publish = testUtils.FakePublisher(app)
+        app.connectEvent.set()
+        app.setMessageCodec("ts", TimestampedJsonCodec)
+        app.publishCommand("t", "d", "reboot", "ts", "f")
+        assert json.loads(app.client.publish.messages[0][2])["ts"]
+
+    def testDisconnected(self):
+        client = createClient(wiotp.sdk.device.DeviceClient)
+        client.connectEvent.clear()
+        client.connectEvent.wait = lambda timeout=None: False
+        assert client.publisher("status", "json")({"n": 1}) == False
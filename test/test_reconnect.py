@@ -0,0 +1,145 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import json
+import socket
+import pytest
+import testUtils
+import wiotp.sdk
+import wiotp.sdk.device
+from wiotp.sdk.reconnect import ReconnectPolicy
+
+
+def createClient(cls=wiotp.sdk.device.DeviceClient, reconnect=None):
+    client = testUtils.createClient(cls, options={"mqtt": {"reconnect": reconnect}}, connected=False)
+    client.client.subscribe = lambda topic, qos=0: (0, 1)
+    return client
+
+
+class TestReconnect(testUtils.AbstractTest):
+    def testPolicyBackoff(self):
+        policy = ReconnectPolicy(minDelay=1, maxDelay=30, jitter=0)
+        assert [policy.delay(n) for n in range(1, 8)] == [1, 2, 4, 8, 16, 30, 30]
+        assert policy.delay(1000) == 30
+
+    def testPolicyJitter(self):
+        policy = ReconnectPolicy(minDelay=10, maxDelay=10, jitter=0.5)
+        delays = [policy.delay(1) for i in range(200)]
+        assert all(5 <= d <= 10 for d in delays)
+        assert len(set(delays)) > 1
+
+    def testPolicyExhausted(self):
+        assert not ReconnectPolicy(maxAttempts=0).exhausted(1000)
+        assert not ReconnectPolicy(maxAttempts=3).exhausted(2)
+        assert ReconnectPolicy(maxAttempts=3).exhausted(3)
+
+    def testConfigDefaults(self):
+        client = createClient()
+        assert client.reconnectPolicy.minDelay == 1
+        assert client.reconnectPolicy.maxDelay == 120
+        assert client.reconnectPolicy.jitter == 0.5
+        assert client.reconnectPolicy.maxAttempts == 0
+
+    def testInvalidConfig(self):
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            createClient(reconnect={"jitter": 2})
+        assert "options.mqtt.reconnect.jitter" in e.value.reason
+        with pytest.raises(wiotp.sdk.ConfigurationException) as e:
+            createClient(reconnect={"minDelay": -1})
+        assert "options.mqtt.reconnect.minDelay" in e.value.reason
+
+    def testConnectRetries(self):
+        client = createClient(reconnect={"minDelay": 0, "maxAttempts": 3})
+        attempts = []
+
+        def failingConnect(*args, **kwargs):
+            attempts.append(True)
+            raise socket.error("unreachable")
+
+        client.client.connect = failingConnect
+        with pytest.raises(wiotp.sdk.ConnectionException):
+            client.connect()
+        assert len(attempts) == 3
+
+    def testConnectSingleAttemptByDefault(self):
+        client = createClient()
+        attempts = []
+
+        def failingConnect(*args, **kwargs):
+            attempts.append(True)
+            raise socket.error("unreachable")
+
+        client.client.connect = failingConnect
+        with pytest.raises(wiotp.sdk.ConnectionException):
+            client.connect()
+        assert len(attempts) == 1
+
+    def testReconnectDelayAndStats(self):
+        client = createClient(reconnect={"minDelay": 2, "maxDelay": 8, "jitter": 0})
+        client._onConnect(None, None, None, 0)
+        assert client.reconnectStats.reconnects == 0
+
+        client._onDisconnect(None, None, 1)
+        assert client.reconnectStats.disconnected
+        assert client.client._reconnect_min_delay == 2
+        client._onConnectFail(None, None)
+        client._onConnectFail(None, None)
+        assert client.client._reconnect_min_delay == 8
+        assert client.reconnectStats.failedAttempts == 2
+
+        client._onConnect(None, None, None, 0)
+        stats = client.reconnectStats
+        assert stats.disconnects == 1
+        assert stats.reconnects == 1
+        assert not stats.disconnected
+        assert stats.lastRecoveryTime >= 0
+        assert stats.maxRecoveryTime == stats.lastRecoveryTime
+
+    def testReconnectGivesUp(self):
+        client = createClient(reconnect={"maxAttempts": 2})
+        disconnects = []
+        client.client.disconnect = lambda: disconnects.append(True)
+        client._onDisconnect(None, None, 1)
+        assert disconnects == []
+        client._onConnectFail(None, None)
+        assert disconnects == [True]
+
+    def testManagedClientReplaysPendingRequests(self):
+        client = createClient(wiotp.sdk.device.ManagedDeviceClient)
+        client.subscriptionsAcknowledged.set()
+        client.readyForDeviceMgmt.set()
+        client._onConnect(None, None, None, 0)
+        client.manage(lifetime=0)
+        client.setLocation(1.0, 2.0)
+        client.setErrorCode(1)
+        publish = client.client.publish
+        manage, location, errorCode = publish.messages
+
+        # Only the location update was acknowledged, Paho itself re-sends the error code
+        client._onPublish(None, None, manage[0])
+        client._onPublish(None, None, location[0])
+        client._onDisconnect(None, None, 1)
+        client._onConnect(None, None, None, 0)
+        replayed = publish.messages[3:]
+        assert [m[1] for m in replayed] == [wiotp.sdk.device.ManagedDeviceClient.UPDATE_LOCATION_TOPIC]
+        assert json.loads(replayed[0][2])["reqId"] == json.loads(location[2])["reqId"]
+
+        # The superseded manage request is no longer pending, manage() replaces it once subscriptions are restored
+        pending = client._deviceMgmtRequestsPending
+        assert json.loads(manage[2])["reqId"] not in pending
+        assert len(pending) == 2
+
+        # The replayed request is only sent again if it is acknowledged and the connection is lost again
+        client._onDisconnect(None, None, 1)
+        client._onConnect(None, None, None, 0)
+        assert len(publish.messages) == 4
+        client._onPublish(None, None, replayed[0][0])
+        client._onDisconnect(None, None, 1)
+        client._onConnect(None, None, None, 0)
+        assert len(publish.messages) == 5
@@ -0,0 +1,148 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import functools
+import os
+import time
+
+import pytest
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+
+from wiotp.sdk import ConfigurationException, ReconnectPolicy
+from wiotp.sdk.application import ShardedApplicationConsumer
+from wiotp.sdk.metrics import ClientMetrics, mergeSnapshots
+from wiotp.sdk.testing import Broker
+
+CONFIG = {
+    "identity": {"appId": "sharded"},
+    "auth": {"key": "a-myorg-abcdefgh", "token": "t"},
+    "options": {"mqtt": {"port": 1883}},
+}
+
+
+def waitUntil(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def attachedClient(host, port, config):
+    client = wiotp.sdk.application.ApplicationClient(config)
+    client.address = host
+    client.port = port
+    return client
+
+
+def subscribe(client):
+    client.deviceEventCallback = lambda event: None
+    client.subscribeToDeviceEvents()
+
+
+def crashOnce(marker, client):
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(3)
+    subscribe(client)
+
+
+def received(snapshot):
+    return snapshot["received"].get("deviceEvent", {}).get("reading", {}).get("messages", 0)
+
+
+class TestShardedApplicationConsumer(testUtils.AbstractTest):
+    def testShardConfig(self):
+        consumer = ShardedApplicationConsumer(CONFIG, subscribe, processes=3)
+        assert [shard.instanceId for shard in consumer.shards] == ["shard-0", "shard-1", "shard-2"]
+        config = wiotp.sdk.application.ApplicationClientConfig(**consumer.shardConfig(consumer.shards[1]))
+        assert config.clientId == "A:myorg:sharded:shard-1"
+        assert consumer.config.instanceId is None
+
+        config = dict(CONFIG, options={"mqtt": {"instanceId": "node1"}, "inbound": {"path": "/tmp/inbound"}})
+        consumer = ShardedApplicationConsumer(config, subscribe, processes=2)
+        shardConfig = consumer.shardConfig(consumer.shards[0])
+        assert shardConfig["options"]["mqtt"]["instanceId"] == "node1-0"
+        assert shardConfig["options"]["inbound"]["path"] == "/tmp/inbound.node1-0"
+
+        # Every shard shares the generated appId
+        consumer = ShardedApplicationConsumer({"auth": CONFIG["auth"]}, subscribe, processes=2)
+        appIds = {consumer.shardConfig(shard)["identity"]["appId"] for shard in consumer.shards}
+        assert len(appIds) == 1
+
+    def testInvalidProcesses(self):
+        with pytest.raises(ConfigurationException):
+            ShardedApplicationConsumer(CONFIG, subscribe, processes=0)
+
+    def testMergeSnapshots(self):
+        first = ClientMetrics()
+        first._onReceived("iot-2/type/t/id/d1/evt/reading/fmt/json", 10, 0.001)
+        first._onDecodeFailure(ValueError())
+        first.register("queued", "Queued", lambda: 2)
+        first.register("lag", "Lag", lambda: None)
+        second = ClientMetrics()
+        second._onReceived("iot-2/type/t/id/d2/evt/reading/fmt/json", 5, 0.5)
+        second._onConfirmed(0.02)
+        second.register("queued", "Queued", lambda: 3)
+        second.register("lag", "Lag", lambda: None)
+
+        merged = mergeSnapshots([first.snapshot(), second.snapshot()])
+        assert merged["received"] == {"deviceEvent": {"reading": {"messages": 2, "bytes": 15}}}
+        assert merged["callbackTime"]["deviceEvent"]["count"] == 2
+        assert merged["callbackTime"]["deviceEvent"]["buckets"][-1] == (float("inf"), 2)
+        assert merged["publishLatency"]["count"] == 1
+        assert merged["decodeFailures"] == {"ValueError": 1}
+        assert merged["queued"] == 5
+        assert merged["lag"] is None
+        assert mergeSnapshots([])["publishLatency"]["count"] == 0
+
+    def testConsumeAndRestart(self, tmpdir):
+        with Broker() as broker:
+            consumer = ShardedApplicationConsumer(
+                CONFIG,
+                functools.partial(crashOnce, str(tmpdir.join("crashed"))),
+                processes=2,
+                metricsInterval=0.1,
+                restartPolicy=ReconnectPolicy(0.05, 0.1),
+                clientFactory=functools.partial(attachedClient, broker.host, broker.port),
+                startMethod="fork",
+            )
+            consumer.start()
+            try:
+                assert waitUntil(lambda: len(consumer.shardMetrics()) == 2)
+                # One of the shards crashed the first time it started, and was restarted
+                assert sum(shard.restarts for shard in consumer.shards) == 1
+                assert all(shard.failures == 0 for shard in consumer.shards)
+                assert waitUntil(lambda: len(broker.clients) == 2)
+                assert set(broker.clients) == {"A:myorg:sharded:shard-0", "A:myorg:sharded:shard-1"}
+
+                device = wiotp.sdk.device.DeviceClient(
+                    {
+                        "identity": {"orgId": "myorg", "typeId": "t", "deviceId": "d"},
+                        "auth": {"token": "t"},
+                        "options": {"mqtt": {"port": 1883}},
+                    }
+                )
+                broker.attach(device).connect()
+                for i in range(10):
+                    device.publishEvent("reading", "json", {"i": i}, qos=1)
+                assert len(broker.waitForMessages("iot-2/type/t/id/d/evt/reading/fmt/json", 10)) == 10
+                device.disconnect()
+
+                # The events are shared between the shards
+                assert waitUntil(lambda: received(consumer.metrics()) == 10)
+                perShard = [received(snapshot) for snapshot in consumer.shardMetrics().values()]
+                assert sorted(perShard) == [5, 5]
+                assert "wiotp_received_messages_total" in consumer.prometheus()
+            finally:
+                assert consumer.stop(10)
+            assert all(not shard.alive for shard in consumer.shards)
@@ -0,0 +1,120 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import pytest
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+import paho.mqtt.client as paho
+from wiotp.sdk.subscribe import packSubscriptions
+
+
+class FakeSubscriber(object):
+    """
+    Stands in for paho.Client.subscribe(), recording each SUBSCRIBE packet and optionally acknowledging it
+    before the call returns (emulating the Paho network thread winning the race with the subscriber)
+    """
+
+    def __init__(self, client, ackInline=False, refuse=()):
+        self.client = client
+        self.ackInline = ackInline
+        self.refuse = refuse
+        self.packets = []
+        self.mid = 0
+
+    def __call__(self, topic, qos=0):
+        self.mid += 1
+        self.packets.append((self.mid, topic))
+        if self.ackInline:
+            self.ack(self.mid, topic)
+        return (paho.MQTT_ERR_SUCCESS, self.mid)
+
+    def ack(self, mid, topics):
+        granted = tuple(0x80 if t in self.refuse else q for t, q in topics)
+        self.client._onSubscribe(None, None, mid, granted)
+
+    def ackAll(self):
+        for mid, topics in self.packets:
+            self.ack(mid, topics)
+
+
+def createClient(ackInline=False, refuse=()):
+    client = wiotp.sdk.application.ApplicationClient(
+        {"identity": {"appId": "myapp"}, "auth": {"key": "a-myorg-abc", "token": "mytoken"}, "options": {}}
+    )
+    client.client.subscribe = FakeSubscriber(client, ackInline, refuse)
+    client.connectEvent.set()
+    return client
+
+
+class TestSubscribeMany(testUtils.AbstractTest):
+    def testPackSubscriptions(self):
+        subscriptions = [("iot-2/type/t/id/d%04d/evt/+/fmt/+" % i, i % 2) for i in range(1000)]
+        packets = list(packSubscriptions(subscriptions, maxPacketSize=1024))
+        assert [s for packet in packets for s in packet] == subscriptions
+        for packet in packets:
+            assert 7 + sum(len(t) + 3 for t, q in packet) <= 1024
+
+        # A topic too large for the limit still gets a packet of its own
+        assert list(packSubscriptions([("a" * 100, 0), ("b", 1)], maxPacketSize=50)) == [[("a" * 100, 0)], [("b", 1)]]
+
+    def testSubscribeMany(self):
+        client = createClient(refuse=("iot-2/type/t/id/d3/evt/+/fmt/+",))
+        subscriptions = [("iot-2/type/t/id/d%s/evt/+/fmt/+" % i, 1) for i in range(500)]
+        calls = []
+
+        batch = client.subscribeMany(subscriptions, onSubscribe=calls.append, maxPacketSize=4096)
+        assert 1 < batch.packets == len(client.client.subscribe.packets) < 10
+        assert not batch.isComplete()
+
+        client.client.subscribe.ackAll()
+        assert batch.wait(timeout=1)
+        assert calls == [batch]
+        assert batch.pending == 0
+        assert batch.refused == ["iot-2/type/t/id/d3/evt/+/fmt/+"]
+        assert len(batch.granted) == 499
+        assert len(client._subscriptions) == 500
+        assert len(client._subscribeTracker) == 0
+
+    def testSubackBeforeRegister(self):
+        client = createClient(ackInline=True)
+        batch = client.subscribeMany([("iot-2/type/t/id/d/evt/+/fmt/+", 0), ("iot-2/type/+/id/+/mon", 0)])
+        assert batch.isComplete()
+        assert batch.granted == {"iot-2/type/t/id/d/evt/+/fmt/+": 0, "iot-2/type/+/id/+/mon": 0}
+
+    def testRestoreOnReconnect(self):
+        client = createClient()
+        client.subscribeMany([("iot-2/type/t/id/d%s/evt/+/fmt/+" % i, 0) for i in range(2000)])
+        sent = len(client.client.subscribe.packets)
+
+        client._onDisconnect(None, None, 1)
+        client._onConnect(None, None, None, 0)
+        restored = client.client.subscribe.packets[sent:]
+        assert len(restored) == sent
+        assert sum(len(topics) for mid, topics in restored) == 2000
+
+        batch = client.restoredSubscriptions
+        assert not batch.isComplete()
+        client.client.subscribe.ackAll()
+        assert batch.isComplete()
+        assert len(batch.granted) == 2000
+
+    def testDeviceRestoresCommandSubscription(self):
+        client = wiotp.sdk.device.DeviceClient(
+            {
+                "identity": {"orgId": "myorg", "typeId": "mytype", "deviceId": "mydevice"},
+                "auth": {"token": "mytoken"},
+                "options": {"mqtt": {"port": 1883}},
+            }
+        )
+        client.client.subscribe = FakeSubscriber(client, ackInline=True)
+        client._onConnect(None, None, None, 0)
+        assert len(client.client.subscribe.packets) == 1
+        assert client.restoredSubscriptions.isComplete()
+        assert client.subscriptionsAcknowledged.is_set()
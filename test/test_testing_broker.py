@@ -0,0 +1,202 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import threading
+import time
+
+import pytest
+import testUtils
+import wiotp.sdk.application
+import wiotp.sdk.device
+import wiotp.sdk.gateway
+import paho.mqtt.client as paho
+
+from wiotp.sdk import ConfigurationException
+from wiotp.sdk.testing import Broker, topicMatches
+
+OPTIONS = {"mqtt": {"port": 1883}}
+
+
+def waitUntil(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def broker():
+    with Broker() as broker:
+        yield broker
+
+
+@pytest.fixture
+def connected():
+    clients = []
+
+    def connect(broker, client):
+        broker.attach(client).connect()
+        clients.append(client)
+        return client
+
+    yield connect
+    for client in clients:
+        client.disconnect()
+
+
+def applicationClient():
+    return wiotp.sdk.application.ApplicationClient(
+        {"identity": {"appId": "brokertest"}, "auth": {"key": "a-myorg-abcdefgh", "token": "t"}, "options": OPTIONS}
+    )
+
+
+def deviceClient(cls=wiotp.sdk.device.DeviceClient, typeId="mytype", deviceId="mydevice"):
+    return cls(
+        {
+            "identity": {"orgId": "myorg", "typeId": typeId, "deviceId": deviceId},
+            "auth": {"token": "mytoken"},
+            "options": OPTIONS,
+        }
+    )
+
+
+class TestTestingBroker(testUtils.AbstractTest):
+    def testTopicMatches(self):
+        assert topicMatches("iot-2/type/+/id/+/evt/+/fmt/+", "iot-2/type/t/id/d/evt/e/fmt/json")
+        assert not topicMatches("iot-2/type/+/id/+/evt/+/fmt/+", "iot-2/type/t/id/d/mon")
+        assert topicMatches("iotdm-1/#", "iotdm-1")
+        assert topicMatches("iotdm-1/#", "iotdm-1/mgmt/initiate/device/reboot")
+        assert not topicMatches("iotdm-1/+", "iotdm-1/mgmt/initiate")
+
+    def testAttachRequiresPlainTcp(self, broker):
+        client = wiotp.sdk.device.DeviceClient(
+            {"identity": {"orgId": "myorg", "typeId": "t", "deviceId": "d"}, "auth": {"token": "mytoken"}}
+        )
+        with pytest.raises(ConfigurationException):
+            broker.attach(client)
+
+    def testEventsCommandsAndStatus(self, broker, connected):
+        app = connected(broker, applicationClient())
+        events = []
+        statuses = []
+        app.deviceEventCallback = events.append
+        app.deviceStatusCallback = statuses.append
+        app.subscribeToDeviceEvents(typeId="mytype")
+        app.subscribeToDeviceStatus()
+        assert app.subscriptionsAcknowledged.wait(5)
+
+        device = connected(broker, deviceClient())
+        commands = []
+        device.commandCallback = commands.append
+        assert device.publishEvent("status", "json", {"ok": True}, qos=1).wait(5)
+        assert app.publishCommand("mytype", "mydevice", "reboot", "json", {"delay": 5}, qos=1).wait(5)
+
+        assert waitUntil(lambda: len(events) == 1 and len(commands) == 1)
+        assert events[0].device == "mytype:mydevice"
+        assert events[0].data == {"ok": True}
+        assert commands[0].commandId == "reboot"
+        assert commands[0].data == {"delay": 5}
+
+        (published,) = broker.messages("iot-2/type/mytype/id/mydevice/evt/+/fmt/+")
+        assert published.clientId == "d:myorg:mytype:mydevice"
+        assert published.json() == {"ok": True}
+
+        device.disconnect()
+        assert waitUntil(lambda: len(statuses) == 2)
+        assert [status.action for status in statuses] == ["Connect", "Disconnect"]
+        assert statuses[1].clientId == "d:myorg:mytype:mydevice"
+        assert statuses[1].reason == "The connection has completed normally."
+        assert statuses[1].readMsg == 1
+
+    def testGateway(self, broker, connected):
+        app = connected(broker, applicationClient())
+        events = []
+        app.deviceEventCallback = events.append
+        app.subscribeToDeviceEvents()
+        assert app.subscriptionsAcknowledged.wait(5)
+
+        gateway = connected(broker, deviceClient(wiotp.sdk.gateway.GatewayClient, "mygateway", "gw1"))
+        commands = []
+        gateway.deviceCommandCallback = commands.append
+        gateway.subscribeToDeviceCommands("sensor", "s1")
+        assert gateway.subscriptionsAcknowledged.wait(5)
+
+        assert gateway.publishDeviceEvent("sensor", "s1", "reading", "json", {"t": 20}, qos=1).wait(5)
+        app.publishCommand("sensor", "s1", "calibrate", "json", {}, qos=1)
+        assert waitUntil(lambda: len(events) == 1 and len(commands) == 1)
+        assert events[0].device == "sensor:s1"
+        assert commands[0].typeId == "sensor"
+
+    def testDeviceManagement(self, broker, connected):
+        device = connected(broker, deviceClient(wiotp.sdk.device.ManagedDeviceClient))
+        assert device.readyForDeviceMgmt.wait(5)
+        record = broker.device("mytype", "mydevice")
+        assert record.managed
+        assert record.lifetime == 3600
+        assert record.supports == {"deviceActions": True, "firmwareActions": True}
+
+        assert device.setLocation(longitude=1.5, latitude=52).wait(5)
+        assert device.setErrorCode(12).wait(5)
+        assert record.location["latitude"] == 52
+        assert record.errorCodes == [12]
+
+        actions = []
+
+        def onAction(reqId, action):
+            actions.append(action)
+            device.respondDeviceAction(reqId, 202)
+
+        device.deviceActionCallback = onAction
+        request = broker.initiateDeviceManagement("mytype", "mydevice", "mgmt/initiate/device/reboot")
+        assert request.wait(5)
+        assert request.rc == 202
+        assert actions == ["reboot"]
+
+        broker.dmResponseCodes["mgmt/unmanage"] = 403
+        assert device.unmanage().wait(5)
+        assert record.managed
+
+    def testRetainedAndReconnect(self, broker, connected):
+        broker.publish("iot-2/type/mytype/id/mydevice/cmd/config/fmt/json", {"rate": 10}, qos=1, retain=True)
+        device = deviceClient()
+        device.reconnectPolicy.minDelay = 0.01
+        commands = []
+        device.commandCallback = commands.append
+        connected(broker, device)
+        assert waitUntil(lambda: len(commands) == 1)
+        assert commands[0].data == {"rate": 10}
+
+        assert broker.disconnectClient("d:myorg:mytype:mydevice")
+        assert waitUntil(lambda: device.reconnectStats.reconnects == 1, 10)
+        assert waitUntil(lambda: len(commands) == 2)
+        assert broker.messages("iot-2/type/mytype/id/mydevice/mon")[1].json()["Reason"] == (
+            "The connection was closed by the server."
+        )
+
+    def testRefusesUnknownClients(self, broker):
+        results = []
+        connected = threading.Event()
+
+        def onConnect(client, userdata, flags, rc):
+            results.append(rc)
+            connected.set()
+
+        for clientId in ["not-a-wiotp-client", "d:myorg:mytype:mydevice"]:
+            broker.authenticate = lambda clientId, username, password: password == "secret"
+            client = paho.Client(clientId)
+            client.username_pw_set("use-token-auth", "wrong")
+            client.on_connect = onConnect
+            client.connect(broker.host, broker.port)
+            client.loop_start()
+            assert connected.wait(5)
+            client.loop_stop()
+            connected.clear()
+        assert results == [2, 5]
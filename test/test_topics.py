@@ -0,0 +1,96 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import pytest
+import testUtils
+import wiotp.sdk
+import wiotp.sdk.application
+from wiotp.sdk import topics
+from wiotp.sdk.topics import parseTopic
+
+
+class FakePahoMessage(object):
+    def __init__(self, topic, payload=b'{"a":4}'):
+        self.topic = topic
+        self.payload = payload
+        self.retain = False
+
+
+class TestTopics(testUtils.AbstractTest):
+    @pytest.mark.parametrize(
+        "topic,kind,typeId,deviceId,name,format",
+        [
+            ("iot-2/type/t/id/d/evt/e/fmt/json", topics.DEVICE_EVENT, "t", "d", "e", "json"),
+            ("iot-2/type/t/id/d/cmd/c/fmt/json", topics.DEVICE_COMMAND, "t", "d", "c", "json"),
+            ("iot-2/type/t/id/d/mon", topics.DEVICE_STATUS, "t", "d", None, None),
+            ("iot-2/type/t/id/d/intf/li/evt/state", topics.DEVICE_STATE, "t", "d", "li", None),
+            ("iot-2/type/t/id/d/err/data", topics.DEVICE_ERROR, "t", "d", None, None),
+            ("iot-2/type/t/id/d/notify", topics.DEVICE_NOTIFY, "t", "d", None, None),
+            ("iot-2/thing/type/t/id/d/intf/li/evt/state", topics.THING_STATE, "t", "d", "li", None),
+            ("iot-2/thing/type/t/id/d/err/data", topics.THING_ERROR, "t", "d", None, None),
+            ("iot-2/app/myapp/mon", topics.APP_STATUS, None, None, "myapp", None),
+            ("iot-2/cmd/reboot/fmt/json", topics.COMMAND, None, None, "reboot", "json"),
+            ("iot-2/evt/status/fmt/json", topics.EVENT, None, None, "status", "json"),
+        ],
+    )
+    def testParse(self, topic, kind, typeId, deviceId, name, format):
+        parsed = parseTopic(topic)
+        assert parsed.kind == kind
+        assert parsed.typeId == typeId
+        assert parsed.deviceId == deviceId
+        assert parsed.name == name
+        assert parsed.format == format
+        if typeId is not None:
+            assert parsed.device == "t:d"
+
+    @pytest.mark.parametrize(
+        "topic",
+        [
+            "iot-2/type/t/id/d/evt/e/fmt",
+            "iot-2/type/t/id/d/evt/e/fmt/json/extra",
+            "iot-2/type//id/d/evt/e/fmt/json",
+            "iot-2/type/t/id/d/monitor",
+            "iot-3/type/t/id/d/mon",
+            "iot-2/thing/type/t/id/d/mon",
+            "iotdm-1/response",
+            "iot-2/evt/status/json",
+        ],
+    )
+    def testInvalid(self, topic):
+        assert parseTopic(topic) is None
+
+    def testSharedObjects(self):
+        # Build the topics at runtime so that the strings are not shared by the compiler
+        first = parseTopic("/".join(["iot-2", "type", "sensor", "id", "d0001", "evt", "temp", "fmt", "json"]))
+        again = parseTopic("/".join(["iot-2", "type", "sensor", "id", "d0001", "evt", "temp", "fmt", "json"]))
+        other = parseTopic("/".join(["iot-2", "type", "sensor", "id", "d0001", "evt", "humidity", "fmt", "json"]))
+        assert first is again
+        assert other is not first
+        assert other.device is first.device
+        assert other.typeId is first.typeId
+        assert other.deviceId is first.deviceId
+        assert other.format is first.format
+
+    def testEventsShareIdentity(self):
+        codecs = {"json": wiotp.sdk.JsonCodec}
+        events = [
+            wiotp.sdk.application.Event(FakePahoMessage("iot-2/type/t/id/d/evt/%s/fmt/json" % e), codecs)
+            for e in ("a", "b")
+        ]
+        assert events[0].device == "t:d"
+        assert events[0].device is events[1].device
+        assert events[1].eventId == "b"
+
+    def testThingError(self):
+        error = wiotp.sdk.application.ThingError(FakePahoMessage("iot-2/thing/type/t/id/thing1/err/data"))
+        assert error.source == "t:thing1"
+        error = wiotp.sdk.application.ThingError(FakePahoMessage("iot-2/type/t/id/d/err/data"))
+        assert error.source == "t:d"
+        with pytest.raises(wiotp.sdk.InvalidEventException):
+            wiotp.sdk.application.Error(FakePahoMessage("iot-2/thing/type/t/id/thing1/err/data"))
@@ -0,0 +1,245 @@
+# *****************************************************************************
+# Copyright (c) 2024 IBM Corporation and other Contributors.
+#
+# All rights reserved. This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v1.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v10.html
+# *****************************************************************************
+
+import pytest
+import testUtils
+import wiotp.sdk
+import wiotp.sdk.application
+import wiotp.sdk.device
+import paho.mqtt.client as paho
+
+from wiotp.sdk import MissingMessageEncoderException, Span, Tracer, tracing
+
+
+class RecordingSpan(Span):
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.events = []
+        self.errors = []
+        self.ended = False
+
+    def setAttribute(self, key, value):
+        self.attributes[key] = value
+
+    def addEvent(self, name):
+        self.events.append(name)
+
+    def recordError(self, error):
+        self.errors.append(error)
+
+    def end(self):
+        assert not self.ended
+        self.ended = True
+
+
+class RecordingTracer(Tracer):
+    def __init__(self):
+        self.spans = []
+
+    def startSpan(self, name, attributes=None, parent=None):
+        span = RecordingSpan(name, attributes, parent)
+        self.spans.append(span)
+        return span
+
+
+def createDevice():
+    client = testUtils.createClient(wiotp.sdk.device.DeviceClient)
+    client.tracer = RecordingTracer()
+    return client
+
+
+def receive(client, topic, payload, mid=7):
+    message = paho.MQTTMessage(mid=mid, topic=topic.encode("utf-8"))
+    message.payload = payload
+    client.client._handle_on_message(message)
+
+
+class TestTracing(testUtils.AbstractTest):
+    def testNoopByDefault(self):
+        tracer = Tracer()
+        span = tracer.startSpan(tracing.PUBLISH, {tracing.TOPIC: "a"})
+        span.setAttribute(tracing.MID, 1)
+        span.addEvent("sent")
+        span.recordError("failed")
+        span.end()
+        assert span is tracer.startSpan(tracing.RECEIVE)
+
+    def testPublishSpan(self):
+        client = createDevice()
+        client.client.publish = lambda topic, payload=None, qos=0, retain=False: (paho.MQTT_ERR_SUCCESS, 42)
+
+        future = client.publishEvent("status", "json", {"a": 1}, qos=1)
+        (span,) = client.tracer.spans
+        assert span.name == tracing.PUBLISH
+        assert span.attributes[tracing.TOPIC] == "iot-2/evt/status/fmt/json"
+        assert span.attributes[tracing.EVENT] == "status"
+        assert span.attributes[tracing.FORMAT] == "json"
+        assert span.attributes[tracing.QOS] == 1
+        assert span.attributes[tracing.SIZE] == len(client.getMessageCodec("json").encode({"a": 1}, None))
+        assert span.attributes[tracing.MID] == 42
+        assert span.events == ["encoded", "sent"]
+        assert not span.ended
+
+        client._onPublish(None, None, 42)
+        assert future.done()
+        assert span.ended
+        assert span.errors == []
+
+    def testPublishFailures(self):
+        client = createDevice()
+        client.client.publish = lambda topic, payload=None, qos=0, retain=False: (paho.MQTT_ERR_NO_CONN, None)
+        assert not client.publishEvent("status", "json", {"a": 1})
+        with pytest.raises(MissingMessageEncoderException):
+            client.publishEvent("status", "xml", "<a/>")
+
+        refused, missing = client.tracer.spans
+        assert refused.ended and len(refused.errors) == 1
+        assert missing.ended and isinstance(missing.errors[0], MissingMessageEncoderException)
+
+    def testPublisherSpan(self):
+        client = createDevice()
+        client.client.publish = lambda topic, payload=None, qos=0, retain=False: (paho.MQTT_ERR_SUCCESS, 42)
+        publisher = client.publisher("status", "json", qos=1)
+
+        future = publisher.publish({"a": 1})
+        (span,) = client.tracer.spans
+        assert span.name == tracing.PUBLISH
+        assert span.attributes[tracing.TOPIC] == "iot-2/evt/status/fmt/json"
+        assert span.attributes[tracing.EVENT] == "status"
+        assert span.attributes[tracing.FORMAT] == "json"
+        assert span.attributes[tracing.QOS] == 1
+        assert span.attributes[tracing.SIZE] == len(client.getMessageCodec("json").encode({"a": 1}, None))
+        assert span.attributes[tracing.MID] == 42
+        assert span.events == ["encoded", "sent"]
+
+        client._onPublish(None, None, 42)
+        assert future.done()
+        assert span.ended
+
+        with pytest.raises(TypeError):
+            publisher.publish(object())
+        failed = client.tracer.spans[1]
+        assert failed.ended and isinstance(failed.errors[0], TypeError)
+
+    def testBatchSpan(self):
+        client = createDevice()
+        mids = iter(range(1, 100))
+        results = {"refused": 0}
+
+        def publish(topic, payload=None, qos=0, retain=False):
+            if results["refused"]:
+                results["refused"] -= 1
+                return (paho.MQTT_ERR_NO_CONN, None)
+            return (paho.MQTT_ERR_SUCCESS, next(mids))
+
+        client.client.publish = publish
+
+        batch = client.publishEvents([("status", "json", {"i": i}) for i in range(3)], qos=1)
+        (span,) = client.tracer.spans
+        assert span.name == tracing.PUBLISH
+        assert span.attributes[tracing.TOPIC] == "iot-2/evt/status/fmt/json"
+        assert span.attributes[tracing.EVENT] == "status"
+        assert span.attributes[tracing.FORMAT] == "json"
+        assert span.attributes[tracing.QOS] == 1
+        assert span.attributes[tracing.COUNT] == 3
+        assert span.attributes[tracing.SIZE] == 3 * len(client.getMessageCodec("json").encode({"i": 0}, None))
+        assert span.events == ["sent"]
+
+        client._onPublish(None, None, 1)
+        client._onPublish(None, None, 2)
+        assert not span.ended
+        client._onPublish(None, None, 3)
+        assert batch.isComplete()
+        assert span.ended
+        assert span.errors == []
+
+        # A mixed batch records only what its messages share, and the messages that were not sent
+        results["refused"] = 1
+        client.publishEvents([("status", "json", {"i": 1}), ("alert", "json", {"i": 2})])
+        mixed = client.tracer.spans[1]
+        assert tracing.TOPIC not in mixed.attributes and tracing.EVENT not in mixed.attributes
+        assert mixed.attributes[tracing.COUNT] == 2
+        assert len(mixed.errors) == 1
+        client._onPublish(None, None, 4)
+        assert mixed.ended
+
+        with pytest.raises(MissingMessageEncoderException):
+            client.publishEvents([("status", "xml", "<a/>")])
+        missing = client.tracer.spans[2]
+        assert missing.ended and isinstance(missing.errors[0], MissingMessageEncoderException)
+
+    def testReceiveSpans(self):
+        client = createDevice()
+        commands = []
+        client.commandCallback = commands.append
+        receive(client, "iot-2/cmd/reboot/fmt/json", b'{"delay": 5}')
+        assert len(commands) == 1
+
+        received, callback = client.tracer.spans
+        assert received.name == tracing.RECEIVE
+        assert received.attributes == {
+            tracing.TOPIC: "iot-2/cmd/reboot/fmt/json",
+            tracing.QOS: 0,
+            tracing.SIZE: 12,
+            tracing.MID: 7,
+        }
+        assert callback.name == tracing.CALLBACK
+        assert callback.parent is received
+        assert received.ended and callback.ended
+        assert client._receiveSpan() is None
+
+    def testReceiveErrors(self):
+        client = createDevice()
+        receive(client, "iot-2/cmd/reboot/fmt/json", b"not json")
+        (invalid,) = client.tracer.spans
+        assert invalid.ended and len(invalid.errors) == 1
+
+        def fail(command):
+            raise ValueError("callback failed")
+
+        client.commandCallback = fail
+        with pytest.raises(ValueError):
+            receive(client, "iot-2/cmd/reboot/fmt/json", b"{}")
+        received, callback = client.tracer.spans[1:]
+        assert isinstance(callback.errors[0], ValueError)
+        assert isinstance(received.errors[0], ValueError)
+        assert received.ended and callback.ended
+
+    def testApplicationEventSpans(self):
+        client = wiotp.sdk.application.ApplicationClient(
+            {"identity": {"appId": "tracingtest"}, "auth": {"key": "a-myorg-abcdefgh", "token": "mytoken"}}
+        )
+        client.tracer = RecordingTracer()
+        events = []
+        client.deviceEventCallback = events.append
+        receive(client, "iot-2/type/t/id/d/evt/status/fmt/json", b'{"a": 1}')
+        assert len(events) == 1
+        assert [span.name for span in client.tracer.spans] == [tracing.RECEIVE, tracing.CALLBACK]
+
+    def testOpenTelemetry(self):
+        pytest.importorskip("opentelemetry.sdk")
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+        client = createDevice()
+        client.tracer = wiotp.sdk.OpenTelemetryTracer(provider.get_tracer("test"))
+        client.commandCallback = lambda command: None
+        receive(client, "iot-2/cmd/reboot/fmt/json", b"{}")
+
+        callback, received = exporter.get_finished_spans()
+        assert received.name == tracing.RECEIVE
+        assert received.attributes[tracing.MID] == 7
+        assert callback.parent.span_id == received.context.span_id